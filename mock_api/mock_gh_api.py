@@ -2,6 +2,11 @@
 
 # !Note: this module does get checked by linters
 
+import base64
+import hashlib
+
+from github.GithubException import UnknownObjectException
+
 
 class MockGH:
     """Supports the used mock functionalities of GitHub API"""
@@ -32,6 +37,10 @@ class MockRepo:
         self.pulls = [MockPullRequest("empty", "empty", "empty", "empty", 1)]
         self.pulls_last_index = 0
         self.contents = {}
+        self.write_count = 0
+        self.read_count = 0
+        self.blobs = {}
+        self.commits = {}
 
     def create_issue(self, title: str, body: str, labels=None):
         """Mock the create issue function."""
@@ -59,22 +68,51 @@ class MockRepo:
         return self.pulls[number - 1]
 
     def get_contents(self, path: str, branch=None):
+        self.read_count += 1
         if "." in path:
+            if path not in self.contents:
+                raise UnknownObjectException(404, {"message": "Not Found"}, None)
             return self.contents[path]
         contents = []
         for key, content_file in self.contents.items():
-            if key.startswith(path):
+            if key.startswith(path + "/"):
                 contents.append(content_file)
+        if not contents:
+            raise UnknownObjectException(404, {"message": "Not Found"}, None)
         return contents
 
+    def create_git_blob(self, content, encoding):
+        decoded = base64.b64decode(content) if encoding == "base64" else content
+        blob = MockGitBlob(decoded)
+        self.blobs[blob.sha] = blob
+        return blob
+
+    def get_git_blob(self, sha):
+        return self.blobs[sha]
+
+    def get_git_ref(self, ref):
+        return MockGitRef(self, ref)
+
+    def get_git_commit(self, sha):
+        return self.commits.get(sha, MockGitCommit(sha, "", MockGitTree([])))
+
+    def create_git_tree(self, tree, base_tree=None):
+        return MockGitTree([element._identity for element in tree])
+
+    def create_git_commit(self, message, tree, parents):
+        commit = MockGitCommit(f"commit-{len(self.commits)}", message, tree)
+        self.commits[commit.sha] = commit
+        return commit
+
     def create_file(self, path, commit_message, content, branch):
+        self.write_count += 1
         content_file = MockContentFile(path, commit_message, content, branch)
         self.contents[path] = content_file
         return {"content": content_file}
 
     def update_file(self, path, commit_message, new_content, sha, branch):
+        self.write_count += 1
         new_file = MockContentFile(path, commit_message, new_content, branch)
-        new_file.sha = sha
         self.contents[path] = new_file
         return {"content": new_file}
 
@@ -153,8 +191,53 @@ class MockContentFile:
         self, path: str, commit_message: str, contents: str, branch: str
     ) -> None:
         self.path = path
-        self.decoded_content = contents.encode(encoding="utf-8")
+        self.decoded_content = (
+            contents if isinstance(contents, bytes) else contents.encode("utf-8")
+        )
         self.commit_message = commit_message
         self.branch = branch
         self.type = "file"
-        self.sha = ""
+        self.size = len(self.decoded_content)
+        self.sha = hashlib.sha1(
+            b"blob %d\0" % len(self.decoded_content) + self.decoded_content
+        ).hexdigest()
+
+
+class MockGitBlob:
+    def __init__(self, content: bytes) -> None:
+        self.decoded_content = content
+        self.content = base64.b64encode(content).decode("ascii")
+        self.sha = hashlib.sha1(b"blob %d\0" % len(content) + content).hexdigest()
+
+
+class MockGitCommit:
+    def __init__(self, sha: str, message: str, tree) -> None:
+        self.sha = sha
+        self.message = message
+        self.tree = tree
+
+
+class MockGitRef:
+    def __init__(self, repo: MockRepo, ref: str) -> None:
+        self.repo = repo
+        self.ref = ref
+        self.object = MockGitCommit("head", "", MockGitTree([]))
+
+    def edit(self, sha):
+        """Apply the blobs of the commit tree to the contents of the repo."""
+        commit = self.repo.commits[sha]
+        self.repo.write_count += 1
+        for element in commit.tree.tree:
+            blob = self.repo.blobs[element["sha"]]
+            self.repo.contents[element["path"]] = MockContentFile(
+                element["path"],
+                commit.message,
+                blob.decoded_content.decode("utf-8"),
+                self.ref,
+            )
+        self.object = commit
+
+
+class MockGitTree:
+    def __init__(self, tree) -> None:
+        self.tree = tree
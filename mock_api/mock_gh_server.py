@@ -0,0 +1,178 @@
+"""Implement a local stand-in for the GitHub REST API for the purposes of testing"""
+
+# !Note: this module requires aiohttp and is only used by the async tests
+
+import asyncio
+import base64
+import hashlib
+from collections import defaultdict
+from typing import Dict, List
+
+from aiohttp import web
+
+
+class MockServerState:
+    """Store the repos, issues, pull requests, and files of the stand-in server"""
+
+    def __init__(self, throttle_count=0, latency=0.0) -> None:
+        self.repos: Dict[str, MockServerRepo] = defaultdict(MockServerRepo)
+        # Number of requests to answer with a secondary rate limit error
+        self.throttle_count = throttle_count
+        # Seconds waited before answering every request
+        self.latency = latency
+        self.request_count = 0
+
+
+class MockServerRepo:
+    """Store the contents of a single repo, numbers are shared by issues and PRs"""
+
+    def __init__(self) -> None:
+        self.next_number = 1
+        self.issues: Dict[int, Dict] = {}
+        self.pulls: Dict[int, Dict] = {}
+        self.comments: Dict[int, List[str]] = defaultdict(list)
+        self.files: Dict[str, bytes] = {}
+
+    def take_number(self):
+        number = self.next_number
+        self.next_number += 1
+        return number
+
+
+def blob_sha(content: bytes) -> str:
+    """Compute the git blob SHA of the content."""
+    return hashlib.sha1(b"blob %d\0" % len(content) + content).hexdigest()
+
+
+def create_app(state: MockServerState) -> web.Application:
+    """Create the aiohttp application serving the mocked endpoints."""
+    routes = web.RouteTableDef()
+
+    def get_repo(request):
+        return state.repos[
+            f"{request.match_info['owner']}/{request.match_info['name']}"
+        ]
+
+    @web.middleware
+    async def throttle(request, handler):
+        state.request_count += 1
+        if state.latency:
+            await asyncio.sleep(state.latency)
+        if state.throttle_count:
+            state.throttle_count -= 1
+            return web.json_response(
+                {"message": "You have exceeded a secondary rate limit."},
+                status=403,
+                headers={"Retry-After": "0"},
+            )
+        return await handler(request)
+
+    @routes.get("/repos/{owner}/{name}")
+    async def get_repo_info(request):
+        owner, name = request.match_info["owner"], request.match_info["name"]
+        return web.json_response(
+            {
+                "full_name": f"{owner}/{name}",
+                "name": name,
+                "url": str(request.url.with_query(None)),
+            }
+        )
+
+    @routes.post("/repos/{owner}/{name}/issues")
+    async def create_issue(request):
+        repo = get_repo(request)
+        data = await request.json()
+        number = repo.take_number()
+        repo.issues[number] = {
+            "number": number,
+            "title": data["title"],
+            "body": data["body"],
+            "labels": [{"name": label} for label in data.get("labels", [])],
+            "state": "open",
+        }
+        return web.json_response(repo.issues[number], status=201)
+
+    @routes.get("/repos/{owner}/{name}/issues/{number}")
+    async def get_issue(request):
+        repo = get_repo(request)
+        number = int(request.match_info["number"])
+        issue = repo.issues.get(number, repo.pulls.get(number))
+        if issue is None:
+            return web.json_response({"message": "Not Found"}, status=404)
+        return web.json_response(issue)
+
+    @routes.post("/repos/{owner}/{name}/issues/{number}/comments")
+    async def create_comment(request):
+        repo = get_repo(request)
+        number = int(request.match_info["number"])
+        if number not in repo.issues and number not in repo.pulls:
+            return web.json_response({"message": "Not Found"}, status=404)
+        data = await request.json()
+        repo.comments[number].append(data["body"])
+        return web.json_response({"body": data["body"]}, status=201)
+
+    @routes.post("/repos/{owner}/{name}/issues/{number}/labels")
+    async def add_labels(request):
+        repo = get_repo(request)
+        issue = repo.issues[int(request.match_info["number"])]
+        data = await request.json()
+        issue["labels"].extend({"name": label} for label in data["labels"])
+        return web.json_response(issue["labels"])
+
+    @routes.post("/repos/{owner}/{name}/pulls")
+    async def create_pull(request):
+        repo = get_repo(request)
+        data = await request.json()
+        number = repo.take_number()
+        repo.pulls[number] = dict(data, number=number, state="open")
+        return web.json_response(repo.pulls[number], status=201)
+
+    @routes.get("/repos/{owner}/{name}/pulls/{number}")
+    async def get_pull(request):
+        repo = get_repo(request)
+        pull = repo.pulls.get(int(request.match_info["number"]))
+        if pull is None:
+            return web.json_response({"message": "Not Found"}, status=404)
+        return web.json_response(pull)
+
+    @routes.get("/repos/{owner}/{name}/contents/{path:.+}")
+    async def get_contents(request):
+        repo = get_repo(request)
+        path = request.match_info["path"]
+        content = repo.files.get(path)
+        if content is None:
+            listing = [
+                {"path": file_path, "sha": blob_sha(file_content), "type": "file"}
+                for file_path, file_content in repo.files.items()
+                if file_path.startswith(path + "/")
+            ]
+            if listing:
+                return web.json_response(listing)
+            return web.json_response({"message": "Not Found"}, status=404)
+        return web.json_response(
+            {
+                "path": request.match_info["path"],
+                "sha": blob_sha(content),
+                "encoding": "base64",
+                "content": base64.b64encode(content).decode("ascii"),
+            }
+        )
+
+    @routes.put("/repos/{owner}/{name}/contents/{path:.+}")
+    async def put_contents(request):
+        repo = get_repo(request)
+        path = request.match_info["path"]
+        data = await request.json()
+        existing = repo.files.get(path)
+        if existing is not None and data.get("sha") != blob_sha(existing):
+            return web.json_response({"message": "sha does not match"}, status=409)
+        content = base64.b64decode(data["content"])
+        repo.files[path] = content
+        return web.json_response(
+            {"content": {"path": path, "sha": blob_sha(content)}, "commit": {}},
+            status=200 if existing is not None else 201,
+        )
+
+    app = web.Application(middlewares=[throttle])
+    app.add_routes(routes)
+    return app
@@ -0,0 +1,41 @@
+"""Implement a mock Google Sheets API for the purposes of testing"""
+
+# !Note: this module does get checked by linters
+
+
+class MockSheets:
+    """Supports the spreadsheets().values().get().execute() chain of calls"""
+
+    def __init__(self, values=None) -> None:
+        """Create a mock spreadsheets resource.
+
+        Args:
+            values (dict): rows returned for every "sheet!start:end" range
+        """
+        self.values_by_range = values if values is not None else {}
+        self.requests = []
+
+    def values(self):
+        """Mimics the values resource."""
+        return self
+
+    def get(self, spreadsheetId: str, range: str):  # pylint: disable=W0622,C0103
+        """Mimics a request for the values of a range.
+
+        Args:
+            spreadsheetId (str): ID of the Google Sheet file
+            range (str): the requested range, such as "Sheet1!A1:B2"
+        """
+        self.requests.append((spreadsheetId, range))
+        return MockRequest({"values": self.values_by_range.get(range, [])})
+
+
+class MockRequest:
+    """Mimics an API request that has not been executed yet"""
+
+    def __init__(self, response: dict) -> None:
+        self.response = response
+
+    def execute(self):
+        """Return the response of the request."""
+        return self.response
@@ -1,7 +1,6 @@
 import numpy as np
 import pandas as pd
 from sheetshuttle import github_interaction, sheet_collector, util
-import yaml
 
 STANDARD_REPO_NAME = "sample_org/sample_template"
 STANDARD_TITLE = "Automated Grade Update"
@@ -12,12 +11,16 @@ CONFIG_WRITE_FILENAME = "ee_grader_gh_config.yml"
 
 
 def run(sheets_keys_file, sheets_config_directory, gh_config_directory, **kwargs):
-    my_collector = sheet_collector.SheetCollector(sources_dir=sheets_config_directory)
-    my_collector.collect_files()
+    # Sheets collected once by "sheetshuttle run --shared" are reused
+    sheets_data = kwargs.get("sheets_data")
+    if sheets_data is None:
+        my_collector = sheet_collector.SheetCollector(
+            sources_dir=sheets_config_directory
+        )
+        my_collector.collect_files()
+        sheets_data = my_collector.sheets_data
     # Update ee_plugin with the new indexing structure
-    used_config = (
-        my_collector.sheets_data["sample_config"].sheets["students"].regions["names"]
-    )
+    used_config = sheets_data["sample_config"].sheets["students"].regions["names"]
 
     # Get our data frames
     # FIXME: issue with sheetshuttle: unable to fill empty fields to be NaN when
@@ -80,25 +83,17 @@ def run(sheets_keys_file, sheets_config_directory, gh_config_directory, **kwargs
     for student_name, obj in students.items():
         print(f"{student_name}:\t {obj.get_grade()}")
 
-    # Write the configuration list of values to a yaml file to be read later by
-    # github interactions
-    full_config_path = CONFIG_WRITE_DIR + CONFIG_WRITE_FILENAME
-    with open(full_config_path, "w+", encoding="utf-8") as writefile:
-        yaml.dump(list(grades_config.values()), writefile, Dumper=NoAliasDumper)
-
-    # Initialize the github interaction object and prepare for posting to github
-    my_manager = github_interaction.GithubManager(sources_dir=CONFIG_WRITE_DIR)
-    my_manager.collect_config()
+    # Hand the configuration to github interactions directly, a copy is written
+    # to a yaml file in the background for auditing
+    my_manager = github_interaction.GithubManager(api=kwargs.get("github_api"))
+    my_manager.add_entries(
+        grades_config.values(),
+        persist_path=CONFIG_WRITE_DIR + CONFIG_WRITE_FILENAME,
+    )
 
     # TODO: Uncoment this to post everything
     # my_manager.post_all()
-
-
-# !NOTE: this is optional and is only used to ignore aliases and anchors when
-# !writing to a yaml file
-class NoAliasDumper(yaml.SafeDumper):
-    def ignore_aliases(self, data):
-        return True
+    my_manager.wait_for_persistence()
 
 
 class Student:
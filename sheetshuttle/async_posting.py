@@ -0,0 +1,316 @@
+"""Post GitHub entries concurrently using an asynchronous HTTP client.
+
+This backend is optional and requires the aiohttp package, which can be
+installed with the `async` extra.
+"""
+
+import asyncio
+import base64
+import time
+from typing import Callable, Dict, Iterable, Iterator, Optional
+from urllib.parse import quote
+
+try:
+    import aiohttp  # type: ignore[import]
+except ImportError:  # pragma: no cover
+    aiohttp = None  # type: ignore[assignment]
+
+from sheetshuttle import github_objects
+
+API_URL = "https://api.github.com"
+THROTTLE_STATUSES = (403, 429)
+
+
+class AsyncGithubError(Exception):
+    """Raised when the GitHub REST API responds with an error status."""
+
+    def __init__(self, status: int, data) -> None:
+        """Create an AsyncGithubError with the response status and body."""
+        super().__init__(f"{status} {data}")
+        self.status = status
+        self.data = data
+
+
+class AsyncGithubPoster:
+    """Post Entry objects through the GitHub REST API with bounded concurrency.
+
+    Entries are consumed lazily from an iterable by a fixed number of workers
+    that share one pooled aiohttp session, so memory use does not grow with the
+    number of entries. Posting follows the same semantics as Entry.post, the
+    JSON response of the created or updated object is stored in gh_object.
+    """
+
+    # pylint: disable=R0913
+    def __init__(
+        self,
+        token: str,
+        base_url: str = API_URL,
+        concurrency: int = 50,
+        connection_limit: int = 100,
+        max_retries: int = 5,
+    ) -> None:
+        """Create an AsyncGithubPoster object.
+
+        Args:
+            token (str): GitHub access token
+            base_url (str, optional): URL of the GitHub REST API.
+                Defaults to "https://api.github.com".
+            concurrency (int, optional): maximum number of requests in flight.
+                Defaults to 50.
+            connection_limit (int, optional): size of the connection pool.
+                Defaults to 100.
+            max_retries (int, optional): number of times a throttled request
+                is retried. Defaults to 5.
+        """
+        if aiohttp is None:
+            raise ImportError(
+                "The async posting backend requires aiohttp, "
+                "install SheetShuttle with the 'async' extra."
+            )
+        self.token = token
+        self.base_url = base_url.rstrip("/")
+        self.concurrency = concurrency
+        self.connection_limit = connection_limit
+        self.max_retries = max_retries
+        self.session: Optional["aiohttp.ClientSession"] = None
+
+    def post_all(
+        self,
+        entries: Iterable[github_objects.Entry],
+        callback: Optional[Callable] = None,
+    ) -> None:
+        """Post all entries, blocking until they are done.
+
+        Args:
+            entries (Iterable[Entry]): entries to post
+            callback (Callable, optional): function called with every entry
+                right after it is posted. Defaults to None.
+        """
+        asyncio.run(self.post_entries(entries, callback))
+
+    async def post_entries(
+        self,
+        entries: Iterable[github_objects.Entry],
+        callback: Optional[Callable] = None,
+    ) -> None:
+        """Post all entries using a pool of concurrent workers.
+
+        Args:
+            entries (Iterable[Entry]): entries to post
+            callback (Callable, optional): function called with every entry
+                right after it is posted. Defaults to None.
+        """
+        headers = {
+            "Authorization": f"token {self.token}",
+            "Accept": "application/vnd.github.v3+json",
+        }
+        connector = aiohttp.TCPConnector(limit=self.connection_limit)
+        async with aiohttp.ClientSession(
+            headers=headers, connector=connector
+        ) as session:
+            self.session = session
+            entries_iterator = iter(entries)
+            await asyncio.gather(
+                *[
+                    self._worker(entries_iterator, callback)
+                    for _ in range(self.concurrency)
+                ]
+            )
+        self.session = None
+
+    async def post_entry(self, entry: github_objects.Entry) -> None:
+        """Post a single entry and record whether it was posted, skipped, or failed.
+
+        Entries resolving to no object, such as updates of missing issues, are
+        marked as skipped. HTTP, connection, and timeout errors, as well as
+        unreadable content paths, mark the entry as failed.
+
+        Args:
+            entry (Entry): the entry to post
+        """
+        post_function = {
+            "issue": self._post_issue,
+            "pull request": self._post_pull_request,
+            "file": self._post_file,
+        }[entry.type]
+        try:
+            gh_object = await post_function(entry)
+        except (
+            AsyncGithubError,
+            aiohttp.ClientError,
+            asyncio.TimeoutError,
+            OSError,
+        ) as error:
+            entry.set_failed(error)
+            print(
+                f"Warning: a GitHub error occurred while posting a {type(entry).__name__}."
+                f"Entry with the following configuration was NOT posted {entry.to_config()}."
+            )
+            return
+        entry.set_posted(gh_object)
+
+    async def _worker(
+        self,
+        entries_iterator: Iterator[github_objects.Entry],
+        callback: Optional[Callable],
+    ):
+        """Post entries from the shared iterator until it is exhausted."""
+        for entry in entries_iterator:
+            await self.post_entry(entry)
+            if callback:
+                callback(entry)
+
+    async def _post_issue(self, entry) -> Optional[Dict]:
+        """Create an issue or comment on an existing one."""
+        repo_url = f"/repos/{entry.repo}"
+        if entry.action == "create":
+            payload = {"title": entry.title, "body": entry.body}
+            if entry.labels:
+                payload["labels"] = entry.labels
+            return await self._request("POST", f"{repo_url}/issues", payload)
+        if entry.action != "update":
+            raise Exception(f"Unknown action {entry.action} in {entry}")
+        issue = await self._request(
+            "GET", f"{repo_url}/issues/{entry.number}", missing_ok=True
+        )
+        if issue is None:
+            print(
+                f"Warning: issue #{entry.number} in {entry.repo} does not exist, update skipped"
+            )
+            return None
+        await self._request(
+            "POST", f"{repo_url}/issues/{entry.number}/comments", {"body": entry.body}
+        )
+        if entry.labels:
+            await self._request(
+                "POST",
+                f"{repo_url}/issues/{entry.number}/labels",
+                {"labels": entry.labels},
+            )
+        return issue
+
+    async def _post_pull_request(self, entry) -> Optional[Dict]:
+        """Create a pull request or comment on an existing one."""
+        repo_url = f"/repos/{entry.repo}"
+        if entry.action == "create":
+            payload = {
+                "title": entry.title,
+                "body": entry.body,
+                "base": entry.base,
+                "head": entry.head,
+            }
+            return await self._request("POST", f"{repo_url}/pulls", payload)
+        if entry.action != "update":
+            raise Exception(f"Unknown action {entry.action} in {entry}")
+        pull_request = await self._request(
+            "GET", f"{repo_url}/pulls/{entry.number}", missing_ok=True
+        )
+        if pull_request is None:
+            print(
+                f"Warning: PR #{entry.number} in {entry.repo} does not exist, update skipped"
+            )
+            return None
+        await self._request(
+            "POST", f"{repo_url}/issues/{entry.number}/comments", {"body": entry.body}
+        )
+        return pull_request
+
+    async def _post_file(self, entry) -> Optional[Dict]:
+        """Create, update, or replace a file through the contents API."""
+        contents_url = f"/repos/{entry.repo}/contents/{quote(entry.path)}"
+        existing = await self._request(
+            "GET", f"{contents_url}?ref={quote(entry.branch)}", missing_ok=True
+        )
+        location = (
+            f"{entry.path} was NOT {entry.action}d in {entry.repo}:{entry.branch}."
+        )
+        if isinstance(existing, list):
+            print(f"Warning: {entry.path} is a directory, {location}")
+            return None
+        if entry.action == "create" and existing is not None:
+            print(f"Warning: file already exists, {location}")
+            return None
+        if entry.action != "create" and existing is None:
+            print(f"Warning: file does not exist, {location}")
+            return None
+        with github_objects.FileEntry.open_content(
+            entry.content, entry.content_path
+        ) as stream:
+            new_content = stream.read()
+        if entry.action == "update" and existing is not None:
+            new_content = base64.b64decode(existing["content"]) + new_content
+        new_sha = github_objects.FileEntry.blob_sha(new_content)
+        if (
+            entry.action == "replace"
+            and existing is not None
+            and existing["sha"] == new_sha
+        ):
+            print(
+                f"File {entry.path} is unchanged in {entry.repo}:{entry.branch}, skipping commit."
+            )
+            return None
+        payload = {
+            "message": entry.commit_message,
+            "content": base64.b64encode(new_content).decode("ascii"),
+            "branch": entry.branch,
+        }
+        if existing is not None:
+            payload["sha"] = existing["sha"]
+        response = await self._request("PUT", contents_url, payload)
+        return None if response is None else response["content"]
+
+    async def _request(
+        self,
+        method: str,
+        url: str,
+        payload: Optional[Dict] = None,
+        missing_ok=False,
+    ) -> Optional[Dict]:
+        """Send a request, retrying when throttled, and return the JSON response.
+
+        Args:
+            method (str): HTTP method
+            url (str): path of the endpoint relative to the API URL
+            payload (Dict, optional): JSON body of the request. Defaults to None.
+            missing_ok (bool, optional): return None instead of raising an
+                error on a 404 response. Defaults to False.
+
+        Raises:
+            AsyncGithubError: thrown when the response has an error status
+        """
+        attempt = 0
+        while True:
+            async with self.session.request(  # type: ignore[union-attr]
+                method, self.base_url + url, json=payload
+            ) as response:
+                data = await response.json(content_type=None)
+                if response.status < 400:
+                    return data
+                if response.status == 404 and missing_ok:
+                    return None
+                wait_time = AsyncGithubPoster.throttle_wait(response.headers, attempt)
+                throttled = (
+                    response.status in THROTTLE_STATUSES and wait_time is not None
+                )
+                if not throttled or attempt >= self.max_retries:
+                    raise AsyncGithubError(response.status, data)
+            await asyncio.sleep(wait_time)  # type: ignore[arg-type]
+            attempt += 1
+
+    @staticmethod
+    def throttle_wait(headers, attempt: int) -> Optional[float]:
+        """Return the seconds to wait before retrying a throttled request.
+
+        Args:
+            headers: headers of the error response
+            attempt (int): number of retries done so far
+
+        Returns:
+            Optional[float]: None when the headers do not indicate throttling
+        """
+        if "Retry-After" in headers:
+            return float(headers["Retry-After"])
+        if headers.get("X-RateLimit-Remaining") == "0":
+            reset_time = float(headers.get("X-RateLimit-Reset", 0))
+            return max(reset_time - time.time(), float(2**attempt))
+        return None
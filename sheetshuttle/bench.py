@@ -0,0 +1,394 @@
+"""Measure the throughput of SheetShuttle on synthetic workloads and compare runs.
+
+Every workload runs the code used by plugins on generated data, with stand-ins
+replacing the Sheets and GitHub APIs so that results do not depend on the
+network:
+
+- collect: request and convert regions through Sheet.collect_regions
+- convert: convert rows returned by the Sheets API with Sheet.to_dataframe
+- render: render issue entries for every row of a region with an entry template
+- post: post issue entries with a GithubManager through PyGithub to the local
+  GitHub stand-in of mock_api, which requires aiohttp and a checkout of the
+  repository
+
+Workloads are repeated, and the duration of every repetition gives the latency
+percentiles and the throughput. Results are saved as JSON and compared to a
+baseline saved by a previous run, a workload regresses when its median duration
+grows by more than the tolerance.
+"""
+
+import asyncio
+import contextlib
+import inspect
+import json
+import platform
+import threading
+import time
+from typing import Any, Callable, Dict, Iterator, List, NamedTuple, Optional
+
+import numpy as np
+import pandas as pd  # type: ignore[import]
+from github import Github
+
+try:
+    from aiohttp import web  # type: ignore[import]
+    from mock_api import mock_gh_server  # type: ignore[import]
+except ImportError:  # pragma: no cover
+    mock_gh_server = None  # type: ignore[assignment]
+
+import sheetshuttle
+from sheetshuttle import github_interaction, sheet_collector, templates
+
+WORKLOADS = ("collect", "convert", "render", "post")
+# Number of regions, rows, issue bodies, and entries of every workload
+DEFAULT_SIZES = {"collect": 50, "convert": 10000, "render": 1000, "post": 500}
+# Rows of every region collected by the collect workload
+REGION_ROWS = 100
+# Version of the JSON results, changed when their structure changes
+RESULTS_VERSION = 1
+
+ISSUE_TEMPLATE = {
+    "type": "template",
+    "entry_type": "issue",
+    "action": "create",
+    "repo": "bench-org/{repo}",
+    "title": "Feedback for {name}",
+    "body": (
+        "## Feedback for {name}\n\n"
+        "Your grade is **{grade}** out of 100.\n\n"
+        "> {comment}\n"
+    ),
+    "labels": ["feedback", "{status}"],
+}
+
+
+class WorkloadResult(NamedTuple):
+    """Durations of the repetitions of a workload."""
+
+    workload: str
+    # Number of regions, rows, issue bodies, or entries processed per repetition
+    size: int
+    # Duration of every repetition in seconds
+    durations: List[float]
+
+    def summary(self) -> Dict[str, Any]:
+        """Return the throughput and latency percentiles of the workload."""
+        durations = np.array(self.durations)
+        median = float(np.percentile(durations, 50))
+        return {
+            "size": self.size,
+            "repeat": len(self.durations),
+            "throughput": self.size / median if median > 0 else float("inf"),
+            "mean": float(durations.mean()),
+            "p50": median,
+            "p90": float(np.percentile(durations, 90)),
+            "p99": float(np.percentile(durations, 99)),
+        }
+
+
+class StandInSheets:
+    """Answer Sheets API value requests with the same synthetic rows."""
+
+    def __init__(self, rows: List[List[str]]) -> None:
+        """Create a StandInSheets object.
+
+        Args:
+            rows (List[List[str]]): values returned for every requested range,
+                headers included
+        """
+        self.rows = rows
+        self.request_count = 0
+
+    def values(self) -> "StandInSheets":
+        """Return the object itself, as the values resource."""
+        return self
+
+    # pylint: disable=C0103,W0613,W0622
+    def get(self, spreadsheetId: str, range: str) -> "StandInSheets":
+        """Return the object itself, as the request of a range."""
+        self.request_count += 1
+        return self
+
+    def execute(self) -> Dict[str, List[List[str]]]:
+        """Return the synthetic rows."""
+        return {"values": self.rows}
+
+
+def synthetic_rows(row_count: int, seed: int = 0) -> List[List[str]]:
+    """Return rows as the Sheets API returns them, with a header row.
+
+    Args:
+        row_count (int): number of rows after the header row
+        seed (int, optional): seed of the random values. Defaults to 0.
+    """
+    random = np.random.default_rng(seed)
+    grades = random.integers(0, 101, row_count)
+    words = np.array(["good", "work", "tests", "docs", "style", "commits"])
+    comments = random.choice(words, (row_count, 4))
+    rows = [["name", "repo", "grade", "status", "comment"]]
+    for position in range(row_count):
+        grade = int(grades[position])
+        rows.append(
+            [
+                f"Student {position}",
+                f"repo-{position}",
+                str(grade),
+                "passed" if grade >= 60 else "",
+                " ".join(comments[position]),
+            ]
+        )
+    return rows
+
+
+def setup_collect(size: int, seed: int) -> Callable[[], Any]:
+    """Return a function collecting size regions of REGION_ROWS rows."""
+    config = {
+        "source_id": "bench-sheet",
+        "sheets": [
+            {
+                "name": "students",
+                "regions": [
+                    {
+                        "name": f"region_{position}",
+                        "start": "A1",
+                        "end": f"E{REGION_ROWS + 1}",
+                        "contains_headers": True,
+                    }
+                    for position in range(size)
+                ],
+            }
+        ],
+    }
+    api = StandInSheets(synthetic_rows(REGION_ROWS, seed))
+    return sheet_collector.Sheet(config, api).collect_regions
+
+
+def setup_convert(size: int, seed: int) -> Callable[[], Any]:
+    """Return a function converting size rows to a data frame."""
+    rows = synthetic_rows(size, seed)
+    return lambda: sheet_collector.Sheet.to_dataframe(rows)
+
+
+def setup_render(size: int, seed: int) -> Callable[[], Any]:
+    """Return a function rendering size issue entries from a template."""
+    data = sheet_collector.Sheet.to_dataframe(synthetic_rows(size, seed))
+    template = templates.EntryTemplate(ISSUE_TEMPLATE)
+    return lambda: template.render(data)
+
+
+def setup_post(size: int, seed: int, base_url: str) -> Callable[[], Any]:
+    """Return a function posting size issue entries to the GitHub stand-in.
+
+    Args:
+        size (int): number of entries
+        seed (int): seed of the synthetic data
+        base_url (str): URL of the GitHub stand-in started by github_server
+    """
+    data = sheet_collector.Sheet.to_dataframe(synthetic_rows(size, seed))
+    entries = templates.EntryTemplate(ISSUE_TEMPLATE).render(data)
+    # PyGithub 2 waits between requests by default, which would make the
+    # durations of a local stand-in meaningless
+    pacing: Dict[str, Any] = {}
+    if "seconds_between_writes" in inspect.signature(Github).parameters:
+        pacing = {"seconds_between_requests": None, "seconds_between_writes": None}
+    manager = github_interaction.GithubManager(
+        api=Github("bench-token", base_url=base_url, **pacing)
+    )
+    return lambda: manager.post_entries(entries)
+
+
+@contextlib.contextmanager
+def github_server(latency: float = 0.0) -> Iterator[str]:
+    """Run the local GitHub stand-in of mock_api in a background thread.
+
+    Entries are posted to it through PyGithub, so the post workload measures
+    the HTTP requests and the parsing of the responses as well.
+
+    Args:
+        latency (float, optional): seconds waited by every request.
+            Defaults to 0.0.
+
+    Raises:
+        ImportError: thrown when aiohttp or the mock_api package of the
+            repository cannot be imported
+
+    Yields:
+        str: the base URL of the stand-in
+    """
+    if mock_gh_server is None:
+        raise ImportError(
+            "The post workload requires aiohttp, installed with the 'async' "
+            "extra, and is run from a checkout of the SheetShuttle repository."
+        )
+    loop = asyncio.new_event_loop()
+    runner = web.AppRunner(
+        mock_gh_server.create_app(mock_gh_server.MockServerState(latency=latency))
+    )
+    loop.run_until_complete(runner.setup())
+    loop.run_until_complete(web.TCPSite(runner, "127.0.0.1", 0).start())
+    thread = threading.Thread(target=loop.run_forever, daemon=True)
+    thread.start()
+    host, port = runner.addresses[0][:2]
+    try:
+        yield f"http://{host}:{port}"
+    finally:
+        asyncio.run_coroutine_threadsafe(runner.cleanup(), loop).result()
+        loop.call_soon_threadsafe(loop.stop)
+        thread.join()
+        loop.close()
+
+
+SETUP_FUNCTIONS: Dict[str, Callable[..., Callable[[], Any]]] = {
+    "collect": setup_collect,
+    "convert": setup_convert,
+    "render": setup_render,
+    "post": setup_post,
+}
+
+
+# pylint: disable=R0913
+def run_workload(
+    workload: str,
+    size: int,
+    repeat: int = 10,
+    warmup: int = 1,
+    seed: int = 0,
+    latency: float = 0.0,
+) -> WorkloadResult:
+    """Time the repetitions of a workload.
+
+    Every repetition is set up again, and only running the workload is timed.
+
+    Args:
+        workload (str): one of WORKLOADS
+        size (int): number of regions, rows, issue bodies, or entries
+        repeat (int, optional): number of timed repetitions. Defaults to 10.
+        warmup (int, optional): number of repetitions run before the timed
+            ones. Defaults to 1.
+        seed (int, optional): seed of the synthetic data. Defaults to 0.
+        latency (float, optional): seconds waited by every request to the
+            GitHub stand-in. Defaults to 0.0.
+
+    Raises:
+        Exception: thrown when the workload is unknown
+
+    Returns:
+        WorkloadResult: the duration of every timed repetition
+    """
+    if workload not in WORKLOADS:
+        raise Exception(f"Unknown workload {workload}, must be one of {WORKLOADS}")
+    durations = []
+    with contextlib.ExitStack() as stack:
+        if workload == "post":
+            base_url = stack.enter_context(github_server(latency))
+        for repetition in range(warmup + repeat):
+            if workload == "post":
+                function = setup_post(size, seed, base_url)
+            else:
+                function = SETUP_FUNCTIONS[workload](size, seed)
+            start = time.perf_counter()
+            function()
+            duration = time.perf_counter() - start
+            if repetition >= warmup:
+                durations.append(duration)
+    return WorkloadResult(workload, size, durations)
+
+
+def results_document(
+    results: List[WorkloadResult], settings: Optional[Dict[str, Any]] = None
+) -> Dict[str, Any]:
+    """Return the JSON document saved for the results of a run.
+
+    Args:
+        results (List[WorkloadResult]): the results of every workload
+        settings (Dict[str, Any], optional): other settings of the run, such
+            as the seed and latency. Defaults to None.
+    """
+    return {
+        "version": RESULTS_VERSION,
+        "settings": settings if settings is not None else {},
+        "sheetshuttle": sheetshuttle.__version__,
+        "python": platform.python_version(),
+        "pandas": pd.__version__,
+        "machine": platform.machine(),
+        "workloads": {result.workload: result.summary() for result in results},
+    }
+
+
+def save_results(document: Dict[str, Any], path: str):
+    """Write the results of a run to a JSON file."""
+    with open(path, "w", encoding="utf-8") as outfile:
+        json.dump(document, outfile, indent=2)
+        outfile.write("\n")
+
+
+def load_results(path: str) -> Dict[str, Any]:
+    """Read the results of a previous run from a JSON file.
+
+    Raises:
+        Exception: thrown when the file was saved by an incompatible version
+    """
+    with open(path, "r", encoding="utf-8") as infile:
+        document = json.load(infile)
+    if document.get("version") != RESULTS_VERSION:
+        raise Exception(
+            f"ERROR: baseline {path} has version {document.get('version')}, "
+            f"expected {RESULTS_VERSION}"
+        )
+    return document
+
+
+class Comparison(NamedTuple):
+    """Median duration of a workload in the baseline and in the current run."""
+
+    workload: str
+    baseline: float
+    current: float
+    # Relative change of the median duration, positive when slower
+    change: float
+    regressed: bool
+
+
+def compare(
+    document: Dict[str, Any],
+    baseline: Dict[str, Any],
+    tolerance: float = 0.1,
+) -> List[Comparison]:
+    """Compare the median durations of the workloads found in both results.
+
+    Workloads run with a different size than in the baseline are not compared.
+
+    Args:
+        document (Dict[str, Any]): results of the current run
+        baseline (Dict[str, Any]): results of the baseline run
+        tolerance (float, optional): relative growth of the median duration
+            allowed before a workload regresses. Defaults to 0.1.
+
+    Returns:
+        List[Comparison]: the comparison of every shared workload
+    """
+    if document.get("settings") != baseline.get("settings"):
+        print(
+            f"Warning: settings {document.get('settings')} differ from the "
+            f"baseline settings {baseline.get('settings')}"
+        )
+    comparisons = []
+    for workload, summary in document["workloads"].items():
+        reference: Optional[Dict] = baseline["workloads"].get(workload)
+        if reference is None or reference["size"] != summary["size"]:
+            print(
+                f"Warning: workload {workload} is not compared, it was not run "
+                "with the same size in the baseline"
+            )
+            continue
+        change = summary["p50"] / reference["p50"] - 1 if reference["p50"] else 0.0
+        comparisons.append(
+            Comparison(
+                workload,
+                reference["p50"],
+                summary["p50"],
+                change,
+                change > tolerance,
+            )
+        )
+    return comparisons
@@ -0,0 +1,150 @@
+"""Store region data frames with less memory.
+
+Data frames built from sheets hold one Python string per cell, even when a
+column repeats the same few values, such as section names or letter grades.
+Compacting a data frame changes the type of its columns without changing their
+values:
+
+- text columns with few distinct values become categoricals
+- integer columns use the smallest integer type holding their values
+- float columns use 32 bit floats when no value loses precision
+- other string columns are stored in Arrow arrays when pyarrow is installed
+
+Compaction is enabled with "compact: true" in the configuration of a region,
+at the top of a configuration file for all its regions, or for every region of
+a SheetCollector with SheetCollector(compact=True).
+"""
+
+from typing import Dict, List, NamedTuple, Optional
+
+import numpy as np
+import pandas as pd  # type: ignore[import]
+
+try:
+    import pyarrow  # type: ignore[import] # noqa: F401 pylint: disable=W0611
+except ImportError:  # pragma: no cover
+    pyarrow = None
+
+# Text columns become categoricals when their number of distinct values is at
+# most this fraction of their number of rows
+CATEGORY_RATIO = 0.5
+
+
+class RegionMemory(NamedTuple):
+    """Memory use of the data of a collected region, in bytes."""
+
+    sheet: str
+    tab: str
+    region: str
+    rows: int
+    size: int
+    # Size before compaction, None when the region was not compacted
+    original_size: Optional[int]
+
+
+def string_dtype() -> Optional[pd.StringDtype]:
+    """Return the Arrow string type, or None when pyarrow is not installed."""
+    if pyarrow is None:
+        return None
+    return pd.StringDtype("pyarrow")
+
+
+def compact_dataframe(
+    data: pd.DataFrame, category_ratio: float = CATEGORY_RATIO
+) -> pd.DataFrame:
+    """Return a copy of a data frame with the column types using the least memory.
+
+    Args:
+        data (pd.DataFrame): the data frame to compact
+        category_ratio (float, optional): highest ratio of distinct values to
+            rows of the text columns converted to categoricals. Defaults to
+            CATEGORY_RATIO.
+
+    Returns:
+        pd.DataFrame: the data frame with the same values and compact columns
+    """
+    columns = {
+        position: compact_column(data.iloc[:, position], category_ratio)
+        for position in range(data.shape[1])
+    }
+    result = pd.concat(columns, axis=1) if columns else data.copy()
+    result.columns = data.columns
+    return result
+
+
+# pylint: disable=R0911
+def compact_column(
+    values: pd.Series, category_ratio: float = CATEGORY_RATIO
+) -> pd.Series:
+    """Return a column converted to the most compact type holding its values.
+
+    Args:
+        values (pd.Series): the column to compact
+        category_ratio (float, optional): highest ratio of distinct values to
+            rows of a text column converted to a categorical. Defaults to
+            CATEGORY_RATIO.
+    """
+    dtype = values.dtype
+    if isinstance(dtype, pd.CategoricalDtype) or pd.api.types.is_bool_dtype(dtype):
+        return values
+    if pd.api.types.is_integer_dtype(dtype):
+        return pd.to_numeric(values, downcast="integer")
+    if pd.api.types.is_float_dtype(dtype):
+        return downcast_float(values)
+    if not is_text(values):
+        return values
+    if len(values) and values.nunique() <= len(values) * category_ratio:
+        return values.astype("category")
+    arrow_dtype = string_dtype()
+    if arrow_dtype is not None and isinstance(dtype, pd.StringDtype):
+        return values.astype(arrow_dtype)
+    return values
+
+
+def downcast_float(values: pd.Series) -> pd.Series:
+    """Return a float column as 32 bit floats when no value loses precision."""
+    downcast = pd.to_numeric(values, downcast="float")
+    if downcast.dtype == values.dtype:
+        return values
+    original = values.to_numpy(dtype=np.float64, na_value=np.nan)
+    converted = downcast.to_numpy(dtype=np.float64, na_value=np.nan)
+    if np.array_equal(original, converted, equal_nan=True):
+        return downcast
+    return values
+
+
+def is_text(values: pd.Series) -> bool:
+    """Return True when a column holds strings and missing values only."""
+    if isinstance(values.dtype, pd.StringDtype):
+        return True
+    if values.dtype != object:
+        return False
+    return pd.api.types.infer_dtype(values, skipna=True) in ("string", "empty")
+
+
+def data_size(data: pd.DataFrame) -> int:
+    """Return the memory used by a data frame and its strings, in bytes."""
+    return int(data.memory_usage(deep=True).sum())
+
+
+def memory_report(sheets_data: Dict) -> List[RegionMemory]:
+    """Return the memory use of every region of the collected sheets.
+
+    Args:
+        sheets_data (Dict[str, Sheet]): sheets collected by a SheetCollector
+    """
+    report = []
+    for sheet_name, sheet in sheets_data.items():
+        for tab_name, regions in sheet.tabs.items():
+            for region in regions.values():
+                report.append(
+                    RegionMemory(
+                        sheet_name,
+                        tab_name,
+                        region.region_name,
+                        region.data.shape[0],
+                        data_size(region.data),
+                        getattr(region, "original_size", None),
+                    )
+                )
+    return report
@@ -0,0 +1,309 @@
+"""Spread GitHub API calls over several personal access tokens and GitHub Apps.
+
+A CredentialPool can be used in place of an authenticated Github object. Every
+repo is routed to the credential with the most remaining requests among those
+that can access it, so posting throughput grows with the number of credentials.
+"""
+
+import json
+import os
+import threading
+import time
+from datetime import datetime, timezone
+from typing import Callable, Dict, List, Optional, Sequence, Set, Tuple
+
+import requests  # type: ignore[import]
+from github import Github
+from github.GithubException import GithubException
+
+try:
+    import jwt
+except ImportError:  # pragma: no cover
+    jwt = None  # type: ignore[assignment]
+
+from sheetshuttle.rate_limit import RateLimitScheduler
+
+API_URL = "https://api.github.com"
+# Statuses GitHub answers with when a credential cannot see a repo
+NO_ACCESS_STATUSES = (403, 404)
+
+
+class TokenCredential:
+    """A personal access token, or any other token that does not expire."""
+
+    def __init__(self, token: str, name: str = "", owners: Sequence[str] = ()) -> None:
+        """Create a TokenCredential object.
+
+        Args:
+            token (str): the GitHub token
+            name (str, optional): name used in messages. Defaults to the last
+                characters of the token.
+            owners (Sequence[str], optional): organizations, users, or full
+                'org/repo' names the token can access. Any repo is tried when
+                empty. Defaults to ().
+        """
+        self.token = token
+        self.name = name or f"token ...{token[-4:]}"
+        self.owners = tuple(owners)
+
+    def get_token(self) -> str:
+        """Return the token."""
+        return self.token
+
+    def may_access(self, repo_name: str) -> bool:
+        """Check if the credential is configured to access a repo.
+
+        Args:
+            repo_name (str): name of the repo, structured as 'org/repo_name'
+        """
+        if not self.owners:
+            return True
+        owner = repo_name.split("/", 1)[0]
+        return owner in self.owners or repo_name in self.owners
+
+
+# pylint: disable=R0902
+class AppInstallationCredential(TokenCredential):
+    """Installation access tokens of a GitHub App, cached and refreshed before expiry.
+
+    Installation tokens expire after an hour. A new one is requested with a
+    JSON Web Token signed by the private key of the app when the cached token
+    is about to expire. Signing requires PyJWT and cryptography, which can be
+    installed with the `apps` extra.
+    """
+
+    # pylint: disable=R0913
+    def __init__(
+        self,
+        app_id: str,
+        private_key: str,
+        installation_id: int,
+        owners: Sequence[str] = (),
+        base_url: str = API_URL,
+        refresh_margin: float = 300.0,
+        clock: Callable[[], float] = time.time,
+        fetch: Optional[Callable[[str, str], Dict]] = None,
+    ) -> None:
+        """Create an AppInstallationCredential object.
+
+        Args:
+            app_id (str): id of the GitHub App
+            private_key (str): PEM encoded private key of the app
+            installation_id (int): id of the installation of the app
+            owners (Sequence[str], optional): organizations, users, or full
+                'org/repo' names the installation can access. Defaults to ().
+            base_url (str, optional): URL of the GitHub REST API.
+                Defaults to "https://api.github.com".
+            refresh_margin (float, optional): seconds before expiry at which
+                the token is refreshed. Defaults to 300.0.
+            clock (Callable, optional): function returning the current epoch
+                time. Defaults to time.time.
+            fetch (Callable, optional): function posting to a URL with a JWT
+                and returning the decoded response. Defaults to a requests call.
+        """
+        super().__init__("", f"app {app_id} installation {installation_id}", owners)
+        self.app_id = app_id
+        self.private_key = private_key
+        self.installation_id = installation_id
+        self.base_url = base_url.rstrip("/")
+        self.refresh_margin = refresh_margin
+        self.clock = clock
+        self.fetch = fetch or AppInstallationCredential.post_with_jwt
+        self.expires_at = 0.0
+        self.refresh_count = 0
+        self._lock = threading.Lock()
+
+    def get_token(self) -> str:
+        """Return a valid installation token, requesting a new one if needed."""
+        with self._lock:
+            if self.clock() >= self.expires_at - self.refresh_margin:
+                self.token, self.expires_at = self.request_token()
+                self.refresh_count += 1
+            return self.token
+
+    def request_token(self) -> Tuple[str, float]:
+        """Request a new installation token.
+
+        Returns:
+            Tuple[str, float]: the token and its expiry as epoch time
+        """
+        response = self.fetch(
+            f"{self.base_url}/app/installations/{self.installation_id}/access_tokens",
+            self.create_jwt(),
+        )
+        expires_at = datetime.strptime(
+            response["expires_at"], "%Y-%m-%dT%H:%M:%SZ"
+        ).replace(tzinfo=timezone.utc)
+        return response["token"], expires_at.timestamp()
+
+    def create_jwt(self) -> str:
+        """Return a JSON Web Token identifying the app, valid for nine minutes.
+
+        Raises:
+            ImportError: thrown when PyJWT is not installed
+        """
+        if jwt is None:
+            raise ImportError(
+                "GitHub App credentials require PyJWT and cryptography, "
+                "install SheetShuttle with the 'apps' extra."
+            )
+        now = int(self.clock())
+        # Issued in the past to allow for clock drift, as GitHub recommends
+        payload = {"iat": now - 60, "exp": now + 540, "iss": str(self.app_id)}
+        encoded = jwt.encode(payload, self.private_key, algorithm="RS256")
+        return encoded.decode("ascii") if isinstance(encoded, bytes) else encoded
+
+    @staticmethod
+    def post_with_jwt(url: str, app_jwt: str) -> Dict:
+        """Send the installation token request to GitHub."""
+        response = requests.post(
+            url,
+            headers={
+                "Authorization": f"Bearer {app_jwt}",
+                "Accept": "application/vnd.github+json",
+            },
+            timeout=60,
+        )
+        response.raise_for_status()
+        return response.json()
+
+
+class CredentialPool:
+    """Route GitHub calls to the credential best able to serve each repo.
+
+    The pool mimics the get_repo method of a Github object. A repo is served by
+    the credential with the most remaining requests among those allowed to
+    access it. Credentials that get a 403 or 404 for a repo are not tried for
+    it again.
+    """
+
+    def __init__(
+        self,
+        credentials: Sequence[TokenCredential],
+        api_factory: Callable[[str], Github] = Github,
+    ) -> None:
+        """Create a CredentialPool object.
+
+        Args:
+            credentials (Sequence[TokenCredential]): tokens and app installations
+            api_factory (Callable, optional): function creating an
+                authenticated Github object from a token. Defaults to Github.
+        """
+        if not credentials:
+            raise Exception("A credential pool needs at least one credential")
+        self.credentials = list(credentials)
+        self.api_factory = api_factory
+        self.clients: Dict[int, Tuple[str, Github]] = {}
+        self.denied: Dict[str, Set[int]] = {}
+        self.routed: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def get_repo(self, repo_name: str):
+        """Return the repo from the credential with the most remaining requests.
+
+        Args:
+            repo_name (str): name of the repo, structured as 'org/repo_name'
+        """
+        last_error: Optional[GithubException] = None
+        for index in self.candidates(repo_name):
+            try:
+                repo = self.client(index).get_repo(repo_name)
+            except GithubException as error:
+                if error.status not in NO_ACCESS_STATUSES or (
+                    RateLimitScheduler.is_throttled(error)
+                ):
+                    raise
+                with self._lock:
+                    self.denied.setdefault(repo_name, set()).add(index)
+                last_error = error
+                continue
+            with self._lock:
+                self.routed[self.credentials[index].name] = (
+                    self.routed.get(self.credentials[index].name, 0) + 1
+                )
+            return repo
+        if last_error is not None:
+            raise last_error
+        raise GithubException(
+            404, {"message": f"No credential can access {repo_name}"}, {}
+        )
+
+    def candidates(self, repo_name: str) -> List[int]:
+        """Return the indexes of the credentials to try, most remaining requests first.
+
+        Args:
+            repo_name (str): name of the repo, structured as 'org/repo_name'
+        """
+        denied = self.denied.get(repo_name, set())
+        allowed = [
+            index
+            for index, credential in enumerate(self.credentials)
+            if index not in denied and credential.may_access(repo_name)
+        ]
+        return sorted(allowed, key=self.remaining, reverse=True)
+
+    def remaining(self, index: int) -> float:
+        """Return the requests left to a credential, infinite when it is unknown.
+
+        The quota is read from the headers of the last response of the
+        credential's client, so no request is sent and no token is refreshed.
+        PyGithub asks the rate limit endpoint, which does not count against the
+        limit, the first time the quota of a new client is read. A credential
+        whose quota was used up counts as unknown once its reset time passed.
+        """
+        with self._lock:
+            cached = self.clients.get(index)
+        api = cached[1] if cached is not None else self.client(index)
+        rate_limiting = getattr(api, "rate_limiting", None)
+        if not rate_limiting or rate_limiting[0] < 0:
+            return float("inf")
+        reset_time = getattr(api, "rate_limiting_resettime", None)
+        if rate_limiting[0] == 0 and reset_time and reset_time <= time.time():
+            return float("inf")
+        return rate_limiting[0]
+
+    def client(self, index: int) -> Github:
+        """Return the Github object of a credential, rebuilt when its token changed."""
+        token = self.credentials[index].get_token()
+        with self._lock:
+            if index not in self.clients or self.clients[index][0] != token:
+                self.clients[index] = (token, self.api_factory(token))
+            return self.clients[index][1]
+
+    @classmethod
+    def from_key_file(cls, key_file: str):
+        """Create a CredentialPool from a JSON key file or the environment.
+
+        A JSON key file may list "gh_access_tokens" and "github_apps", where
+        every app has an "app_id", an "installation_id", a
+        "private_key_path", and optionally "owners". A .env key file reads a
+        comma separated list of tokens from GH_ACCESS_TOKENS.
+
+        Args:
+            key_file (str): path to a .json file, or .env to use the environment
+        """
+        credentials: List[TokenCredential] = []
+        if key_file.endswith(".json"):
+            with open(key_file, "r", encoding="utf-8") as input_file:
+                keys = json.load(input_file)
+            tokens = keys.get("gh_access_tokens", [])
+            if "gh_access_token" in keys:
+                tokens = [keys["gh_access_token"], *tokens]
+            for app in keys.get("github_apps", []):
+                with open(app["private_key_path"], "r", encoding="utf-8") as key:
+                    credentials.append(
+                        AppInstallationCredential(
+                            app["app_id"],
+                            key.read(),
+                            app["installation_id"],
+                            owners=app.get("owners", ()),
+                        )
+                    )
+        else:
+            tokens = [
+                token.strip()
+                for token in os.getenv("GH_ACCESS_TOKENS", "").split(",")
+                if token.strip()
+            ]
+        credentials[:0] = [TokenCredential(token) for token in tokens]
+        return cls(credentials)
@@ -0,0 +1,392 @@
+"""Keep SheetShuttle running and re-run plugins when the spreadsheets or configs change.
+
+A Daemon authenticates the Sheets and GitHub APIs once and keeps the API
+clients, the parsed sheet configurations, and the collected regions between
+cycles. Every cycle only refetches the spreadsheets that changed since the
+previous one, as reported by the modifiedTime of their Drive file, and skips
+the plugins entirely when nothing changed.
+"""
+
+import copy
+import pathlib
+import threading
+import time
+from types import MappingProxyType
+from typing import Any, Callable, Dict, List, NamedTuple, Optional, Tuple
+
+import yaml
+from googleapiclient.discovery import build  # type: ignore[import]
+
+from sheetshuttle import github_interaction, plugin_runner, sheet_collector, util
+from sheetshuttle.credentials import CredentialPool
+
+# Scope needed to read the modifiedTime of the spreadsheets
+DRIVE_SCOPES = ["https://www.googleapis.com/auth/drive.metadata.readonly"]
+
+
+class CycleResult(NamedTuple):
+    """Outcome of a single cycle of the daemon."""
+
+    # Names of the sheet configuration files that were collected again
+    refetched: List[str]
+    # Names of the sheet configuration files that were removed
+    removed: List[str]
+    # If the plugins ran during the cycle
+    ran_plugins: bool
+    # Duration of the cycle in seconds
+    duration: float
+
+
+# pylint: disable=R0903
+class DriveModifiedTimes:
+    """Read the modifiedTime of spreadsheets from the Drive API.
+
+    When the Drive API cannot be used, for instance because it is not enabled
+    for the service account, get returns None and spreadsheets are fetched
+    again every cycle instead.
+    """
+
+    def __init__(self, credentials) -> None:
+        """Create a DriveModifiedTimes object.
+
+        Args:
+            credentials: the service account credentials of the SheetCollector
+        """
+        self.credentials = credentials
+        self.service: Any = None
+        self.available = credentials is not None
+
+    def get(self, file_id: str) -> Optional[str]:
+        """Return the modifiedTime of a spreadsheet, None when it is unknown.
+
+        Args:
+            file_id (str): ID of the Google Sheet file
+        """
+        if not self.available:
+            return None
+        try:
+            if self.service is None:
+                self.service = build(
+                    "drive",
+                    "v3",
+                    credentials=self.credentials.with_scopes(
+                        sheet_collector.SCOPES + DRIVE_SCOPES
+                    ),
+                )
+            # pylint: disable=E1101
+            return (
+                self.service.files()
+                .get(fileId=file_id, fields="modifiedTime", supportsAllDrives=True)
+                .execute()["modifiedTime"]
+            )
+        # pylint: disable=W0703
+        except Exception as error:
+            print(
+                f"Warning: modified times are not available from Drive, {error}. "
+                "Spreadsheets will be fetched again every cycle."
+            )
+            self.available = False
+            return None
+
+
+# pylint: disable=R0903
+class SheetState:
+    """What the daemon knows about a sheet configuration file between cycles."""
+
+    def __init__(self, config_mtime: float, config: Dict) -> None:
+        """Create a SheetState object.
+
+        Args:
+            config_mtime (float): modification time of the configuration file
+            config (Dict): the parsed configuration
+        """
+        self.config_mtime = config_mtime
+        self.config = config
+        self.file_id = config.get("source_id", "")
+        if "/" in self.file_id:
+            self.file_id = util.extract_sheet_id(self.file_id)
+        self.modified_time: Optional[str] = None
+        self.collected = False
+
+
+# pylint: disable=R0902
+class Daemon:
+    """Re-run plugins on a schedule or when configurations change, with warm state."""
+
+    # pylint: disable=R0913
+    def __init__(
+        self,
+        plugins: Dict[str, Any],
+        run_args: Tuple[str, str, str],
+        run_kwargs: Optional[Dict[str, Any]] = None,
+        gh_keys_file: str = ".env",
+        interval: float = 300.0,
+        poll_interval: float = 2.0,
+        concurrency: int = 1,
+        modified_times: Optional[Callable[[str], Optional[str]]] = None,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        """Create a Daemon object and authenticate the APIs.
+
+        Args:
+            plugins (Dict[str, Any]): the plugin modules by name
+            run_args (Tuple[str, str, str]): the Sheets keys file, the sheets
+                configuration directory, and the GitHub configuration directory
+                given to the plugins
+            run_kwargs (Dict[str, Any], optional): keyword arguments given to
+                the plugins. Defaults to None.
+            gh_keys_file (str, optional): path to the GitHub token.
+                Defaults to ".env".
+            interval (float, optional): seconds between checks of the
+                spreadsheets. Defaults to 300.0.
+            poll_interval (float, optional): seconds between checks of the
+                configuration files. Defaults to 2.0.
+            concurrency (int, optional): number of plugins run at the same
+                time. Defaults to 1.
+            modified_times (Callable, optional): function returning the
+                modifiedTime of a spreadsheet from its ID, or None when it is
+                unknown. Defaults to reading it from the Drive API.
+            clock (Callable, optional): function returning the current time in
+                seconds. Defaults to time.monotonic.
+        """
+        self.plugins = plugins
+        self.run_args = run_args
+        self.run_kwargs = run_kwargs if run_kwargs is not None else {}
+        self.sheets_config_dir = pathlib.Path(run_args[1])
+        self.gh_config_dir = pathlib.Path(run_args[2])
+        self.interval = interval
+        self.poll_interval = poll_interval
+        self.concurrency = concurrency
+        self.clock = clock
+        self.collector = sheet_collector.SheetCollector(
+            key_file=run_args[0], sources_dir=run_args[1]
+        )
+        self.github_api = Daemon.authenticate_github(gh_keys_file)
+        if modified_times is None:
+            modified_times = DriveModifiedTimes(self.collector.credentials).get
+        self.modified_times = modified_times
+        self.sheet_states: Dict[str, SheetState] = {}
+        self.gh_config_mtimes: Dict[pathlib.Path, float] = {}
+        self.last_check: Optional[float] = None
+        self.cycle_count = 0
+        self._stop = threading.Event()
+
+    @staticmethod
+    def authenticate_github(gh_keys_file: str):
+        """Return an authenticated Github object, None when no token was found.
+
+        Args:
+            gh_keys_file (str): path to the GitHub token, either .json or .env
+        """
+        try:
+            return github_interaction.GithubManager.authenticate_api(gh_keys_file)
+        # pylint: disable=W0703
+        except Exception as error:
+            print(f"Warning: GitHub was not authenticated, {error}")
+            return None
+
+    @staticmethod
+    def create_credential_pool(gh_keys_file: str):
+        """Return a CredentialPool of the GitHub credentials, None when none was found.
+
+        Args:
+            gh_keys_file (str): path to the GitHub credentials, either .json or .env
+        """
+        try:
+            return CredentialPool.from_key_file(gh_keys_file)
+        # pylint: disable=W0703
+        except Exception as error:
+            print(f"Warning: no GitHub credential pool was created, {error}")
+            return None
+
+    def serve(self, max_cycles: Optional[int] = None):
+        """Run cycles until stop is called or max_cycles cycles ran.
+
+        Configuration files are checked every poll_interval seconds and a cycle
+        runs as soon as one of them changed. Spreadsheets are checked every
+        interval seconds. Errors are printed and the daemon keeps running.
+
+        Args:
+            max_cycles (int, optional): number of cycles to run before
+                returning. Defaults to None, running until stop is called.
+        """
+        self._stop.clear()
+        while not self._stop.is_set():
+            due = (
+                self.last_check is None
+                or self.clock() - self.last_check >= self.interval
+            )
+            if due or self.configs_changed():
+                try:
+                    self.report(self.run_cycle())
+                # pylint: disable=W0703
+                except Exception as error:
+                    print(f"ERROR: cycle {self.cycle_count} failed: {error}")
+                if max_cycles is not None and self.cycle_count >= max_cycles:
+                    return
+            self._stop.wait(self.poll_interval)
+
+    def stop(self):
+        """Make serve return after the current cycle."""
+        self._stop.set()
+
+    def run_cycle(self) -> CycleResult:
+        """Refetch the spreadsheets that changed and run the plugins if anything did.
+
+        The refetched sheets and the modification times are only kept once
+        the plugins ran, so the changes are run again by the next cycle when
+        a plugin fails.
+
+        Returns:
+            CycleResult: what was refetched and if the plugins ran
+        """
+        start = self.clock()
+        self.cycle_count += 1
+        self.last_check = start
+        config_files = {
+            path.stem: path for path in util.get_yaml_files(self.sheets_config_dir)
+        }
+        removed = [name for name in self.sheet_states if name not in config_files]
+        sheets_data = {
+            name: sheet
+            for name, sheet in self.collector.sheets_data.items()
+            if name not in removed
+        }
+        sheet_states = {}
+        refetched = []
+        for name, path in config_files.items():
+            state, sheet = self.refresh_sheet(name, path)
+            sheet_states[name] = state
+            if sheet is not None:
+                sheets_data[name] = sheet
+                refetched.append(name)
+        gh_config_mtimes = self.read_gh_config_mtimes()
+        gh_configs_changed = gh_config_mtimes != self.gh_config_mtimes
+        ran_plugins = bool(refetched or removed or gh_configs_changed)
+        if ran_plugins:
+            self.run_plugins(refetched, sheets_data)
+        self.sheet_states = sheet_states
+        self.collector.sheets_data.clear()
+        self.collector.sheets_data.update(sheets_data)
+        self.gh_config_mtimes = gh_config_mtimes
+        return CycleResult(refetched, removed, ran_plugins, self.clock() - start)
+
+    def refresh_sheet(
+        self, name: str, path: pathlib.Path
+    ) -> Tuple[SheetState, Optional[sheet_collector.Sheet]]:
+        """Collect a sheet again if its configuration or spreadsheet changed.
+
+        The state of the sheet is not changed, the new state is returned to be
+        kept once the cycle succeeded.
+
+        Args:
+            name (str): name of the sheet configuration file, without extension
+            path (pathlib.Path): path to the sheet configuration file
+
+        Returns:
+            Tuple[SheetState, Sheet]: the new state of the sheet, and the sheet
+                collected again, None when it did not change
+        """
+        config_mtime = path.stat().st_mtime
+        state = self.sheet_states.get(name)
+        if state is None or state.config_mtime != config_mtime:
+            with open(path, "r", encoding="utf-8") as config_file:
+                state = SheetState(config_mtime, yaml.safe_load(config_file))
+        else:
+            state = copy.copy(state)
+        modified_time = self.modified_times(state.file_id)
+        if (
+            state.collected
+            and modified_time is not None
+            and modified_time == state.modified_time
+        ):
+            return state, None
+        # The configuration is copied since collecting changes its source_id
+        sheet = sheet_collector.Sheet(
+            copy.deepcopy(state.config), self.collector.sheets
+        )
+        sheet.collect_regions()
+        previous = self.collector.sheets_data.get(name)
+        state.modified_time = modified_time
+        if (
+            state.collected
+            and modified_time is None
+            and previous is not None
+            and Daemon.same_data(previous, sheet)
+        ):
+            # Without modified times the data is compared instead
+            return state, None
+        state.collected = True
+        return state, sheet
+
+    @staticmethod
+    def same_data(first, second) -> bool:
+        """Check if two sheets have the same tabs, regions, and region data.
+
+        Args:
+            first (Sheet): a collected sheet
+            second (Sheet): another collected sheet
+        """
+        if first.tabs.keys() != second.tabs.keys():
+            return False
+        for tab_name, regions in first.tabs.items():
+            other_regions = second.tabs[tab_name]
+            if regions.keys() != other_regions.keys():
+                return False
+            for region_name, region in regions.items():
+                other = other_regions[region_name]
+                if (
+                    region.start_range != other.start_range
+                    or region.end_range != other.end_range
+                    or not region.data.equals(other.data)
+                ):
+                    return False
+        return True
+
+    def configs_changed(self) -> bool:
+        """Check if a sheet or GitHub configuration file was added, changed, or removed."""
+        config_files = {
+            path.stem: path for path in util.get_yaml_files(self.sheets_config_dir)
+        }
+        if set(config_files) != set(self.sheet_states):
+            return True
+        for name, path in config_files.items():
+            if path.stat().st_mtime != self.sheet_states[name].config_mtime:
+                return True
+        return self.gh_config_mtimes != self.read_gh_config_mtimes()
+
+    def read_gh_config_mtimes(self) -> Dict[pathlib.Path, float]:
+        """Return the modification time of every GitHub configuration file."""
+        if not self.gh_config_dir.is_dir():
+            return {}
+        paths = util.get_yaml_files(self.gh_config_dir)
+        paths.extend(self.gh_config_dir.glob("*.jsonl"))
+        return {path: path.stat().st_mtime for path in paths}
+
+    def run_plugins(self, refetched: List[str], sheets_data: Dict[str, Any]):
+        """Run every plugin with the warm sheets data and GitHub api.
+
+        Args:
+            refetched (List[str]): names of the sheets collected in this cycle,
+                given to the plugins as "changed_sheets"
+            sheets_data (Dict[str, Sheet]): the sheets of this cycle
+        """
+        kwargs = {
+            **self.run_kwargs,
+            "sheets_data": MappingProxyType(sheets_data),
+            "github_api": self.github_api,
+            "changed_sheets": list(refetched),
+        }
+        plugin_runner.run_plugins(self.plugins, self.run_args, kwargs, self.concurrency)
+
+    def report(self, result: CycleResult):
+        """Print a one line summary of a cycle."""
+        if result.ran_plugins:
+            changes = ", ".join(result.refetched + result.removed) or "configuration"
+            outcome = f"changes in {changes}, plugins ran"
+        else:
+            outcome = "no changes, plugins skipped"
+        print(
+            f"Cycle {self.cycle_count}: {outcome} in "
+            f"{result.duration * 1000:.1f} ms"
+        )
@@ -1,15 +1,32 @@
 """Read and process GitHub configs in the github_interactions directory."""
+
+import itertools
 import json
 import os
 import pathlib
-from typing import Dict, List
+import queue
+import threading
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Union
 
+import pandas as pd  # type: ignore[import]
 import yaml
 from github import Github
+from github.GithubException import GithubException
 
-from jsonschema import validate
-from sheetshuttle import github_objects, util
-
+from sheetshuttle import (
+    async_posting,
+    github_objects,
+    graphql_batch,
+    http_cache,
+    profiling,
+    templates,
+    tracing,
+    util,
+)
+from sheetshuttle.credentials import CredentialPool
+from sheetshuttle.ledger import PostingLedger
+from sheetshuttle.rate_limit import RateLimitScheduler, credential_key
+from sheetshuttle.retry import RetryPolicy
 
 CONFIG_LIST_SCHEMA = {
     "type": "array",
@@ -18,24 +35,52 @@ CONFIG_LIST_SCHEMA = {
         "properties": {
             "type": {
                 "type": "string",
-                "enum": ["issue", "pull request", "file"],
+                "enum": ["issue", "pull request", "file", "template"],
             }
         },
         "required": ["type"],
     },
     "minItems": 1,
 }
+# Every line of a JSON Lines config file is a single entry
+CONFIG_ENTRY_SCHEMA = CONFIG_LIST_SCHEMA["items"]
+# Object put on the entry queue once the producer is done
+_END_OF_ENTRIES = object()
 
 
 class MissingAuthenticationVariable(Exception):
     """Raised when a GitHub authentication variable is missing."""
 
 
+class InvalidEntryConfig(Exception):
+    """Raised when entry configurations handed to a GithubManager are invalid."""
+
+
+class NoAliasDumper(yaml.SafeDumper):
+    """YAML dumper that writes shared objects in full instead of using anchors."""
+
+    def ignore_aliases(self, data):
+        """Never use aliases."""
+        return True
+
+
+# pylint: disable=R0902,R0904
 class GithubManager:
     """Manage github authentication and posting functionalities."""
 
+    # pylint: disable=R0913
     def __init__(
-        self, key_file=".env", sources_dir="config/github_interactions"
+        self,
+        key_file=".env",
+        sources_dir="config/github_interactions",
+        scheduler: Optional[RateLimitScheduler] = None,
+        ledger: Optional[PostingLedger] = None,
+        cache_dir: Optional[str] = None,
+        compact: bool = False,
+        retry_policy: Optional[RetryPolicy] = None,
+        credential_pool: Optional[CredentialPool] = None,
+        sheets_data: Optional[Dict] = None,
+        api: Optional[Github] = None,
     ) -> None:
         """
         Create a GithubManager object that stores the configuration and authenticate api.
@@ -46,25 +91,97 @@ class GithubManager:
 
             sources_dir (str, optional): path to where the configuration
             is stored. Defaults to "config/github_interactions"
+
+            scheduler (RateLimitScheduler, optional): scheduler used to pace,
+            retry, and parallelize posting according to GitHub rate limits.
+            Entries are posted one by one without it. Defaults to None.
+
+            ledger (PostingLedger, optional): durable record of posted entries.
+            Entries found in the ledger are skipped and newly posted entries
+            are recorded in it. Defaults to None.
+
+            cache_dir (str, optional): directory where the GET responses of the
+            GitHub client built from key_file are cached and revalidated with
+            conditional requests. Responses, including their bodies, are stored
+            unencrypted. Responses are not cached without it. Defaults to None.
+
+            compact (bool, optional): create compact entries that drop their
+            configuration once parsed and their GitHub object once posted,
+            keeping only a PostResult. Defaults to False.
+
+            retry_policy (RetryPolicy, optional): policy retrying GitHub calls
+            that failed with transient errors. Its circuit breaker skips repos
+            that keep failing, and its report collects the entries that were
+            not posted. Defaults to None.
+
+            credential_pool (CredentialPool, optional): tokens and GitHub App
+            installations used instead of the token in key_file. Every repo is
+            posted to with the credential that has the most remaining requests
+            and access to it. Defaults to None.
+
+            sheets_data (Dict[str, Sheet], optional): sheets collected by a
+            SheetCollector, used to render the template entries that refer to
+            a source region. Defaults to None.
+
+            api (Github, optional): an authenticated Github object used instead
+            of authenticating with key_file, such as the github_api shared with
+            plugins by "sheetshuttle run --shared". Defaults to None.
         """
         self.key_file: str = key_file
-        self.api = GithubManager.authenticate_api(self.key_file)
+        self.scheduler = scheduler
+        self.ledger = ledger
+        self.compact = compact
+        self.sheets_data = sheets_data if sheets_data is not None else {}
+        self.retry_policy = retry_policy
+        if scheduler is not None and scheduler.retry_policy is None:
+            scheduler.retry_policy = retry_policy
+        self.credential_pool = credential_pool
+        self.http_cache: Optional[http_cache.ResponseCache] = None
+        if cache_dir:
+            self.http_cache = http_cache.ResponseCache(cache_dir)
+        self.api: Union[Github, CredentialPool]
+        if api is not None:
+            self.api = api
+        elif credential_pool is not None:
+            self.api = credential_pool
+        else:
+            built_api = GithubManager.authenticate_api(self.key_file)
+            if self.http_cache is not None:
+                http_cache.attach_cache(built_api, self.http_cache)
+            self.api = built_api
+        if self.http_cache is not None and (
+            api is not None or credential_pool is not None
+        ):
+            print(
+                "Warning: cache_dir is only used by the GitHub client built "
+                "from key_file, the given api or credential_pool is not cached"
+            )
         self.config_dir = pathlib.Path(sources_dir)
         self.config_data: Dict[str, Dict] = {}
         self.issue_entries: List[github_objects.IssueEntry] = []
         self.pull_request_entries: List[github_objects.PullRequestEntry] = []
         self.file_entries: List[github_objects.FileEntry] = []
+        self.persist_threads: List[threading.Thread] = []
+        self.persist_errors: List[Exception] = []
 
     def collect_config(self):
         """Update config_data with the contents of file in the config directory."""
+        for config_file_path in self.get_config_files():
+            if config_file_path.suffix == ".jsonl":
+                loaded_list = list(GithubManager.iter_json_lines(config_file_path))
+            else:
+                # Open yaml file as read
+                with open(config_file_path, "r", encoding="utf-8") as config_file:
+                    loaded_list = yaml.safe_load(config_file)
+            self.parse_config_list(loaded_list)
+            self.config_data[config_file_path.stem] = loaded_list
+
+    def get_config_files(self) -> List[pathlib.Path]:
+        """Return the YAML and JSON Lines files in the config directory."""
         # get a list of all yaml and yml path objects in the config_dir
         config_files: List[pathlib.Path] = util.get_yaml_files(self.config_dir)
-        for yaml_file in config_files:
-            # Open yaml file as read
-            with open(yaml_file, "r", encoding="utf-8") as config_file:
-                loaded_list = yaml.safe_load(config_file)
-                self.parse_config_list(loaded_list)
-                self.config_data[yaml_file.stem] = loaded_list
+        config_files.extend(self.config_dir.glob("*.jsonl"))
+        return config_files
 
     def parse_config_list(self, config_list: list):
         """Create and append github object entries to respective instance variables.
@@ -73,45 +190,568 @@ class GithubManager:
             config_list (list): list of dictionaries for every github entry
         """
         # validate the config list against the json schema
-        validate(instance=config_list, schema=CONFIG_LIST_SCHEMA)
+        github_objects.Entry.validate_schema(config_list, CONFIG_LIST_SCHEMA)
         for config in config_list:
             # Initialize the correct github object for each config and add it to
             # its list
-            if config["type"] == "issue":
-                issue_entry = github_objects.IssueEntry(config)
-                self.issue_entries.append(issue_entry)
-            elif config["type"] == "pull request":
-                pr_entry = github_objects.PullRequestEntry(config)
-                self.pull_request_entries.append(pr_entry)
-            elif config["type"] == "file":
-                file_entry = github_objects.FileEntry(config)
-                self.file_entries.append(file_entry)
+            for entry in self.create_entries(config):
+                self.store_entry(entry)
+
+    def create_entries(self, config: Dict) -> List[github_objects.Entry]:
+        """Create the entry of a configuration, or all entries of a template.
+
+        Args:
+            config (Dict): configuration of a single entry or of an entry
+                template with a source region
+        """
+        if config.get("type") != "template":
+            return [github_objects.create_entry(config, self.compact)]
+        template = templates.EntryTemplate(config)
+        if template.source is None:
+            raise templates.InvalidTemplate(
+                "Templates in the GitHub configuration need a source region, "
+                "use add_template to render a data frame directly"
+            )
+        region = templates.find_region(self.sheets_data, template.source)
+        return template.render(region.data, self.compact)
+
+    def store_entry(self, entry: github_objects.Entry):
+        """Append an entry to the list of its type.
+
+        Args:
+            entry (Entry): the entry to store
+        """
+        if isinstance(entry, github_objects.IssueEntry):
+            self.issue_entries.append(entry)
+        elif isinstance(entry, github_objects.PullRequestEntry):
+            self.pull_request_entries.append(entry)
+        elif isinstance(entry, github_objects.FileEntry):
+            self.file_entries.append(entry)
+
+    def add_template(
+        self, config: Dict, data: Optional[pd.DataFrame] = None
+    ) -> List[github_objects.Entry]:
+        """Render an entry template for every row of a data frame.
+
+        The template is compiled once and every field is rendered a column at a
+        time, which is much faster than building one configuration per row.
+
+        Args:
+            config (Dict): the template configuration. "type" may be left out.
+            data (pd.DataFrame, optional): the rows to render. Defaults to the
+                data of the source region of the template.
+
+        Returns:
+            List[Entry]: the created entries, also appended to the entry lists
+        """
+        config = {"type": "template", **config}
+        if data is None:
+            entries = self.create_entries(config)
+        else:
+            entries = templates.EntryTemplate(config).render(data, self.compact)
+        for entry in entries:
+            self.store_entry(entry)
+        return entries
+
+    def add_entries(
+        self, configs: Union[Dict, Iterable[Dict]], persist_path: Optional[str] = None
+    ) -> List[github_objects.Entry]:
+        """Create entries from configurations built in memory by a plugin.
+
+        Every configuration is validated before any entry is added, and all
+        invalid configurations are reported together.
+
+        Args:
+            configs (Union[Dict, Iterable[Dict]]): a single entry configuration
+                or an iterable of them
+            persist_path (str, optional): file to also write the configurations
+                to, for auditing, in a background thread. Written as JSON Lines
+                when it ends with ".jsonl", as YAML otherwise. Defaults to None.
+
+        Returns:
+            List[Entry]: the created entries, also appended to the entry lists
+        """
+        config_list = [configs] if isinstance(configs, dict) else list(configs)
+        entries = []
+        errors = []
+        for index, config in enumerate(config_list):
+            try:
+                github_objects.Entry.validate_schema(config, CONFIG_ENTRY_SCHEMA)
+                entries.extend(self.create_entries(config))
+            # pylint: disable=W0703
+            except Exception as error:
+                message = getattr(error, "message", str(error))
+                errors.append(f"entry {index}: {message}")
+        if errors:
+            raise InvalidEntryConfig(
+                f"{len(errors)} invalid entry configurations:\n" + "\n".join(errors)
+            )
+        for entry in entries:
+            self.store_entry(entry)
+        if persist_path:
+            self.persist_config(config_list, persist_path)
+        return entries
+
+    def persist_config(self, config_list: List[Dict], path: str):
+        """Write entry configurations to a file in a background thread.
+
+        Call wait_for_persistence to make sure the file is complete.
+
+        Args:
+            config_list (List[Dict]): configurations to write
+            path (str): destination, JSON Lines when it ends with ".jsonl",
+                YAML otherwise
+        """
+
+        def write_config():
+            try:
+                with open(path, "w", encoding="utf-8") as writefile:
+                    if path.endswith(".jsonl"):
+                        for config in config_list:
+                            writefile.write(json.dumps(config) + "\n")
+                    else:
+                        yaml.dump(config_list, writefile, Dumper=NoAliasDumper)
+            # pylint: disable=W0703
+            except Exception as error:
+                self.persist_errors.append(error)
+
+        thread = threading.Thread(target=write_config)
+        thread.start()
+        self.persist_threads.append(thread)
+
+    def wait_for_persistence(self):
+        """Wait for the configuration files being written in the background.
+
+        Raises the first error that occurred while writing.
+        """
+        while self.persist_threads:
+            self.persist_threads.pop().join()
+        if self.persist_errors:
+            error = self.persist_errors[0]
+            self.persist_errors = []
+            raise error
+
+    def iter_entries(self) -> Iterator[github_objects.Entry]:
+        """Yield validated entries from the config directory one at a time.
+
+        Unlike collect_config, nothing is stored in config_data or the entry
+        lists. JSON Lines files are read line by line, YAML files are loaded
+        one file at a time.
+        """
+        for config_file_path in self.get_config_files():
+            if config_file_path.suffix == ".jsonl":
+                configs: Iterable[Dict] = GithubManager.iter_json_lines(
+                    config_file_path
+                )
+            else:
+                with open(config_file_path, "r", encoding="utf-8") as config_file:
+                    configs = yaml.safe_load(config_file)
+                github_objects.Entry.validate_schema(configs, CONFIG_LIST_SCHEMA)
+            for config in configs:
+                yield from self.create_entries(config)
+
+    @staticmethod
+    def iter_json_lines(path: pathlib.Path) -> Iterator[Dict]:
+        """Yield the entry configurations of a JSON Lines file, skipping blank lines.
+
+        Args:
+            path (pathlib.Path): path to the .jsonl file
+        """
+        with open(path, "r", encoding="utf-8") as config_file:
+            for line_number, line in enumerate(config_file, start=1):
+                if not line.strip():
+                    continue
+                try:
+                    config = json.loads(line)
+                except json.JSONDecodeError as error:
+                    raise Exception(
+                        f"Invalid JSON on line {line_number} of {path}: {error}"
+                    ) from error
+                github_objects.Entry.validate_schema(config, CONFIG_ENTRY_SCHEMA)
+                yield config
+
+    @profiling.phase("post")
+    @tracing.span("post stream")
+    def post_stream(
+        self,
+        entries: Optional[Iterable[github_objects.Entry]] = None,
+        queue_size: int = 1000,
+    ) -> int:
+        """Post entries while they are being read, without storing them.
+
+        A producer thread reads and validates the entries into a bounded queue
+        that the posting loop, or the scheduler, consumes. The producer waits
+        when the queue is full, so memory does not grow with the number of
+        entries. Entries are posted in the order they are read instead of
+        issues first.
+
+        Args:
+            entries (Iterable[Entry], optional): entries to post. Defaults to
+                the entries of the config directory.
+            queue_size (int, optional): maximum number of entries read ahead
+                of posting. Defaults to 1000.
+
+        Returns:
+            int: number of entries posted, without the ones found in the ledger
+        """
+        if entries is None:
+            entries = self.iter_entries()
+        entry_queue: queue.Queue = queue.Queue(maxsize=queue_size)
+        stop = threading.Event()
+        producer = threading.Thread(
+            target=GithubManager._produce_entries,
+            args=(entries, entry_queue, stop),
+            daemon=True,
+        )
+        producer.start()
+        posted_count = 0
+        # The scheduler calls after_post from its worker threads
+        count_lock = threading.Lock()
+
+        def after_post(entry):
+            nonlocal posted_count
+            self.finish_entry(entry)
+            if entry.posted:
+                with count_lock:
+                    posted_count += 1
+
+        try:
+            pending = self.admit(
+                self.iter_unrecorded(GithubManager._consume_entries(entry_queue))
+            )
+            if self.scheduler:
+                self.scheduler.run(pending, tracing.wrap(self.api), callback=after_post)
+            else:
+                api_object = tracing.wrap(self.posting_api())
+                for entry in pending:
+                    with tracing.entry_span(entry):
+                        entry.post(api_object)
+                    after_post(entry)
+        finally:
+            stop.set()
+            producer.join()
+        return posted_count
+
+    @staticmethod
+    def _produce_entries(
+        entries: Iterable[github_objects.Entry],
+        entry_queue: queue.Queue,
+        stop: threading.Event,
+    ):
+        """Put entries on the queue until they run out or stop is set."""
+        try:
+            for entry in itertools.chain(entries, [_END_OF_ENTRIES]):
+                if not GithubManager._put_entry(entry_queue, entry, stop):
+                    return
+        # pylint: disable=W0703
+        except Exception as error:
+            # Errors are raised again by the consumer
+            GithubManager._put_entry(entry_queue, error, stop)
+
+    @staticmethod
+    def _put_entry(entry_queue: queue.Queue, item, stop: threading.Event) -> bool:
+        """Put an item on the queue, waiting for room until stop is set.
+
+        Returns:
+            bool: True when the item was put, False when stop was set first
+        """
+        while not stop.is_set():
+            try:
+                entry_queue.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    @staticmethod
+    def _consume_entries(entry_queue: queue.Queue) -> Iterator[github_objects.Entry]:
+        """Yield entries from the queue until the producer is done."""
+        while True:
+            item = entry_queue.get()
+            if item is _END_OF_ENTRIES:
+                return
+            if isinstance(item, Exception):
+                raise item
+            yield item
+
+    @profiling.phase("post")
+    def post_entries(self, entries: List[github_objects.Entry]):
+        """Post a list of entries, using the scheduler if one is available.
+
+        Entries already recorded in the ledger are marked as posted and skipped.
+
+        Args:
+            entries (List[Entry]): entries to post
+        """
+        with tracing.span("post entries", count=len(entries)):
+            pending = self.admit(self.skip_recorded(entries))
+            if self.scheduler:
+                self.scheduler.run(
+                    pending, tracing.wrap(self.api), callback=self.finish_entry
+                )
+                return
+            api_object = tracing.wrap(self.posting_api())
+            for entry in pending:
+                with tracing.entry_span(entry):
+                    entry.post(api_object)
+                self.finish_entry(entry)
+
+    def posting_api(self):
+        """Return the api object used to post entries without a scheduler."""
+        if self.retry_policy is None:
+            return self.api
+        return self.retry_policy.wrap(self.api)
+
+    def admit(
+        self, entries: Iterable[github_objects.Entry]
+    ) -> Iterator[github_objects.Entry]:
+        """Yield the entries whose repo is not skipped by the circuit breaker.
+
+        Args:
+            entries (Iterable[Entry]): entries about to be posted
+        """
+        for entry in entries:
+            if self.retry_policy is None or self.retry_policy.admit(entry):
+                yield entry
+
+    def finish_entry(self, entry: github_objects.Entry):
+        """Record an entry in the ledger and the retry policy after posting it.
+
+        Args:
+            entry (Entry): the entry that was just posted
+        """
+        self.record_posted(entry)
+        if self.retry_policy is not None:
+            self.retry_policy.record(entry)
+
+    def skip_recorded(
+        self, entries: Iterable[github_objects.Entry]
+    ) -> List[github_objects.Entry]:
+        """Return the entries that are not recorded as posted in the ledger.
+
+        Args:
+            entries (Iterable[Entry]): entries to check
+        """
+        return list(self.iter_unrecorded(entries))
+
+    def iter_unrecorded(
+        self, entries: Iterable[github_objects.Entry]
+    ) -> Iterator[github_objects.Entry]:
+        """Yield the entries that are not recorded as posted in the ledger.
+
+        Args:
+            entries (Iterable[Entry]): entries to check
+        """
+        for entry in entries:
+            if self.ledger is not None and self.ledger.contains(entry):
+                entry.posted = True
+            else:
+                yield entry
+
+    def record_posted(self, entry: github_objects.Entry):
+        """Store an entry in the ledger if it was posted successfully.
+
+        Entries that failed or were skipped, such as updates of missing issues,
+        are not stored so that later runs try them again.
+
+        Args:
+            entry (Entry): the entry that was just posted
+        """
+        if (
+            self.ledger is not None
+            and entry.result is not None
+            and entry.result.status == "posted"
+        ):
+            self.ledger.record(entry)
 
     def post_issues(self):
         """Iterate and post all issues in the issue entries list."""
-        for issue in self.issue_entries:
-            issue.post(self.api)
+        self.post_entries(self.issue_entries)
 
     def post_pull_requests(self):
         """Iterate and post all pull requests in the pull requests entries list."""
-        for pull_request in self.pull_request_entries:
-            pull_request.post(self.api)
+        self.post_entries(self.pull_request_entries)
 
     def post_files(self):
         """Iterate and post all files in the pull files entries list."""
-        for file in self.file_entries:
-            file.post(self.api)
+        self.post_entries(self.file_entries)
 
+    @tracing.span("post all")
     def post_all(self):
         """Post all entries in issues, pull requests, and files."""
         self.post_issues()
         self.post_pull_requests()
         self.post_files()
 
+    @profiling.phase("post")
+    def post_all_async(
+        self, base_url: str = async_posting.API_URL, concurrency: int = 50
+    ):
+        """Post all entries using the asynchronous posting backend.
+
+        Args:
+            base_url (str, optional): URL of the GitHub REST API.
+                Defaults to "https://api.github.com".
+            concurrency (int, optional): maximum number of requests in flight.
+                Defaults to 50.
+
+        Raises:
+            Exception: thrown when the manager uses a credential pool, the
+                asynchronous backend posts with the token of key_file only
+        """
+        self.check_single_token("asynchronous")
+        poster = async_posting.AsyncGithubPoster(
+            GithubManager.read_token(self.key_file),
+            base_url=base_url,
+            concurrency=concurrency,
+        )
+        poster.post_all(
+            self.skip_recorded(
+                itertools.chain(
+                    self.issue_entries, self.pull_request_entries, self.file_entries
+                )
+            ),
+            callback=self.record_posted,
+        )
+
+    @profiling.phase("post")
+    def post_all_graphql(self, batch_size: int = 50):
+        """Post all entries, sending issue and pull request updates through GraphQL.
+
+        Comments and labels of update entries are packed into batched GraphQL
+        requests, every other entry is posted through the REST API. GraphQL
+        requests are sent with the same credentials as the REST calls, the
+        credential of every repo when a credential pool is used, and paced by
+        the scheduler when there is one. Updates go through the circuit
+        breaker and the ledger like the other entries.
+
+        Args:
+            batch_size (int, optional): number of aliased fields in a single
+                GraphQL request. Defaults to 50.
+        """
+        updates = self.admit(
+            entry
+            for entry in self.skip_recorded(
+                itertools.chain(self.issue_entries, self.pull_request_entries)
+            )
+            if graphql_batch.is_graphql_postable(entry)
+        )
+        for requester, entries in self.group_by_requester(updates).items():
+            if requester is not None:
+                self.post_graphql_updates(requester, entries, batch_size)
+            for entry in entries:
+                self.finish_entry(entry)
+        self.post_entries(
+            [
+                entry
+                for entry in itertools.chain(
+                    self.issue_entries, self.pull_request_entries
+                )
+                if not graphql_batch.is_graphql_postable(entry)
+            ]
+        )
+        self.post_files()
+
+    def post_graphql_updates(
+        self, requester, entries: List[github_objects.Entry], batch_size: int
+    ) -> None:
+        """Post update entries through GraphQL with the requester of a client.
+
+        Entries are marked as failed when a whole GraphQL request fails.
+
+        Args:
+            requester (Requester): requester of the PyGithub client
+            entries (List[Entry]): update entries of repos posted with it
+            batch_size (int): number of aliased fields in a single request
+        """
+        batcher = graphql_batch.GraphQLBatcher.from_requester(
+            requester, batch_size=batch_size, scheduler=self.scheduler
+        )
+        try:
+            batcher.post_updates(entries)
+        except (graphql_batch.GraphQLError, GithubException) as error:
+            print(
+                f"Warning: a GraphQL request failed, {len(entries)} updates "
+                f"were NOT posted: {error}"
+            )
+            for entry in entries:
+                if entry.result is None:
+                    entry.set_failed(error)
+
+    def group_by_requester(
+        self, entries: Iterable[github_objects.Entry]
+    ) -> Dict[Any, List[github_objects.Entry]]:
+        """Group entries by the PyGithub requester their repo is posted with.
+
+        With a credential pool, every repo is routed like its REST calls are.
+        Entries of repos that no credential can access are marked as failed
+        and grouped under None.
+
+        Args:
+            entries (Iterable[Entry]): entries to group
+
+        Raises:
+            Exception: thrown when the api object is not a PyGithub client
+        """
+        groups: Dict[Any, List[github_objects.Entry]] = {}
+        requesters: Dict[str, Any] = {}
+        for entry in entries:
+            repo = entry.repo  # type: ignore[attr-defined]
+            if repo not in requesters:
+                try:
+                    requesters[repo] = credential_key(
+                        self.api
+                        if self.credential_pool is None
+                        else self.credential_pool.get_repo(repo)
+                    )
+                except GithubException as error:
+                    print(
+                        f"Warning: no credential can access {repo}, "
+                        "its updates were NOT posted."
+                    )
+                    requesters[repo] = error
+                if requesters[repo] is None:
+                    raise Exception(
+                        "ERROR: GraphQL requests are sent with the requester of "
+                        "a PyGithub client, which the GitHub api object does not have"
+                    )
+            requester = requesters[repo]
+            if isinstance(requester, GithubException):
+                entry.set_failed(requester)
+                requester = None
+            groups.setdefault(requester, []).append(entry)
+        return groups
+
+    def check_single_token(self, backend: str) -> None:
+        """Stop a backend that posts with the token of key_file when a credential pool is used.
+
+        Args:
+            backend (str): name of the posting backend, used in the error
+
+        Raises:
+            Exception: thrown when the manager uses a credential pool
+        """
+        if self.credential_pool is not None:
+            raise Exception(
+                f"ERROR: the {backend} posting backend uses the token of "
+                f"{self.key_file} and does not support a credential pool, "
+                "use post_all instead"
+            )
+
     @staticmethod
     def authenticate_api(key_file):
         """Use credentials from key_file our environment authenticate access to a GitHub account.
 
+        Args:
+            key_file (str, optional): Path to file containing GitHub token.
+            Can be either JSON or .env file
+        """
+        return Github(GithubManager.read_token(key_file))
+
+    @staticmethod
+    def read_token(key_file) -> str:
+        """Read the GitHub token from key_file or the environment.
+
         Args:
             key_file (str, optional): Path to file containing GitHub token.
             Can be either JSON or .env file
@@ -126,7 +766,7 @@ class GithubManager:
                     print(f"ERROR: the key {var_name} does not exist in {key_file}.")
                     raise exce
         elif key_file.endswith(".env"):
-            token = os.getenv(var_name)
+            token = os.getenv(var_name, "")
             if not token:
                 raise MissingAuthenticationVariable(
                     f"Variable {var_name} could not be found"
@@ -137,4 +777,4 @@ class GithubManager:
                 + "Must be a .env or .json file"
             )
 
-        return Github(token)
+        return token
@@ -1,30 +1,179 @@
 """Create the object oriented structure for issue trackers, pull requests, and files."""
-from typing import Dict, List, Collection, Union
+
+# pylint: disable=C0302
+
+import base64
+import hashlib
+import io
+import json
+import os
+import shutil
+import tempfile
+from typing import (
+    Any,
+    BinaryIO,
+    Dict,
+    Iterator,
+    List,
+    NamedTuple,
+    Optional,
+    Tuple,
+    Type,
+    Union,
+)
 
 from github import Github
+from github.GitBlob import GitBlob
+from github.InputGitTreeElement import InputGitTreeElement
 from github.Issue import Issue
 from github.PullRequest import PullRequest
+from github.Repository import Repository
 from github.ContentFile import ContentFile
 from github.GithubException import GithubException
-from jsonschema import validate
+from jsonschema import validators
+from jsonschema.exceptions import best_match
+
+# Validators built for each schema, checking a schema is slower than
+# validating an entry so it is only done once
+_VALIDATORS: Dict[int, Tuple[Dict, Any]] = {}
+
+
+class PostResult(NamedTuple):
+    """Small record of the outcome of posting an entry."""
+
+    # "posted", "skipped" when there was nothing to post, or "failed"
+    status: str
+    number: Optional[int] = None
+    url: Optional[str] = None
+    node_id: Optional[str] = None
+    # REST id of issues and pull requests, blob SHA of files
+    object_id: Optional[str] = None
+    # HTTP status and message of the error that made posting fail
+    error_status: Optional[int] = None
+    error: Optional[str] = None
+
+    @staticmethod
+    def from_object(gh_object) -> "PostResult":
+        """Create a PostResult from a PyGithub object or a JSON response dictionary.
+
+        Args:
+            gh_object: the object returned when posting, None if nothing was posted
+        """
+        if gh_object is None:
+            return PostResult("skipped")
+        object_id = object_field(gh_object, "id")
+        if object_id is None:
+            object_id = object_field(gh_object, "sha")
+        return PostResult(
+            "posted",
+            object_field(gh_object, "number"),
+            object_field(gh_object, "html_url"),
+            object_field(gh_object, "node_id"),
+            None if object_id is None else str(object_id),
+        )
+
+
+def object_field(gh_object, name: str):
+    """Read a field from a PyGithub object or a JSON response dictionary.
+
+    Args:
+        gh_object: the object to read from
+        name (str): name of the field
+
+    Returns:
+        the value when it is a non empty string or an integer, None otherwise
+    """
+    if gh_object is None:
+        return None
+    if isinstance(gh_object, dict):
+        return gh_object.get(name)
+    value = getattr(gh_object, name, None)
+    if isinstance(value, (str, int)) and value != "":
+        return value
+    return None
 
 
 class Entry:
     """Contain the interface and basic functions for a GitHub entry."""
 
-    SCHEMA: Dict[str, Collection[str]] = {}
+    __slots__ = ("config", "compact", "posted", "gh_object", "result", "_config_key")
+
+    # Kind of the entry, "issue", "pull request", or "file", set by parse_config
+    type: str  # pylint: disable=E0245
+    SCHEMA: Dict[str, Any] = {}
+    # Instance variables that make up the configuration, used by to_config
+    CONFIG_FIELDS: Tuple[str, ...] = ()
 
-    def __init__(self, config: Dict) -> None:
+    def __init__(
+        self, config: Dict, compact: bool = False, validate: bool = True
+    ) -> None:
         """Initialize an Entry object using a configuration argument.
 
         Args:
             config (Dict): a dictionary with needed keys that follows the Entry schema.
+            compact (bool, optional): drop the configuration once it is parsed
+                and the GitHub object once it is posted, only keeping the
+                result record. Defaults to False.
+            validate (bool, optional): validate the configuration against the
+                schema. Only disabled for configurations known to be valid,
+                such as the ones rendered from an entry template.
+                Defaults to True.
         """
-        self.validate_schema(config, type(self).SCHEMA)
-        self.config = config
+        if validate:
+            self.validate_schema(config, type(self).SCHEMA)
+        self.config: Optional[Dict] = config
+        self.compact = compact
         self.posted = False
         self.gh_object = None
+        self.result: Optional[PostResult] = None
+        self._config_key: Optional[str] = None
         self.parse_config()
+        if compact:
+            # The key cannot be computed from the configuration later
+            self._config_key = Entry.config_hash(config)
+            self.config = None
+
+    @property
+    def config_key(self) -> str:
+        """Return a stable hash of the entry configuration."""
+        if self._config_key is not None:
+            return self._config_key
+        return Entry.config_hash(self.config)  # type: ignore[arg-type]
+
+    def to_config(self) -> Dict:
+        """Return the configuration of the entry, rebuilt from its fields in compact mode."""
+        if self.config is not None:
+            return self.config
+        config = {}
+        for field in type(self).CONFIG_FIELDS:
+            value = getattr(self, field)
+            if value is not None:
+                config[field] = value
+        return config
+
+    def set_posted(self, gh_object) -> None:
+        """Mark the entry as posted and keep the result of posting it.
+
+        Args:
+            gh_object: the object returned when posting, None if nothing was posted
+        """
+        self.posted = True
+        self.result = PostResult.from_object(gh_object)
+        self.gh_object = None if self.compact else gh_object
+
+    def set_failed(self, error: Union[Exception, str, None] = None) -> None:
+        """Record that posting the entry failed.
+
+        Args:
+            error (Union[Exception, str], optional): the error that made posting
+                fail. Defaults to None.
+        """
+        status = getattr(error, "status", None)
+        self.result = PostResult(
+            "failed",
+            error_status=status if isinstance(status, int) else None,
+            error=None if error is None else str(error),
+        )
 
     def parse_config(self):
         """Iterate through configuration and create appropriate variables.
@@ -48,7 +197,37 @@ class Entry:
             config (Dict): Configuration to validate
             schema (Dict): Schema used for validation
         """
-        validate(instance=config, schema=schema)
+        error = best_match(Entry.get_validator(schema).iter_errors(config))
+        if error is not None:
+            raise error
+
+    @staticmethod
+    def config_hash(config: Dict) -> str:
+        """Return a stable hash of an entry configuration.
+
+        Args:
+            config (Dict): the entry configuration
+
+        Returns:
+            str: hex digest that does not depend on the order of the keys
+        """
+        serialized = json.dumps(config, sort_keys=True, separators=(",", ":"))
+        return hashlib.sha256(serialized.encode("utf-8")).hexdigest()
+
+    @staticmethod
+    def get_validator(schema):
+        """Return a validator for the schema, building it on first use.
+
+        Args:
+            schema (Dict): the schema to validate against
+        """
+        cached = _VALIDATORS.get(id(schema))
+        if cached is None or cached[0] is not schema:
+            validator_class = validators.validator_for(schema)
+            validator_class.check_schema(schema)
+            cached = (schema, validator_class(schema))
+            _VALIDATORS[id(schema)] = cached
+        return cached[1]
 
 
 # pylint: disable=R0902
@@ -59,6 +238,9 @@ class IssueEntry(Entry):
     Inherits from Entry
     """
 
+    __slots__ = ("type", "action", "repo", "body", "labels", "title", "number")
+    CONFIG_FIELDS = ("type", "action", "repo", "title", "number", "body", "labels")
+
     SCHEMA = {
         "type": "object",
         "properties": {
@@ -128,13 +310,13 @@ class IssueEntry(Entry):
                 )
             else:
                 raise Exception(f"Unknown action {self.action} in {self}")
-            self.posted = True
             # Store the issue github object as instance variable
-            self.gh_object = issue
-        except GithubException:
+            self.set_posted(issue)
+        except GithubException as error:
+            self.set_failed(error)
             print(
                 "Warning: a GitHub error occurred while posting an IssueEntry."
-                f"Entry with the following configuration was NOT posted {self.config}."
+                f"Entry with the following configuration was NOT posted {self.to_config()}."
             )
 
     @staticmethod
@@ -204,6 +386,18 @@ class FileEntry(Entry):
     Inherits from Entry
     """
 
+    __slots__ = (
+        "type",
+        "action",
+        "repo",
+        "path",
+        "content",
+        "content_path",
+        "branch",
+        "commit_message",
+    )
+    CONFIG_FIELDS = __slots__
+
     SCHEMA = {
         "type": "object",
         "properties": {
@@ -212,19 +406,28 @@ class FileEntry(Entry):
             "repo": {"type": "string", "pattern": r"^.+[^\s]\/[^\s].+$"},
             "path": {"type": "string", "minLength": 1},
             "content": {"type": "string", "minLength": 1},
+            "content_path": {"type": "string", "minLength": 1},
             "branch": {"type": "string", "minLength": 1},
             "commit_message": {"type": "string", "minLength": 1},
         },
-        "required": ["type", "action", "repo", "path", "content", "branch"],
+        "required": ["type", "action", "repo", "path", "branch"],
+        "oneOf": [{"required": ["content"]}, {"required": ["content_path"]}],
     }
 
+    # Files above this size are committed through the Git blobs API, the
+    # contents API does not handle files larger than 1 MB
+    LARGE_FILE_SIZE = 1024 * 1024
+    # Multiple of 3 so that base64 encoded chunks can be concatenated
+    BASE64_CHUNK_SIZE = 3 * 256 * 1024
+
     def parse_config(self):
         """Iterate through the entry configuration and assign instance variables."""
         self.type = "file"
         self.action = self.config["action"]
         self.repo = self.config["repo"]
         self.path = self.config["path"]
-        self.content = self.config["content"]
+        self.content = self.config.get("content")
+        self.content_path = self.config.get("content_path")
         self.branch = self.config["branch"]
         if "commit_message" in self.config:
             self.commit_message = self.config["commit_message"]
@@ -238,20 +441,48 @@ class FileEntry(Entry):
             api_object (Github): An authenticated Github object
         """
         try:
-            function_to_call = getattr(FileEntry, f"{self.action}_file")
-            self.gh_object = function_to_call(
-                api_object,
-                self.repo,
-                self.path,
-                self.content,
-                self.branch,
-                self.commit_message,
-            )
-            self.posted = True
-        except GithubException:
+            content: Union[str, bytes, None] = self.content
+            if self.content_path is not None:
+                if os.path.getsize(self.content_path) > FileEntry.LARGE_FILE_SIZE:
+                    content = None
+                else:
+                    with open(self.content_path, "rb") as infile:
+                        content = infile.read()
+            elif len(FileEntry.to_bytes(content)) > FileEntry.LARGE_FILE_SIZE:
+                content = None
+            if content is None:
+                gh_object = FileEntry.commit_large_file(
+                    api_object,
+                    self.repo,
+                    self.path,
+                    self.action,
+                    self.branch,
+                    self.commit_message,
+                    content=self.content,
+                    content_path=self.content_path,
+                )
+            else:
+                function_to_call = getattr(FileEntry, f"{self.action}_file")
+                gh_object = function_to_call(
+                    api_object,
+                    self.repo,
+                    self.path,
+                    content,
+                    self.branch,
+                    self.commit_message,
+                )
+            self.set_posted(gh_object)
+        except GithubException as error:
+            self.set_failed(error)
             print(
                 "Warning: a GitHub error occurred while posting a FileEntry."
-                f"Entry with the following configuration was NOT posted {self.config}."
+                f"Entry with the following configuration was NOT posted {self.to_config()}."
+            )
+        except OSError as error:
+            self.set_failed(error)
+            print(
+                f"Warning: could not read {self.content_path} while posting a FileEntry."
+                f"Entry with the following configuration was NOT posted {self.to_config()}."
             )
 
     @staticmethod
@@ -259,7 +490,7 @@ class FileEntry(Entry):
         api_object: Github,
         repo_name: str,
         path: str,
-        content: str,
+        content: Union[str, bytes],
         branch: str,
         commit_message="Add new file",
     ) -> Union[ContentFile, None]:
@@ -269,7 +500,7 @@ class FileEntry(Entry):
             api_object (Github): an authenticated GitHub object
             repo_name (str): name of the repo to post the issue to, structured as 'org/repo_name'
             path (str): path to the file from the root of the repository
-            contents (str): contents of the new file
+            contents (Union[str, bytes]): contents of the new file
             branch (str): name of the branch to create the file in
             commit_message (str, optional): Defaults to "Add new file"
         """
@@ -287,34 +518,50 @@ class FileEntry(Entry):
         api_object: Github,
         repo_name: str,
         path: str,
-        added_content: str,
+        added_content: Union[str, bytes],
         branch: str,
         commit_message="Update file",
-    ) -> Union[ContentFile, None]:
+    ) -> Union[ContentFile, GitBlob, None]:
         """Update an existing file in a GitHub repository.
 
+        The SHA, size, and content of the file come from a single contents
+        request, and the file is not committed when its SHA does not change.
+
         Args:
             api_object (Github): an authenticated GitHub object
             repo_name (str): name of the repo to post the issue to, structured as 'org/repo_name'
             path (str): path to the file from the root of the repository
-            added_content (str): content to append to the file
+            added_content (Union[str, bytes]): content to append to the file
             branch (str): name of the branch to create the file in
             commit_message (str, optional): Defaults to "Add new file"
         """
-        if not FileEntry.exists(api_object, repo_name, path, branch):
+        repo = api_object.get_repo(repo_name)
+        contents = FileEntry.get_remote_contents(repo, path, branch)
+        if contents is None or isinstance(contents, list):
             print(
                 f"Warning: file does not exist, {path} was NOT updated in {repo_name}:{branch}."
             )
             return None
-        repo = api_object.get_repo(repo_name)
-        contents = repo.get_contents(path)
-        old_content = contents.decoded_content.decode("utf-8")  # type: ignore[union-attr]
-        new_content = old_content + added_content
+        added_bytes = FileEntry.to_bytes(added_content)
+        if contents.size + len(added_bytes) > FileEntry.LARGE_FILE_SIZE:
+            return FileEntry.commit_large_file(
+                api_object,
+                repo_name,
+                path,
+                "update",
+                branch,
+                commit_message,
+                content=added_content,
+            )
+        new_content = contents.decoded_content + added_bytes
+        if FileEntry.blob_sha(new_content) == contents.sha:
+            print(f"File {path} is unchanged in {repo_name}:{branch}, skipping commit.")
+            return None
         response = repo.update_file(
-            contents.path,  # type: ignore[union-attr]
+            path,
             commit_message,
             new_content,
-            contents.sha,  # type: ignore[union-attr]
+            contents.sha,
             branch,
         )
         return response["content"]  # type: ignore[return-value]
@@ -324,32 +571,38 @@ class FileEntry(Entry):
         api_object: Github,
         repo_name: str,
         path: str,
-        new_content: str,
+        new_content: Union[str, bytes],
         branch: str,
         commit_message="Replace file",
     ) -> Union[ContentFile, None]:
         """Replace the contents of a file in a GitHub repository.
 
+        The git blob SHA of the new content is computed locally and compared
+        with the SHA in the branch tree, unchanged files are not committed.
+
         Args:
             api_object (Github): an authenticated GitHub object
             repo_name (str): name of the repo to post the issue to, structured as 'org/repo_name'
             path (str): path to the file from the root of the repository
-            new_content (str): new contents of the file
+            new_content (Union[str, bytes]): new contents of the file
             branch (str): name of the branch to create the file in
             commit_message (str, optional): Defaults to "Add new file"
         """
-        if not FileEntry.exists(api_object, repo_name, path, branch):
+        remote_sha = FileEntry.get_remote_sha(api_object, repo_name, path, branch)
+        if remote_sha is None:
             print(
                 f"Warning: file does not exist, {path} was NOT replaced in {repo_name}:{branch}."
             )
             return None
+        if FileEntry.blob_sha(FileEntry.to_bytes(new_content)) == remote_sha:
+            print(f"File {path} is unchanged in {repo_name}:{branch}, skipping commit.")
+            return None
         repo = api_object.get_repo(repo_name)
-        contents = repo.get_contents(path)
         response = repo.update_file(
-            contents.path,  # type: ignore[union-attr]
+            path,
             commit_message,
             new_content,
-            contents.sha,  # type: ignore[union-attr]
+            remote_sha,
             branch,
         )
         return response["content"]  # type: ignore[return-value]
@@ -367,19 +620,279 @@ class FileEntry(Entry):
         Returns:
             bool
         """
+        return (
+            FileEntry.get_remote_sha(
+                api_object, repo_name, path, branch, include_directories=True
+            )
+            is not None
+        )
+
+    @staticmethod
+    def get_remote_sha(
+        api_object: Github,
+        repo_name: str,
+        path: str,
+        branch: str,
+        include_directories=False,
+    ) -> Union[str, None]:
+        """Return the SHA of a path in a branch.
+
+        Args:
+            api_object (Github): an authenticated GitHub object
+            repo_name (str): name of the repo to post the issue to, structured as 'org/repo_name'
+            path (str): path to the file or directory from the root of the repository
+            branch (str): branch to search in
+            include_directories (bool, optional): also match directories.
+                Defaults to False.
+
+        Returns:
+            Union[str, None]: the SHA, or None if the path does not exist
+        """
+        remote_file = FileEntry.get_remote_file(
+            api_object, repo_name, path, branch, include_directories
+        )
+        return None if remote_file is None else remote_file.sha
+
+    @staticmethod
+    def get_remote_file(
+        api_object: Github,
+        repo_name: str,
+        path: str,
+        branch: str,
+        include_directories=False,
+    ) -> Union["RemoteFile", None]:
+        """Return the SHA and size of a path in a branch.
+
+        Only the contents of the path are requested, instead of the whole tree
+        of the branch. GitHub leaves out the content of files over 1 MB.
+
+        Args:
+            api_object (Github): an authenticated GitHub object
+            repo_name (str): name of the repo to post the issue to, structured as 'org/repo_name'
+            path (str): path to the file or directory from the root of the repository
+            branch (str): branch to search in
+            include_directories (bool, optional): also match directories.
+                Defaults to False.
+
+        Returns:
+            Union[RemoteFile, None]: the SHA and size, or None if the path does not exist
+        """
         repo = api_object.get_repo(repo_name)
-        contents = repo.get_contents("", branch)
-        while contents:
-            file_content = contents.pop(0)  # type: ignore[union-attr]
-            if file_content.path == path:
-                return True
-            if file_content.type == "dir":
-                contents.extend(  # type: ignore[union-attr]
-                    repo.get_contents(
-                        file_content.path, branch  # type: ignore[arg-type]
-                    )
+        contents = FileEntry.get_remote_contents(repo, path, branch)
+        if contents is None:
+            return None
+        if isinstance(contents, list):
+            return RemoteFile("", 0) if include_directories else None
+        return RemoteFile(contents.sha, contents.size)
+
+    @staticmethod
+    def get_remote_contents(
+        repo: Repository, path: str, branch: str
+    ) -> Union[ContentFile, List[ContentFile], None]:
+        """Return the contents of a file, or the listing of a directory, in a branch.
+
+        Args:
+            repo (Repository): the repository to search in
+            path (str): path to the file or directory from the root of the repository
+            branch (str): branch to search in
+
+        Returns:
+            Union[ContentFile, List[ContentFile], None]: the contents, or None
+            if the path does not exist
+        """
+        try:
+            return repo.get_contents(path, branch)
+        except GithubException:
+            return None
+
+    @staticmethod
+    def commit_large_file(
+        api_object: Github,
+        repo_name: str,
+        path: str,
+        action: str,
+        branch: str,
+        commit_message: str,
+        content: Optional[Union[str, bytes]] = None,
+        content_path: Optional[str] = None,
+    ) -> Union[GitBlob, None]:
+        """Create, update, or replace a file through the Git blobs API.
+
+        The content is read from content_path, or from content when it is not
+        given, and base64 encoded in chunks. The blob is then committed on top
+        of the branch with a new tree and commit.
+
+        The blobs API takes the encoded content as a single JSON string, so the
+        whole encoded file, about 4/3 of its size, is held in memory while it
+        is sent. Updates decode the old content of the file into a temporary
+        file in chunks and append the new content to it before encoding.
+
+        Args:
+            api_object (Github): an authenticated GitHub object
+            repo_name (str): name of the repo to post the issue to, structured as 'org/repo_name'
+            path (str): path to the file from the root of the repository
+            action (str): "create", "update", or "replace"
+            branch (str): name of the branch to commit to
+            commit_message (str): message of the commit
+            content (Union[str, bytes], optional): content of the file.
+                Defaults to None.
+            content_path (str, optional): local file to read the content from.
+                Defaults to None.
+
+        Returns:
+            Union[GitBlob, None]: the created blob, or None if nothing was committed
+        """
+        remote_file = FileEntry.get_remote_file(api_object, repo_name, path, branch)
+        if action == "create" and remote_file is not None:
+            print(
+                f"Warning: file already exists, {path} was NOT created in {repo_name}:{branch}."
+            )
+            return None
+        if action != "create" and remote_file is None:
+            print(
+                f"Warning: file does not exist, {path} was NOT {action}d in {repo_name}:{branch}."
+            )
+            return None
+        repo = api_object.get_repo(repo_name)
+        with FileEntry.open_content(content, content_path) as stream:
+            if (
+                action == "replace"
+                and remote_file is not None
+                and remote_file.sha == FileEntry.stream_blob_sha(stream)
+            ):
+                print(
+                    f"File {path} is unchanged in {repo_name}:{branch}, skipping commit."
                 )
-        return False
+                return None
+            stream.seek(0)
+            if action == "update" and remote_file is not None:
+                with tempfile.TemporaryFile() as combined:
+                    FileEntry.decode_base64(
+                        repo.get_git_blob(remote_file.sha).content, combined
+                    )
+                    shutil.copyfileobj(stream, combined)
+                    combined.seek(0)
+                    encoded_content = "".join(FileEntry.encode_base64(combined))
+            else:
+                encoded_content = "".join(FileEntry.encode_base64(stream))
+        blob = repo.create_git_blob(encoded_content, "base64")
+        del encoded_content
+        FileEntry.commit_blob(repo, branch, path, blob, commit_message)
+        return blob
+
+    @staticmethod
+    def commit_blob(
+        repo: Repository, branch: str, path: str, blob: GitBlob, commit_message: str
+    ) -> None:
+        """Commit a blob at path on top of a branch with a new tree and commit."""
+        ref = repo.get_git_ref(f"heads/{branch}")
+        parent = repo.get_git_commit(ref.object.sha)
+        tree = repo.create_git_tree(
+            [InputGitTreeElement(path, "100644", "blob", sha=blob.sha)], parent.tree
+        )
+        commit = repo.create_git_commit(commit_message, tree, [parent])
+        ref.edit(commit.sha)
+
+    @staticmethod
+    def open_content(
+        content: Optional[Union[str, bytes]] = None, content_path: Optional[str] = None
+    ) -> BinaryIO:
+        """Open the content of a file entry as a binary stream.
+
+        Args:
+            content (Union[str, bytes], optional): inline content. Defaults to None.
+            content_path (str, optional): local file with the content, used
+                instead of content when given. Defaults to None.
+        """
+        if content_path is not None:
+            return open(content_path, "rb")
+        if content is None:
+            raise Exception("A file entry needs content or content_path")
+        return io.BytesIO(FileEntry.to_bytes(content))
+
+    @staticmethod
+    def to_bytes(content: Union[str, bytes]) -> bytes:
+        """Return the content of a file as bytes, encoding text as utf-8."""
+        if isinstance(content, bytes):
+            return content
+        return content.encode("utf-8")
+
+    @staticmethod
+    def encode_base64(
+        stream: BinaryIO, chunk_size: int = BASE64_CHUNK_SIZE
+    ) -> Iterator[str]:
+        """Base64 encode a stream in chunks without reading it at once.
+
+        Args:
+            stream (BinaryIO): the content to encode
+            chunk_size (int, optional): bytes read at a time, must be a
+                multiple of 3. Defaults to BASE64_CHUNK_SIZE.
+
+        Yields:
+            str: base64 encoded chunks that can be concatenated
+        """
+        while True:
+            chunk = stream.read(chunk_size)
+            if not chunk:
+                return
+            yield base64.b64encode(chunk).decode("ascii")
+
+    @staticmethod
+    def decode_base64(
+        encoded: str, out: BinaryIO, chunk_size: int = BASE64_CHUNK_SIZE
+    ) -> None:
+        """Base64 decode a string into a stream in chunks without decoding it at once.
+
+        Args:
+            encoded (str): base64 encoded content, line breaks are ignored
+            out (BinaryIO): stream the decoded content is written to
+            chunk_size (int, optional): characters decoded at a time.
+                Defaults to BASE64_CHUNK_SIZE.
+        """
+        remainder = ""
+        for start in range(0, len(encoded), chunk_size):
+            end = start + chunk_size
+            chunk = remainder + "".join(encoded[start:end].split())
+            # Only whole groups of 4 characters can be decoded separately
+            usable = len(chunk) - len(chunk) % 4
+            out.write(base64.b64decode(chunk[:usable]))
+            remainder = chunk[usable:]
+        out.write(base64.b64decode(remainder))
+
+    @staticmethod
+    def stream_blob_sha(stream: BinaryIO, chunk_size: int = BASE64_CHUNK_SIZE) -> str:
+        """Compute the git blob SHA of a seekable stream without reading it at once.
+
+        Args:
+            stream (BinaryIO): the content of the file
+            chunk_size (int, optional): bytes read at a time. Defaults to BASE64_CHUNK_SIZE.
+        """
+        size = stream.seek(0, io.SEEK_END)
+        stream.seek(0)
+        digest = hashlib.sha1(f"blob {size}\0".encode("ascii"))
+        for chunk in iter(lambda: stream.read(chunk_size), b""):
+            digest.update(chunk)
+        return digest.hexdigest()
+
+    @staticmethod
+    def blob_sha(content: bytes) -> str:
+        """Compute the git blob SHA of the content, the same way git hash-object does.
+
+        Args:
+            content (bytes): the content of the file
+
+        Returns:
+            str: hexadecimal SHA-1 of the blob header and the content
+        """
+        header = f"blob {len(content)}\0".encode("ascii")
+        return hashlib.sha1(header + content).hexdigest()
+
+
+class RemoteFile(NamedTuple):
+    """SHA and size in bytes of a path in a GitHub repository."""
+
+    sha: str
+    size: int
 
 
 class PullRequestEntry(Entry):
@@ -389,6 +902,18 @@ class PullRequestEntry(Entry):
     Inherits from Entry
     """
 
+    __slots__ = ("type", "action", "repo", "body", "title", "base", "head", "number")
+    CONFIG_FIELDS = (
+        "type",
+        "action",
+        "repo",
+        "title",
+        "number",
+        "body",
+        "base",
+        "head",
+    )
+
     SCHEMA = {
         "type": "object",
         "properties": {
@@ -449,18 +974,18 @@ class PullRequestEntry(Entry):
                 )
             else:
                 raise Exception(f"Unknown action {self.action} in {self}")
-            self.posted = True
-            self.gh_object = pull_request
-        except GithubException:
+            self.set_posted(pull_request)
+        except GithubException as error:
+            self.set_failed(error)
             print(
                 "Warning: a GitHub error occurred while posting a PullRequestEntry."
-                f"Entry with the following configuration was NOT posted {self.config}."
+                f"Entry with the following configuration was NOT posted {self.to_config()}."
             )
 
     @staticmethod
     def create_pull_request(
         api_object: Github, repo_name: str, title: str, body: str, base: str, head: str
-    ) -> Union[PullRequest, None]:
+    ) -> PullRequest:
         """Create a new pull request on GitHub.
 
         Args:
@@ -470,19 +995,13 @@ class PullRequestEntry(Entry):
             body (str): description of the pull request
             base (str): the name of the branch to merge into
             head (str): the name of the branch to merge from
+
+        Raises:
+            GithubException: thrown when GitHub rejects the pull request, so
+                that the entry is marked as failed
         """
-        try:
-            repo = api_object.get_repo(repo_name)
-            pull_request = repo.create_pull(
-                title=title, body=body, base=base, head=head
-            )
-        except GithubException:
-            print(
-                f"Warning: a GitHub error occurred while creating a pull request in {repo_name}."
-                f"{title} was not created"
-            )
-            return None
-        return pull_request
+        repo = api_object.get_repo(repo_name)
+        return repo.create_pull(title=title, body=body, base=base, head=head)
 
     @staticmethod
     def update_pull_request(
@@ -511,3 +1030,26 @@ class PullRequestEntry(Entry):
         pull_request = repo.get_pull(number=number)
         pull_request.create_issue_comment(body)
         return pull_request
+
+
+# Entry class for every value of the "type" key
+ENTRY_TYPES: Dict[str, Type[Entry]] = {
+    "issue": IssueEntry,
+    "pull request": PullRequestEntry,
+    "file": FileEntry,
+}
+
+
+def create_entry(config: Dict, compact: bool = False) -> Entry:
+    """Create the Entry object matching the type of the configuration.
+
+    Args:
+        config (Dict): configuration of a single entry
+        compact (bool, optional): create a compact entry. Defaults to False.
+
+    Returns:
+        Entry: an IssueEntry, PullRequestEntry, or FileEntry
+    """
+    if config.get("type") not in ENTRY_TYPES:
+        raise Exception(f"Unknown entry type {config.get('type')} in {config}")
+    return ENTRY_TYPES[config["type"]](config, compact)
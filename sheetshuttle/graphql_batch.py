@@ -0,0 +1,392 @@
+"""Post issue and pull request updates through batched GitHub GraphQL requests."""
+
+import json
+from typing import Callable, Dict, Iterable, List, Tuple, Union
+
+import requests  # type: ignore[import]
+
+from sheetshuttle import github_objects
+
+GRAPHQL_URL = "https://api.github.com/graphql"
+# Color GitHub uses for labels created without a color
+DEFAULT_LABEL_COLOR = "ededed"
+
+# Entries whose updates can be sent through GraphQL
+UpdateEntry = Union[github_objects.IssueEntry, github_objects.PullRequestEntry]
+# A lookup of a repo, its kind ("numbers" or "labels"), and its number or name
+Lookup = Tuple[str, str, Union[int, str]]
+
+
+class GraphQLError(Exception):
+    """Raised when a GraphQL request fails as a whole."""
+
+
+class GraphQLBatcher:
+    """Pack the comment and label mutations of many entries into few requests.
+
+    Node ids of the issues, pull requests, repositories, and labels are first
+    resolved with aliased bulk queries. The comments and labels are then added
+    with aliased mutations, batch_size of them per HTTP request.
+    """
+
+    def __init__(
+        self, execute: Callable[[str, Dict], Dict], batch_size: int = 50
+    ) -> None:
+        """Create a GraphQLBatcher object.
+
+        Args:
+            execute (Callable[[str, Dict], Dict]): function sending a GraphQL
+                document and its variables, returning the decoded response
+            batch_size (int, optional): number of aliased fields in a single
+                request. Defaults to 50.
+        """
+        self.execute = execute
+        self.batch_size = batch_size
+        self.request_count = 0
+
+    @classmethod
+    def from_token(cls, token: str, url: str = GRAPHQL_URL, batch_size: int = 50):
+        """Create a GraphQLBatcher that sends requests with a GitHub token.
+
+        Args:
+            token (str): GitHub access token
+            url (str, optional): GraphQL endpoint. Defaults to GRAPHQL_URL.
+            batch_size (int, optional): number of aliased fields in a single
+                request. Defaults to 50.
+        """
+        session = requests.Session()
+        session.headers["Authorization"] = f"bearer {token}"
+
+        def execute(query: str, variables: Dict) -> Dict:
+            response = session.post(
+                url, json={"query": query, "variables": variables}, timeout=60
+            )
+            response.raise_for_status()
+            return response.json()
+
+        return cls(execute, batch_size)
+
+    @classmethod
+    def from_requester(cls, requester, batch_size: int = 50, scheduler=None):
+        """Create a GraphQLBatcher that sends requests with a PyGithub requester.
+
+        Requests share the credential and connection of the REST calls of the
+        client the requester belongs to. With a scheduler, they are paced and
+        retried against the GraphQL rate limit of that credential, which
+        GitHub counts separately from the REST limit.
+
+        Args:
+            requester (Requester): requester of a Github object or of an
+                object returned by it, see rate_limit.credential_key
+            batch_size (int, optional): number of aliased fields in a single
+                request. Defaults to 50.
+            scheduler (RateLimitScheduler, optional): scheduler pacing and
+                retrying the requests. Defaults to None.
+        """
+        url = getattr(requester, "graphql_url", "/graphql")
+        limit_key = ("graphql", requester)
+
+        def send(query: str, variables: Dict) -> Tuple[Dict, Dict]:
+            return requester.requestJsonAndCheck(
+                "POST", url, input={"query": query, "variables": variables}
+            )
+
+        def execute(query: str, variables: Dict) -> Dict:
+            if scheduler is None:
+                return send(query, variables)[1]
+            headers, data = scheduler.call(
+                send,
+                query,
+                variables,
+                write=query.startswith("mutation"),
+                limit_key=limit_key,
+            )
+            scheduler.update_from_headers(headers, limit_key)
+            return data
+
+        return cls(execute, batch_size)
+
+    def post_updates(self, entries: Iterable[github_objects.Entry]) -> None:
+        """Add the comments and labels of update entries to GitHub.
+
+        Entries of missing issues and pull requests are marked as skipped, and
+        entries whose comment or labels were not added are marked as failed.
+
+        Args:
+            entries (Iterable[Entry]): IssueEntry and PullRequestEntry objects
+                with the "update" action
+        """
+        updates: List[UpdateEntry] = []
+        for entry in entries:
+            if (
+                not isinstance(
+                    entry, (github_objects.IssueEntry, github_objects.PullRequestEntry)
+                )
+                or entry.action != "update"
+            ):
+                raise Exception(
+                    f"GraphQL mode only supports update entries, got {entry}"
+                )
+            updates.append(entry)
+        subject_ids, repo_ids, label_ids = self.resolve_ids(updates)
+        self.create_missing_labels(updates, repo_ids, label_ids)
+        postable = []
+        for entry in updates:
+            if (entry.repo, entry.number) in subject_ids:
+                postable.append(entry)
+                continue
+            kind = "issue" if entry.type == "issue" else "PR"
+            print(
+                f"Warning: {kind} #{entry.number} in {entry.repo} does not exist, update skipped"
+            )
+            entry.set_posted(None)
+        for batch in self._batches(postable):
+            self._post_batch(batch, subject_ids, label_ids)
+
+    # pylint: disable=R0914
+    def resolve_ids(
+        self, entries: List[UpdateEntry]
+    ) -> Tuple[Dict[Tuple[str, int], str], Dict[str, str], Dict[Tuple[str, str], str]]:
+        """Resolve the node ids needed by the entries with bulk queries.
+
+        Args:
+            entries (List[Entry]): update entries
+
+        Returns:
+            Tuple of dictionaries: (repo, number) to subject id, repo to
+            repository id, and (repo, label name) to label id. Missing objects
+            are left out.
+        """
+        targets: Dict[str, Dict[str, set]] = {}
+        for entry in entries:
+            target = targets.setdefault(entry.repo, {"numbers": set(), "labels": set()})
+            target["numbers"].add(entry.number)
+            target["labels"].update(getattr(entry, "labels", None) or [])
+        # Flatten into (repo, kind, value) lookups and query them in batches
+        lookups: List[Lookup] = [
+            (repo, kind, value)
+            for repo, target in targets.items()
+            for kind in ("numbers", "labels")
+            for value in sorted(target[kind])
+        ]
+        subject_ids: Dict[Tuple[str, int], str] = {}
+        repo_ids: Dict[str, str] = {}
+        label_ids: Dict[Tuple[str, str], str] = {}
+        for batch in self._batches(lookups):
+            query, aliases = GraphQLBatcher.build_resolve_query(batch)
+            data = self._execute(query, {})
+            for repo_alias, (repo, fields) in aliases.items():
+                repository = data.get(repo_alias)
+                if not repository:
+                    continue
+                repo_ids[repo] = repository["id"]
+                for field_alias, (kind, value) in fields.items():
+                    node = repository.get(field_alias)
+                    if not node:
+                        continue
+                    if kind == "numbers":
+                        subject_ids[(repo, int(value))] = node["id"]
+                    else:
+                        label_ids[(repo, str(value))] = node["id"]
+        return subject_ids, repo_ids, label_ids
+
+    def create_missing_labels(
+        self,
+        entries: List[UpdateEntry],
+        repo_ids: Dict[str, str],
+        label_ids: Dict[Tuple[str, str], str],
+    ) -> None:
+        """Create labels that do not exist yet, like the REST API does.
+
+        Args:
+            entries (List[Entry]): update entries
+            repo_ids (Dict[str, str]): repository node ids
+            label_ids (Dict[Tuple[str, str], str]): label node ids, updated
+                with the created labels
+        """
+        missing = sorted(
+            {
+                (entry.repo, label)
+                for entry in entries
+                for label in getattr(entry, "labels", None) or []
+                if (entry.repo, label) not in label_ids and entry.repo in repo_ids
+            }
+        )
+        for batch in self._batches(missing):
+            fields = []
+            variables = {}
+            for index, (repo, label) in enumerate(batch):
+                fields.append(
+                    f"c{index}: createLabel(input: {{repositoryId: $r{index}, "
+                    f"name: $n{index}, color: {json.dumps(DEFAULT_LABEL_COLOR)}}})"
+                    " { label { id } }"
+                )
+                variables[f"r{index}"] = repo_ids[repo]
+                variables[f"n{index}"] = label
+            declarations = ", ".join(
+                f"$r{index}: ID!, $n{index}: String!" for index in range(len(batch))
+            )
+            data = self._execute(
+                f"mutation({declarations}) {{ {' '.join(fields)} }}", variables
+            )
+            for index, key in enumerate(batch):
+                created = data.get(f"c{index}")
+                if created:
+                    label_ids[key] = created["label"]["id"]
+
+    @staticmethod
+    def build_resolve_query(
+        lookups: List[Lookup],
+    ) -> Tuple[str, Dict[str, Tuple[str, Dict[str, Tuple[str, Union[int, str]]]]]]:
+        """Build an aliased query resolving issue, pull request, and label ids.
+
+        Args:
+            lookups (List[Tuple[str, str, Union[int, str]]]): (repo, kind,
+                value) where kind is "numbers" or "labels"
+
+        Returns:
+            Tuple: the query and a mapping of repository aliases to the repo
+            name and the lookup behind every field alias
+        """
+        aliases: Dict[str, Tuple[str, Dict[str, Tuple[str, Union[int, str]]]]] = {}
+        repo_aliases: Dict[str, str] = {}
+        for repo, kind, value in lookups:
+            if repo not in repo_aliases:
+                repo_aliases[repo] = f"r{len(repo_aliases)}"
+                aliases[repo_aliases[repo]] = (repo, {})
+            fields = aliases[repo_aliases[repo]][1]
+            fields[f"f{len(fields)}"] = (kind, value)
+        blocks = []
+        for repo_alias, (repo, fields) in aliases.items():
+            owner, name = repo.split("/", 1)
+            field_queries = []
+            for field_alias, (kind, value) in fields.items():
+                if kind == "numbers":
+                    number = int(value)
+                    field_queries.append(
+                        f"{field_alias}: issueOrPullRequest(number: {number}) "
+                        "{ ... on Issue { id } ... on PullRequest { id } }"
+                    )
+                else:
+                    field_queries.append(
+                        f"{field_alias}: label(name: {json.dumps(value)}) {{ id }}"
+                    )
+            blocks.append(
+                f"{repo_alias}: repository(owner: {json.dumps(owner)}, "
+                f"name: {json.dumps(name)}) {{ id {' '.join(field_queries)} }}"
+            )
+        return f"query {{ {' '.join(blocks)} }}", aliases
+
+    def _post_batch(
+        self,
+        batch: List[UpdateEntry],
+        subject_ids: Dict[Tuple[str, int], str],
+        label_ids: Dict[Tuple[str, str], str],
+    ) -> None:
+        """Send the comment and label mutations of a batch of entries."""
+        fields = []
+        declarations = []
+        variables: Dict[str, object] = {}
+        for index, entry in enumerate(batch):
+            subject_id = subject_ids[(entry.repo, entry.number)]
+            variables[f"s{index}"] = subject_id
+            variables[f"b{index}"] = entry.body
+            declarations.append(f"$s{index}: ID!, $b{index}: String!")
+            fields.append(
+                f"m{index}: addComment(input: {{subjectId: $s{index}, body: $b{index}}})"
+                " { clientMutationId }"
+            )
+            labels = [
+                label_ids[(entry.repo, label)]
+                for label in getattr(entry, "labels", None) or []
+                if (entry.repo, label) in label_ids
+            ]
+            if labels:
+                variables[f"l{index}"] = labels
+                declarations.append(f"$l{index}: [ID!]!")
+                fields.append(
+                    f"a{index}: addLabelsToLabelable(input: "
+                    f"{{labelableId: $s{index}, labelIds: $l{index}}}) {{ clientMutationId }}"
+                )
+        response = self.execute(
+            f"mutation({', '.join(declarations)}) {{ {' '.join(fields)} }}", variables
+        )
+        self.request_count += 1
+        errors = {
+            error["path"][0]: error.get("message")
+            for error in response.get("errors") or []
+            if error.get("path")
+        }
+        data = response.get("data") or {}
+        for index, entry in enumerate(batch):
+            error = GraphQLBatcher.batch_error(entry, index, errors, data, label_ids)
+            if error is not None:
+                entry.set_failed(error)
+                print(
+                    f"Warning: a GitHub error occurred while posting a {type(entry).__name__}."
+                    f"Entry with the following configuration was NOT posted {entry.to_config()}."
+                )
+                continue
+            entry.set_posted(
+                {
+                    "id": subject_ids[(entry.repo, entry.number)],
+                    "node_id": subject_ids[(entry.repo, entry.number)],
+                    "number": entry.number,
+                }
+            )
+
+    @staticmethod
+    def batch_error(
+        entry: UpdateEntry,
+        index: int,
+        errors: Dict[str, str],
+        data: Dict,
+        label_ids: Dict[Tuple[str, str], str],
+    ) -> Union[str, None]:
+        """Return why the mutations of an entry failed, None when they succeeded.
+
+        Args:
+            entry (UpdateEntry): the entry at index in the batch
+            index (int): position of the entry in the batch
+            errors (Dict[str, str]): error messages by field alias
+            data (Dict): data of the mutation response
+            label_ids (Dict[Tuple[str, str], str]): label node ids
+        """
+        if f"m{index}" in errors or data.get(f"m{index}") is None:
+            return errors.get(f"m{index}") or "comment was not added"
+        if f"a{index}" in errors:
+            return errors[f"a{index}"] or "labels were not added"
+        missing = [
+            label
+            for label in getattr(entry, "labels", None) or []
+            if (entry.repo, label) not in label_ids
+        ]
+        if missing:
+            return f"labels {missing} could not be created"
+        return None
+
+    def _execute(self, query: str, variables: Dict) -> Dict:
+        """Send a request where any error means the whole request failed."""
+        response = self.execute(query, variables)
+        self.request_count += 1
+        if response.get("data") is None:
+            raise GraphQLError(f"GraphQL request failed: {response.get('errors')}")
+        return response["data"]
+
+    def _batches(self, items: List) -> Iterable[List]:
+        """Split items into lists of batch_size."""
+        for start in range(0, len(items), self.batch_size):
+            end = start + self.batch_size
+            yield items[start:end]
+
+
+def is_graphql_postable(entry: github_objects.Entry) -> bool:
+    """Check if an entry can be posted in GraphQL mode.
+
+    Args:
+        entry (Entry): the entry to check
+    """
+    return (
+        isinstance(entry, (github_objects.IssueEntry, github_objects.PullRequestEntry))
+        and entry.action == "update"
+    )
@@ -0,0 +1,284 @@
+"""Cache GitHub GET responses on disk and revalidate them with conditional requests.
+
+GitHub does not count 304 Not Modified responses against the rate limit, so
+repeated reads of the same repositories, issue lists, and contents only cost
+requests when the data actually changed.
+
+Responses are stored as they were received, without encryption, including the
+bodies of requests made with a token. The cache directory is only readable by
+its owner, and should be kept out of shared or synced locations.
+"""
+
+import base64
+import hashlib
+import json
+import os
+import pathlib
+import tempfile
+import threading
+from typing import Dict, List, Optional, Tuple
+
+import requests  # type: ignore[import]
+from github import Github, Requester
+from requests.structures import CaseInsensitiveDict  # type: ignore[import]
+
+# Headers of a 304 response that replace the cached ones
+REFRESHED_HEADERS = (
+    "Date",
+    "ETag",
+    "Last-Modified",
+    "X-RateLimit-Limit",
+    "X-RateLimit-Remaining",
+    "X-RateLimit-Reset",
+    "X-RateLimit-Used",
+)
+# Headers describing the encoding on the wire, not the stored body
+TRANSPORT_HEADERS = ("content-encoding", "content-length", "transfer-encoding")
+# Caches attached to a client since their statistics were last reported
+_ATTACHED: List["ResponseCache"] = []
+_ATTACHED_LOCK = threading.Lock()
+
+
+class CacheStats:
+    """Count the outcome of the requests that went through the cache."""
+
+    def __init__(self) -> None:
+        """Create a CacheStats object with all counters at zero."""
+        self.hits = 0
+        self.misses = 0
+        self.stores = 0
+        self.uncached = 0
+        self._lock = threading.Lock()
+
+    def increment(self, counter: str) -> None:
+        """Add one to a counter.
+
+        Args:
+            counter (str): name of the counter, "hits", "misses", "stores",
+                or "uncached"
+        """
+        with self._lock:
+            setattr(self, counter, getattr(self, counter) + 1)
+
+    @property
+    def hit_ratio(self) -> float:
+        """Return the fraction of cacheable requests answered with 304."""
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+    def report(self) -> Dict[str, float]:
+        """Return the statistics as a dictionary."""
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "stores": self.stores,
+            "uncached": self.uncached,
+            "hit_ratio": self.hit_ratio,
+        }
+
+
+class ResponseCache:
+    """Store responses with their validators as JSON files in a directory."""
+
+    def __init__(self, directory: str = ".sheetshuttle_cache/github") -> None:
+        """Create a ResponseCache object, creating the directory if needed.
+
+        The directory is created readable by its owner only, since the stored
+        responses are not encrypted.
+
+        Args:
+            directory (str, optional): where the responses are stored.
+                Defaults to ".sheetshuttle_cache/github".
+        """
+        self.directory = pathlib.Path(directory)
+        self.directory.mkdir(mode=0o700, parents=True, exist_ok=True)
+        self.stats = CacheStats()
+        self.connection_classes = connection_classes(self)
+
+    @staticmethod
+    def request_key(request: requests.PreparedRequest) -> str:
+        """Return the cache key of a request.
+
+        The Authorization header is part of the key so that responses are never
+        shared between different identities.
+        """
+        identity = request.headers.get("Authorization", "")
+        accept = request.headers.get("Accept", "")
+        raw_key = f"{request.method} {request.url} {accept} {identity}"
+        return hashlib.sha256(raw_key.encode("utf-8")).hexdigest()
+
+    def load(self, key: str) -> Optional[Dict]:
+        """Return the cached response stored under key, or None."""
+        try:
+            with open(self.directory / f"{key}.json", "r", encoding="utf-8") as infile:
+                return json.load(infile)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return None
+
+    def store(self, key: str, response: requests.Response) -> None:
+        """Store a response that has an ETag or Last-Modified validator."""
+        cached = {
+            "url": response.url,
+            "status": response.status_code,
+            "headers": {
+                name: value
+                for name, value in response.headers.items()
+                if name.lower() not in TRANSPORT_HEADERS
+            },
+            "body": base64.b64encode(response.content).decode("ascii"),
+        }
+        # Write to a temporary file first so readers never see partial files
+        descriptor, temporary_path = tempfile.mkstemp(dir=self.directory)
+        with os.fdopen(descriptor, "w", encoding="utf-8") as outfile:
+            json.dump(cached, outfile)
+        os.replace(temporary_path, self.directory / f"{key}.json")
+        self.stats.increment("stores")
+
+    def clear(self) -> None:
+        """Delete every cached response."""
+        for cached_file in self.directory.glob("*.json"):
+            cached_file.unlink()
+
+
+class ConditionalCacheAdapter(requests.adapters.HTTPAdapter):
+    """HTTPAdapter that revalidates cached GET responses with ETag and Last-Modified."""
+
+    def __init__(self, cache: ResponseCache, **kwargs) -> None:
+        """Create a ConditionalCacheAdapter object.
+
+        Args:
+            cache (ResponseCache): where responses are stored
+            kwargs: arguments of requests.adapters.HTTPAdapter
+        """
+        super().__init__(**kwargs)
+        self.cache = cache
+
+    # pylint: disable=R0913
+    def send(
+        self, request, stream=False, timeout=None, verify=True, cert=None, proxies=None
+    ):
+        """Send a request, answering from the cache when GitHub replies 304."""
+        if request.method != "GET":
+            self.cache.stats.increment("uncached")
+            return super().send(request, stream, timeout, verify, cert, proxies)
+        key = ResponseCache.request_key(request)
+        cached = self.cache.load(key)
+        if cached:
+            if "ETag" in cached["headers"]:
+                request.headers["If-None-Match"] = cached["headers"]["ETag"]
+            if "Last-Modified" in cached["headers"]:
+                request.headers["If-Modified-Since"] = cached["headers"][
+                    "Last-Modified"
+                ]
+        response = super().send(request, stream, timeout, verify, cert, proxies)
+        if response.status_code == 304 and cached:
+            self.cache.stats.increment("hits")
+            return ConditionalCacheAdapter.cached_response(cached, response, request)
+        self.cache.stats.increment("misses")
+        if response.status_code == 200 and (
+            "ETag" in response.headers or "Last-Modified" in response.headers
+        ):
+            self.cache.store(key, response)
+        return response
+
+    @staticmethod
+    def cached_response(
+        cached: Dict, not_modified: requests.Response, request
+    ) -> requests.Response:
+        """Build a full response from the cache and the headers of a 304 response."""
+        response = requests.Response()
+        response.status_code = cached["status"]
+        response.reason = "OK"
+        response.headers = CaseInsensitiveDict(cached["headers"])
+        for header in REFRESHED_HEADERS:
+            if header in not_modified.headers:
+                response.headers[header] = not_modified.headers[header]
+        # pylint: disable=W0212
+        response._content = base64.b64decode(cached["body"])
+        response.url = cached["url"]
+        response.request = request
+        response.connection = not_modified.connection
+        return response
+
+
+def connection_classes(cache: ResponseCache) -> Tuple[type, type]:
+    """Return PyGithub HTTP and HTTPS connection classes sending requests through a cache.
+
+    Args:
+        cache (ResponseCache): where responses are stored
+    """
+
+    def mount_cache(connection, prefix):
+        pool_size = getattr(connection, "pool_size", requests.adapters.DEFAULT_POOLSIZE)
+        connection.adapter = ConditionalCacheAdapter(
+            cache,
+            max_retries=connection.retry,
+            pool_connections=pool_size,
+            pool_maxsize=pool_size,
+        )
+        connection.session.mount(prefix, connection.adapter)
+
+    class CachingHTTPConnection(Requester.HTTPRequestsConnectionClass):
+        """PyGithub HTTP connection using a ConditionalCacheAdapter."""
+
+        def __init__(self, *args, **kwargs):
+            super().__init__(*args, **kwargs)
+            mount_cache(self, "http://")
+
+    class CachingHTTPSConnection(Requester.HTTPSRequestsConnectionClass):
+        """PyGithub HTTPS connection using a ConditionalCacheAdapter."""
+
+        def __init__(self, *args, **kwargs):
+            super().__init__(*args, **kwargs)
+            mount_cache(self, "https://")
+
+    return CachingHTTPConnection, CachingHTTPSConnection
+
+
+# pylint: disable=W0212
+def attach_cache(api: Github, cache: ResponseCache) -> Github:
+    """Send the requests of a PyGithub client through a cache.
+
+    Only the given client, and the objects it returns, use the cache. Other
+    clients, created before or after, keep their own connections.
+
+    Args:
+        api (Github): the PyGithub client
+        cache (ResponseCache): where responses are stored
+
+    Returns:
+        Github: the client
+    """
+    requester = api._Github__requester  # type: ignore[attr-defined]
+    http_class, https_class = cache.connection_classes
+    # The classes PyGithub reads from its Requester class are set on the instance
+    requester._Requester__httpConnectionClass = http_class
+    requester._Requester__httpsConnectionClass = https_class
+    requester._Requester__connectionClass = (
+        https_class if requester._Requester__scheme == "https" else http_class
+    )
+    # A connection opened before is dropped so the next requests use the cache
+    if requester._Requester__connection is not None:
+        requester._Requester__connection.close()
+        requester._Requester__connection = None
+    with _ATTACHED_LOCK:
+        if cache not in _ATTACHED:
+            _ATTACHED.append(cache)
+    return api
+
+
+def report_stats() -> List[ResponseCache]:
+    """Print the hits and misses of the caches attached since the last report.
+
+    Returns:
+        List[ResponseCache]: the caches that were reported
+    """
+    with _ATTACHED_LOCK:
+        caches = list(_ATTACHED)
+        _ATTACHED.clear()
+    for cache in caches:
+        print(
+            f"GitHub cache {cache.directory}: {cache.stats.hits} hits, "
+            f"{cache.stats.misses} misses ({cache.stats.hit_ratio:.0%} hit ratio)"
+        )
+    return caches
@@ -0,0 +1,392 @@
+"""Run plugins in worker processes and share the collected regions through shared memory.
+
+Plugins run in the CLI process are limited to one core by the GIL. In isolated
+mode every plugin runs in a worker process instead. The data of the collected
+regions is written once to a single multiprocessing.shared_memory block, and
+workers rebuild the regions from it: numeric, boolean, and datetime columns are
+NumPy arrays viewing the block without any copy, text columns are stored as
+UTF-8 bytes with offsets, categorical columns as their codes, and other columns
+are pickled into the block. Only a small description of the block is sent to
+the workers, so the workbook is never pickled for every plugin.
+
+Text columns are not shared without copies: pandas keeps text as Python
+string objects, so every worker decodes the text columns it rebuilds into its
+own strings. Workbooks with large text columns take that much memory in every
+worker, converting repeated text to categorical columns avoids it.
+
+Regions rebuilt in a worker are read-only, as the sheets shared with --shared
+are, data frames must be copied before being modified in place.
+"""
+
+import multiprocessing
+import os
+import pickle
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+from types import MappingProxyType
+from typing import Any, Dict, List, NamedTuple, Optional, Tuple
+
+import numpy as np
+import pandas as pd  # type: ignore[import]
+
+from sheetshuttle import daemon, http_cache, plugin_runner, sheet_collector
+
+# Offsets of the buffers in the shared memory block are multiples of this
+ALIGNMENT = 64
+# Kinds of NumPy arrays stored as they are, booleans, integers, floats, and dates
+BUFFER_KINDS = "biufcmM"
+
+# Nullable arrays stored as a values and a mask array
+MASKED_ARRAYS = (
+    pd.arrays.BooleanArray,
+    pd.arrays.IntegerArray,
+    pd.arrays.FloatingArray,
+)
+
+# State of a worker process, set once by init_worker
+_WORKER_STATE: Dict[str, Any] = {}
+
+
+class BufferLayout(NamedTuple):
+    """Position of an array in the shared memory block."""
+
+    offset: int
+    dtype: str
+    length: int
+
+
+class SharedSheets:
+    """Write the regions of collected sheets to a shared memory block.
+
+    The block is created when the object is created and removed by close, or
+    when leaving a with statement.
+    """
+
+    def __init__(self, sheets_data) -> None:
+        """Create a SharedSheets object and copy the region data to shared memory.
+
+        Args:
+            sheets_data (Dict[str, Sheet]): sheets collected by a SheetCollector
+        """
+        self.arrays: List[np.ndarray] = []
+        self.size = 0
+        sheets = {}
+        for sheet_name, sheet in sheets_data.items():
+            tabs = {}
+            for tab_name, regions in sheet.tabs.items():
+                tabs[tab_name] = {
+                    region_name: self.describe_region(region)
+                    for region_name, region in regions.items()
+                }
+            sheets[sheet_name] = {"config": sheet.config, "tabs": tabs}
+        self.memory = shared_memory.SharedMemory(create=True, size=max(self.size, 1))
+        offset = 0
+        for array in self.arrays:
+            offset = align(offset)
+            target = np.ndarray(
+                array.shape, array.dtype, buffer=self.memory.buf, offset=offset
+            )
+            target[...] = array
+            offset += array.nbytes
+            # Views of the block must be released before it can be closed
+            del target
+        self.arrays = []
+        # Sent to the workers instead of the data
+        self.description = {"name": self.memory.name, "sheets": sheets}
+
+    def __enter__(self) -> "SharedSheets":
+        """Return the object itself."""
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        """Remove the shared memory block."""
+        self.close()
+
+    def close(self) -> None:
+        """Close and remove the shared memory block."""
+        self.memory.close()
+        self.memory.unlink()
+
+    def add_array(self, array: np.ndarray) -> BufferLayout:
+        """Reserve space for an array in the block and return its layout."""
+        array = np.ascontiguousarray(array)
+        offset = align(self.size)
+        self.arrays.append(array)
+        self.size = offset + array.nbytes
+        return BufferLayout(offset, array.dtype.str, len(array))
+
+    def add_bytes(self, data: bytes) -> BufferLayout:
+        """Reserve space for bytes in the block and return their layout."""
+        return self.add_array(np.frombuffer(data, dtype=np.uint8))
+
+    def describe_region(self, region) -> Dict[str, Any]:
+        """Add the data of a region to the block and return its description."""
+        data: pd.DataFrame = region.data
+        if isinstance(data.index, pd.RangeIndex):
+            index: Tuple = (
+                "range",
+                data.index.start,
+                data.index.stop,
+                data.index.step,
+                data.index.name,
+            )
+        else:
+            index = ("pickle", self.add_bytes(pickle.dumps(data.index)))
+        return {
+            "region_name": region.region_name,
+            "parent_sheet_name": region.parent_sheet_name,
+            "start_range": region.start_range,
+            "end_range": region.end_range,
+            "key": region.key,
+            "index": index,
+            "columns": [
+                self.describe_column(label, data.iloc[:, position])
+                for position, label in enumerate(data.columns)
+            ],
+        }
+
+    def describe_column(self, label, values: pd.Series) -> Dict[str, Any]:
+        """Add the data of a column to the block and return its description."""
+        dtype = values.dtype
+        column: Dict[str, Any] = {"label": label, "dtype": dtype}
+        if isinstance(dtype, np.dtype) and dtype.kind in BUFFER_KINDS:
+            column["kind"] = "array"
+            column["values"] = self.add_array(values.to_numpy())
+            return column
+        if isinstance(values.array, MASKED_ARRAYS):
+            missing = values.isna().to_numpy()
+            column["kind"] = "masked"
+            column["values"] = self.add_array(
+                values.to_numpy(dtype=dtype.numpy_dtype, na_value=0)
+            )
+            column["mask"] = self.add_array(missing)
+            return column
+        if isinstance(dtype, pd.CategoricalDtype):
+            # The categories are sent with the dtype, only the codes are shared
+            column["kind"] = "categorical"
+            column["values"] = self.add_array(values.cat.codes.to_numpy())
+            return column
+        strings = values.to_numpy(dtype=object)
+        missing = pd.isna(strings)
+        present = strings[~missing]
+        if isinstance(dtype, pd.StringDtype) or all(
+            isinstance(value, str) for value in present
+        ):
+            encoded = [value.encode("utf-8") for value in present]
+            offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+            np.cumsum([len(value) for value in encoded], out=offsets[1:])
+            column["kind"] = "strings"
+            column["values"] = self.add_bytes(b"".join(encoded))
+            column["offsets"] = self.add_array(offsets)
+            column["mask"] = self.add_array(missing)
+            return column
+        column["kind"] = "pickle"
+        column["values"] = self.add_bytes(pickle.dumps(values.array))
+        return column
+
+
+def align(offset: int) -> int:
+    """Return the first multiple of ALIGNMENT from an offset."""
+    return -(-offset // ALIGNMENT) * ALIGNMENT
+
+
+def read_array(memory: shared_memory.SharedMemory, layout: BufferLayout) -> np.ndarray:
+    """Return a read-only array viewing a buffer of the block, without copying it."""
+    array: np.ndarray = np.ndarray(
+        (layout.length,),
+        np.dtype(layout.dtype),
+        buffer=memory.buf,
+        offset=layout.offset,
+    )
+    array.flags.writeable = False
+    return array
+
+
+# pylint: disable=R0911
+def read_column(memory: shared_memory.SharedMemory, column: Dict[str, Any]):
+    """Return the values of a column from its description."""
+    kind = column["kind"]
+    if kind == "array":
+        return read_array(memory, column["values"])
+    if kind == "masked":
+        values = read_array(memory, column["values"])
+        mask = read_array(memory, column["mask"])
+        if values.dtype.kind == "b":
+            return pd.arrays.BooleanArray(values, mask, copy=False)
+        if values.dtype.kind == "f":
+            return pd.arrays.FloatingArray(values, mask, copy=False)
+        return pd.arrays.IntegerArray(values, mask, copy=False)
+    if kind == "categorical":
+        codes = read_array(memory, column["values"])
+        return pd.Categorical.from_codes(codes, dtype=column["dtype"])
+    if kind == "strings":
+        # The text is decoded into strings owned by this process
+        raw = read_array(memory, column["values"]).tobytes()
+        offsets = read_array(memory, column["offsets"]).tolist()
+        mask = read_array(memory, column["mask"])
+        text = raw.decode("utf-8")
+        if len(text) == len(raw):
+            # Byte offsets are character offsets in ASCII text
+            present = [text[start:end] for start, end in zip(offsets, offsets[1:])]
+        else:
+            present = [
+                raw[start:end].decode("utf-8")
+                for start, end in zip(offsets, offsets[1:])
+            ]
+        strings = np.full(len(mask), None, dtype=object)
+        strings[~mask] = present
+        return pd.array(strings, dtype=column["dtype"])
+    return pickle.loads(read_array(memory, column["values"]).tobytes())
+
+
+def read_region(memory: shared_memory.SharedMemory, region: Dict[str, Any]):
+    """Return a Region rebuilt from its description."""
+    if region["index"][0] == "range":
+        _, start, stop, step, name = region["index"]
+        index = pd.RangeIndex(start, stop, step, name=name)
+    else:
+        index = pickle.loads(read_array(memory, region["index"][1]).tobytes())
+    columns = [read_column(memory, column) for column in region["columns"]]
+    data = pd.DataFrame(dict(enumerate(columns)), index=index, copy=False)
+    data.columns = pd.Index([column["label"] for column in region["columns"]])
+    return sheet_collector.Region(
+        region["region_name"],
+        region["parent_sheet_name"],
+        region["start_range"],
+        region["end_range"],
+        data,
+        key=region["key"],
+    )
+
+
+def read_sheets(memory: shared_memory.SharedMemory, description: Dict[str, Any]):
+    """Return the sheets described by SharedSheets.description.
+
+    Args:
+        memory (SharedMemory): the attached shared memory block
+        description (Dict[str, Any]): the description of the block
+
+    Returns:
+        Dict[str, Sheet]: the sheets, keyed as in the collected sheets data
+    """
+    sheets_data = {}
+    for sheet_name, sheet_description in description["sheets"].items():
+        sheet = sheet_collector.Sheet(sheet_description["config"], None)
+        for tab_name, regions in sheet_description["tabs"].items():
+            sheet.tabs[tab_name] = {
+                region_name: read_region(memory, region)
+                for region_name, region in regions.items()
+            }
+        sheets_data[sheet_name] = sheet
+    return sheets_data
+
+
+def init_worker(
+    description: Optional[Dict[str, Any]],
+    gh_keys_file: Optional[str],
+    pool_keys_file: Optional[str] = None,
+):
+    """Attach the shared sheets and authenticate GitHub once per worker process.
+
+    Args:
+        description (Dict[str, Any], optional): description of the shared
+            sheets, None when the sheets are not shared
+        gh_keys_file (str, optional): path to the GitHub token, None when
+            GitHub is not shared
+        pool_keys_file (str, optional): path to the GitHub credentials of the
+            credential pool, None when no pool is shared. Defaults to None.
+    """
+    if description is not None:
+        memory = shared_memory.SharedMemory(name=description["name"])
+        _WORKER_STATE["memory"] = memory
+        _WORKER_STATE["sheets_data"] = MappingProxyType(
+            read_sheets(memory, description)
+        )
+    if gh_keys_file is not None:
+        _WORKER_STATE["github_api"] = daemon.Daemon.authenticate_github(gh_keys_file)
+    if pool_keys_file is not None:
+        _WORKER_STATE["credential_pool"] = daemon.Daemon.create_credential_pool(
+            pool_keys_file
+        )
+
+
+def run_in_worker(directory: str, name: str, args: tuple, kwargs: Dict[str, Any]):
+    """Load a plugin in the worker process and call its run function."""
+    plugin_source, my_plugin = plugin_runner.load_plugin(directory, name)
+    _WORKER_STATE.setdefault("plugin_sources", []).append(plugin_source)
+    shared = {
+        key: value
+        for key, value in _WORKER_STATE.items()
+        if key in ("sheets_data", "github_api", "credential_pool")
+    }
+    try:
+        my_plugin.run(*args, **{**kwargs, **shared})
+    finally:
+        # Caches used in the worker are not seen by the main process
+        http_cache.report_stats()
+
+
+def run_plugins(
+    plugins: Dict[str, Any],
+    args: tuple,
+    kwargs: Dict[str, Any],
+    concurrency: int = 1,
+    gh_keys_file: str = ".env",
+):
+    """Run every plugin in a worker process.
+
+    Sheets given as "sheets_data" are written to shared memory once and read
+    by every worker. Workers authenticate GitHub themselves with gh_keys_file
+    when a "github_api" is given, and create their own pool from it when a
+    "credential_pool" is given, since API clients cannot be sent to other
+    processes. Every plugin runs even when another one fails, the first error
+    is raised once they all finished.
+
+    Args:
+        plugins (Dict[str, Any]): the plugin modules by name
+        args (tuple): positional arguments of the run functions
+        kwargs (Dict[str, Any]): keyword arguments of the run functions
+        concurrency (int, optional): number of worker processes. Defaults to 1.
+        gh_keys_file (str, optional): path to the GitHub token.
+            Defaults to ".env".
+    """
+    kwargs = dict(kwargs)
+    sheets_data = kwargs.pop("sheets_data", None)
+    shared_gh_keys = gh_keys_file if kwargs.pop("github_api", None) else None
+    pool_gh_keys = gh_keys_file if kwargs.pop("credential_pool", None) else None
+    shared_sheets = SharedSheets(sheets_data) if sheets_data is not None else None
+    errors = []
+    try:
+        # Workers are spawned so that they start the same way on every platform
+        with ProcessPoolExecutor(
+            max_workers=max(1, min(concurrency, len(plugins))),
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=init_worker,
+            initargs=(
+                shared_sheets.description if shared_sheets else None,
+                shared_gh_keys,
+                pool_gh_keys,
+            ),
+        ) as executor:
+            futures = {
+                name: executor.submit(
+                    run_in_worker,
+                    os.path.dirname(plugin.__file__),
+                    name,
+                    args,
+                    kwargs,
+                )
+                for name, plugin in plugins.items()
+            }
+            for name, future in futures.items():
+                # pylint: disable=W0703
+                try:
+                    future.result()
+                except Exception as error:
+                    print(f"ERROR: plugin {name} failed: {error}")
+                    errors.append(error)
+    finally:
+        if shared_sheets is not None:
+            shared_sheets.close()
+    if errors:
+        raise errors[0]
@@ -0,0 +1,125 @@
+"""Keep a durable record of posted entries so that reruns skip completed work."""
+
+import sqlite3
+import threading
+from datetime import datetime, timezone
+from typing import Dict, NamedTuple, Optional
+
+from sheetshuttle import github_objects
+
+LEDGER_SCHEMA = """
+CREATE TABLE IF NOT EXISTS posted_entries (
+    entry_key TEXT PRIMARY KEY,
+    entry_type TEXT NOT NULL,
+    action TEXT NOT NULL,
+    repo TEXT NOT NULL,
+    number INTEGER,
+    object_id TEXT,
+    url TEXT,
+    posted_at TEXT NOT NULL
+)
+"""
+
+
+class LedgerRecord(NamedTuple):
+    """Information stored about a posted entry."""
+
+    entry_key: str
+    entry_type: str
+    action: str
+    repo: str
+    number: Optional[int]
+    object_id: Optional[str]
+    url: Optional[str]
+    posted_at: str
+
+
+class PostingLedger:
+    """Store posted entries in a SQLite database keyed by a hash of their config."""
+
+    def __init__(self, path: str = "sheetshuttle_ledger.db") -> None:
+        """Open or create the ledger database.
+
+        Args:
+            path (str, optional): path to the SQLite database file.
+                Defaults to "sheetshuttle_ledger.db".
+        """
+        self.path = path
+        self._lock = threading.Lock()
+        self.connection = sqlite3.connect(path, check_same_thread=False)
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute(LEDGER_SCHEMA)
+        self.connection.commit()
+
+    def contains(self, entry) -> bool:
+        """Check if an entry with the same configuration was already posted.
+
+        Args:
+            entry (Entry): the entry to look up
+        """
+        return self.get(entry) is not None
+
+    def get(self, entry) -> Optional[LedgerRecord]:
+        """Return the ledger record of an entry, or None if it was never posted.
+
+        Args:
+            entry (Entry): the entry to look up
+        """
+        with self._lock:
+            row = self.connection.execute(
+                "SELECT * FROM posted_entries WHERE entry_key = ?",
+                (entry.config_key,),
+            ).fetchone()
+        if row is None:
+            return None
+        return LedgerRecord(*row)
+
+    def record(self, entry) -> LedgerRecord:
+        """Store a posted entry and the GitHub object created for it.
+
+        Args:
+            entry (Entry): an entry that was posted successfully
+        """
+        result = entry.result
+        if result is None:
+            result = github_objects.PostResult.from_object(entry.gh_object)
+        ledger_record = LedgerRecord(
+            entry.config_key,
+            entry.type,
+            entry.action,
+            entry.repo,
+            result.number,
+            result.object_id,
+            result.url,
+            datetime.now(timezone.utc).isoformat(),
+        )
+        with self._lock:
+            self.connection.execute(
+                "INSERT OR REPLACE INTO posted_entries VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                ledger_record,
+            )
+            self.connection.commit()
+        return ledger_record
+
+    def __len__(self) -> int:
+        """Return the number of recorded entries."""
+        with self._lock:
+            return self.connection.execute(
+                "SELECT COUNT(*) FROM posted_entries"
+            ).fetchone()[0]
+
+    def close(self) -> None:
+        """Close the database connection."""
+        self.connection.close()
+
+    @staticmethod
+    def entry_key(config: Dict) -> str:
+        """Return a stable hash of an entry configuration.
+
+        Args:
+            config (Dict): the entry configuration
+
+        Returns:
+            str: hex digest that does not depend on the order of the keys
+        """
+        return github_objects.Entry.config_hash(config)
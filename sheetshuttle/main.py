@@ -5,12 +5,25 @@
 
 import json
 from pathlib import Path
+from types import MappingProxyType
+from typing import Any, Dict, List, Optional
+
 import typer
+from rich.console import Console
+from rich.table import Table
 
-from pluginbase import PluginBase  # type: ignore[import]
 from dotenv import load_dotenv
 
-PLUGIN_BASE = PluginBase("sheetshuttle.plugins")
+from sheetshuttle import (
+    bench,
+    daemon,
+    http_cache,
+    isolation,
+    plugin_runner,
+    profiling,
+    sheet_collector,
+    tracing,
+)
 
 app = typer.Typer(name="sheetshuttle")
 
@@ -42,8 +55,8 @@ def init(
     print(f"{plugin_name} created successfully")
 
 
-# pylint: disable=R0913
-@app.command("run", help="Run sheetshuttle using your custom plugin.")
+# pylint: disable=R0912,R0913,R0914
+@app.command("run", help="Run sheetshuttle using your custom plugins.")
 def sheetshuttle_run(
     sheets_keys_file: str = typer.Option(
         ".env",
@@ -69,11 +82,156 @@ def sheetshuttle_run(
         "-pd",
         help="Directory to get plugins from",
     ),
-    plugin_name: str = typer.Option(
-        "default",
+    plugin_names: List[str] = typer.Option(
+        ["default"],
+        "--plugin-name",
+        "-pn",
+        help="Name of plugin to use for processing, repeat to run several plugins",
+    ),
+    json_args=typer.Option(
+        None,
+        "--json-args",
+        "-ja",
+        help="Path to the JSON file with additional arguments. [Optional]",
+    ),
+    shared: bool = typer.Option(
+        False,
+        "--shared",
+        "-s",
+        help="Collect the sheets and authenticate GitHub once for all plugins",
+    ),
+    gh_keys_file: str = typer.Option(
+        ".env",
+        "--gh-keys-file",
+        "-gk",
+        help="Path to the GitHub token used with --shared, either .json or .env file",
+    ),
+    gh_pool: bool = typer.Option(
+        False,
+        "--gh-pool",
+        help="Give plugins a credential pool read from --gh-keys-file with --shared",
+    ),
+    compact: bool = typer.Option(
+        False,
+        "--compact",
+        help="Compact the regions collected with --shared that do not set compact",
+    ),
+    concurrency: int = typer.Option(
+        1,
+        "--concurrency",
+        "-c",
+        help="Number of plugins to run at the same time",
+    ),
+    isolated: bool = typer.Option(
+        False,
+        "--isolated",
+        "-x",
+        help="Run every plugin in a worker process, sharing the sheets in memory",
+    ),
+    profile: Optional[str] = typer.Option(
+        None,
+        "--profile",
+        help="Profile the collection, plugin, and posting phases: cpu or memory",
+    ),
+    profile_directory: str = typer.Option(
+        "profile/",
+        "--profile-directory",
+        help="Directory to write the profile reports to",
+    ),
+    trace: Optional[str] = typer.Option(
+        None,
+        "--trace",
+        help="Path to write the spans of the run to as Chrome trace events. [Optional]",
+    ),
+    trace_endpoint: Optional[str] = typer.Option(
+        None,
+        "--trace-endpoint",
+        help="URL of an OpenTelemetry collector to send the spans to. [Optional]",
+    ),
+):
+    """Create the CLI and runs the chosen plugins."""
+    if profile is not None and profile not in profiling.PROFILE_MODES:
+        print(f"ERROR: --profile must be one of {profiling.PROFILE_MODES}")
+        return
+    if sheets_keys_file.endswith(".env"):
+        load_dotenv(dotenv_path=sheets_keys_file)
+    # Every plugin is checked before anything is collected or run
+    plugins = plugin_runner.load_plugins(plugins_directory, plugin_names)
+    if profile is not None:
+        if isolated or concurrency > 1:
+            print(
+                "Warning: plugins are run one after the other in this process "
+                "while profiling"
+            )
+            isolated = False
+            concurrency = 1
+        profiling.start(profile, profile_directory)
+    exporters: List[Any] = []
+    if trace:
+        exporters.append(tracing.ChromeTraceExporter(trace))
+    if trace_endpoint:
+        exporters.append(tracing.OTLPExporter(trace_endpoint))
+    if exporters:
+        tracing.start(exporters)
+    try:
+        with tracing.span("run", plugins=list(plugins), shared=shared):
+            kwargs = {"args": load_json_file(json_args)}
+            if shared:
+                kwargs.update(
+                    collect_shared(
+                        sheets_keys_file,
+                        sheets_config_directory,
+                        gh_keys_file,
+                        compact,
+                        gh_pool,
+                    )
+                )
+            args = (sheets_keys_file, sheets_config_directory, gh_config_directory)
+            if isolated:
+                isolation.run_plugins(plugins, args, kwargs, concurrency, gh_keys_file)
+            else:
+                plugin_runner.run_plugins(plugins, args, kwargs, concurrency)
+    finally:
+        http_cache.report_stats()
+        summary = profiling.stop()
+        if summary is not None:
+            print(f"Profile reports written to {summary.parent}")
+        if tracing.stop() is not None and trace:
+            print(f"Trace written to {trace}")
+
+
+# pylint: disable=R0913
+@app.command("serve", help="Keep running and re-run plugins when the data changes.")
+def sheetshuttle_serve(
+    sheets_keys_file: str = typer.Option(
+        ".env",
+        "--sheets-keys-file",
+        "-kf",
+        help="Path to the Sheets api keys, either .json or .env file",
+    ),
+    sheets_config_directory: str = typer.Option(
+        "config/sheet_sources/",
+        "--sheets-config-directory",
+        "-sd",
+        help="Directory to get the sheets configuration .yaml files from",
+    ),
+    gh_config_directory: str = typer.Option(
+        "config/gh_sources/",
+        "--gh-config-directory",
+        "-gd",
+        help="Directory to get the Github configuration .yaml files from",
+    ),
+    plugins_directory: str = typer.Option(
+        "plugins/",
+        "--plugins-directory",
+        "-pd",
+        help="Directory to get plugins from",
+    ),
+    plugin_names: List[str] = typer.Option(
+        ["default"],
         "--plugin-name",
         "-pn",
-        help="Name of plugin to use for processing",
+        help="Name of plugin to use for processing, repeat to run several plugins",
     ),
     json_args=typer.Option(
         None,
@@ -81,29 +239,232 @@ def sheetshuttle_run(
         "-ja",
         help="Path to the JSON file with additional arguments. [Optional]",
     ),
+    gh_keys_file: str = typer.Option(
+        ".env",
+        "--gh-keys-file",
+        "-gk",
+        help="Path to the GitHub token, either .json or .env file",
+    ),
+    concurrency: int = typer.Option(
+        1,
+        "--concurrency",
+        "-c",
+        help="Number of plugins to run at the same time",
+    ),
+    interval: float = typer.Option(
+        300.0,
+        "--interval",
+        "-i",
+        help="Seconds between checks of the spreadsheets for changes",
+    ),
+    poll_interval: float = typer.Option(
+        2.0,
+        "--poll-interval",
+        help="Seconds between checks of the configuration files for changes",
+    ),
+    max_cycles: Optional[int] = typer.Option(
+        None,
+        "--max-cycles",
+        help="Number of cycles to run before exiting. [Optional]",
+    ),
+):
+    """Run the plugins in a daemon that keeps the APIs and collected data warm."""
+    if sheets_keys_file.endswith(".env"):
+        load_dotenv(dotenv_path=sheets_keys_file)
+    my_daemon = daemon.Daemon(
+        plugin_runner.load_plugins(plugins_directory, plugin_names),
+        (sheets_keys_file, sheets_config_directory, gh_config_directory),
+        {"args": load_json_file(json_args)},
+        gh_keys_file=gh_keys_file,
+        interval=interval,
+        poll_interval=poll_interval,
+        concurrency=concurrency,
+    )
+    try:
+        my_daemon.serve(max_cycles=max_cycles)
+    except KeyboardInterrupt:
+        print(f"Stopped after {my_daemon.cycle_count} cycles")
+
+
+# pylint: disable=R0913
+@app.command("preview", help="Collect the sheet regions and preview them.")
+def sheetshuttle_preview(
+    sheets_keys_file: str = typer.Option(
+        ".env",
+        "--sheets-keys-file",
+        "-kf",
+        help="Path to the Sheets api keys, either .json or .env file",
+    ),
+    sheets_config_directory: str = typer.Option(
+        "config/sheet_sources/",
+        "--sheets-config-directory",
+        "-sd",
+        help="Directory to get the sheets configuration .yaml files from",
+    ),
+    head: int = typer.Option(5, "--head", help="Number of first rows to show"),
+    tail: int = typer.Option(0, "--tail", help="Number of last rows to show"),
+    sample: int = typer.Option(
+        0, "--sample", help="Number of random rows to show from the other rows"
+    ),
+    seed: Optional[int] = typer.Option(
+        None, "--seed", help="Seed of the random sample. [Optional]"
+    ),
+    compact: bool = typer.Option(
+        False, "--compact", help="Compact the regions that do not set compact"
+    ),
 ):
-    """Create the CLI and runs the chosen plugin."""
+    """Print a preview of every region as soon as it is collected."""
     if sheets_keys_file.endswith(".env"):
         load_dotenv(dotenv_path=sheets_keys_file)
-    _, my_plugin = load_plugin(plugins_directory, plugin_name)
-    methods_list = [
-        func for func in dir(my_plugin) if callable(getattr(my_plugin, func))
-    ]
-    if "run" not in methods_list:
-        raise Exception(f"ERROR: function run was not found in {plugin_name} plugin.")
-    my_plugin.run(
-        sheets_keys_file,
-        sheets_config_directory,
-        gh_config_directory,
-        args=load_json_file(json_args),
+    my_collector = sheet_collector.SheetCollector(
+        key_file=sheets_keys_file,
+        sources_dir=sheets_config_directory,
+        compact=compact,
+    )
+    region_count = my_collector.preview(head=head, tail=tail, sample=sample, seed=seed)
+    if not region_count:
+        print(f"ERROR: No regions found in {sheets_config_directory}")
+
+
+# pylint: disable=R0913,R0914
+@app.command("bench", help="Measure SheetShuttle on synthetic workloads.")
+def sheetshuttle_bench(
+    workloads: List[str] = typer.Option(
+        list(bench.WORKLOADS),
+        "--workload",
+        "-w",
+        help="Workload to run, repeat to run several: collect, convert, render, post",
+    ),
+    regions: int = typer.Option(
+        bench.DEFAULT_SIZES["collect"],
+        "--regions",
+        help="Number of regions collected by the collect workload",
+    ),
+    rows: int = typer.Option(
+        bench.DEFAULT_SIZES["convert"],
+        "--rows",
+        help="Number of rows converted by the convert workload",
+    ),
+    issues: int = typer.Option(
+        bench.DEFAULT_SIZES["render"],
+        "--issues",
+        help="Number of issue bodies rendered by the render workload",
+    ),
+    entries: int = typer.Option(
+        bench.DEFAULT_SIZES["post"],
+        "--entries",
+        help="Number of entries posted by the post workload",
+    ),
+    repeat: int = typer.Option(10, "--repeat", help="Number of timed repetitions"),
+    warmup: int = typer.Option(
+        1, "--warmup", help="Number of repetitions run before the timed ones"
+    ),
+    seed: int = typer.Option(0, "--seed", help="Seed of the synthetic data"),
+    latency: float = typer.Option(
+        0.0,
+        "--latency",
+        help="Milliseconds waited by every request to the GitHub stand-in",
+    ),
+    output: Optional[str] = typer.Option(
+        None, "--output", "-o", help="Path to save the results as JSON. [Optional]"
+    ),
+    baseline: Optional[str] = typer.Option(
+        None,
+        "--baseline",
+        "-b",
+        help="Path to the JSON results to compare to, exits with 1 on regressions",
+    ),
+    tolerance: float = typer.Option(
+        0.1,
+        "--tolerance",
+        help="Relative growth of the median duration allowed by --baseline",
+    ),
+):
+    """Run the workloads, print their results, and compare them to a baseline."""
+    unknown = [workload for workload in workloads if workload not in bench.WORKLOADS]
+    if unknown:
+        print(f"ERROR: unknown workloads {unknown}, must be in {bench.WORKLOADS}")
+        raise typer.Exit(code=1)
+    sizes = {"collect": regions, "convert": rows, "render": issues, "post": entries}
+    results = []
+    for workload in dict.fromkeys(workloads):
+        results.append(
+            bench.run_workload(
+                workload,
+                sizes[workload],
+                repeat=repeat,
+                warmup=warmup,
+                seed=seed,
+                latency=latency / 1000,
+            )
+        )
+    document = bench.results_document(
+        results,
+        {"seed": seed, "latency": latency, "region_rows": bench.REGION_ROWS},
     )
+    console = Console()
+    table = Table("workload", "size", "items/s", "p50 ms", "p90 ms", "p99 ms")
+    for workload, summary in document["workloads"].items():
+        table.add_row(
+            workload,
+            str(summary["size"]),
+            f"{summary['throughput']:,.0f}",
+            *(f"{summary[key] * 1000:.2f}" for key in ("p50", "p90", "p99")),
+        )
+    console.print(table)
+    if output:
+        bench.save_results(document, output)
+        print(f"Results saved to {output}")
+    if baseline:
+        comparisons = bench.compare(document, bench.load_results(baseline), tolerance)
+        for comparison in comparisons:
+            print(
+                f"{'ERROR: regression in' if comparison.regressed else 'OK:'} "
+                f"{comparison.workload} {comparison.baseline * 1000:.2f} ms -> "
+                f"{comparison.current * 1000:.2f} ms ({comparison.change:+.1%})"
+            )
+        if any(comparison.regressed for comparison in comparisons):
+            raise typer.Exit(code=1)
 
 
-def load_plugin(directory: str, name: str):
-    """Return a pluginbase object using a plugin name and a directory."""
-    plugin_source = PLUGIN_BASE.make_plugin_source(searchpath=[directory])
-    my_plugin = plugin_source.load_plugin(name)
-    return plugin_source, my_plugin
+def collect_shared(
+    sheets_keys_file: str,
+    sheets_config_directory: str,
+    gh_keys_file: str,
+    compact: bool = False,
+    gh_pool: bool = False,
+) -> Dict[str, Any]:
+    """Collect the sheets and authenticate GitHub once for all plugins.
+
+    Args:
+        sheets_keys_file (str): path to the Sheets api keys
+        sheets_config_directory (str): directory of the sheets configuration
+        gh_keys_file (str): path to the GitHub token
+        compact (bool, optional): compact the regions whose configuration does
+            not set compact. Defaults to False.
+        gh_pool (bool, optional): also create a credential pool from
+            gh_keys_file. Defaults to False.
+
+    Returns:
+        Dict[str, Any]: the keyword arguments given to every plugin,
+            "sheets_data" with a read-only view of the collected sheets and
+            "github_api" with the authenticated Github object, or None when no
+            token was found. With gh_pool, "credential_pool" holds the
+            CredentialPool, or None when no credential was found.
+    """
+    my_collector = sheet_collector.SheetCollector(
+        key_file=sheets_keys_file,
+        sources_dir=sheets_config_directory,
+        compact=compact,
+    )
+    my_collector.collect_files()
+    shared = {
+        "sheets_data": MappingProxyType(my_collector.sheets_data),
+        "github_api": daemon.Daemon.authenticate_github(gh_keys_file),
+    }
+    if gh_pool:
+        shared["credential_pool"] = daemon.Daemon.create_credential_pool(gh_keys_file)
+    return shared
 
 
 def load_json_file(file_path):
@@ -111,7 +472,7 @@ def load_json_file(file_path):
     if not file_path:
         return {}
     try:
-        with open(file_path, "r", encoding="uts-8") as read_file:
+        with open(file_path, "r", encoding="utf-8") as read_file:
             data = json.load(read_file)
             return data
     except FileNotFoundError as error_obj:
@@ -0,0 +1,86 @@
+"""Load plugins from directories and run them in the current process.
+
+Plugins are modules with a run function, loaded with pluginbase. The plugin
+sources are kept once the plugins are loaded, since pluginbase unloads the
+plugins of a source once it is garbage collected.
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List
+
+from pluginbase import PluginBase  # type: ignore[import]
+
+from sheetshuttle import profiling, tracing
+
+PLUGIN_BASE = PluginBase("sheetshuttle.plugins")
+# Sources of the loaded plugins, kept so that the plugins stay importable
+_PLUGIN_SOURCES: List[Any] = []
+
+
+def load_plugin(directory: str, name: str):
+    """Return a pluginbase object using a plugin name and a directory."""
+    plugin_source = PLUGIN_BASE.make_plugin_source(searchpath=[directory])
+    my_plugin = plugin_source.load_plugin(name)
+    return plugin_source, my_plugin
+
+
+def load_plugins(directory: str, names: List[str]) -> Dict[str, Any]:
+    """Load every plugin and check that it has a run function.
+
+    Args:
+        directory (str): directory to get the plugins from
+        names (List[str]): names of the plugins, duplicates are loaded once
+
+    Returns:
+        Dict[str, Any]: the plugin modules by name, in the order of names
+    """
+    plugins = {}
+    for name in dict.fromkeys(names):
+        plugin_source, my_plugin = load_plugin(directory, name)
+        if not callable(getattr(my_plugin, "run", None)):
+            raise Exception(f"ERROR: function run was not found in {name} plugin.")
+        # The plugin source unloads its plugins once it is garbage collected
+        _PLUGIN_SOURCES.append(plugin_source)
+        plugins[name] = my_plugin
+    return plugins
+
+
+def run_plugins(
+    plugins: Dict[str, Any], args: tuple, kwargs: Dict[str, Any], concurrency=1
+):
+    """Run the plugins one after the other or concurrently.
+
+    Every plugin runs even when another one fails, the first error is raised
+    once they all finished.
+
+    Args:
+        plugins (Dict[str, Any]): the plugin modules by name
+        args (tuple): positional arguments of the run functions
+        kwargs (Dict[str, Any]): keyword arguments of the run functions
+        concurrency (int, optional): number of plugins run at the same time.
+            Defaults to 1.
+    """
+    errors = []
+
+    # Plugins run in other threads do not share the active span
+    parent_span = tracing.current_span()
+
+    def run_plugin(name):
+        try:
+            with profiling.phase(f"plugin {name}"), tracing.span(
+                "plugin", parent_span, plugin=name
+            ):
+                plugins[name].run(*args, **kwargs)
+        # pylint: disable=W0703
+        except Exception as error:
+            print(f"ERROR: plugin {name} failed: {error}")
+            errors.append(error)
+
+    if concurrency > 1 and len(plugins) > 1:
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            list(executor.map(run_plugin, plugins))
+    else:
+        for name in plugins:
+            run_plugin(name)
+    if errors:
+        raise errors[0]
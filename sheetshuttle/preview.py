@@ -0,0 +1,171 @@
+"""Print previews of regions in the terminal while they are being collected.
+
+A preview shows the size, memory use, and column types of a region together
+with a limited number of its rows: the first rows, the last rows, and a random
+sample of the rows in between. Only the shown rows are converted to text, so
+previewing a large region is as fast as previewing a small one.
+"""
+
+from typing import Iterable, Optional
+
+import pandas as pd  # type: ignore[import]
+from rich.console import Console
+from rich.markup import escape
+from rich.table import Table
+from rich.text import Text
+
+from sheetshuttle import tables
+
+# Cell shown in every column in place of rows left out of the preview
+SKIPPED_CELL = "…"
+
+
+def preview_regions(
+    regions: Iterable, console: Optional[Console] = None, **options
+) -> int:
+    """Print a preview of every region as soon as the iterable yields it.
+
+    Args:
+        regions (Iterable[Region]): regions to preview, such as the ones
+            yielded by SheetCollector.iter_regions
+        console (Console, optional): rich console to print to. Defaults to a
+            console writing to the terminal.
+        **options: head, tail, sample, and seed of preview_region
+
+    Returns:
+        int: number of previewed regions
+    """
+    console = console if console is not None else Console()
+    count = 0
+    for region in regions:
+        preview_region(region, console, **options)
+        count += 1
+    return count
+
+
+# pylint: disable=R0913
+def preview_region(
+    region,
+    console: Console,
+    head: int = 5,
+    tail: int = 0,
+    sample: int = 0,
+    seed: Optional[int] = None,
+) -> None:
+    """Print the summary and a limited number of rows of a region.
+
+    Args:
+        region (Region): the region to preview
+        console (Console): rich console to print to
+        head (int, optional): number of first rows shown. Defaults to 5.
+        tail (int, optional): number of last rows shown. Defaults to 0.
+        sample (int, optional): number of random rows shown from the remaining
+            rows. Defaults to 0.
+        seed (int, optional): seed of the random sample. Defaults to None.
+    """
+    data: pd.DataFrame = region.data
+    console.rule(
+        escape(
+            f"{region.parent_sheet_name} / {region.region_name} "
+            f"({region.start_range}:{region.end_range})"
+        )
+    )
+    size = format_size(int(data.memory_usage(deep=True).sum()))
+    original_size = getattr(region, "original_size", None)
+    if original_size is not None:
+        size += f", compacted from {format_size(original_size)}"
+    console.print(f"{data.shape[0]} rows x {data.shape[1]} columns, {size}")
+    console.print(summary_table(data))
+    console.print(rows_table(data, head, tail, sample, seed))
+
+
+def summary_table(data: pd.DataFrame) -> Table:
+    """Return a table with the type and number of missing values of every column.
+
+    Args:
+        data (pd.DataFrame): the region data
+    """
+    table = Table("column", "dtype", "non-null", "missing")
+    missing = data.isna().sum()
+    for position, label in enumerate(data.columns):
+        missing_count = int(missing.iloc[position])
+        table.add_row(
+            Text(str(label)),
+            str(data.dtypes.iloc[position]),
+            str(len(data) - missing_count),
+            str(missing_count),
+        )
+    return table
+
+
+def select_rows(
+    row_count: int, head: int = 5, tail: int = 0, sample: int = 0, seed=None
+):
+    """Return the sorted positions of the rows shown in a preview.
+
+    Args:
+        row_count (int): number of rows of the region
+        head (int, optional): number of first rows. Defaults to 5.
+        tail (int, optional): number of last rows. Defaults to 0.
+        sample (int, optional): number of random rows between the first and
+            last rows. Defaults to 0.
+        seed (int, optional): seed of the random sample. Defaults to None.
+
+    Returns:
+        List[int]: positions of the selected rows
+    """
+    head = min(max(head, 0), row_count)
+    tail = min(max(tail, 0), row_count - head)
+    middle = pd.RangeIndex(head, row_count - tail)
+    sampled = []
+    if sample > 0 and len(middle):
+        sampled = (
+            pd.Series(middle)
+            .sample(n=min(sample, len(middle)), random_state=seed)
+            .sort_values()
+            .tolist()
+        )
+    return [*range(head), *sampled, *range(row_count - tail, row_count)]
+
+
+def rows_table(
+    data: pd.DataFrame, head: int = 5, tail: int = 0, sample: int = 0, seed=None
+) -> Table:
+    """Return a rich table with the selected rows of a data frame.
+
+    A row of "…" marks every place where rows were left out.
+
+    Args:
+        data (pd.DataFrame): the region data
+        head (int, optional): number of first rows. Defaults to 5.
+        tail (int, optional): number of last rows. Defaults to 0.
+        sample (int, optional): number of random rows between the first and
+            last rows. Defaults to 0.
+        seed (int, optional): seed of the random sample. Defaults to None.
+    """
+    positions = select_rows(len(data), head, tail, sample, seed)
+    headers, columns, numeric = tables.table_columns(data.iloc[positions])
+    table = Table()
+    for header, is_numeric in zip(headers, numeric):
+        table.add_column(Text(header), justify="right" if is_numeric else "left")
+    previous = -1
+    for row, position in enumerate(positions):
+        if position != previous + 1:
+            table.add_row(*[SKIPPED_CELL] * len(columns))
+        table.add_row(*[Text(column[row]) for column in columns])
+        previous = position
+    if previous != len(data) - 1:
+        table.add_row(*[SKIPPED_CELL] * len(columns))
+    return table
+
+
+def format_size(size: int) -> str:
+    """Return a number of bytes in a human readable unit."""
+    if size < 1024:
+        return f"{size} B"
+    value = size / 1024
+    for unit in ("KB", "MB"):
+        if value < 1024:
+            return f"{value:.1f} {unit}"
+        value /= 1024
+    return f"{value:.1f} GB"
@@ -0,0 +1,322 @@
+"""Profile the phases of a SheetShuttle run with cProfile or tracemalloc.
+
+Collecting the sheets, running every plugin, and posting entries are phases.
+Plugins can mark their own phases with profiling.phase, which does nothing
+unless a profiler was started, for instance by "sheetshuttle run --profile":
+
+    from sheetshuttle import profiling
+
+    with profiling.phase("grade submissions"):
+        ...
+
+With the cpu mode, every phase is profiled with cProfile and its top functions
+are written to a report. With the memory mode, allocations are traced with
+tracemalloc and the report of every phase gives its peak memory and its top
+allocation sites. The peak memory and data size of every collected Region are
+listed in the summary written when the profiler stops.
+
+Phases are only profiled in the thread that started the profiler. A phase
+started inside another one is profiled on its own, and its peak memory counts
+towards the peak of the outer phase.
+"""
+
+import contextlib
+import cProfile
+import io
+import json
+import pathlib
+import pstats
+import re
+import threading
+import time
+import tracemalloc
+from typing import Any, Dict, Iterator, List, Optional
+
+PROFILE_MODES = ("cpu", "memory")
+# Number of functions or allocation sites listed in every report
+TOP_COUNT = 30
+
+# Profiler started by start, None when profiling is off
+_ACTIVE: Optional["Profiler"] = None
+
+
+# pylint: disable=R0902
+class PhaseRecord:
+    """Duration and memory use of a phase."""
+
+    def __init__(self, name: str, report: bool) -> None:
+        """Create a PhaseRecord object.
+
+        Args:
+            name (str): name of the phase
+            report (bool): if a report file is written for the phase
+        """
+        self.name = name
+        self.report = report
+        self.duration = 0.0
+        # Memory mode only, in bytes
+        self.peak: Optional[int] = None
+        self.allocated: Optional[int] = None
+        # Memory use of the data of a collected region, in bytes
+        self.data_size: Optional[int] = None
+        self.report_path: Optional[str] = None
+        # Started when the phase began, in the mode of the profiler
+        self.profile: Optional[cProfile.Profile] = None
+        self.snapshot: Optional[tracemalloc.Snapshot] = None
+        self.start_memory = 0
+
+    def set_data(self, data) -> None:
+        """Record the memory use of the data frame of a region in the memory mode.
+
+        Args:
+            data (pd.DataFrame): data collected during the phase
+        """
+        if self.peak is not None:
+            self.data_size = int(data.memory_usage(deep=True).sum())
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Return the record as written to the summary."""
+        return {
+            "name": self.name,
+            "duration": self.duration,
+            "peak": self.peak,
+            "allocated": self.allocated,
+            "data_size": self.data_size,
+            "report": self.report_path,
+        }
+
+
+# pylint: disable=R0902
+class Profiler:
+    """Profile phases and write a report for every phase to a directory."""
+
+    def __init__(self, mode: str, directory: str, top: int = TOP_COUNT) -> None:
+        """Create a Profiler object and the report directory.
+
+        Args:
+            mode (str): "cpu" or "memory"
+            directory (str): directory where the reports are written
+            top (int, optional): number of functions or allocation sites
+                listed in every report. Defaults to TOP_COUNT.
+
+        Raises:
+            Exception: thrown when the mode is unknown
+        """
+        if mode not in PROFILE_MODES:
+            raise Exception(
+                f"ERROR: unknown profile mode {mode}, must be one of {PROFILE_MODES}"
+            )
+        self.mode = mode
+        self.directory = pathlib.Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.top = top
+        self.thread = threading.get_ident()
+        self.records: List[PhaseRecord] = []
+        self.stack: List[PhaseRecord] = []
+        self.report_count = 0
+        self.started_tracing = False
+
+    def start(self):
+        """Start tracing allocations in the memory mode."""
+        if self.mode == "memory" and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self.started_tracing = True
+
+    def stop(self) -> pathlib.Path:
+        """Stop tracing and write the summary of every phase.
+
+        Returns:
+            pathlib.Path: path to the summary
+        """
+        if self.started_tracing:
+            tracemalloc.stop()
+            self.started_tracing = False
+        summary = self.directory / "summary.json"
+        with open(summary, "w", encoding="utf-8") as outfile:
+            json.dump(
+                {
+                    "mode": self.mode,
+                    "phases": [record.to_dict() for record in self.records],
+                },
+                outfile,
+                indent=2,
+            )
+            outfile.write("\n")
+        return summary
+
+    @contextlib.contextmanager
+    def phase(self, name: str, report: bool = True) -> Iterator[PhaseRecord]:
+        """Profile the code run inside the with statement as a phase.
+
+        Args:
+            name (str): name of the phase, used in the report file name
+            report (bool, optional): write a report for the phase. Phases
+                without reports, such as the ones of single regions, are only
+                listed in the summary. Defaults to True.
+        """
+        record = PhaseRecord(name, report)
+        self.begin(record)
+        started = time.perf_counter()
+        try:
+            yield record
+        finally:
+            record.duration = time.perf_counter() - started
+            self.end(record)
+
+    def begin(self, record: PhaseRecord):
+        """Start profiling a phase, pausing the phase it is nested in."""
+        outer = self.stack[-1] if self.stack else None
+        if self.mode == "cpu" and record.report:
+            if outer is not None and outer.profile is not None:
+                outer.profile.disable()
+            record.profile = cProfile.Profile()
+            record.profile.enable()
+        elif self.mode == "memory":
+            if record.report:
+                record.snapshot = tracemalloc.take_snapshot()
+            current, peak = tracemalloc.get_traced_memory()
+            if outer is not None:
+                outer.peak = max(outer.peak or 0, peak)
+            tracemalloc.reset_peak()
+            record.start_memory = current
+            record.peak = current
+        self.stack.append(record)
+        self.records.append(record)
+
+    def end(self, record: PhaseRecord):
+        """Stop profiling a phase, write its report, and resume the outer phase."""
+        self.stack.pop()
+        outer = self.stack[-1] if self.stack else None
+        if record.profile is not None:
+            record.profile.disable()
+            self.write_cpu_report(record)
+            record.profile = None
+            if outer is not None and outer.profile is not None:
+                outer.profile.enable()
+        elif self.mode == "memory":
+            current, peak = tracemalloc.get_traced_memory()
+            record.peak = max(record.peak or 0, peak)
+            record.allocated = current - record.start_memory
+            if outer is not None:
+                outer.peak = max(outer.peak or 0, record.peak)
+            if record.snapshot is not None:
+                self.write_memory_report(record, tracemalloc.take_snapshot())
+                record.snapshot = None
+
+    def report_path(self, record: PhaseRecord, suffix: str) -> pathlib.Path:
+        """Return a new path for a report of a phase."""
+        self.report_count += 1
+        slug = re.sub(r"[^A-Za-z0-9_.-]+", "_", record.name).strip("_")
+        path = self.directory / f"{self.report_count:03d}-{slug}.{suffix}"
+        record.report_path = str(path)
+        return path
+
+    def write_cpu_report(self, record: PhaseRecord):
+        """Write the top functions of a phase, and its stats for other tools."""
+        path = self.report_path(record, "cpu.txt")
+        stream = io.StringIO()
+        stats = pstats.Stats(record.profile, stream=stream)
+        stream.write(f"Phase {record.name}: {record.duration:.3f} s\n")
+        stats.sort_stats("cumulative").print_stats(self.top)
+        path.write_text(stream.getvalue(), encoding="utf-8")
+        stats.dump_stats(path.with_suffix("").with_suffix(".prof"))
+
+    def write_memory_report(self, record: PhaseRecord, snapshot):
+        """Write the peak memory and top allocation sites of a phase."""
+        path = self.report_path(record, "memory.txt")
+        lines = [
+            f"Phase {record.name}: {record.duration:.3f} s",
+            f"Peak traced memory: {format_size(record.peak or 0)}",
+            f"Allocated and not freed: {format_size(record.allocated or 0)}",
+            "",
+            f"Top {self.top} allocation sites:",
+        ]
+        differences = snapshot.compare_to(record.snapshot, "lineno")
+        for difference in differences[: self.top]:
+            lines.append(str(difference))
+        # Regions collected during the phase are recorded after it
+        first = self.records.index(record)
+        regions = [
+            nested for nested in self.records[first:] if nested.data_size is not None
+        ]
+        if regions:
+            lines.extend(["", "Regions:"])
+            for region in regions:
+                lines.append(
+                    f"{region.name}: peak {format_size(region.peak or 0)}, "
+                    f"data {format_size(region.data_size or 0)}"
+                )
+        path.write_text("\n".join(lines) + "\n", encoding="utf-8")
+
+
+def format_size(size: int) -> str:
+    """Return a number of bytes in a human readable unit."""
+    value = float(size)
+    for unit in ("B", "KB", "MB"):
+        if abs(value) < 1024:
+            return f"{value:.1f} {unit}"
+        value /= 1024
+    return f"{value:.1f} GB"
+
+
+def start(mode: str, directory: str, top: int = TOP_COUNT) -> Profiler:
+    """Start profiling the phases of the current thread.
+
+    Args:
+        mode (str): "cpu" or "memory"
+        directory (str): directory where the reports are written
+        top (int, optional): number of functions or allocation sites listed
+            in every report. Defaults to TOP_COUNT.
+
+    Returns:
+        Profiler: the started profiler
+    """
+    # pylint: disable=W0603
+    global _ACTIVE
+    profiler = Profiler(mode, directory, top)
+    profiler.start()
+    _ACTIVE = profiler
+    return profiler
+
+
+def stop() -> Optional[pathlib.Path]:
+    """Stop profiling and write the summary.
+
+    Returns:
+        Optional[pathlib.Path]: path to the summary, None when profiling was off
+    """
+    # pylint: disable=W0603
+    global _ACTIVE
+    profiler, _ACTIVE = _ACTIVE, None
+    if profiler is None:
+        return None
+    return profiler.stop()
+
+
+def active() -> Optional[Profiler]:
+    """Return the started profiler, None when profiling is off."""
+    return _ACTIVE
+
+
+@contextlib.contextmanager
+def phase(name: str, report: bool = True) -> Iterator[Optional[PhaseRecord]]:
+    """Mark the code run inside the with statement as a phase.
+
+    Does nothing when no profiler was started or when called from another
+    thread than the one that started it. Can also decorate functions.
+
+    Args:
+        name (str): name of the phase
+        report (bool, optional): write a report for the phase, otherwise it is
+            only listed in the summary. Defaults to True.
+
+    Yields:
+        Optional[PhaseRecord]: the record of the phase, None when it is not
+            profiled
+    """
+    profiler = _ACTIVE
+    if profiler is None or threading.get_ident() != profiler.thread:
+        yield None
+        return
+    with profiler.phase(name, report) as record:
+        yield record
@@ -0,0 +1,494 @@
+"""Schedule GitHub API calls according to the primary and secondary rate limits."""
+
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from typing import Any, Callable, Dict, Iterable, List, Optional, Protocol, Set
+
+from github import Github
+from github.GithubException import GithubException
+from github.GithubObject import GithubObject
+from github.PaginatedList import PaginatedListBase
+
+from sheetshuttle import tracing
+
+THROTTLE_STATUSES = (403, 429)
+# Method names that create content on GitHub and count towards the secondary
+# content creation limit
+WRITE_PREFIXES = ("create", "update", "add", "edit", "delete", "merge")
+# Attribute values that can send requests and are wrapped in a ScheduledProxy
+GITHUB_TYPES = (GithubObject, PaginatedListBase)
+
+
+def credential_key(target) -> Any:
+    """Return the key of the rate limit state that a target's requests count against.
+
+    PyGithub objects share the Requester of the Github client, and so of the
+    credential, that created them. Other objects, such as mock APIs and
+    credential pools, use the shared state of the None key.
+
+    Args:
+        target: a Github object or any object returned by it
+    """
+    requester = getattr(target, "_requester", None)
+    if requester is None and isinstance(target, Github):
+        # pylint: disable=W0212
+        requester = target._Github__requester  # type: ignore[attr-defined]
+    return requester
+
+
+def loaded_items(paginated: PaginatedListBase) -> List:
+    """Return the items of the pages a paginated list already fetched.
+
+    PaginatedListBase keeps them in a private list that grows in place when
+    the next page is fetched.
+    """
+    return paginated._PaginatedListBase__elements  # type: ignore[attr-defined] # pylint: disable=W0212
+
+
+# pylint: disable=R0903
+class LimitState:
+    """Known rate limits of a credential and the times its next calls may start."""
+
+    def __init__(self) -> None:
+        """Create a LimitState object without known limits."""
+        self.remaining: Optional[int] = None
+        self.reset_time: Optional[float] = None
+        self.blocked_until = 0.0
+        self.next_call = 0.0
+        self.next_write = 0.0
+
+
+class RateLimitScheduler:
+    """Pace, retry, and parallelize GitHub API calls using rate limit feedback.
+
+    The scheduler reads the X-RateLimit-Remaining, X-RateLimit-Reset, and
+    Retry-After headers from GitHub responses. Calls are paused until a limit
+    resets, content creating calls are spaced out to respect the secondary
+    limits, and the number of concurrent calls is halved every time a call is
+    throttled and slowly increased again after successful calls.
+
+    Limits are tracked for every credential, keyed by the Requester of the
+    PyGithub client that sends the calls, so the tokens of a CredentialPool
+    are paced independently.
+    """
+
+    # pylint: disable=R0902,R0913
+    def __init__(
+        self,
+        max_concurrency: int = 4,
+        write_interval: float = 1.0,
+        max_retries: int = 10,
+        default_wait: float = 60.0,
+        max_wait: float = 900.0,
+        low_water: int = 50,
+        sleep: Callable[[float], None] = time.sleep,
+        clock: Callable[[], float] = time.time,
+        retry_policy=None,
+    ) -> None:
+        """Create a RateLimitScheduler object.
+
+        Args:
+            max_concurrency (int, optional): maximum number of calls running at
+                the same time. Defaults to 4.
+            write_interval (float, optional): minimum number of seconds between
+                two content creating calls. Defaults to 1.0.
+            max_retries (int, optional): number of times a throttled call is
+                retried before its error is raised. Defaults to 10.
+            default_wait (float, optional): seconds to wait after a throttled
+                call that does not include a Retry-After or reset header.
+                Doubles with every retry. Defaults to 60.0.
+            max_wait (float, optional): upper bound of a single wait in
+                seconds. Defaults to 900.0.
+            low_water (int, optional): number of remaining requests below which
+                calls are spread evenly until the limit resets. Defaults to 50.
+            sleep (Callable, optional): function used to wait. Defaults to
+                time.sleep.
+            clock (Callable, optional): function returning the current epoch
+                time. Defaults to time.time.
+            retry_policy (RetryPolicy, optional): policy deciding if calls that
+                failed without being throttled are retried. They are raised
+                immediately without it. Defaults to None.
+        """
+        self.max_concurrency = max_concurrency
+        self.concurrency = max_concurrency
+        self.write_interval = write_interval
+        self.max_retries = max_retries
+        self.default_wait = default_wait
+        self.max_wait = max_wait
+        self.low_water = low_water
+        self.sleep = sleep
+        self.clock = clock
+        # Rate limit state of every credential, see credential_key
+        self.limits: Dict[Any, LimitState] = {}
+        self.active = 0
+        self.success_streak = 0
+        self.throttled_count = 0
+        self.call_count = 0
+        self.retry_policy = retry_policy
+        self._condition = threading.Condition()
+
+    def limit(self, key: Any = None) -> LimitState:
+        """Return the rate limit state of a credential, creating it the first time.
+
+        Args:
+            key (optional): the key returned by credential_key. Defaults to None.
+        """
+        with self._condition:
+            if key not in self.limits:
+                self.limits[key] = LimitState()
+            return self.limits[key]
+
+    # pylint: disable=R0912
+    def call(
+        self,
+        function: Callable,
+        *args,
+        write: bool = False,
+        limit_key: Any = None,
+        **kwargs,
+    ):
+        """Run a GitHub API call once the rate limits allow it.
+
+        Throttled calls are retried after waiting for the limit to reset. Other
+        GithubExceptions are retried when the retry policy allows it, and raised
+        otherwise.
+
+        Args:
+            function (Callable): the function that executes the API call
+            write (bool, optional): if the call creates content on GitHub.
+                Defaults to False.
+            limit_key (optional): key of the credential the call counts
+                against, see credential_key. Defaults to None.
+
+        Returns:
+            the value returned by function
+        """
+        state = self.limit(limit_key)
+        attempt = 0
+        failed_attempt = 0
+        while True:
+            self._acquire(write, state)
+            try:
+                result = function(*args, **kwargs)
+            except GithubException as error:
+                self._release(False, state)
+                if not RateLimitScheduler.is_throttled(error):
+                    if self.retry_policy is None or not self.retry_policy.should_retry(
+                        error, failed_attempt, write
+                    ):
+                        raise
+                    self.retry_policy.count_retry()
+                    self.sleep(self.retry_policy.delay(failed_attempt))
+                    failed_attempt += 1
+                    continue
+                if attempt >= self.max_retries:
+                    print(
+                        f"Warning: GitHub call was throttled {attempt + 1} times, giving up."
+                    )
+                    raise
+                self._throttled(error, attempt, limit_key)
+                attempt += 1
+                continue
+            except BaseException:
+                self._release(False, state)
+                raise
+            self._release(True, state)
+            self.update_from_result(result, limit_key)
+            return result
+
+    def update_from_headers(
+        self, headers: Optional[Dict[str, str]], key: Any = None
+    ) -> None:
+        """Update the known rate limit state of a credential using the headers of a response.
+
+        Args:
+            headers (Dict[str, str]): headers of a GitHub response
+            key (optional): key of the credential that sent the request, see
+                credential_key. Defaults to None.
+        """
+        if not headers:
+            return
+        lowered = {name.lower(): value for name, value in headers.items()}
+        state = self.limit(key)
+        with self._condition:
+            now = self.clock()
+            if "x-ratelimit-remaining" in lowered:
+                state.remaining = int(lowered["x-ratelimit-remaining"])
+            if "x-ratelimit-reset" in lowered:
+                state.reset_time = float(lowered["x-ratelimit-reset"])
+            if "retry-after" in lowered:
+                state.blocked_until = max(
+                    state.blocked_until, now + float(lowered["retry-after"])
+                )
+            elif state.remaining == 0 and state.reset_time:
+                state.blocked_until = max(state.blocked_until, state.reset_time)
+
+    def update_from_result(self, result, key: Any = None) -> None:
+        """Update the known rate limit state using the response a result was built from.
+
+        PyGithub objects keep the headers of the response that created them,
+        so every call updates the state with its own response instead of the
+        latest response of any thread. The state of the credential that
+        created the result is updated, which is not the one of the call for
+        repos returned by a CredentialPool.
+
+        Args:
+            result: the value returned by a GitHub API call
+            key (optional): key of the credential of the call, used when the
+                result does not tell its own. Defaults to None.
+        """
+        # raw_headers would request incomplete objects, _headers never does
+        headers = getattr(result, "_headers", None)
+        if isinstance(headers, dict):
+            result_key = credential_key(result)
+            self.update_from_headers(
+                {name: str(value) for name, value in headers.items()},
+                key if result_key is None else result_key,
+            )
+
+    def update_from_api(self, api_object) -> None:
+        """Update the known rate limit state from an authenticated Github object.
+
+        PyGithub keeps the rate limit headers of the latest response, objects
+        without that information (such as mock APIs) are ignored.
+
+        Args:
+            api_object (Github): an authenticated Github object
+        """
+        if not hasattr(api_object, "rate_limiting_resettime"):
+            return
+        remaining, _ = api_object.rate_limiting
+        self.update_from_headers(
+            {
+                "X-RateLimit-Remaining": str(remaining),
+                "X-RateLimit-Reset": str(api_object.rate_limiting_resettime),
+            },
+            credential_key(api_object),
+        )
+
+    def wrap(self, target):
+        """Return a proxy of target that schedules all of its method calls.
+
+        Args:
+            target: a Github object or any object returned by it
+        """
+        if isinstance(target, (*tracing.PLAIN_TYPES, ScheduledProxy)):
+            return target
+        return ScheduledProxy(target, self)
+
+    def run(
+        self, entries: Iterable, api_object, callback: Optional[Callable] = None
+    ) -> None:
+        """Post all entries concurrently using a scheduled api object.
+
+        Args:
+            entries (Iterable[Entry]): the entries to post
+            api_object (Github): an authenticated Github object
+            callback (Callable, optional): function called with every entry
+                right after it is posted. Defaults to None.
+        """
+        scheduled_api = self.wrap(api_object)
+        # Entries are posted in other threads, which do not share the active span
+        parent_span = tracing.current_span()
+
+        def post_entry(entry):
+            with tracing.entry_span(entry, parent_span):
+                entry.post(scheduled_api)
+            if callback:
+                callback(entry)
+
+        # Entries are taken from the iterable only when a worker is about to
+        # be free, so lazy iterables are not read far ahead of posting
+        with ThreadPoolExecutor(max_workers=self.max_concurrency) as executor:
+            in_flight: Set[Future] = set()
+            for entry in entries:
+                if len(in_flight) >= self.max_concurrency * 2:
+                    done, in_flight = wait(in_flight, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        future.result()
+                in_flight.add(executor.submit(post_entry, entry))
+            for future in in_flight:
+                future.result()
+
+    @staticmethod
+    def is_throttled(error: GithubException) -> bool:
+        """Check if a GithubException was caused by a primary or secondary rate limit.
+
+        Args:
+            error (GithubException): the error raised by PyGithub
+
+        Returns:
+            bool
+        """
+        if error.status not in THROTTLE_STATUSES:
+            return False
+        headers = {key.lower(): value for key, value in (error.headers or {}).items()}
+        if "retry-after" in headers or headers.get("x-ratelimit-remaining") == "0":
+            return True
+        return "rate limit" in str(error.data).lower()
+
+    def _acquire(self, write: bool, state: LimitState) -> None:
+        """Wait until a call can start without exceeding the limits of its credential."""
+        while True:
+            with self._condition:
+                while self.active >= self.concurrency:
+                    self._condition.wait()
+                wait_time = self._wait_time(write, state)
+                if wait_time <= 0:
+                    now = self.clock()
+                    self.active += 1
+                    self.call_count += 1
+                    state.next_call = now + self._spread_interval(now, state)
+                    if write:
+                        state.next_write = now + self.write_interval
+                    return
+            self.sleep(min(wait_time, self.max_wait))
+
+    def _release(self, success: bool, state: LimitState) -> None:
+        """Free a concurrency slot and grow the concurrency after successful calls."""
+        with self._condition:
+            self.active -= 1
+            if success:
+                self.success_streak += 1
+                if (
+                    self.success_streak >= self.concurrency * 10
+                    and self.concurrency < self.max_concurrency
+                ):
+                    self.concurrency += 1
+                    self.success_streak = 0
+                if state.remaining is not None and state.remaining > 0:
+                    state.remaining -= 1
+            self._condition.notify_all()
+
+    def _throttled(self, error: GithubException, attempt: int, key: Any) -> None:
+        """Shrink the concurrency and block the credential until its limit resets."""
+        self.throttled_count += 1
+        self.update_from_headers(error.headers, key)
+        state = self.limit(key)
+        with self._condition:
+            self.concurrency = max(1, self.concurrency // 2)
+            self.success_streak = 0
+            now = self.clock()
+            if state.blocked_until <= now:
+                state.blocked_until = now + min(
+                    self.default_wait * (2**attempt), self.max_wait
+                )
+            self._condition.notify_all()
+
+    def _wait_time(self, write: bool, state: LimitState) -> float:
+        """Return the number of seconds to wait before the next call of a credential may start."""
+        now = self.clock()
+        start = max(state.blocked_until, state.next_call)
+        if write:
+            start = max(start, state.next_write)
+        return start - now
+
+    def _spread_interval(self, now: float, state: LimitState) -> float:
+        """Return the pause needed to make the remaining requests last until the reset."""
+        if state.remaining is None or state.reset_time is None:
+            return 0.0
+        if state.remaining >= self.low_water or state.reset_time <= now:
+            return 0.0
+        return (state.reset_time - now) / max(state.remaining, 1)
+
+
+class CallRunner(Protocol):
+    """Run the method calls of a ScheduledProxy and wrap their results.
+
+    RateLimitScheduler and RetryPolicy both run the calls of the proxies they
+    wrap, pacing them or retrying them.
+    """
+
+    def call(self, function: Callable, *args, write: bool = False, **kwargs) -> Any:
+        """Run a call, passing limit_key as a keyword argument."""
+
+    def wrap(self, target) -> Any:
+        """Return a proxy of target running its method calls."""
+
+
+class ScheduledProxy(tracing.Proxy):
+    """Forward attribute access to a target and schedule its method calls."""
+
+    def __init__(self, target, scheduler: CallRunner) -> None:
+        """Create a ScheduledProxy object.
+
+        Args:
+            target: object to forward attributes to
+            scheduler (CallRunner): the scheduler or retry policy running the
+                calls
+        """
+        super().__init__(target)
+        self._scheduler = scheduler
+        self._limit_key = credential_key(target)
+
+    def __getattr__(self, name: str):
+        """Return the attribute of the target, scheduling it if it's a method.
+
+        Reading a property of an incomplete PyGithub object requests the rest
+        of the object, so the read is scheduled as well.
+        """
+        if getattr(self._target, "completed", True) is False and not callable(
+            getattr(type(self._target), name, None)
+        ):
+            attribute = self._scheduler.call(
+                getattr, self._target, name, limit_key=self._limit_key
+            )
+        else:
+            attribute = getattr(self._target, name)
+        if not callable(attribute):
+            if isinstance(attribute, GITHUB_TYPES):
+                return self._scheduler.wrap(attribute)
+            return attribute
+
+        def scheduled(*args, **kwargs):
+            result = self._scheduler.call(
+                attribute,
+                *args,
+                write=name.startswith(WRITE_PREFIXES),
+                limit_key=self._limit_key,
+                **kwargs,
+            )
+            return self._scheduler.wrap(result)
+
+        return scheduled
+
+    def __getitem__(self, key):
+        """Schedule indexing of paginated lists, only when a page has to be fetched."""
+        if isinstance(self._target, PaginatedListBase) and isinstance(key, int):
+            if key >= 0:
+                self._fetch_to(key)
+            return self._scheduler.wrap(loaded_items(self._target)[key])
+        return self._scheduler.wrap(
+            self._scheduler.call(
+                self._target.__getitem__, key, limit_key=self._limit_key
+            )
+        )
+
+    def __iter__(self):
+        """Iterate the target, scheduling the pages fetched by paginated lists.
+
+        Items of fetched pages are read without a request, so only the page
+        fetches are paced and counted against the rate limits. A page whose
+        request failed is requested again when the call is retried.
+        """
+        if not isinstance(self._target, PaginatedListBase):
+            for item in self._target:
+                yield self._scheduler.wrap(item)
+            return
+        index = 0
+        while self._fetch_to(index):
+            yield self._scheduler.wrap(loaded_items(self._target)[index])
+            index += 1
+
+    def _fetch_to(self, index: int) -> bool:
+        """Fetch the pages of a paginated list up to an index, one scheduled call per page.
+
+        Returns:
+            bool: True when the list has an item at the index
+        """
+        paginated = self._target
+        # pylint: disable=W0212
+        while len(loaded_items(paginated)) <= index and paginated._couldGrow():
+            self._scheduler.call(paginated._grow, limit_key=self._limit_key)
+        return len(loaded_items(paginated)) > index
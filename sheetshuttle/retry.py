@@ -0,0 +1,356 @@
+"""Retry transient GitHub errors, stop posting to failing repos, and report failures."""
+
+import json
+import random
+import threading
+import time
+from datetime import datetime, timezone
+from typing import Callable, Dict, List, Optional
+
+import requests  # type: ignore[import]
+from github.GithubException import GithubException
+
+from sheetshuttle.rate_limit import RateLimitScheduler, ScheduledProxy
+from sheetshuttle.tracing import PLAIN_TYPES
+
+# Server errors that usually succeed when the request is sent again
+RETRYABLE_STATUSES = (500, 502, 503, 504)
+# Network errors raised by requests before a response is received
+RETRYABLE_NETWORK_ERRORS = (
+    requests.exceptions.ConnectionError,
+    requests.exceptions.Timeout,
+)
+# Network errors raised before the request reached GitHub, the only transient
+# errors retried for calls creating content, which may have succeeded otherwise
+UNSENT_NETWORK_ERRORS = (requests.exceptions.ConnectTimeout,)
+
+
+class CircuitBreaker:
+    """Stop posting to a repo after it failed too many times in a row.
+
+    A repo whose circuit is open is skipped until reset_timeout seconds have
+    passed. A single entry is then let through, its success closes the circuit
+    and its failure opens it again.
+    """
+
+    def __init__(
+        self,
+        failure_threshold: int = 5,
+        reset_timeout: float = 300.0,
+        clock: Callable[[], float] = time.time,
+    ) -> None:
+        """Create a CircuitBreaker object.
+
+        Args:
+            failure_threshold (int, optional): consecutive failures that open
+                the circuit of a repo. Defaults to 5.
+            reset_timeout (float, optional): seconds before an open circuit
+                lets a trial entry through. Defaults to 300.0.
+            clock (Callable, optional): function returning the current epoch
+                time. Defaults to time.time.
+        """
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.clock = clock
+        self.failures: Dict[str, int] = {}
+        self.opened_at: Dict[str, float] = {}
+        self._lock = threading.Lock()
+
+    def allow(self, repo: str) -> bool:
+        """Check if an entry of the repo may be posted.
+
+        Args:
+            repo (str): name of the repo, structured as 'org/repo_name'
+        """
+        with self._lock:
+            if repo not in self.opened_at:
+                return True
+            if self.clock() - self.opened_at[repo] < self.reset_timeout:
+                return False
+            # Half open, let one trial through and wait for its outcome
+            self.opened_at[repo] = self.clock()
+            return True
+
+    def record_success(self, repo: str) -> None:
+        """Close the circuit of the repo."""
+        with self._lock:
+            self.failures.pop(repo, None)
+            self.opened_at.pop(repo, None)
+
+    def record_failure(self, repo: str) -> None:
+        """Count a failure and open the circuit once the threshold is reached."""
+        with self._lock:
+            self.failures[repo] = self.failures.get(repo, 0) + 1
+            if self.failures[repo] >= self.failure_threshold:
+                if repo not in self.opened_at:
+                    print(
+                        f"Warning: {repo} failed {self.failures[repo]} times in a row, "
+                        f"skipping its entries for {self.reset_timeout} seconds."
+                    )
+                self.opened_at[repo] = self.clock()
+
+    def is_open(self, repo: str) -> bool:
+        """Check if the circuit of the repo is open."""
+        with self._lock:
+            return repo in self.opened_at
+
+
+class FailureReport:
+    """Collect the entries that could not be posted, with enough detail to retry them."""
+
+    def __init__(self) -> None:
+        """Create an empty FailureReport object."""
+        self.failures: List[Dict] = []
+        self._lock = threading.Lock()
+
+    def add(self, entry, reason: str) -> None:
+        """Add a failed entry to the report.
+
+        Args:
+            entry (Entry): the entry that was not posted
+            reason (str): "failed" when GitHub returned an error, or
+                "circuit_open" when the entry was skipped
+        """
+        result = entry.result
+        failure = {
+            "reason": reason,
+            "type": entry.type,
+            "action": entry.action,
+            "repo": entry.repo,
+            "status": None if result is None else result.error_status,
+            "error": None if result is None else result.error,
+            "failed_at": datetime.now(timezone.utc).isoformat(),
+            "config": entry.to_config(),
+        }
+        with self._lock:
+            self.failures.append(failure)
+
+    def __len__(self) -> int:
+        """Return the number of failed entries."""
+        return len(self.failures)
+
+    def to_dict(self) -> Dict:
+        """Return the report with a summary of failures per repo."""
+        with self._lock:
+            failures = list(self.failures)
+        per_repo: Dict[str, int] = {}
+        for failure in failures:
+            per_repo[failure["repo"]] = per_repo.get(failure["repo"], 0) + 1
+        return {"count": len(failures), "per_repo": per_repo, "failures": failures}
+
+    def write(self, path: str) -> None:
+        """Write the report to a JSON file.
+
+        Args:
+            path (str): destination of the report
+        """
+        with open(path, "w", encoding="utf-8") as report_file:
+            json.dump(self.to_dict(), report_file, indent=2)
+
+    @staticmethod
+    def load_configs(path: str) -> List[Dict]:
+        """Read the configurations of the failed entries of a report.
+
+        The result can be given to GithubManager.add_entries to post them again.
+
+        Args:
+            path (str): a report written by FailureReport.write
+        """
+        with open(path, "r", encoding="utf-8") as report_file:
+            return [failure["config"] for failure in json.load(report_file)["failures"]]
+
+
+# pylint: disable=R0902
+class RetryPolicy:
+    """Retry GitHub calls that failed with transient errors using jittered backoff.
+
+    Errors are classified as throttled (left to the RateLimitScheduler),
+    retryable (server and network errors), or permanent (anything else, such as
+    404 and 422). Retryable calls wait a random time between zero and an
+    exponentially growing bound, so that parallel workers do not retry in
+    lockstep.
+
+    Calls creating content, such as create_issue and create_pull, are not
+    retried after server errors, since GitHub may have created the content
+    before failing and a retry would post it twice.
+    """
+
+    # pylint: disable=R0913
+    def __init__(
+        self,
+        max_attempts: int = 5,
+        base_delay: float = 1.0,
+        max_delay: float = 60.0,
+        breaker: Optional[CircuitBreaker] = None,
+        sleep: Callable[[float], None] = time.sleep,
+        jitter: Callable[[], float] = random.random,
+        clock: Callable[[], float] = time.time,
+    ) -> None:
+        """Create a RetryPolicy object.
+
+        Args:
+            max_attempts (int, optional): number of times a call is tried,
+                including the first one. Defaults to 5.
+            base_delay (float, optional): bound of the first wait in seconds,
+                doubled with every attempt. Defaults to 1.0.
+            max_delay (float, optional): upper bound of a single wait in
+                seconds. Defaults to 60.0.
+            breaker (CircuitBreaker, optional): circuit breaker used when
+                posting entries. Defaults to a CircuitBreaker with default
+                settings.
+            sleep (Callable, optional): function used to wait. Defaults to
+                time.sleep.
+            jitter (Callable, optional): function returning a random number in
+                [0, 1). Defaults to random.random.
+            clock (Callable, optional): function returning the current epoch
+                time, used with the X-RateLimit-Reset header. Defaults to
+                time.time.
+        """
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.breaker = breaker if breaker is not None else CircuitBreaker()
+        self.report = FailureReport()
+        self.sleep = sleep
+        self.jitter = jitter
+        self.clock = clock
+        self.retry_count = 0
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def classify(error: Exception) -> str:
+        """Return "throttled", "retryable", or "permanent" for an error.
+
+        Args:
+            error (Exception): the error raised by a GitHub call
+        """
+        if isinstance(error, RETRYABLE_NETWORK_ERRORS):
+            return "retryable"
+        if not isinstance(error, GithubException):
+            return "permanent"
+        if RateLimitScheduler.is_throttled(error):
+            return "throttled"
+        if error.status in RETRYABLE_STATUSES:
+            return "retryable"
+        return "permanent"
+
+    def delay(self, attempt: int) -> float:
+        """Return the seconds to wait before retrying, with full jitter.
+
+        Args:
+            attempt (int): number of the failed attempt, starting at 0
+        """
+        return self.jitter() * min(self.max_delay, self.base_delay * 2**attempt)
+
+    def throttle_delay(self, error: Exception, attempt: int) -> float:
+        """Return the seconds to wait before retrying a throttled call.
+
+        The Retry-After header is used first, then the X-RateLimit-Reset
+        header when no requests remain, and the jittered backoff otherwise.
+
+        Args:
+            error (Exception): the rate limit error
+            attempt (int): number of the failed attempt, starting at 0
+        """
+        error_headers = getattr(error, "headers", None) or {}
+        headers = {key.lower(): value for key, value in error_headers.items()}
+        if "retry-after" in headers:
+            return float(headers["retry-after"])
+        if (
+            headers.get("x-ratelimit-remaining") == "0"
+            and "x-ratelimit-reset" in headers
+        ):
+            return max(float(headers["x-ratelimit-reset"]) - self.clock(), 0.0)
+        return self.delay(attempt)
+
+    def should_retry(self, error: Exception, attempt: int, write: bool = False) -> bool:
+        """Check if a call that failed with error should be tried again.
+
+        Throttled errors are retried here as well when no scheduler handles them.
+
+        Args:
+            error (Exception): the error raised by the call
+            attempt (int): number of the failed attempt, starting at 0
+            write (bool, optional): if the call creates content on GitHub, in
+                which case only throttled calls and calls that did not reach
+                GitHub are retried. Defaults to False.
+        """
+        if attempt + 1 >= self.max_attempts:
+            return False
+        kind = RetryPolicy.classify(error)
+        if kind == "retryable" and write:
+            return isinstance(error, UNSENT_NETWORK_ERRORS)
+        return kind != "permanent"
+
+    def count_retry(self) -> None:
+        """Count a retried call, from any of the posting threads."""
+        with self._lock:
+            self.retry_count += 1
+
+    def call(self, function: Callable, *args, write: bool = False, **kwargs):
+        """Run a GitHub call, retrying it after transient errors.
+
+        Without a RateLimitScheduler, throttled calls wait for the time given
+        by the rate limit headers of the error.
+
+        Args:
+            function (Callable): the function that executes the API call
+            write (bool, optional): if the call creates content on GitHub.
+                Defaults to False.
+            limit_key (optional): key of the credential of the call, accepted
+                like RateLimitScheduler.call does. Retries wait the same way
+                for every credential. Defaults to None.
+
+        Returns:
+            the value returned by function
+        """
+        kwargs.pop("limit_key", None)
+        attempt = 0
+        while True:
+            try:
+                return function(*args, **kwargs)
+            except (GithubException, *RETRYABLE_NETWORK_ERRORS) as error:
+                if not self.should_retry(error, attempt, write):
+                    raise
+                self.count_retry()
+                if RetryPolicy.classify(error) == "throttled":
+                    self.sleep(self.throttle_delay(error, attempt))
+                else:
+                    self.sleep(self.delay(attempt))
+                attempt += 1
+
+    def wrap(self, target):
+        """Return a proxy of target that retries all of its method calls.
+
+        Args:
+            target: a Github object or any object returned by it
+        """
+        if isinstance(target, (*PLAIN_TYPES, ScheduledProxy)):
+            return target
+        return ScheduledProxy(target, self)
+
+    def admit(self, entry) -> bool:
+        """Check the circuit breaker before posting an entry.
+
+        Skipped entries are marked as failed and added to the report.
+
+        Args:
+            entry (Entry): the entry about to be posted
+        """
+        if self.breaker.allow(entry.repo):
+            return True
+        entry.set_failed(error=f"circuit open for {entry.repo}")
+        self.report.add(entry, "circuit_open")
+        return False
+
+    def record(self, entry) -> None:
+        """Update the circuit breaker and the report after an entry was posted.
+
+        Args:
+            entry (Entry): the entry that was just posted
+        """
+        if entry.posted:
+            self.breaker.record_success(entry.repo)
+            return
+        self.breaker.record_failure(entry.repo)
+        self.report.add(entry, "failed")
@@ -4,26 +4,34 @@ import json
 import os
 import pathlib
 import pickle
-from typing import Dict, List
+from typing import Dict, Iterable, Iterator, List, Optional, TextIO
 
+import numpy as np
 import pandas as pd  # type: ignore[import]
 import yaml
 from google.oauth2 import service_account  # type: ignore[import]
 from googleapiclient.discovery import build  # type: ignore[import]
 from jsonschema import validate
+from rich.console import Console
 
-from sheetshuttle import util
+from sheetshuttle import compact as compaction
+from sheetshuttle import preview, profiling, tables, tracing, util, views
 
 SCOPES = ["https://www.googleapis.com/auth/spreadsheets"]
 CONFIG_SCHEMA = {
     "type": "object",
     "properties": {
         "source_id": {"type": "string"},
+        "compact": {"type": "boolean"},
         "sheets": {
             "type": "array",
             "items": {"$ref": "#/$defs/sheet"},
             "minItems": 1,
         },
+        "views": {
+            "type": "array",
+            "items": {"$ref": "#/$defs/view"},
+        },
     },
     "required": ["source_id", "sheets"],
     "$defs": {
@@ -40,6 +48,8 @@ CONFIG_SCHEMA = {
                     "minItems": 1,
                 },
                 "fill": {"type": "boolean"},
+                "compact": {"type": "boolean"},
+                "key": {"type": "string"},
                 "types": {
                     "anyOf": [
                         {
@@ -88,6 +98,37 @@ CONFIG_SCHEMA = {
             },
             "required": ["name", "regions"],
         },
+        "view": {
+            "type": "object",
+            "properties": {
+                "name": {"type": "string"},
+                "join": {
+                    "type": "array",
+                    "items": {"type": "string"},
+                    "minItems": 1,
+                },
+                "how": {"type": "string", "enum": ["inner", "outer", "left"]},
+                "filter": {
+                    "type": "array",
+                    "items": {"$ref": "#/$defs/condition"},
+                },
+                "columns": {
+                    "type": "array",
+                    "items": {"type": "string"},
+                    "minItems": 1,
+                },
+            },
+            "required": ["name", "join"],
+        },
+        "condition": {
+            "type": "object",
+            "properties": {
+                "column": {"type": "string"},
+                "op": {"type": "string", "enum": list(views.FILTER_OPERATIONS)},
+                "value": {},
+            },
+            "required": ["column", "op"],
+        },
     },
 }
 
@@ -109,10 +150,13 @@ class MissingAuthenticationVariable(Exception):
     """Raised when a Sheets authentication variable is missing."""
 
 
+# pylint: disable=R0902
 class SheetCollector:
     """Authenticate Sheets api and store retrieved data."""
 
-    def __init__(self, key_file=".env", sources_dir="config/sheet_sources") -> None:
+    def __init__(
+        self, key_file=".env", sources_dir="config/sheet_sources", compact=False
+    ) -> None:
         """
         Create a SheetCollector object that stores a dictionary of sheets.
 
@@ -124,6 +168,9 @@ class SheetCollector:
 
             sources_dir (str, optional): path to where the configuration
             is stored. Defaults to "config/sheet_sources"
+
+            compact (bool, optional): compact the data of the regions whose
+            configuration does not set compact. Defaults to False.
         """
         self.key_file: str = key_file
         (
@@ -132,7 +179,9 @@ class SheetCollector:
             self.sheets,
         ) = SheetCollector.authenticate_api(self.key_file)
         self.config_dir = pathlib.Path(sources_dir)
+        self.compact = compact
         self.sheets_data: Dict[str, Sheet] = {}
+        self.views = views.Views(self.sheets_data)
 
     def print_contents(self) -> None:
         """Print all Sheet objects in self.sheets_data."""
@@ -154,18 +203,89 @@ class SheetCollector:
         config_files: List[pathlib.Path] = util.get_yaml_files(self.config_dir)
         if not config_files:
             raise Exception(f"ERROR: No configuration files found in {self.config_dir}")
+        with profiling.phase("collect"), tracing.span(
+            "collect", directory=str(self.config_dir)
+        ):
+            for yaml_file in config_files:
+                with tracing.span("config file", path=str(yaml_file)):
+                    self.load_sheet(yaml_file).collect_regions()
+
+    def iter_regions(
+        self, config_files: Optional[List[pathlib.Path]] = None
+    ) -> Iterator["Region"]:
+        """Collect regions one at a time, yielding each one as soon as it is retrieved.
+
+        Sheets are added to sheets_data before their regions are collected, and
+        regions are added to their Sheet as they are yielded.
+
+        Args:
+            config_files (List[pathlib.Path], optional): configuration files to
+                collect. Defaults to the yaml files in the config directory.
+
+        Raises:
+            Exception: thrown when the Google Sheets API is not authenticated.
+        """
+        if not self.sheets:
+            raise Exception("ERROR: Collector was not authenticated")
+        if config_files is None:
+            config_files = util.get_yaml_files(self.config_dir)
         for yaml_file in config_files:
-            # Open yaml file as read
-            with open(yaml_file, "r", encoding="utf-8") as config_file:
-                config_data = yaml.safe_load(config_file)
-                # create sheet object using the yaml data
-                sheet_obj = Sheet(config_data, self.sheets)
-                # fill the sheet object with the regions
-                # by excecuting API calls
-                sheet_obj.collect_regions()
-                # store the sheet object in sheet_data, use the yaml file name
-                # as key
-                self.sheets_data[yaml_file.stem] = sheet_obj
+            # fill the sheet object with the regions by excecuting API calls
+            yield from self.load_sheet(yaml_file).iter_regions()
+
+    def load_sheet(self, yaml_file: pathlib.Path) -> "Sheet":
+        """Create a Sheet from a configuration file and store it in sheets_data.
+
+        Args:
+            yaml_file (pathlib.Path): path to the sheet configuration file
+
+        Returns:
+            Sheet: the sheet, without its regions
+        """
+        # Open yaml file as read
+        with open(yaml_file, "r", encoding="utf-8") as config_file:
+            config_data = yaml.safe_load(config_file)
+        # create sheet object using the yaml data
+        sheet_obj = Sheet(config_data, self.sheets, compact=self.compact)
+        # store the sheet object in sheet_data, use the yaml file name
+        # as key
+        self.sheets_data[yaml_file.stem] = sheet_obj
+        # Views are evaluated again from the new regions
+        self.views.clear()
+        return sheet_obj
+
+    def view(self, name: str) -> "Region":
+        """Return a view declared in the configuration files, evaluating it once.
+
+        Args:
+            name (str): name of the view
+
+        Returns:
+            Region: the rows of the view, keyed like its first joined region
+        """
+        return self.views.get(name)
+
+    def memory_report(self) -> List[compaction.RegionMemory]:
+        """Return the memory use of every collected region.
+
+        Returns:
+            List[RegionMemory]: the size of every region, and its size
+                before compaction for compacted regions
+        """
+        return compaction.memory_report(self.sheets_data)
+
+    def preview(self, console: Optional[Console] = None, **options) -> int:
+        """Collect the regions and print a preview of each one as soon as it is retrieved.
+
+        Args:
+            console (Console, optional): rich console to print to. Defaults to
+                a console writing to the terminal.
+            **options: head, tail, sample, and seed of preview.preview_region
+
+        Returns:
+            int: number of previewed regions
+        """
+        return preview.preview_regions(self.iter_regions(), console, **options)
 
     @staticmethod
     def authenticate_api(key_file):
@@ -225,80 +345,142 @@ class SheetCollector:
 class Sheet:
     """Retrieve Google Sheets data and store as Regions."""
 
-    def __init__(self, config: Dict, sheets_api) -> None:
+    def __init__(self, config: Dict, sheets_api, compact=False) -> None:
         """Initialize a Sheet object.
 
         Args:
             config (Dict): a dictionary containing file
                 sheets file retrieval configuration
             sheets_api: authenticated sheets api object
+            compact (bool, optional): compact the data of the regions when
+                neither the region nor the file configuration set compact.
+                Defaults to False.
         """
         self.api = sheets_api
         self.config: Dict = config
         Sheet.check_config_schema(self.config)
-        self.tabs: Dict[str, Tab] = {}
+        self.compact: bool = self.config.get("compact", compact)
+        # Regions of every tab, keyed by tab name and region name
+        self.tabs: Dict[str, Dict[str, "Region"]] = {}
 
     def collect_regions(self):
         """Iterate through configuration and request data through API."""
+        with tracing.span("collect regions", spreadsheet_id=self.config["source_id"]):
+            for _ in self.iter_regions():
+                pass
+
+    def iter_regions(self) -> Iterator["Region"]:
+        """Request the data of every region, yielding each Region once it is stored."""
         # Extract ID if URL used as source_id
         if "/" in self.config["source_id"]:
             self.config["source_id"] = util.extract_sheet_id(self.config["source_id"])
         for sheet in self.config["sheets"]:
-            regions_dict = {}
+            regions_dict: Dict[str, Region] = {}
+            self.tabs[sheet["name"]] = regions_dict
             for region in sheet["regions"]:
-                region_data = Sheet.execute_sheets_call(
-                    self.api,
-                    self.config["source_id"],
-                    sheet["name"],
-                    region["start"],
-                    region["end"],
+                with profiling.phase(
+                    f"region {sheet['name']}/{region['name']}", report=False
+                ) as record, tracing.span(
+                    "region",
+                    spreadsheet_id=self.config["source_id"],
+                    region=region["name"],
+                    range=f"{sheet['name']}!{region['start']}:{region['end']}",
+                ) as span:
+                    region_object = self.collect_region(sheet["name"], region)
+                    if span is not None:
+                        span.set(
+                            rows=region_object.data.shape[0],
+                            columns=region_object.data.shape[1],
+                        )
+                if record is not None:
+                    record.set_data(region_object.data)
+                regions_dict[region_object.region_name] = region_object
+                yield region_object
+
+    def collect_region(self, tab_name: str, region: Dict) -> "Region":
+        """Request the data of a region and convert it to a Region.
+
+        Args:
+            tab_name (str): name of the tab the region is in
+            region (Dict): the configuration of the region
+        """
+        with tracing.span("fetch") as span:
+            region_data = Sheet.execute_sheets_call(
+                self.api,
+                self.config["source_id"],
+                tab_name,
+                region["start"],
+                region["end"],
+            )
+            if span is not None:
+                span.set(
+                    rows=len(region_data),
+                    bytes=sum(len(str(cell)) for row in region_data for cell in row),
                 )
-                if "fill" in region and region["fill"]:
-                    # Find region dimensions
-                    columns, rows = util.calculate_dimensions(
-                        region["start"], region["end"]
-                    )
-                    region_data = util.fill_to_dimensions(region_data, columns, rows)
-                # set the default type as string
-                types = "string"
-                if "types" in region:
-                    types = region["types"]
-                if region["contains_headers"]:
-                    data = Sheet.to_dataframe(region_data, types=types)
-                else:
-                    data = Sheet.to_dataframe(
-                        region_data,
-                        headers_in_data=False,
-                        headers=region["headers"],
-                        types=types,
-                    )
-                region_object = Region(
-                    region["name"],
-                    sheet["name"],
-                    region["start"],
-                    region["end"],
-                    data,
+        if "fill" in region and region["fill"]:
+            # Find region dimensions
+            columns, rows = util.calculate_dimensions(region["start"], region["end"])
+            region_data = util.fill_to_dimensions(region_data, columns, rows)
+        # set the default type as string
+        types = "string"
+        if "types" in region:
+            types = region["types"]
+        with tracing.span("convert", rows=len(region_data)):
+            if region["contains_headers"]:
+                data = Sheet.to_dataframe(region_data, types=types)
+            else:
+                data = Sheet.to_dataframe(
+                    region_data,
+                    headers_in_data=False,
+                    headers=region["headers"],
+                    types=types,
                 )
-                regions_dict[region_object.region_name] = region_object
-            self.tabs[sheet["name"]] = regions_dict
+        if "key" in region and region["key"] not in data.columns:
+            raise Exception(
+                f"ERROR: key column {region['key']} not found in region "
+                f"{tab_name}/{region['name']}"
+            )
+        original_size = None
+        if region.get("compact", self.compact):
+            with tracing.span("compact") as span:
+                original_size = compaction.data_size(data)
+                data = compaction.compact_dataframe(data)
+                if span is not None:
+                    span.set(
+                        size=compaction.data_size(data), original_size=original_size
+                    )
+        region_object = Region(
+            region["name"],
+            tab_name,
+            region["start"],
+            region["end"],
+            data,
+            key=region.get("key"),
+        )
+        region_object.original_size = original_size
+        return region_object
 
     def get_tab(self, tab_name: str):
-        """Return a Tab object from the tabs dictionary.
+        """Return the regions of a tab from the tabs dictionary.
 
         Args:
-            tab_name (str): name of the Tab to get
+            tab_name (str): name of the tab to get
 
         Returns:
-            Tab: the Tab object from the self.tabs dictionary
+            Dict[str, Region]: the regions of the tab, keyed by region name
         """
-        requested_tab: Tab = self.tabs[tab_name]
+        requested_tab: Dict[str, Region] = self.tabs[tab_name]
         return requested_tab
 
     def print_sheet(self):
-        """Iterate through self.regions and print the contents."""
-        for tab_name, tab_obj in self.tabs.items():
+        """Iterate through the regions of every tab and print the contents."""
+        for tab_name, regions in self.tabs.items():
             print(f"******\t {tab_name} \t ******")
-            tab_obj.print_tab()
+            print(f"\t- Tab name: {tab_name}")
+            for region_name, region_obj in regions.items():
+                print(f"###############  {region_name} ###############")
+                region_obj.print_region()
+                print("##########################################")
             print("*********************************")
 
     @staticmethod
@@ -381,6 +563,7 @@ class Sheet:
         )
 
 
+# pylint: disable=R0902
 class Region:
     """Store data frame and metadata about Google Sheet region."""
 
@@ -392,6 +575,7 @@ class Region:
         start_range: str,
         end_range: str,
         data: pd.DataFrame,
+        key: Optional[str] = None,
     ) -> None:
         """Create a Region object.
 
@@ -401,6 +585,8 @@ class Region:
             start_range (str): Cell name to start from (eg. A4)
             end_range (str): Cell name to end at (eg. H5)
             data (pd.DataFrame): Data in the region
+            key (str, optional): label of the column identifying the rows,
+                such as "Student GitHub". Defaults to None.
         """
         self.region_name = region_name
         self.parent_sheet_name = parent_sheet_name
@@ -408,12 +594,106 @@ class Region:
         self.start_range = start_range
         self.end_range = end_range
         self.data: pd.DataFrame = data
+        # Memory use of the data before it was compacted, in bytes
+        self.original_size: Optional[int] = None
+        self.key = key
+        # Positions of the rows by key, built for the data frame it indexes
+        self.key_positions: Optional[pd.Series] = None
+        self.indexed_data: Optional[pd.DataFrame] = None
+
+    def key_index(self) -> pd.Series:
+        """Return the position of every row by its key, building it on first use.
+
+        Rows with a missing key are left out. The index is built again when
+        data is replaced by another data frame.
+
+        Raises:
+            Exception: thrown when the region has no key column or when the
+                key column has duplicate values
+
+        Returns:
+            pd.Series: the row positions, indexed by key
+        """
+        if self.key is None:
+            raise Exception(f"ERROR: region {self.full_name} has no key column")
+        if self.key_positions is None or self.indexed_data is not self.data:
+            keys = self.data[self.key]
+            present = keys.notna().to_numpy()
+            positions = pd.Series(
+                np.flatnonzero(present),
+                index=pd.Index(keys[present], name=self.key),
+            )
+            if not positions.index.is_unique:
+                duplicates = positions.index[positions.index.duplicated()].unique()
+                raise Exception(
+                    f"ERROR: key column {self.key} of region {self.full_name} "
+                    f"has duplicate values: {list(duplicates)}"
+                )
+            self.key_positions = positions
+            self.indexed_data = self.data
+        return self.key_positions
+
+    def lookup(self, key) -> pd.Series:
+        """Return the row with the given key.
+
+        Args:
+            key: value of the key column
+
+        Raises:
+            KeyError: thrown when no row has the key
+
+        Returns:
+            pd.Series: the row, named by its key
+        """
+        positions = self.key_index()
+        try:
+            location = positions.index.get_loc(key)
+        except KeyError:
+            raise KeyError(f"{key} not found in region {self.full_name}") from None
+        row = self.data.iloc[int(positions.iloc[location])]
+        row.name = key
+        return row
+
+    def take(self, keys: Iterable) -> pd.DataFrame:
+        """Return the rows with the given keys, in the order of the keys.
+
+        Args:
+            keys (Iterable): values of the key column
+
+        Raises:
+            KeyError: thrown when some keys are not found
+
+        Returns:
+            pd.DataFrame: the rows, indexed by their key
+        """
+        positions = self.key_index()
+        requested = pd.Index(keys, name=self.key)
+        found = positions.index.get_indexer(requested)
+        if (found < 0).any():
+            missing = list(requested[found < 0])
+            raise KeyError(f"{missing} not found in region {self.full_name}")
+        rows = self.data.iloc[positions.to_numpy()[found]]
+        rows.index = requested
+        return rows
 
     def print_region(self):
         """Print the contents of the region in a markdown table format."""
         print(f"start range: {self.start_range}")
         print(f"end range: {self.end_range}")
-        print(self.data.to_markdown())
+        print(self.to_table(), end="")
+
+    def to_table(self, out: Optional[TextIO] = None, **options) -> Optional[str]:
+        """Render the region data as a Markdown, CSV, or HTML table.
+
+        Args:
+            out (TextIO, optional): file or string builder the table is
+                written to. Defaults to None, in which case the table is returned.
+            **options: table_format, max_rows, and index of tables.render
+
+        Returns:
+            Optional[str]: the table if out is None, None otherwise
+        """
+        return tables.render(self.data, out, **options)
 
     def region_to_pickle(self, directory: pathlib.PosixPath):
         """Write the region object to a Pickle file.
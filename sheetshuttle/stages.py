@@ -0,0 +1,362 @@
+"""Split plugins into stages whose results are cached under a hash of their inputs.
+
+Every stage declares the sources and stages it reads. When a pipeline runs, the
+content of every source is hashed, for instance region data with
+pd.util.hash_pandas_object, and a stage is only computed again when the hash
+of one of its inputs or its own code changed. Stage outputs are hashed as well,
+so a stage that computes the same output as before leaves the stages after it
+cached.
+"""
+
+import hashlib
+import inspect
+import json
+import os
+import pathlib
+import pickle
+import tempfile
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+import pandas as pd  # type: ignore[import]
+
+from sheetshuttle import github_objects, sheet_collector
+
+
+class Stage:
+    """A function of a pipeline and the names of its inputs."""
+
+    def __init__(
+        self,
+        name: str,
+        function: Callable,
+        inputs: Sequence[str] = (),
+        version: str = "",
+        cache: bool = True,
+    ) -> None:
+        """Create a Stage object.
+
+        Args:
+            name (str): name of the stage, used as input name by other stages
+            function (Callable): function called with the value of every input,
+                in the order of inputs
+            inputs (Sequence[str], optional): names of sources and stages the
+                function reads. Defaults to ().
+            version (str, optional): changing it recomputes the stage even if
+                its code did not change. Only the module of the function is
+                hashed, so it has to be changed when code imported from other
+                modules changes. Defaults to "".
+            cache (bool, optional): cache the output of the stage. Stages with
+                side effects on every run, such as posting, are not cached.
+                Defaults to True.
+        """
+        self.name = name
+        self.function = function
+        self.inputs = tuple(inputs)
+        self.version = version
+        self.cache = cache
+        self.code_hash = Stage.hash_code(function)
+
+    @staticmethod
+    def hash_code(function: Callable) -> str:
+        """Return a hash of the source code of the module of a function.
+
+        The whole module is hashed, so that changing a helper defined next to
+        the function recomputes the stage. The bytecode of the function is
+        hashed when the source cannot be read.
+        """
+        module = inspect.getmodule(function)
+        try:
+            code = inspect.getsource(module or function).encode("utf-8")
+        except (OSError, TypeError):
+            code = getattr(getattr(function, "__code__", None), "co_code", b"")
+        return hashlib.sha256(code).hexdigest()
+
+    def key(self, input_hashes: Iterable[str]) -> str:
+        """Return the cache key of the stage for the given input hashes."""
+        digest = hashlib.sha256()
+        for part in (self.name, self.version, self.code_hash, *input_hashes):
+            digest.update(part.encode("utf-8"))
+            digest.update(b"\0")
+        return digest.hexdigest()
+
+
+class StageCache:
+    """Store stage outputs in memory and, optionally, as pickle files in a directory."""
+
+    def __init__(self, directory: Optional[str] = None) -> None:
+        """Create a StageCache object, creating the directory if needed.
+
+        Args:
+            directory (str, optional): where outputs are stored. Outputs are
+                only kept in memory without it. Defaults to None.
+        """
+        self.directory = pathlib.Path(directory) if directory else None
+        if self.directory is not None:
+            self.directory.mkdir(parents=True, exist_ok=True)
+        self.memory: Dict[str, Tuple[str, Any]] = {}
+
+    def load(self, key: str) -> Optional[Tuple[str, Any]]:
+        """Return the output hash and output stored under key, or None."""
+        if key in self.memory:
+            return self.memory[key]
+        if self.directory is None:
+            return None
+        try:
+            with open(self.directory / f"{key}.pkl", "rb") as infile:
+                cached = pickle.load(infile)
+        except (FileNotFoundError, EOFError, pickle.UnpicklingError):
+            return None
+        self.memory[key] = cached
+        return cached
+
+    def store(self, key: str, output_hash: str, output: Any) -> None:
+        """Store the output of a stage and its hash under key."""
+        self.memory[key] = (output_hash, output)
+        if self.directory is None:
+            return
+        # Write to a temporary file first so readers never see partial files
+        descriptor, temporary_path = tempfile.mkstemp(dir=self.directory)
+        with os.fdopen(descriptor, "wb") as outfile:
+            pickle.dump((output_hash, output), outfile)
+        os.replace(temporary_path, self.directory / f"{key}.pkl")
+
+
+class Pipeline:
+    """Run stages in dependency order, computing only the ones whose inputs changed."""
+
+    def __init__(self, cache_dir: Optional[str] = None) -> None:
+        """Create an empty Pipeline object.
+
+        Args:
+            cache_dir (str, optional): directory where stage outputs are stored
+                between processes, such as ".sheetshuttle_cache/stages".
+                Outputs are only kept in memory without it. Defaults to None.
+        """
+        self.stages: Dict[str, Stage] = {}
+        self.cache = StageCache(cache_dir)
+        # "computed" or "cached" for every stage of the last run
+        self.last_run: Dict[str, str] = {}
+
+    def stage(
+        self,
+        inputs: Sequence[str] = (),
+        name: Optional[str] = None,
+        version: str = "",
+        cache: bool = True,
+    ) -> Callable:
+        """Return a decorator adding a function to the pipeline as a stage.
+
+        Args:
+            inputs (Sequence[str], optional): names of the sources and stages
+                the function reads. Defaults to ().
+            name (str, optional): name of the stage. Defaults to the name of
+                the function.
+            version (str, optional): changing it recomputes the stage, for
+                instance when code imported from other modules changed.
+                Defaults to "".
+            cache (bool, optional): cache the output of the stage.
+                Defaults to True.
+        """
+
+        def add_stage(function: Callable) -> Callable:
+            self.add_stage(
+                Stage(name or function.__name__, function, inputs, version, cache)
+            )
+            return function
+
+        return add_stage
+
+    def add_stage(self, stage: Stage) -> None:
+        """Add a stage to the pipeline.
+
+        Raises:
+            Exception: thrown when a stage with the same name exists
+        """
+        if stage.name in self.stages:
+            raise Exception(f"ERROR: stage {stage.name} is defined twice")
+        self.stages[stage.name] = stage
+
+    def run(
+        self, sources: Dict[str, Any], targets: Optional[Sequence[str]] = None
+    ) -> Dict[str, Any]:
+        """Run the stages needed for the targets, reusing cached outputs.
+
+        Args:
+            sources (Dict[str, Any]): values the stages can read by name, such
+                as regions and configurations
+            targets (Sequence[str], optional): stages to compute, with the
+                stages they depend on. Defaults to every stage.
+
+        Returns:
+            Dict[str, Any]: the output of every stage that was run or loaded
+        """
+        # Sources are only hashed when a stage reads them
+        hashes: Dict[str, str] = {}
+        values: Dict[str, Any] = dict(sources)
+        outputs: Dict[str, Any] = {}
+        self.last_run = {}
+        order = self.order(targets if targets is not None else list(self.stages))
+        for name in order:
+            stage = self.stages[name]
+            for input_name in stage.inputs:
+                if input_name not in values:
+                    raise Exception(
+                        f"ERROR: input {input_name} of stage {name} is neither "
+                        "a source nor a stage"
+                    )
+                if input_name not in hashes:
+                    hashes[input_name] = content_hash(values[input_name])
+            key = stage.key(hashes[input_name] for input_name in stage.inputs)
+            cached = self.cache.load(key) if stage.cache else None
+            if cached is None:
+                output = stage.function(
+                    *(values[input_name] for input_name in stage.inputs)
+                )
+                output_hash = content_hash(output)
+                if stage.cache:
+                    self.cache.store(key, output_hash, output)
+                self.last_run[name] = "computed"
+            else:
+                output_hash, output = cached
+                self.last_run[name] = "cached"
+            hashes[name] = output_hash
+            values[name] = output
+            outputs[name] = output
+        return outputs
+
+    def order(self, targets: Sequence[str]) -> List[str]:
+        """Return the targets and the stages they depend on, dependencies first.
+
+        Raises:
+            Exception: thrown when a target is unknown or stages depend on
+                each other in a cycle
+        """
+        order: List[str] = []
+        visiting: List[str] = []
+
+        def visit(name: str):
+            if name in order:
+                return
+            if name in visiting:
+                start = visiting.index(name)
+                cycle = " -> ".join([*visiting[start:], name])
+                raise Exception(f"ERROR: stages depend on each other: {cycle}")
+            visiting.append(name)
+            for input_name in self.stages[name].inputs:
+                if input_name in self.stages:
+                    visit(input_name)
+            visiting.pop()
+            order.append(name)
+
+        for target in targets:
+            if target not in self.stages:
+                raise Exception(f"ERROR: unknown stage {target}")
+            visit(target)
+        return order
+
+    def run_plugin(
+        self, sheets_keys_file, sheets_config_directory, gh_config_directory, **kwargs
+    ) -> Dict[str, Any]:
+        """Run the pipeline as the run function of a plugin.
+
+        Sources are every collected region, named "sheet/tab/region", the
+        "args" of the plugin, and "gh_config_directory". Sheets shared with
+        "sheetshuttle run --shared" or "sheetshuttle serve" are used when
+        available, they are collected otherwise.
+
+        Returns:
+            Dict[str, Any]: the output of every stage
+        """
+        sheets_data = kwargs.get("sheets_data")
+        if sheets_data is None:
+            my_collector = sheet_collector.SheetCollector(
+                key_file=sheets_keys_file, sources_dir=sheets_config_directory
+            )
+            my_collector.collect_files()
+            sheets_data = my_collector.sheets_data
+        sources = region_sources(sheets_data)
+        sources["args"] = kwargs.get("args", {})
+        sources["gh_config_directory"] = gh_config_directory
+        return self.run(sources)
+
+
+def region_sources(sheets_data: Dict) -> Dict[str, Any]:
+    """Return every region of the collected sheets, named "sheet/tab/region".
+
+    Args:
+        sheets_data (Dict[str, Sheet]): sheets collected by a SheetCollector
+    """
+    sources = {}
+    for sheet_name, sheet in sheets_data.items():
+        for tab_name, regions in sheet.tabs.items():
+            for region_name, region in regions.items():
+                sources[f"{sheet_name}/{tab_name}/{region_name}"] = region
+    return sources
+
+
+def content_hash(value: Any) -> str:
+    """Return a hash of the content of a value.
+
+    Data frames and series are hashed with pd.util.hash_pandas_object, regions
+    by their data and location, entries by their configuration, and containers
+    by their items. Other values are hashed through pickle.
+
+    Args:
+        value (Any): the value to hash
+    """
+    digest = hashlib.sha256()
+    _update_hash(digest, value)
+    return digest.hexdigest()
+
+
+# pylint: disable=R0912
+def _update_hash(digest, value: Any) -> None:
+    """Feed the content of a value to a hash object."""
+    digest.update(type(value).__name__.encode("utf-8") + b"\0")
+    if value is None or isinstance(value, (bool, int, float, str)):
+        digest.update(json.dumps(value).encode("utf-8"))
+    elif isinstance(value, bytes):
+        digest.update(value)
+    elif isinstance(value, (pd.DataFrame, pd.Series)):
+        _update_pandas_hash(digest, value)
+    elif isinstance(value, sheet_collector.Region):
+        for part in (
+            value.region_name,
+            value.parent_sheet_name,
+            value.start_range,
+            value.end_range,
+        ):
+            digest.update(part.encode("utf-8") + b"\0")
+        _update_pandas_hash(digest, value.data)
+    elif isinstance(value, sheet_collector.Sheet):
+        _update_hash(digest, region_sources({"": value}))
+    elif isinstance(value, github_objects.Entry):
+        digest.update(github_objects.Entry.config_hash(value.to_config()).encode())
+    elif isinstance(value, dict) or hasattr(value, "keys"):
+        for key in sorted(value.keys(), key=str):
+            _update_hash(digest, key)
+            _update_hash(digest, value[key])
+    elif isinstance(value, (list, tuple)):
+        digest.update(str(len(value)).encode("utf-8"))
+        for item in value:
+            _update_hash(digest, item)
+    elif isinstance(value, (set, frozenset)):
+        digest.update("".join(sorted(content_hash(item) for item in value)).encode())
+    else:
+        digest.update(pickle.dumps(value))
+
+
+def _update_pandas_hash(digest, data) -> None:
+    """Feed the content of a data frame or series to a hash object."""
+    if isinstance(data, pd.DataFrame):
+        digest.update(repr(list(data.columns)).encode("utf-8"))
+        digest.update(repr([str(dtype) for dtype in data.dtypes]).encode("utf-8"))
+    else:
+        digest.update(repr((data.name, str(data.dtype))).encode("utf-8"))
+    try:
+        row_hashes = pd.util.hash_pandas_object(data, index=True)
+    except TypeError:
+        # Cells holding unhashable values such as lists
+        digest.update(pickle.dumps(data))
+        return
+    digest.update(row_hashes.to_numpy().tobytes())
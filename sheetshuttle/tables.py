@@ -0,0 +1,258 @@
+"""Render Region data as Markdown, CSV, or HTML tables for issue bodies and files.
+
+Tables are built a column at a time: every column is converted to strings and
+padded in one operation. Rows are converted and written to the output in
+chunks, so large regions are not formatted cell by cell nor held in memory as
+strings all at once.
+The Markdown output matches the pipe tables of DataFrame.to_markdown for text
+columns.
+"""
+
+import io
+import itertools
+from typing import Iterator, List, Optional, TextIO
+
+import numpy as np
+import pandas as pd  # type: ignore[import]
+
+TABLE_FORMATS = ("markdown", "csv", "html")
+# Number of rows joined and written at once
+CHUNK_SIZE = 10000
+# Cell shown in every column in place of the rows left out of a truncated table
+TRUNCATED_CELL = "..."
+# Extra width of header cells in Markdown tables, as tabulate adds
+HEADER_PADDING = 2
+
+
+def render(
+    data: pd.DataFrame,
+    out: Optional[TextIO] = None,
+    table_format: str = "markdown",
+    max_rows: Optional[int] = None,
+    index: bool = True,
+) -> Optional[str]:
+    """Render a data frame as a table.
+
+    Args:
+        data (pd.DataFrame): the data to render
+        out (TextIO, optional): file or string builder the table is written to.
+            Defaults to None, in which case the table is returned.
+        table_format (str, optional): "markdown", "csv", or "html".
+            Defaults to "markdown".
+        max_rows (int, optional): number of rows to render, the remaining rows
+            are replaced with a row of "..." in Markdown and HTML tables.
+            Defaults to None, rendering every row.
+        index (bool, optional): render the index as the first column.
+            Defaults to True.
+
+    Raises:
+        Exception: thrown when the table format is unknown
+
+    Returns:
+        Optional[str]: the table if out is None, None otherwise
+    """
+    if table_format not in TABLE_FORMATS:
+        raise Exception(
+            f"Unknown table format {table_format}, must be one of {TABLE_FORMATS}"
+        )
+    builder = io.StringIO()
+    target = builder if out is None else out
+    truncated = max_rows is not None and len(data) > max_rows
+    if truncated:
+        data = data.iloc[:max_rows]
+    if table_format == "markdown":
+        write_markdown(data, target, truncated, index)
+    elif table_format == "html":
+        write_html(data, target, truncated, index)
+    else:
+        data.to_csv(target, index=index)
+    if out is None:
+        return builder.getvalue()
+    return None
+
+
+def write_markdown(data: pd.DataFrame, out: TextIO, truncated=False, index=True):
+    """Write a data frame as a Markdown pipe table.
+
+    Numeric columns are right aligned and every other column is left aligned.
+    The widths of the columns are found in a first pass over the rows, and
+    the rows are converted again and written in a second pass, a chunk at a
+    time.
+
+    Args:
+        data (pd.DataFrame): the rows to write
+        out (TextIO): destination of the table
+        truncated (bool, optional): add a row of "..." after the rows.
+            Defaults to False.
+        index (bool, optional): write the index as the first column.
+            Defaults to True.
+    """
+    headers, _, numeric = table_columns(data.iloc[:0], index)
+    headers = [
+        escape_markdown(np.array([header], dtype=object))[0] for header in headers
+    ]
+    widths = [len(header) + HEADER_PADDING for header in headers]
+    if truncated:
+        widths = [max(width, len(TRUNCATED_CELL)) for width in widths]
+    for chunk in row_chunks(data):
+        _, columns, _ = table_columns(chunk, index)
+        widths = [
+            max(width, column_width(escape_markdown(column)))
+            for width, column in zip(widths, columns)
+        ]
+    header_cells = [
+        header.rjust(width) if is_numeric else header.ljust(width)
+        for header, width, is_numeric in zip(headers, widths, numeric)
+    ]
+    rules = [
+        "-" * (width + 1) + ":" if is_numeric else ":" + "-" * (width + 1)
+        for width, is_numeric in zip(widths, numeric)
+    ]
+    out.write("| " + " | ".join(header_cells) + " |\n")
+    out.write("|" + "|".join(rules) + "|\n")
+    chunks: Iterator[List[np.ndarray]] = (
+        table_columns(chunk, index)[1] for chunk in row_chunks(data)
+    )
+    if truncated:
+        chunks = itertools.chain(
+            chunks, [[np.array([TRUNCATED_CELL], dtype=object)] * len(headers)]
+        )
+    for columns in chunks:
+        padded = [
+            pad_column(escape_markdown(column), width, is_numeric)
+            for column, width, is_numeric in zip(columns, widths, numeric)
+        ]
+        write_rows(padded, out, "| ", " | ", " |\n")
+
+
+def write_html(data: pd.DataFrame, out: TextIO, truncated=False, index=True):
+    """Write a data frame as an HTML table, a chunk of rows at a time.
+
+    Args:
+        data (pd.DataFrame): the rows to write
+        out (TextIO): destination of the table
+        truncated (bool, optional): add a row of "..." after the rows.
+            Defaults to False.
+        index (bool, optional): write the index as the first column.
+            Defaults to True.
+    """
+    headers, _, _ = table_columns(data.iloc[:0], index)
+    headers = [escape_html(np.array([header], dtype=object))[0] for header in headers]
+    out.write("<table>\n<thead>\n<tr>")
+    out.write("".join(f"<th>{header}</th>" for header in headers))
+    out.write("</tr>\n</thead>\n<tbody>\n")
+    for chunk in row_chunks(data):
+        _, columns, _ = table_columns(chunk, index)
+        columns = [escape_html(column) for column in columns]
+        write_rows(columns, out, "<tr><td>", "</td><td>", "</td></tr>\n")
+    if truncated:
+        out.write("<tr><td>" + "</td><td>".join([TRUNCATED_CELL] * len(headers)))
+        out.write("</td></tr>\n")
+    out.write("</tbody>\n</table>\n")
+
+
+def row_chunks(data: pd.DataFrame) -> Iterator[pd.DataFrame]:
+    """Yield the rows of a data frame in slices of CHUNK_SIZE rows."""
+    for chunk_start in range(0, len(data), CHUNK_SIZE):
+        chunk_end = chunk_start + CHUNK_SIZE
+        yield data.iloc[chunk_start:chunk_end]
+
+
+def table_columns(data: pd.DataFrame, index=True):
+    """Convert every column of a data frame to an array of strings.
+
+    Missing values are converted to empty strings.
+
+    Args:
+        data (pd.DataFrame): the data to convert
+        index (bool, optional): include the index as the first column.
+            Defaults to True.
+
+    Returns:
+        Tuple[List[str], List[np.ndarray], List[bool]]: the headers, the
+            columns as object arrays of strings, and whether each column is
+            numeric
+    """
+    headers: List[str] = []
+    columns: List[np.ndarray] = []
+    numeric: List[bool] = []
+    series = [pd.Series(data.index, index=data.index)] if index else []
+    series.extend(data.iloc[:, position] for position in range(data.shape[1]))
+    labels = [""] if index else []
+    labels.extend(str(label) for label in data.columns)
+    for label, values in zip(labels, series):
+        strings = values.astype(str).to_numpy(dtype=object)
+        strings[values.isna().to_numpy()] = ""
+        headers.append(label)
+        columns.append(strings)
+        numeric.append(
+            pd.api.types.is_numeric_dtype(values.dtype)
+            and not pd.api.types.is_bool_dtype(values.dtype)
+        )
+    return headers, columns, numeric
+
+
+def column_width(column: np.ndarray) -> int:
+    """Return the length of the longest string of a column, 0 when it is empty."""
+    if column.size == 0:
+        return 0
+    return int(pd.Series(column, dtype=object).str.len().max())
+
+
+def pad_column(column: np.ndarray, width: int, right: bool) -> np.ndarray:
+    """Pad every string of a column to the same width.
+
+    Args:
+        column (np.ndarray): object array of strings
+        width (int): width of the padded strings
+        right (bool): align the strings to the right instead of the left
+    """
+    strings = pd.Series(column, dtype=object).str
+    padded = strings.rjust(width) if right else strings.ljust(width)
+    return padded.to_numpy(dtype=object)
+
+
+def escape_markdown(column: np.ndarray) -> np.ndarray:
+    """Escape pipes and replace line breaks so that cells stay on their row."""
+    strings = pd.Series(column, dtype=object).str
+    return (
+        strings.replace("|", "\\|", regex=False)
+        .str.replace("\r\n", "<br>", regex=False)
+        .str.replace("\n", "<br>", regex=False)
+        .to_numpy(dtype=object)
+    )
+
+
+def escape_html(column: np.ndarray) -> np.ndarray:
+    """Escape the characters that have a meaning in HTML."""
+    strings = pd.Series(column, dtype=object).str
+    return (
+        strings.replace("&", "&amp;", regex=False)
+        .str.replace("<", "&lt;", regex=False)
+        .str.replace(">", "&gt;", regex=False)
+        .str.replace('"', "&quot;", regex=False)
+        .to_numpy(dtype=object)
+    )
+
+
+def write_rows(
+    columns: List[np.ndarray], out: TextIO, start: str, separator: str, end: str
+):
+    """Join the cells of every row and write the rows at once.
+
+    Args:
+        columns (List[np.ndarray]): object arrays of cell strings, one chunk
+            of rows long
+        out (TextIO): destination of the rows
+        start (str): text before the first cell of a row
+        separator (str): text between cells
+        end (str): text after the last cell of a row, including the line break
+    """
+    row_count = len(columns[0]) if columns else 0
+    rows = np.full(row_count, start, dtype=object)
+    for position, column in enumerate(columns):
+        if position:
+            rows = rows + separator
+        rows = rows + column
+    rows = rows + end
+    out.write("".join(rows))
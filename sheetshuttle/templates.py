@@ -0,0 +1,396 @@
+"""Generate GitHub entries in bulk from the rows of a Region data frame.
+
+An entry template is written once in the GitHub configuration and rendered for
+every row of a region. String fields may contain placeholders such as
+"{Student Name}" that are replaced with the values of the matching column.
+Every field is rendered a whole column at a time. The first rendered entry is
+validated against the entry schema, and the rendered fields of every row are
+checked against the patterns and allowed values of the schema a column at a
+time.
+"""
+
+import string
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd  # type: ignore[import]
+
+from sheetshuttle import github_objects
+
+TEMPLATE_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "type": {"type": "string", "const": "template"},
+        "entry_type": {"type": "string", "enum": ["issue", "pull request", "file"]},
+        "source": {
+            "type": "object",
+            "properties": {
+                "sheet": {"type": "string"},
+                "tab": {"type": "string"},
+                "region": {"type": "string"},
+            },
+            "required": ["sheet", "tab", "region"],
+        },
+        "labels": {
+            "type": "array",
+            "items": {"type": "string"},
+            "minItems": 1,
+        },
+    },
+    "required": ["type", "entry_type"],
+}
+# Keys of a template that are not rendered into the entries
+TEMPLATE_KEYS = ("type", "entry_type", "source")
+# Fields rendered as integers instead of strings
+INTEGER_FIELDS = ("number",)
+
+
+class InvalidTemplate(Exception):
+    """Raised when an entry template cannot be rendered."""
+
+
+class FieldTemplate:
+    """A single field of an entry template, compiled into literals and placeholders."""
+
+    def __init__(self, template: str) -> None:
+        """Compile a template string.
+
+        Args:
+            template (str): text with placeholders in str.format syntax, such
+                as "{Student Name}" or "{Grade:.2f}"
+        """
+        self.template = template
+        self.literals: List[str] = []
+        # Column name, conversion, and format spec of each placeholder
+        self.placeholders: List[Tuple[str, Optional[str], str]] = []
+        try:
+            parsed = list(string.Formatter().parse(template))
+        except ValueError as error:
+            raise InvalidTemplate(f"Invalid template {template!r}: {error}") from error
+        # Escaped braces split the literal text in several parts
+        literal_text = ""
+        for literal, column, format_spec, conversion in parsed:
+            literal_text += literal
+            if column is None:
+                continue
+            if not column:
+                raise InvalidTemplate(
+                    f"Empty placeholder in template {template!r}, "
+                    "placeholders must name a column"
+                )
+            self.literals.append(literal_text)
+            self.placeholders.append((column, conversion, format_spec or ""))
+            literal_text = ""
+        # Literals surround the placeholders, so there is always one more
+        self.literals.append(literal_text)
+
+    @property
+    def columns(self) -> List[str]:
+        """Return the columns used by the placeholders."""
+        return [column for column, _, _ in self.placeholders]
+
+    def render(self, data: pd.DataFrame) -> np.ndarray:
+        """Render the template for every row of the data frame.
+
+        Args:
+            data (pd.DataFrame): the region data, containing every column used
+                by the placeholders
+
+        Returns:
+            np.ndarray: object array with one rendered string per row
+        """
+        rendered = np.full(len(data), self.literals[0], dtype=object)
+        for (column, conversion, format_spec), literal in zip(
+            self.placeholders, self.literals[1:]
+        ):
+            rendered = rendered + FieldTemplate.format_column(
+                data[column], conversion, format_spec
+            )
+            if literal:
+                rendered = rendered + literal
+        return rendered
+
+    @staticmethod
+    def format_column(
+        values: pd.Series, conversion: Optional[str], format_spec: str
+    ) -> np.ndarray:
+        """Convert a column to strings, with empty strings for missing values.
+
+        Args:
+            values (pd.Series): the column to convert
+            conversion (str, optional): "s", "r", or "a" as in str.format
+            format_spec (str): format specification as in str.format
+
+        Returns:
+            np.ndarray: object array of strings
+        """
+        if conversion or format_spec:
+            formatter = string.Formatter()
+            strings = values.map(
+                lambda value: format(
+                    formatter.convert_field(value, conversion) if conversion else value,
+                    format_spec,
+                ),
+                na_action="ignore",
+            )
+        else:
+            strings = values.astype(str)
+        strings = strings.to_numpy(dtype=object)
+        strings[values.isna().to_numpy()] = ""
+        return strings
+
+
+class EntryTemplate:
+    """Render one entry configuration for every row of a data frame."""
+
+    def __init__(self, config: Dict) -> None:
+        """Validate and compile an entry template configuration.
+
+        Args:
+            config (Dict): the template configuration, with "type" set to
+                "template", the "entry_type" to generate, an optional "source"
+                region, and the fields of the entries
+        """
+        github_objects.Entry.validate_schema(config, TEMPLATE_SCHEMA)
+        self.config = config
+        self.entry_type: str = config["entry_type"]
+        self.source: Optional[Dict[str, str]] = config.get("source")
+        self.constants: Dict = {"type": self.entry_type}
+        self.fields: Dict[str, FieldTemplate] = {}
+        self.labels: List[FieldTemplate] = []
+        for key, value in config.items():
+            if key in TEMPLATE_KEYS:
+                continue
+            if key == "labels":
+                self.labels = [FieldTemplate(label) for label in value]
+                continue
+            field = FieldTemplate(value) if isinstance(value, str) else None
+            if field is None or not field.placeholders:
+                self.constants[key] = value
+            else:
+                self.fields[key] = field
+        if self.labels and not any(label.placeholders for label in self.labels):
+            self.constants["labels"] = list(config["labels"])
+            self.labels = []
+
+    @property
+    def columns(self) -> List[str]:
+        """Return every column used by the template, without duplicates."""
+        columns: List[str] = []
+        for field in [*self.fields.values(), *self.labels]:
+            for column in field.columns:
+                if column not in columns:
+                    columns.append(column)
+        return columns
+
+    def render_configs(self, data: pd.DataFrame) -> List[Dict]:
+        """Render the entry configuration of every row of the data frame.
+
+        The first configuration of every action and set of fields is validated
+        against the entry schema, the other rows share its structure. The
+        rendered fields of every row are
+        checked to not be empty, which would happen for rows with missing
+        values, to match the patterns and allowed values of the schema, and
+        to be whole numbers for integer fields.
+
+        Args:
+            data (pd.DataFrame): the region data
+
+        Raises:
+            InvalidTemplate: thrown when a column is missing or a field renders
+                to an empty string, a value not allowed by the entry schema, or
+                a number that is not an integer
+
+        Returns:
+            List[Dict]: one entry configuration per row
+        """
+        missing = [column for column in self.columns if column not in data.columns]
+        if missing:
+            raise InvalidTemplate(
+                f"Columns {missing} used by the {self.entry_type} template "
+                f"are not in the data, available columns are {list(data.columns)}"
+            )
+        if data.empty:
+            return []
+        columns = {}
+        for key, field in self.fields.items():
+            rendered = field.render(data)
+            empty_rows = np.flatnonzero(rendered == "")
+            if empty_rows.size:
+                raise InvalidTemplate(
+                    f"Field {key} of the {self.entry_type} template is empty "
+                    f"in rows {list(data.index[empty_rows[:10]])}"
+                )
+            if key in INTEGER_FIELDS:
+                rendered = self.render_integers(key, rendered, data)
+            columns[key] = rendered.tolist()
+        if self.labels:
+            columns["labels"] = self.render_labels(data)
+        if columns:
+            keys = list(columns)
+            configs = [
+                {**self.constants, **dict(zip(keys, values))}
+                for values in zip(*columns.values())
+            ]
+        else:
+            configs = [dict(self.constants) for _ in range(len(data))]
+        for config in configs:
+            # Labels that rendered empty for every label template are dropped
+            if config.get("labels") == []:
+                del config["labels"]
+        self.validate_structures(configs)
+        for key in self.fields:
+            if key not in INTEGER_FIELDS:
+                self.check_field(key, columns[key], data)
+        return configs
+
+    def validate_structures(self, configs: List[Dict]) -> None:
+        """Validate one configuration of every action and set of fields.
+
+        Rows with the same action and fields only differ by their rendered
+        values, which check_field checks for every row.
+
+        Args:
+            configs (List[Dict]): the rendered entry configurations
+
+        Raises:
+            ValidationError: thrown when a configuration does not follow the
+                entry schema
+        """
+        schema = github_objects.ENTRY_TYPES[self.entry_type].SCHEMA
+        structures = set()
+        for config in configs:
+            structure = (config.get("action"), tuple(config))
+            if structure not in structures:
+                structures.add(structure)
+                github_objects.Entry.validate_schema(config, schema)
+
+    def field_schemas(self) -> Dict[str, Dict]:
+        """Return the schema of every field of the entries, by field name.
+
+        The fields required by the "create" action or by the other actions are
+        included when the action of the template is not rendered.
+        """
+        schema = github_objects.ENTRY_TYPES[self.entry_type].SCHEMA
+        action = self.constants.get("action")
+        properties = dict(schema.get("properties", {}))
+        for branch in ("then", "else"):
+            if branch not in schema:
+                continue
+            if action is not None and (action == "create") != (branch == "then"):
+                continue
+            for key, value in schema[branch].get("properties", {}).items():
+                properties.setdefault(key, value)
+        return properties
+
+    def check_field(self, key: str, rendered: List[str], data: pd.DataFrame) -> None:
+        """Check a rendered field of every row against the entry schema.
+
+        Args:
+            key (str): name of the field
+            rendered (List[str]): the rendered strings, one per row
+            data (pd.DataFrame): the region data, to report the invalid rows
+
+        Raises:
+            InvalidTemplate: thrown when rows do not match the pattern, the
+                allowed values, or the minimum length of the field
+        """
+        schema = self.field_schemas().get(key, {})
+        values = pd.Series(rendered, dtype=object)
+        valid = np.ones(len(values), dtype=bool)
+        if "pattern" in schema:
+            valid &= values.str.contains(schema["pattern"], regex=True).to_numpy(
+                dtype=bool
+            )
+        if "enum" in schema:
+            valid &= values.isin(schema["enum"]).to_numpy(dtype=bool)
+        if "const" in schema:
+            valid &= (values == schema["const"]).to_numpy(dtype=bool)
+        if "minLength" in schema:
+            valid &= (values.str.len() >= schema["minLength"]).to_numpy(dtype=bool)
+        invalid_rows = np.flatnonzero(~valid)
+        if invalid_rows.size:
+            raise InvalidTemplate(
+                f"Field {key} of the {self.entry_type} template does not match "
+                f"the {self.entry_type} schema in rows "
+                f"{list(data.index[invalid_rows[:10]])}"
+            )
+
+    def render_integers(
+        self, key: str, rendered: np.ndarray, data: pd.DataFrame
+    ) -> np.ndarray:
+        """Convert a rendered integer field of every row to integers.
+
+        Args:
+            key (str): name of the field
+            rendered (np.ndarray): the rendered strings, one per row
+            data (pd.DataFrame): the region data, to report the invalid rows
+
+        Raises:
+            InvalidTemplate: thrown when rows are not whole numbers
+
+        Returns:
+            np.ndarray: the integers, one per row
+        """
+        numbers = pd.to_numeric(pd.Series(rendered, dtype=object), errors="coerce")
+        numbers = numbers.to_numpy(dtype=np.float64)
+        invalid_rows = np.flatnonzero(~np.isfinite(numbers) | (numbers % 1 != 0))
+        if invalid_rows.size:
+            raise InvalidTemplate(
+                f"Field {key} of the {self.entry_type} template must render to "
+                f"integers, rows {list(data.index[invalid_rows[:10]])} are not "
+                f"integers: {list(rendered[invalid_rows[:10]])}"
+            )
+        return numbers.astype(np.int64)
+
+    def render_labels(self, data: pd.DataFrame) -> List[List[str]]:
+        """Render the labels of every row, leaving out empty labels.
+
+        Args:
+            data (pd.DataFrame): the region data
+        """
+        rendered = [label.render(data) for label in self.labels]
+        return [
+            [label for label in row_labels if label] for row_labels in zip(*rendered)
+        ]
+
+    def render(
+        self, data: pd.DataFrame, compact: bool = False
+    ) -> List[github_objects.Entry]:
+        """Create an entry for every row of the data frame.
+
+        Args:
+            data (pd.DataFrame): the region data
+            compact (bool, optional): create compact entries. Defaults to False.
+
+        Returns:
+            List[Entry]: the entries, in the order of the rows
+        """
+        entry_class = github_objects.ENTRY_TYPES[self.entry_type]
+        return [
+            entry_class(config, compact, validate=False)
+            for config in self.render_configs(data)
+        ]
+
+
+def find_region(sheets_data: Dict, source: Dict[str, str]):
+    """Return the region a template refers to from collected sheets.
+
+    Args:
+        sheets_data (Dict[str, Sheet]): sheets collected by a SheetCollector,
+            keyed by the name of their configuration file
+        source (Dict[str, str]): the "sheet", "tab", and "region" names
+
+    Raises:
+        InvalidTemplate: thrown when the region was not collected
+
+    Returns:
+        Region: the region object
+    """
+    try:
+        return sheets_data[source["sheet"]].get_tab(source["tab"])[source["region"]]
+    except KeyError as error:
+        raise InvalidTemplate(
+            f"Region {source['region']} of tab {source['tab']} in sheet "
+            f"{source['sheet']} was not collected"
+        ) from error
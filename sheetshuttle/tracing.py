@@ -0,0 +1,462 @@
+"""Trace a SheetShuttle run as nested spans and export them for trace viewers.
+
+A span records the duration and attributes of one step of a run, such as the
+collection of a configuration file, the request of a region, the posting of an
+entry, or a single call to the GitHub API. Spans started while another span is
+active in the same thread become its children, so the exported trace shows
+which spreadsheet, region, or repo made a run slow:
+
+    run
+    ├── collect
+    │   └── config file
+    │       └── collect regions
+    │           └── region
+    │               ├── fetch
+    │               └── convert
+    └── plugin
+        └── post entries
+            └── entry
+                └── github create_issue
+
+Spans are exported as Chrome trace events, which chrome://tracing and Perfetto
+open, or sent as OTLP/HTTP JSON to an OpenTelemetry collector. Nothing is
+recorded unless a tracer was started, for instance by "sheetshuttle run --trace".
+"""
+
+import contextlib
+import contextvars
+import json
+import os
+import threading
+import time
+import urllib.request
+from typing import Any, ContextManager, Dict, Iterator, List, Optional
+
+# Results of GitHub calls that are returned as they are instead of being
+# traced, scheduled, or retried by a proxy
+PLAIN_TYPES = (str, bytes, int, float, bool, dict, list, tuple, type(None))
+# Span kind "internal" of OTLP
+OTLP_SPAN_KIND = 1
+# Status codes "ok" and "error" of OTLP
+OTLP_STATUS_CODES = {"ok": 1, "error": 2}
+
+# Tracer started by start, None when tracing is off
+_TRACER: Optional["Tracer"] = None
+# Span active in the current thread or context
+_CURRENT_SPAN: contextvars.ContextVar = contextvars.ContextVar(
+    "sheetshuttle_span", default=None
+)
+
+
+# pylint: disable=R0902,R0903
+class Span:
+    """A timed step of a run with its attributes."""
+
+    __slots__ = (
+        "name",
+        "span_id",
+        "parent_id",
+        "start",
+        "end",
+        "attributes",
+        "thread_id",
+        "status",
+        "error",
+    )
+
+    def __init__(
+        self, name: str, parent_id: Optional[str], attributes: Dict[str, Any]
+    ) -> None:
+        """Create a Span object.
+
+        Args:
+            name (str): name of the step
+            parent_id (str, optional): id of the span it is part of
+            attributes (Dict[str, Any]): details of the step, such as the
+                spreadsheet id, range, repo, number of rows, or bytes
+        """
+        self.name = name
+        self.span_id = os.urandom(8).hex()
+        self.parent_id = parent_id
+        # Nanoseconds since the epoch
+        self.start = 0
+        self.end = 0
+        self.attributes = attributes
+        self.thread_id = threading.get_ident()
+        self.status = "ok"
+        self.error: Optional[str] = None
+
+    def set(self, **attributes) -> None:
+        """Add or replace attributes of the span."""
+        self.attributes.update(attributes)
+
+
+class Tracer:
+    """Record spans and export them when the run is done."""
+
+    def __init__(self, exporters: List[Any]) -> None:
+        """Create a Tracer object.
+
+        Args:
+            exporters (List[Any]): objects with an export method called with
+                the trace id and the finished spans, such as
+                ChromeTraceExporter and OTLPExporter
+        """
+        self.exporters = exporters
+        self.trace_id = os.urandom(16).hex()
+        self.spans: List[Span] = []
+        self.lock = threading.Lock()
+        # Span times are measured with a monotonic clock from this time
+        self.epoch = time.time_ns()
+        self.counter_start = time.perf_counter_ns()
+
+    def now(self) -> int:
+        """Return the current time in nanoseconds since the epoch."""
+        return self.epoch + time.perf_counter_ns() - self.counter_start
+
+    @contextlib.contextmanager
+    def span(
+        self, name: str, parent: Optional[Span] = None, /, **attributes
+    ) -> Iterator[Span]:
+        """Record the code run inside the with statement as a span.
+
+        Args:
+            name (str): name of the span
+            parent (Span, optional): span it is part of. Defaults to the span
+                active in the current context.
+            **attributes: details of the span
+        """
+        if parent is None:
+            parent = _CURRENT_SPAN.get()
+        new_span = Span(
+            name, parent.span_id if parent is not None else None, attributes
+        )
+        token = _CURRENT_SPAN.set(new_span)
+        new_span.start = self.now()
+        try:
+            yield new_span
+        except BaseException as error:
+            new_span.status = "error"
+            new_span.error = f"{type(error).__name__}: {error}"
+            raise
+        finally:
+            new_span.end = self.now()
+            _CURRENT_SPAN.reset(token)
+            with self.lock:
+                self.spans.append(new_span)
+
+    def export(self) -> None:
+        """Give the finished spans to every exporter, in the order they started."""
+        spans = sorted(self.spans, key=lambda span: span.start)
+        for exporter in self.exporters:
+            exporter.export(self.trace_id, spans)
+
+
+# pylint: disable=R0903
+class ChromeTraceExporter:
+    """Write spans as a Chrome trace event file."""
+
+    def __init__(self, path: str) -> None:
+        """Create a ChromeTraceExporter object.
+
+        Args:
+            path (str): path to the JSON file to write
+        """
+        self.path = path
+
+    def export(self, trace_id: str, spans: List[Span]) -> None:
+        """Write the spans as complete events, in microseconds from the first span."""
+        origin = spans[0].start if spans else 0
+        events = [
+            {
+                "name": span.name,
+                "cat": "sheetshuttle",
+                "ph": "X",
+                "ts": (span.start - origin) / 1000,
+                "dur": (span.end - span.start) / 1000,
+                "pid": os.getpid(),
+                "tid": span.thread_id,
+                "args": {
+                    **{
+                        key: json_value(value) for key, value in span.attributes.items()
+                    },
+                    "span_id": span.span_id,
+                    "parent_id": span.parent_id,
+                    "status": span.status,
+                    **({"error": span.error} if span.error else {}),
+                },
+            }
+            for span in spans
+        ]
+        with open(self.path, "w", encoding="utf-8") as outfile:
+            json.dump(
+                {"traceEvents": events, "otherData": {"trace_id": trace_id}},
+                outfile,
+            )
+
+
+class OTLPExporter:
+    """Send spans to an OpenTelemetry collector with OTLP/HTTP JSON."""
+
+    def __init__(
+        self, endpoint: str, service_name: str = "sheetshuttle", timeout: float = 10
+    ) -> None:
+        """Create an OTLPExporter object.
+
+        Args:
+            endpoint (str): URL of the traces endpoint of the collector, such
+                as "http://localhost:4318/v1/traces"
+            service_name (str, optional): service.name of the spans.
+                Defaults to "sheetshuttle".
+            timeout (float, optional): seconds to wait for the collector.
+                Defaults to 10.
+        """
+        self.endpoint = endpoint
+        self.service_name = service_name
+        self.timeout = timeout
+
+    def payload(self, trace_id: str, spans: List[Span]) -> Dict[str, Any]:
+        """Return the OTLP JSON request body of the spans."""
+        otlp_spans = []
+        for recorded in spans:
+            otlp_span: Dict[str, Any] = {
+                "traceId": trace_id,
+                "spanId": recorded.span_id,
+                "name": recorded.name,
+                "kind": OTLP_SPAN_KIND,
+                "startTimeUnixNano": str(recorded.start),
+                "endTimeUnixNano": str(recorded.end),
+                "attributes": otlp_attributes(
+                    {**recorded.attributes, "thread.id": recorded.thread_id}
+                ),
+                "status": {"code": OTLP_STATUS_CODES[recorded.status]},
+            }
+            if recorded.parent_id is not None:
+                otlp_span["parentSpanId"] = recorded.parent_id
+            if recorded.error:
+                otlp_span["status"]["message"] = recorded.error
+            otlp_spans.append(otlp_span)
+        return {
+            "resourceSpans": [
+                {
+                    "resource": {
+                        "attributes": otlp_attributes(
+                            {"service.name": self.service_name}
+                        )
+                    },
+                    "scopeSpans": [
+                        {"scope": {"name": "sheetshuttle"}, "spans": otlp_spans}
+                    ],
+                }
+            ]
+        }
+
+    def export(self, trace_id: str, spans: List[Span]) -> None:
+        """Send the spans, printing a warning when the collector cannot be reached."""
+        request = urllib.request.Request(
+            self.endpoint,
+            data=json.dumps(self.payload(trace_id, spans)).encode("utf-8"),
+            headers={"Content-Type": "application/json"},
+            method="POST",
+        )
+        try:
+            with urllib.request.urlopen(request, timeout=self.timeout) as response:
+                response.read()
+        except OSError as error:
+            print(f"Warning: spans were not sent to {self.endpoint}, {error}")
+
+
+class Proxy:
+    """Compare, hash, and represent proxies as the target they forward to."""
+
+    def __init__(self, target) -> None:
+        """Create a Proxy object.
+
+        Args:
+            target: object to forward attributes to
+        """
+        self._target = target
+
+    def __eq__(self, other) -> bool:
+        """Compare the target with other."""
+        if isinstance(other, Proxy):
+            other = other._target  # pylint: disable=W0212
+        return self._target == other
+
+    def __hash__(self) -> int:
+        """Hash the target."""
+        return hash(self._target)
+
+    def __repr__(self) -> str:
+        """Represent the target."""
+        return repr(self._target)
+
+
+class TracedProxy(Proxy):
+    """Forward attribute access to a target and trace its method calls."""
+
+    def __init__(self, target, tracer: Tracer) -> None:
+        """Create a TracedProxy object.
+
+        Args:
+            target: a Github object or any object returned by it
+            tracer (Tracer): the tracer recording the calls
+        """
+        super().__init__(target)
+        self._tracer = tracer
+
+    def __getattr__(self, name: str):
+        """Return the attribute of the target, tracing it if it's a method."""
+        attribute = getattr(self._target, name)
+        if not callable(attribute):
+            return attribute
+
+        def traced(*args, **kwargs):
+            attributes: Dict[str, Any] = {"method": name}
+            if name == "get_repo" and args:
+                attributes["repo"] = args[0]
+            with self._tracer.span(f"github {name}", **attributes):
+                result = attribute(*args, **kwargs)
+            return wrap(result)
+
+        return traced
+
+    def __getitem__(self, key):
+        """Trace indexing of paginated lists."""
+        with self._tracer.span("github get item", key=str(key)):
+            item = self._target[key]
+        return wrap(item)
+
+    def __iter__(self):
+        """Iterate the target and wrap every item."""
+        for item in self._target:
+            yield wrap(item)
+
+
+def json_value(value: Any) -> Any:
+    """Return an attribute value that can be written as JSON."""
+    if isinstance(value, (str, int, float, bool)) or value is None:
+        return value
+    if isinstance(value, (list, tuple)):
+        return [json_value(item) for item in value]
+    return str(value)
+
+
+def otlp_attributes(attributes: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """Return attributes as a list of OTLP key values."""
+    key_values = []
+    for key, value in attributes.items():
+        if isinstance(value, bool):
+            otlp_value: Dict[str, Any] = {"boolValue": value}
+        elif isinstance(value, int):
+            otlp_value = {"intValue": str(value)}
+        elif isinstance(value, float):
+            otlp_value = {"doubleValue": value}
+        else:
+            otlp_value = {"stringValue": str(value)}
+        key_values.append({"key": key, "value": otlp_value})
+    return key_values
+
+
+def start(exporters: List[Any]) -> Tracer:
+    """Start recording spans.
+
+    Args:
+        exporters (List[Any]): exporters given the spans when tracing stops
+
+    Returns:
+        Tracer: the started tracer
+    """
+    # pylint: disable=W0603
+    global _TRACER
+    _TRACER = Tracer(exporters)
+    return _TRACER
+
+
+def stop() -> Optional[Tracer]:
+    """Stop recording spans and export them.
+
+    Returns:
+        Optional[Tracer]: the stopped tracer, None when tracing was off
+    """
+    # pylint: disable=W0603
+    global _TRACER
+    tracer, _TRACER = _TRACER, None
+    if tracer is not None:
+        tracer.export()
+    return tracer
+
+
+def active() -> Optional[Tracer]:
+    """Return the started tracer, None when tracing is off."""
+    return _TRACER
+
+
+def current_span() -> Optional[Span]:
+    """Return the span active in the current context, None if there is none."""
+    return _CURRENT_SPAN.get()
+
+
+@contextlib.contextmanager
+def span(
+    name: str, parent: Optional[Span] = None, /, **attributes
+) -> Iterator[Optional[Span]]:
+    """Record the code run inside the with statement as a span.
+
+    Does nothing when no tracer was started. Can also decorate functions.
+
+    Args:
+        name (str): name of the span
+        parent (Span, optional): span it is part of, for spans started in
+            other threads. Defaults to the span active in the current context.
+        **attributes: details of the span
+
+    Yields:
+        Optional[Span]: the span, None when tracing is off
+    """
+    tracer = _TRACER
+    context: ContextManager[Optional[Span]] = contextlib.nullcontext()
+    if tracer is not None:
+        context = tracer.span(name, parent, **attributes)
+    with context as new_span:
+        yield new_span
+
+
+@contextlib.contextmanager
+def entry_span(entry, parent: Optional[Span] = None) -> Iterator[Optional[Span]]:
+    """Record the posting of an entry as a span with its status.
+
+    Args:
+        entry (Entry): the entry being posted
+        parent (Span, optional): span it is part of. Defaults to the span
+            active in the current context.
+    """
+    with span(
+        "entry",
+        parent,
+        type=type(entry).__name__,
+        action=getattr(entry, "action", None),
+        repo=entry.repo,
+    ) as new_span:
+        try:
+            yield new_span
+        finally:
+            if new_span is not None and entry.result is not None:
+                new_span.set(result=entry.result.status)
+                if entry.result.number is not None:
+                    new_span.set(number=entry.result.number)
+
+
+def wrap(target):
+    """Return a proxy tracing the method calls of target, or target itself.
+
+    Targets are returned as they are when tracing is off or when they are plain
+    values.
+
+    Args:
+        target: a Github object or any object returned by it
+    """
+    tracer = _TRACER
+    if tracer is None or isinstance(target, PLAIN_TYPES + (TracedProxy,)):
+        return target
+    return TracedProxy(target, tracer)
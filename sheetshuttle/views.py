@@ -0,0 +1,282 @@
+"""Join, filter, and project regions declared as views in sheet configurations.
+
+A view joins regions on their key columns, filters the joined rows, and keeps
+some of their columns, without writing pandas code in a plugin. Views are
+declared in the "views" list of a sheet configuration and evaluated by
+SheetCollector.view, or by a Views object for sheets shared with plugins.
+"""
+
+from typing import TYPE_CHECKING, Dict, Iterable, List, Tuple, Union
+
+import numpy as np
+import pandas as pd  # type: ignore[import]
+
+if TYPE_CHECKING:  # pragma: no cover
+    from sheetshuttle.sheet_collector import Region, Sheet
+
+# Comparisons available in the filters of views, with the rows they keep
+FILTER_OPERATIONS = {
+    "==": lambda values, value: values == value,
+    "!=": lambda values, value: values != value,
+    "<": lambda values, value: values < value,
+    "<=": lambda values, value: values <= value,
+    ">": lambda values, value: values > value,
+    ">=": lambda values, value: values >= value,
+    "in": lambda values, value: values.isin(value),
+    "not in": lambda values, value: ~values.isin(value),
+    "isna": lambda values, value: values.isna(),
+    "notna": lambda values, value: values.notna(),
+}
+
+
+def align(
+    regions: Union[Iterable["Region"], Dict[str, "Region"]], how: str = "inner"
+) -> pd.DataFrame:
+    """Join regions on their key column, matching rows by key instead of position.
+
+    Args:
+        regions (Iterable[Region] or Dict[str, Region]): regions with a key
+            column, named by their region name or by the keys of the dictionary
+        how (str, optional): keys kept, "inner" for keys found in every
+            region, "outer" for keys found in any region, or "left" for the
+            keys of the first region. Defaults to "inner".
+
+    Raises:
+        Exception: thrown when how is unknown, no region is given, or regions
+            have the same name
+
+    Returns:
+        pd.DataFrame: one row per key, in the order the keys are first found,
+            with the columns of every region under its name. Rows missing from
+            a region hold missing values in its columns.
+    """
+    if how not in ("inner", "outer", "left"):
+        raise Exception(f"ERROR: unknown alignment {how}, use inner, outer, or left")
+    if isinstance(regions, dict):
+        named = dict(regions)
+    else:
+        named = {}
+        for region in regions:
+            if region.region_name in named:
+                raise Exception(
+                    f"ERROR: regions named {region.region_name} are aligned twice, "
+                    "give the regions as a dictionary with distinct names"
+                )
+            named[region.region_name] = region
+    if not named:
+        raise Exception("ERROR: no regions to align")
+    frames = {}
+    for name, region in named.items():
+        positions = region.key_index()
+        rows = region.data.iloc[positions.to_numpy()].drop(columns=region.key)
+        rows.index = positions.index
+        frames[name] = rows
+    indexes = [frame.index for frame in frames.values()]
+    keys = indexes[0]
+    for index in indexes[1:]:
+        if how == "inner":
+            keys = keys.intersection(index, sort=False)
+        elif how == "outer":
+            keys = keys.union(index, sort=False)
+    keys = keys.rename(indexes[0].name)
+    return pd.concat(
+        {name: frame.reindex(keys) for name, frame in frames.items()}, axis=1
+    )
+
+
+def filter_rows(data: pd.DataFrame, conditions: List[Dict]) -> pd.DataFrame:
+    """Return the rows meeting every condition of a view filter.
+
+    Args:
+        data (pd.DataFrame): the rows to filter
+        conditions (List[Dict]): conditions with a "column", an "op" from
+            FILTER_OPERATIONS, and a "value" for the comparisons
+
+    Raises:
+        Exception: thrown when a condition uses an unknown column
+
+    Returns:
+        pd.DataFrame: the rows for which every condition holds
+    """
+    keep = np.ones(len(data), dtype=bool)
+    for condition in conditions:
+        if condition["column"] not in data.columns:
+            raise Exception(
+                f"ERROR: filter column {condition['column']} not found, "
+                f"columns are {list(data.columns)}"
+            )
+        value = condition.get("value")
+        values = numeric_values(data[condition["column"]], value)
+        matches = FILTER_OPERATIONS[condition["op"]](values, value)
+        keep &= matches.fillna(False).to_numpy(dtype=bool)
+    return data[keep]
+
+
+def numeric_values(values: pd.Series, value) -> pd.Series:
+    """Return a column as numbers when a filter compares it with numbers.
+
+    Cells are collected as text unless the region declares their types, so a
+    column compared with 85 is converted to numbers instead of comparing the
+    text "100" lower than "85". Cells that are not numbers become missing and
+    are not kept by comparisons.
+
+    Args:
+        values (pd.Series): the column of the condition
+        value: the value of the condition, or the list of values of "in"
+    """
+    compared = value if isinstance(value, list) else [value]
+    if not compared or not all(
+        isinstance(item, (int, float)) and not isinstance(item, bool)
+        for item in compared
+    ):
+        return values
+    if pd.api.types.is_numeric_dtype(values.dtype):
+        return values
+    return pd.to_numeric(values.astype(object), errors="coerce")
+
+
+class Views:
+    """Evaluate the views declared in sheet configurations and cache them.
+
+    Regions are named "tab/region" in the configuration file of the view and
+    "file/tab/region" in other files, where file is the name of the
+    configuration file without extension. Views can also join other views by
+    name.
+    """
+
+    def __init__(self, sheets_data: Dict[str, "Sheet"]) -> None:
+        """Create a Views object.
+
+        Args:
+            sheets_data (Dict[str, Sheet]): sheets collected by a
+                SheetCollector, or shared with a plugin
+        """
+        self.sheets_data = sheets_data
+        self.cache: Dict[str, "Region"] = {}
+        # Views being evaluated, to report views joining each other
+        self.evaluating: List[str] = []
+
+    def configs(self) -> Dict[str, Tuple[str, Dict]]:
+        """Return the configuration of every view with the name of its sheet.
+
+        Raises:
+            Exception: thrown when two views have the same name
+        """
+        configs: Dict[str, Tuple[str, Dict]] = {}
+        for sheet_name, sheet in self.sheets_data.items():
+            for view in sheet.config.get("views", []):
+                if view["name"] in configs:
+                    raise Exception(f"ERROR: view {view['name']} is declared twice")
+                configs[view["name"]] = (sheet_name, view)
+        return configs
+
+    def names(self) -> List[str]:
+        """Return the names of the declared views."""
+        return list(self.configs())
+
+    def clear(self) -> None:
+        """Forget the evaluated views, for instance after collecting again."""
+        self.cache.clear()
+
+    def get(self, name: str) -> "Region":
+        """Return a view, evaluating it and the views it joins the first time.
+
+        Raises:
+            Exception: thrown when the view is unknown or views join each
+                other in a cycle
+        """
+        if name in self.cache:
+            return self.cache[name]
+        configs = self.configs()
+        if name not in configs:
+            raise Exception(f"ERROR: unknown view {name}")
+        if name in self.evaluating:
+            cycle = " -> ".join([*self.evaluating, name])
+            raise Exception(f"ERROR: views join each other: {cycle}")
+        self.evaluating.append(name)
+        try:
+            sheet_name, config = configs[name]
+            view = self.evaluate(sheet_name, config)
+        finally:
+            self.evaluating.pop()
+        self.cache[name] = view
+        return view
+
+    def resolve(self, reference: str, sheet_name: str) -> "Region":
+        """Return the region or view a view joins.
+
+        Args:
+            reference (str): "tab/region", "file/tab/region", or a view name
+            sheet_name (str): name of the sheet declaring the view
+
+        Raises:
+            Exception: thrown when the region is not collected
+        """
+        parts = reference.split("/")
+        if len(parts) == 1:
+            return self.get(reference)
+        if len(parts) == 2:
+            parts.insert(0, sheet_name)
+        file_name, tab_name, region_name = parts[0], parts[1], "/".join(parts[2:])
+        try:
+            return self.sheets_data[file_name].get_tab(tab_name)[region_name]
+        except KeyError:
+            raise Exception(
+                f"ERROR: region {reference} joined by a view of {sheet_name} "
+                "was not collected"
+            ) from None
+
+    def evaluate(self, sheet_name: str, config: Dict) -> "Region":
+        """Join, filter, and project the regions of a view.
+
+        The key of the first joined region is the first column of the joined
+        rows, so filters and columns can name it. Other columns found several
+        times are named "region.column", where region is the last part of the
+        reference to the region.
+
+        Args:
+            sheet_name (str): name of the sheet declaring the view
+            config (Dict): the configuration of the view
+
+        Returns:
+            Region: the rows of the view, with the key of the first joined
+                region as first column and key
+        """
+        regions = {
+            reference: self.resolve(reference, sheet_name)
+            for reference in config["join"]
+        }
+        joined = align(regions, config.get("how", "inner"))
+        key = joined.index.name
+        labels = [key] + [column for _, column in joined.columns]
+        names = []
+        for reference, column in joined.columns:
+            if labels.count(column) > 1:
+                column = f"{reference.split('/')[-1]}.{column}"
+            names.append(column)
+        if len(set([key, *names])) <= len(names):
+            raise Exception(
+                f"ERROR: view {config['name']} joins regions with the same name "
+                "and columns"
+            )
+        joined.columns = pd.Index(names)
+        rows = filter_rows(joined.reset_index(), config.get("filter", []))
+        if "columns" in config:
+            columns = [key, *names]
+            missing = [column for column in config["columns"] if column not in columns]
+            if missing:
+                raise Exception(
+                    f"ERROR: columns {missing} of view {config['name']} not found, "
+                    f"columns are {columns}"
+                )
+            rows = rows[[key] + [name for name in config["columns"] if name != key]]
+        # Views are regions of the same class as the regions they join
+        region_class = type(next(iter(regions.values())))
+        return region_class(
+            config["name"],
+            sheet_name,
+            "",
+            "",
+            rows.reset_index(drop=True),
+            key=key,
+        )
@@ -4,8 +4,11 @@ import json
 import pathlib
 import pytest
 
+import pandas as pd
 from dotenv import load_dotenv
 
+from sheetshuttle import sheet_collector
+
 # pylint: disable=C0103,W0602
 full_test_data = {}
 
@@ -34,3 +37,32 @@ def pytest_sessionstart():
 def test_data():
     """Return full_test_data."""
     return full_test_data
+
+
+@pytest.fixture
+def keyed_regions():
+    """Return two regions keyed by GitHub username, with rows in different orders."""
+    info = sheet_collector.Region(
+        "info",
+        "students",
+        "A1",
+        "B5",
+        pd.DataFrame(
+            {
+                "Student GitHub": ["ada", "alan", None, "grace"],
+                "Student Name": ["Ada", "Alan", "", "Grace"],
+            }
+        ),
+        key="Student GitHub",
+    )
+    grades = sheet_collector.Region(
+        "grades",
+        "students",
+        "D1",
+        "E4",
+        pd.DataFrame(
+            {"username": ["grace", "ada", "linus"], "EE1": [90.0, 80.0, 70.0]}
+        ),
+        key="username",
+    )
+    return info, grades
@@ -0,0 +1,85 @@
+"""Share constants and helpers between test modules."""
+
+from mock_api import mock_sheets_api
+from sheetshuttle import sheet_collector
+
+# Repository created by the mock GitHub API and used by the tests
+TEST_REPO_NAME = "AC-GopherBot/test-1"
+
+# Cells of a students tab served by mock_sheets and a configuration collecting them
+STUDENTS_CELLS = {"students!A1:B3": [["name", "grade"], ["Ada", "90"], ["Alan", "80"]]}
+STUDENTS_CONFIG = (
+    "source_id: sheet-id\n"
+    "sheets:\n"
+    "  - name: students\n"
+    "    regions:\n"
+    "      - {name: names, start: A1, end: B3, contains_headers: true}\n"
+)
+
+
+def issue_config(number, repo=TEST_REPO_NAME):
+    """Return a valid issue creation configuration."""
+    return {
+        "type": "issue",
+        "action": "create",
+        "repo": repo,
+        "title": f"issue {number}",
+        "body": f"body of issue {number}",
+    }
+
+
+class SleepingClock:
+    """Keep track of a fake time that only moves when sleeping."""
+
+    def __init__(self) -> None:
+        """Create a SleepingClock object starting at a fixed time."""
+        self.now = 1000.0
+        self.sleeps = []
+
+    def time(self):
+        """Return the current fake time."""
+        return self.now
+
+    def sleep(self, seconds):
+        """Move the fake time forward."""
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+
+def mock_sheets(monkeypatch, values_by_range):
+    """Return a mock Sheets api used by every SheetCollector, with the given cells."""
+    api = mock_sheets_api.MockSheets(values_by_range)
+    monkeypatch.setattr(
+        sheet_collector.SheetCollector,
+        "authenticate_api",
+        staticmethod(lambda key_file: (None, None, api)),
+    )
+    return api
+
+
+def collected_sheet(*regions):
+    """Return a sheet whose tabs hold regions that are already collected."""
+    tabs = {}
+    for region in regions:
+        tabs.setdefault(region.parent_sheet_name, {})[region.region_name] = region
+    config = {
+        "source_id": "sheet-id",
+        "sheets": [
+            {
+                "name": tab_name,
+                "regions": [
+                    {
+                        "name": region.region_name,
+                        "start": region.start_range,
+                        "end": region.end_range,
+                        "contains_headers": True,
+                    }
+                    for region in tab.values()
+                ],
+            }
+            for tab_name, tab in tabs.items()
+        ],
+    }
+    sheet = sheet_collector.Sheet(config, None)
+    sheet.tabs = tabs
+    return sheet
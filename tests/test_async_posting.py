@@ -0,0 +1,227 @@
+"""Test functionalities in the async_posting module."""
+
+import asyncio
+
+import pytest
+
+aiohttp = pytest.importorskip("aiohttp")
+
+# pylint: disable=C0413
+from aiohttp.test_utils import TestServer  # noqa: E402
+from mock_api import mock_gh_server  # noqa: E402
+from sheetshuttle import async_posting, github_objects  # noqa: E402
+from tests.helpers import TEST_REPO_NAME  # noqa: E402
+
+
+def post_to_stand_in(entries, state, **kwargs):
+    """Post entries to a local stand-in server and return the server state."""
+
+    async def run():
+        server = TestServer(mock_gh_server.create_app(state))
+        await server.start_server()
+        try:
+            poster = async_posting.AsyncGithubPoster(
+                "test-token", base_url=str(server.make_url("")), **kwargs
+            )
+            await poster.post_entries(entries)
+        finally:
+            await server.close()
+
+    asyncio.run(run())
+    return state
+
+
+def test_post_many_issue_comments():
+    """Check that many issues and comments are posted with bounded concurrency."""
+    create_entries = [
+        github_objects.IssueEntry(
+            {
+                "type": "issue",
+                "action": "create",
+                "repo": TEST_REPO_NAME,
+                "title": f"issue {number}",
+                "body": "async body",
+                "labels": ["SheetShuttle"],
+            }
+        )
+        for number in range(200)
+    ]
+    state = post_to_stand_in(
+        create_entries, mock_gh_server.MockServerState(), concurrency=20
+    )
+    assert all(entry.posted for entry in create_entries)
+    repo = state.repos[TEST_REPO_NAME]
+    assert len(repo.issues) == 200
+    update_entries = [
+        github_objects.IssueEntry(
+            {
+                "type": "issue",
+                "action": "update",
+                "repo": TEST_REPO_NAME,
+                "number": entry.gh_object["number"],
+                "body": "async comment",
+                "labels": ["graded"],
+            }
+        )
+        for entry in create_entries
+    ]
+    post_to_stand_in(update_entries, state, concurrency=20)
+    assert all(entry.posted for entry in update_entries)
+    assert all(repo.comments[number] == ["async comment"] for number in repo.issues)
+    assert repo.issues[1]["labels"] == [{"name": "SheetShuttle"}, {"name": "graded"}]
+
+
+def test_update_nonexistent_issue_and_pull_request(capfd):
+    """Check that updating missing issues and PRs is skipped with a warning."""
+    issue_entry = github_objects.IssueEntry(
+        {
+            "type": "issue",
+            "action": "update",
+            "repo": TEST_REPO_NAME,
+            "number": 7,
+            "body": "missing",
+        }
+    )
+    pr_entry = github_objects.PullRequestEntry(
+        {
+            "type": "pull request",
+            "action": "update",
+            "repo": TEST_REPO_NAME,
+            "number": 8,
+            "body": "missing",
+        }
+    )
+    post_to_stand_in([issue_entry, pr_entry], mock_gh_server.MockServerState())
+    out, _ = capfd.readouterr()
+    assert issue_entry.result.status == "skipped"
+    assert pr_entry.result.status == "skipped"
+    assert (
+        f"Warning: issue #7 in {TEST_REPO_NAME} does not exist, update skipped" in out
+    )
+    assert f"Warning: PR #8 in {TEST_REPO_NAME} does not exist, update skipped" in out
+
+
+def test_create_pull_request_and_files():
+    """Check that pull requests and file create, update, replace actions are posted."""
+    state = mock_gh_server.MockServerState()
+    pr_entry = github_objects.PullRequestEntry(
+        {
+            "type": "pull request",
+            "action": "create",
+            "repo": TEST_REPO_NAME,
+            "title": "async pull request",
+            "body": "body",
+            "base": "main",
+            "head": "feature",
+        }
+    )
+    post_to_stand_in([pr_entry], state)
+    assert pr_entry.posted and pr_entry.gh_object["number"] == 1
+    for action, content in [("create", "hello"), ("update", " world")]:
+        file_entry = github_objects.FileEntry(
+            {
+                "type": "file",
+                "action": action,
+                "repo": TEST_REPO_NAME,
+                "path": "folder/report.md",
+                "content": content,
+                "branch": "main",
+            }
+        )
+        post_to_stand_in([file_entry], state)
+        assert file_entry.posted
+    assert state.repos[TEST_REPO_NAME].files["folder/report.md"] == b"hello world"
+    replace_entry = github_objects.FileEntry(
+        {
+            "type": "file",
+            "action": "replace",
+            "repo": TEST_REPO_NAME,
+            "path": "folder/report.md",
+            "content": "replaced",
+            "branch": "main",
+        }
+    )
+    post_to_stand_in([replace_entry], state)
+    assert state.repos[TEST_REPO_NAME].files["folder/report.md"] == b"replaced"
+
+
+def test_unchanged_files_are_skipped(capfd):
+    """Check that replacing a file with identical content is skipped."""
+    state = mock_gh_server.MockServerState()
+    state.repos[TEST_REPO_NAME].files["folder/report.md"] = b"report"
+    entry = github_objects.FileEntry(
+        {
+            "type": "file",
+            "action": "replace",
+            "repo": TEST_REPO_NAME,
+            "path": "folder/report.md",
+            "content": "report",
+            "branch": "main",
+        }
+    )
+    post_to_stand_in([entry], state)
+    out, _ = capfd.readouterr()
+    assert entry.result.status == "skipped"
+    assert "File folder/report.md is unchanged" in out
+    # Only the file metadata is read
+    assert state.request_count == 1
+
+
+def test_throttled_requests_are_retried():
+    """Check that secondary rate limit responses are retried."""
+    state = mock_gh_server.MockServerState(throttle_count=3)
+    entry = github_objects.IssueEntry(
+        {
+            "type": "issue",
+            "action": "create",
+            "repo": TEST_REPO_NAME,
+            "title": "throttled",
+            "body": "body",
+        }
+    )
+    post_to_stand_in([entry], state, concurrency=1)
+    assert entry.posted
+    assert state.request_count == 4
+
+
+def test_directory_paths_are_skipped(capfd):
+    """Check that files are not replaced when their path is a directory."""
+    state = mock_gh_server.MockServerState()
+    state.repos[TEST_REPO_NAME].files["folder/report.md"] = b"report"
+    entry = github_objects.FileEntry(
+        {
+            "type": "file",
+            "action": "replace",
+            "repo": TEST_REPO_NAME,
+            "path": "folder",
+            "content": "replaced",
+            "branch": "main",
+        }
+    )
+    post_to_stand_in([entry], state)
+    out, _ = capfd.readouterr()
+    assert entry.result.status == "skipped"
+    assert "Warning: folder is a directory" in out
+    assert state.repos[TEST_REPO_NAME].files == {"folder/report.md": b"report"}
+
+
+def test_connection_errors_mark_entries_failed():
+    """Check that an unreachable server marks every entry as failed."""
+    entries = [
+        github_objects.IssueEntry(
+            {
+                "type": "issue",
+                "action": "create",
+                "repo": TEST_REPO_NAME,
+                "title": f"unreachable {number}",
+                "body": "body",
+            }
+        )
+        for number in range(3)
+    ]
+    poster = async_posting.AsyncGithubPoster(
+        "test-token", base_url="http://127.0.0.1:1", concurrency=2
+    )
+    poster.post_all(entries)
+    assert [entry.result.status for entry in entries] == ["failed"] * 3
+    assert not any(entry.posted for entry in entries)
@@ -0,0 +1,69 @@
+"""Test functionalities in the bench module."""
+
+import pytest
+from github import Github
+from sheetshuttle import bench
+
+
+@pytest.mark.parametrize("workload", bench.WORKLOADS)
+def test_run_workload(workload):
+    """Check that every workload is timed for every repetition."""
+    result = bench.run_workload(workload, 3, repeat=4, warmup=1)
+    assert result.workload == workload
+    assert len(result.durations) == 4
+    summary = result.summary()
+    assert summary["size"] == 3 and summary["repeat"] == 4
+    assert summary["p50"] <= summary["p90"] <= summary["p99"]
+    assert summary["throughput"] > 0
+
+
+def test_workloads_use_the_stand_ins():
+    """Check that the stand-ins answer the requests of the workloads."""
+    rows = bench.synthetic_rows(4, seed=1)
+    assert rows[0] == ["name", "repo", "grade", "status", "comment"]
+    assert len(rows) == 5 and rows == bench.synthetic_rows(4, seed=1)
+    with bench.github_server() as base_url:
+        bench.setup_post(3, 1, base_url)()
+        # Every entry is posted through PyGithub to the repo of its row
+        repo = Github("token", base_url=base_url).get_repo("bench-org/repo-2")
+        assert repo.get_issue(1).title == "Feedback for Student 2"
+    with pytest.raises(Exception, match="Unknown workload"):
+        bench.run_workload("sort", 3)
+
+
+def test_compare_detects_regressions(capsys):
+    """Check that workloads slower than the tolerance are regressions."""
+    baseline = bench.results_document(
+        [
+            bench.WorkloadResult("convert", 100, [1.0, 1.0]),
+            bench.WorkloadResult("render", 100, [1.0]),
+            bench.WorkloadResult("post", 100, [1.0]),
+        ]
+    )
+    document = bench.results_document(
+        [
+            bench.WorkloadResult("convert", 100, [1.05, 1.05]),
+            bench.WorkloadResult("render", 100, [1.5]),
+            bench.WorkloadResult("post", 50, [1.0]),
+        ]
+    )
+    comparisons = bench.compare(document, baseline, tolerance=0.1)
+    assert [(item.workload, item.regressed) for item in comparisons] == [
+        ("convert", False),
+        ("render", True),
+    ]
+    assert comparisons[1].change == pytest.approx(0.5)
+    assert "workload post is not compared" in capsys.readouterr().out
+
+
+def test_results_are_saved_and_loaded(tmp_path):
+    """Check that saved results can be used as a baseline."""
+    document = bench.results_document(
+        [bench.WorkloadResult("convert", 10, [0.5])], {"seed": 0}
+    )
+    path = str(tmp_path / "results.json")
+    bench.save_results(document, path)
+    assert bench.load_results(path) == document
+    (tmp_path / "old.json").write_text('{"version": 0}', encoding="utf-8")
+    with pytest.raises(Exception, match="has version 0"):
+        bench.load_results(str(tmp_path / "old.json"))
@@ -0,0 +1,116 @@
+"""Test functionalities in the compact module."""
+
+import numpy as np
+import pandas as pd
+import pytest
+from sheetshuttle import compact, sheet_collector
+from tests.helpers import mock_sheets
+
+
+def test_compact_dataframe_keeps_values():
+    """Check that columns get compact types and keep their values."""
+    rows = 200
+    data = pd.DataFrame(
+        {
+            "name": pd.array([f"student {n}" for n in range(rows)], dtype="string"),
+            "section": pd.array(["01", "02", None, "01"] * 50, dtype="string"),
+            "labs": np.arange(rows, dtype=np.int64),
+            "grade": np.full(rows, 92.5),
+            "ratio": np.full(rows, 0.1),
+            "passed": np.ones(rows, dtype=bool),
+        }
+    )
+    compacted = compact.compact_dataframe(data)
+    assert isinstance(compacted["section"].dtype, pd.CategoricalDtype)
+    assert list(compacted["section"].cat.categories) == ["01", "02"]
+    assert compacted["labs"].dtype == np.int16
+    assert compacted["grade"].dtype == np.float32
+    # 0.1 is not exactly a 32 bit float
+    assert compacted["ratio"].dtype == np.float64
+    assert compacted["passed"].dtype == bool
+    assert isinstance(compacted["name"].dtype, pd.StringDtype)
+    assert list(compacted.columns) == list(data.columns)
+    pd.testing.assert_frame_equal(
+        compacted.astype(data.dtypes.to_dict()), data, check_dtype=True
+    )
+    assert compact.data_size(compacted) < compact.data_size(data)
+
+
+def test_compact_column_types():
+    """Check the compact type of nullable, object, and already compact columns."""
+    grades = pd.Series([1, None, 300], dtype="Int64")
+    assert compact.compact_column(grades).dtype == "Int16"
+    mixed = pd.Series([1, "one", 1, "one"], dtype=object)
+    assert compact.compact_column(mixed) is mixed
+    letters = pd.Series(["A", "B", "A", None], dtype=object)
+    assert isinstance(compact.compact_column(letters).dtype, pd.CategoricalDtype)
+    assert compact.compact_column(letters, category_ratio=0.1) is letters
+    dates = pd.Series(pd.to_datetime(["2022-01-01", "2022-01-02"]))
+    assert compact.compact_column(dates) is dates
+    assert compact.compact_column(pd.Series([], dtype="string")).empty
+
+
+def test_is_text():
+    """Check that only columns of strings and missing values are text."""
+    assert compact.is_text(pd.Series(["a", None, np.nan], dtype=object))
+    assert compact.is_text(pd.Series([None, None], dtype=object))
+    assert not compact.is_text(pd.Series(["a", 1], dtype=object))
+    assert not compact.is_text(pd.Series([b"a"], dtype=object))
+    assert not compact.is_text(pd.Series([1.5]))
+
+
+def test_arrow_strings(monkeypatch):
+    """Check that distinct strings use the Arrow string type when it is available."""
+    pytest.importorskip("pyarrow")
+    names = pd.Series(["Ada", "Alan", "Grace"], dtype="string")
+    assert compact.compact_column(names).dtype == pd.StringDtype("pyarrow")
+    monkeypatch.setattr(compact, "pyarrow", None)
+    assert compact.compact_column(names) is names
+
+
+def test_collector_compacts_configured_regions(monkeypatch, tmp_path):
+    """Check that the region, file, and collector settings choose the compact regions."""
+    rows = [["name", "section"]] + [[f"student {n}", "01"] for n in range(10)]
+    mock_sheets(
+        monkeypatch,
+        {"students!A1:B11": rows, "labs!A1:B11": rows, "roster!A1:B11": rows},
+    )
+    (tmp_path / "grades.yml").write_text(
+        "source_id: sheet-id\n"
+        "compact: true\n"
+        "sheets:\n"
+        "  - name: students\n"
+        "    regions:\n"
+        "      - {name: names, start: A1, end: B11, contains_headers: true}\n"
+        "  - name: labs\n"
+        "    regions:\n"
+        "      - name: labs\n"
+        "        start: A1\n"
+        "        end: B11\n"
+        "        contains_headers: true\n"
+        "        compact: false\n",
+        encoding="utf-8",
+    )
+    (tmp_path / "roster.yml").write_text(
+        "source_id: sheet-id\n"
+        "sheets:\n"
+        "  - name: roster\n"
+        "    regions:\n"
+        "      - {name: roster, start: A1, end: B11, contains_headers: true}\n",
+        encoding="utf-8",
+    )
+    collector = sheet_collector.SheetCollector(sources_dir=str(tmp_path))
+    collector.collect_files()
+    report = {memory.region: memory for memory in collector.memory_report()}
+    assert sorted(report) == ["labs", "names", "roster"]
+    names = collector.sheets_data["grades"].get_tab("students")["names"]
+    assert isinstance(names.data["section"].dtype, pd.CategoricalDtype)
+    assert report["names"].rows == 10
+    assert report["names"].size < report["names"].original_size
+    assert report["labs"].original_size is None
+    assert report["roster"].original_size is None
+    collector = sheet_collector.SheetCollector(sources_dir=str(tmp_path), compact=True)
+    collector.collect_files()
+    report = {memory.region: memory for memory in collector.memory_report()}
+    assert report["labs"].original_size is None
+    assert report["roster"].original_size is not None
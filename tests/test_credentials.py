@@ -0,0 +1,288 @@
+"""Test functionalities in the credentials module."""
+
+import json
+from datetime import datetime, timezone
+
+import jwt
+import pytest
+from github.GithubException import GithubException
+from mock_api import mock_gh_api
+from sheetshuttle import credentials, github_interaction, graphql_batch, retry
+from tests.helpers import TEST_REPO_NAME
+
+OTHER_REPO_NAME = "other-org/test-2"
+
+
+# pylint: disable=R0903
+class FakeClock:
+    """Keep track of a fake time that only moves when told to."""
+
+    def __init__(self) -> None:
+        self.now = 1_700_000_000.0
+
+    def time(self):
+        """Return the current fake time."""
+        return self.now
+
+
+class FakeClient(mock_gh_api.MockGH):
+    """Mock Github object with a quota that can only access some repos."""
+
+    def __init__(self, token: str, remaining: int, accessible) -> None:
+        super().__init__()
+        self.token = token
+        self.remaining = remaining
+        self.accessible = accessible
+
+    @property
+    def rate_limiting(self):
+        """Return the remaining requests and the limit."""
+        return self.remaining, 5000
+
+    def get_repo(self, repo_name: str):
+        self.remaining -= 1
+        if repo_name not in self.accessible:
+            raise GithubException(404, {"message": "Not Found"}, {})
+        repo = super().get_repo(repo_name)
+        # PyGithub objects keep the requester of the client that created them
+        repo._requester = f"requester {self.token}"  # pylint: disable=W0212
+        return repo
+
+
+def client_factory(quotas, accessible):
+    """Return an api factory creating FakeClients and the dictionary of created clients."""
+    clients = {}
+
+    def create(token):
+        clients[token] = FakeClient(token, quotas[token], accessible[token])
+        return clients[token]
+
+    return create, clients
+
+
+def test_pool_routes_by_quota_and_access():
+    """Check that repos go to the credential with the most quota that can access them."""
+    api_factory, clients = client_factory(
+        {"a": 100, "b": 4000, "c": 3000},
+        {"a": {TEST_REPO_NAME, OTHER_REPO_NAME}, "b": {TEST_REPO_NAME}, "c": set()},
+    )
+    pool = credentials.CredentialPool(
+        [credentials.TokenCredential(token) for token in ("a", "b", "c")],
+        api_factory=api_factory,
+    )
+    assert pool.get_repo(TEST_REPO_NAME) is clients["b"].repos[TEST_REPO_NAME]
+    # b and c are denied, the request then falls back to a
+    assert pool.get_repo(OTHER_REPO_NAME) is clients["a"].repos[OTHER_REPO_NAME]
+    assert pool.denied[OTHER_REPO_NAME] == {1, 2}
+    calls_before = clients["b"].remaining
+    pool.get_repo(OTHER_REPO_NAME)
+    assert clients["b"].remaining == calls_before
+    with pytest.raises(GithubException):
+        pool.get_repo("nobody/has-access")
+
+
+def test_pool_respects_owners():
+    """Check that credentials restricted to owners are only used for their repos."""
+    api_factory, clients = client_factory(
+        {"a": 10, "b": 4000},
+        {"a": {OTHER_REPO_NAME}, "b": {OTHER_REPO_NAME}},
+    )
+    pool = credentials.CredentialPool(
+        [
+            credentials.TokenCredential("a"),
+            credentials.TokenCredential("b", owners=["AC-GopherBot"]),
+        ],
+        api_factory=api_factory,
+    )
+    assert pool.get_repo(OTHER_REPO_NAME) is clients["a"].repos[OTHER_REPO_NAME]
+    assert "b" not in clients
+
+
+def test_installation_token_is_cached_and_refreshed():
+    """Check that installation tokens are reused until they are about to expire."""
+    rsa = pytest.importorskip("cryptography.hazmat.primitives.asymmetric.rsa")
+    serialization = pytest.importorskip("cryptography.hazmat.primitives.serialization")
+    private_key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    private_pem = private_key.private_bytes(
+        serialization.Encoding.PEM,
+        serialization.PrivateFormat.PKCS8,
+        serialization.NoEncryption(),
+    ).decode("ascii")
+    clock = FakeClock()
+    requests_sent = []
+
+    def fetch(url, app_jwt):
+        requests_sent.append((url, app_jwt))
+        expires_at = datetime.fromtimestamp(clock.now + 3600, tz=timezone.utc)
+        return {
+            "token": f"installation-token-{len(requests_sent)}",
+            "expires_at": expires_at.strftime("%Y-%m-%dT%H:%M:%SZ"),
+        }
+
+    credential = credentials.AppInstallationCredential(
+        "1234", private_pem, 42, clock=clock.time, fetch=fetch
+    )
+    assert credential.get_token() == "installation-token-1"
+    clock.now += 3000
+    assert credential.get_token() == "installation-token-1"
+    clock.now += 301
+    assert credential.get_token() == "installation-token-2"
+    url, app_jwt = requests_sent[0]
+    assert url == "https://api.github.com/app/installations/42/access_tokens"
+    claims = jwt.decode(
+        app_jwt,
+        private_key.public_key(),
+        algorithms=["RS256"],
+        options={"verify_exp": False, "verify_iat": False},
+    )
+    assert claims["iss"] == "1234"
+    assert claims["exp"] - claims["iat"] == 600
+
+
+def test_pool_rebuilds_client_after_refresh():
+    """Check that a new Github object is created when the token of a credential changes."""
+    api_factory, clients = client_factory(
+        {"first": 10, "second": 10},
+        {"first": {TEST_REPO_NAME}, "second": {TEST_REPO_NAME}},
+    )
+    credential = credentials.TokenCredential("first")
+    pool = credentials.CredentialPool([credential], api_factory=api_factory)
+    pool.get_repo(TEST_REPO_NAME)
+    credential.token = "second"
+    pool.get_repo(TEST_REPO_NAME)
+    assert set(clients) == {"first", "second"}
+
+
+class CountingCredential(credentials.TokenCredential):
+    """Token credential counting how many times its token is read."""
+
+    def __init__(self, token: str) -> None:
+        super().__init__(token)
+        self.token_calls = 0
+
+    def get_token(self) -> str:
+        self.token_calls += 1
+        return super().get_token()
+
+
+def test_pool_reads_quotas_without_tokens():
+    """Check that routing reads quotas from the clients instead of reading tokens."""
+    repo_names = [f"AC-GopherBot/repo-{number}" for number in range(10)]
+    api_factory, clients = client_factory(
+        {"a": 100, "b": 200},
+        {"a": set(repo_names), "b": set(repo_names)},
+    )
+    first, second = CountingCredential("a"), CountingCredential("b")
+    pool = credentials.CredentialPool([first, second], api_factory=api_factory)
+    for repo_name in repo_names:
+        pool.get_repo(repo_name)
+    # a is only read once to create its client, b once more for every repo it serves
+    assert first.token_calls == 1
+    assert second.token_calls == 1 + len(repo_names)
+    assert pool.routed == {"token ...b": len(repo_names)}
+    assert clients["b"].remaining == 200 - len(repo_names)
+
+
+def test_from_key_file(tmp_path, monkeypatch):
+    """Check that pools are created from JSON key files and the environment."""
+    key_file = tmp_path / "keys.json"
+    key_file.write_text(
+        json.dumps({"gh_access_token": "a", "gh_access_tokens": ["b", "c"]}),
+        encoding="utf-8",
+    )
+    pool = credentials.CredentialPool.from_key_file(str(key_file))
+    assert [credential.token for credential in pool.credentials] == ["a", "b", "c"]
+    monkeypatch.setenv("GH_ACCESS_TOKENS", "d, e,")
+    pool = credentials.CredentialPool.from_key_file(".env")
+    assert [credential.token for credential in pool.credentials] == ["d", "e"]
+
+
+def test_manager_posts_with_pool(monkeypatch):
+    """Check that a GithubManager posts through a pool without GH_ACCESS_TOKEN."""
+    monkeypatch.delenv("GH_ACCESS_TOKEN", raising=False)
+    api_factory, clients = client_factory(
+        {"a": 100, "b": 200}, {"a": {TEST_REPO_NAME}, "b": set()}
+    )
+    pool = credentials.CredentialPool(
+        [credentials.TokenCredential("a"), credentials.TokenCredential("b")],
+        api_factory=api_factory,
+    )
+    manager = github_interaction.GithubManager(credential_pool=pool)
+    manager.add_entries(
+        {
+            "type": "issue",
+            "action": "create",
+            "repo": TEST_REPO_NAME,
+            "title": "pooled issue",
+            "body": "body",
+        }
+    )
+    manager.post_all()
+    assert manager.issue_entries[0].posted
+    assert clients["a"].repos[TEST_REPO_NAME].issues[0].title == "pooled issue"
+    assert pool.routed == {"token ...a": 1}
+    # The asynchronous backend posts with the single token of the key file
+    with pytest.raises(Exception, match="does not support a credential pool"):
+        manager.post_all_async()
+
+
+def test_graphql_updates_use_the_pool(monkeypatch):
+    """Check that GraphQL updates are sent with the credential of their repo and recorded."""
+    api_factory, _ = client_factory(
+        {"a": 100, "b": 200}, {"a": {TEST_REPO_NAME}, "b": {OTHER_REPO_NAME}}
+    )
+    pool = credentials.CredentialPool(
+        [credentials.TokenCredential("a"), credentials.TokenCredential("b")],
+        api_factory=api_factory,
+    )
+    policy = retry.RetryPolicy()
+    manager = github_interaction.GithubManager(
+        credential_pool=pool, retry_policy=policy
+    )
+    for repo in (TEST_REPO_NAME, OTHER_REPO_NAME, "nobody/has-access"):
+        manager.add_entries(
+            {
+                "type": "issue",
+                "action": "update",
+                "repo": repo,
+                "number": 1,
+                "body": "b",
+            }
+        )
+    requesters = []
+
+    # pylint: disable=R0903
+    class RecordingBatcher:
+        """Post the updates of credential a and fail those of credential b."""
+
+        def __init__(self, requester) -> None:
+            self.requester = requester
+
+        def post_updates(self, entries):
+            """Record the requester and post or fail the entries."""
+            requesters.append((self.requester, [entry.repo for entry in entries]))
+            if self.requester == "requester b":
+                raise graphql_batch.GraphQLError("GraphQL request failed")
+            for entry in entries:
+                entry.set_posted({"id": "I_1", "node_id": "I_1", "number": 1})
+
+    monkeypatch.setattr(
+        graphql_batch.GraphQLBatcher,
+        "from_requester",
+        lambda requester, **_options: RecordingBatcher(requester),
+    )
+    manager.post_all_graphql()
+    assert requesters == [
+        ("requester a", [TEST_REPO_NAME]),
+        ("requester b", [OTHER_REPO_NAME]),
+    ]
+    assert [entry.result.status for entry in manager.issue_entries] == [
+        "posted",
+        "failed",
+        "failed",
+    ]
+    # Failed updates reach the failure report of the retry policy
+    assert [failure["config"]["repo"] for failure in policy.report.failures] == [
+        OTHER_REPO_NAME,
+        "nobody/has-access",
+    ]
@@ -0,0 +1,169 @@
+"""Test functionalities in the daemon module."""
+
+import os
+from types import SimpleNamespace
+
+import pytest
+from typer.testing import CliRunner
+from sheetshuttle import daemon, main
+from tests.helpers import mock_sheets
+
+SHEET_CONFIG = (
+    "source_id: {source_id}\n"
+    "sheets:\n"
+    "  - name: students\n"
+    "    regions:\n"
+    "      - {{name: names, start: A1, end: B2, contains_headers: true}}\n"
+)
+
+
+# pylint: disable=R0903
+class FakeClock:
+    """Keep track of a fake time that moves forward every time it is read."""
+
+    def __init__(self, step: float) -> None:
+        self.now = 0.0
+        self.step = step
+
+    def time(self):
+        """Return the current fake time and move it forward."""
+        self.now += self.step
+        return self.now
+
+
+@pytest.fixture(name="sheets_api")
+def fixture_sheets_api(monkeypatch):
+    """Return the mock Sheets api used by every SheetCollector."""
+    api = mock_sheets(
+        monkeypatch, {"students!A1:B2": [["name", "grade"], ["Ada", "90"]]}
+    )
+    monkeypatch.setenv("GH_ACCESS_TOKEN", "test-token")
+    return api
+
+
+def write_sheet_config(directory, name, source_id):
+    """Write a sheet configuration with a single region."""
+    path = directory / f"{name}.yml"
+    path.write_text(SHEET_CONFIG.format(source_id=source_id), encoding="utf-8")
+    return path
+
+
+def make_daemon(tmp_path, modified_times, **kwargs):
+    """Return a daemon running a plugin that records its keyword arguments."""
+    (tmp_path / "sheets").mkdir(exist_ok=True)
+    (tmp_path / "github").mkdir(exist_ok=True)
+    runs = []
+    plugin = SimpleNamespace(
+        run=lambda *args, **plugin_kwargs: runs.append(plugin_kwargs)
+    )
+    my_daemon = daemon.Daemon(
+        {"recorder": plugin},
+        (".env", str(tmp_path / "sheets"), str(tmp_path / "github")),
+        {"args": {}},
+        modified_times=modified_times.get,
+        **kwargs,
+    )
+    return my_daemon, runs
+
+
+def test_cycles_only_refetch_changed_sheets(tmp_path, sheets_api):
+    """Check that unchanged spreadsheets are not fetched and plugins are skipped."""
+    modified_times = {"first-id": "t1", "second-id": "t1"}
+    my_daemon, runs = make_daemon(tmp_path, modified_times)
+    write_sheet_config(tmp_path / "sheets", "first", "first-id")
+    write_sheet_config(tmp_path / "sheets", "second", "second-id")
+    result = my_daemon.run_cycle()
+    assert sorted(result.refetched) == ["first", "second"] and result.ran_plugins
+    assert sorted(runs[0]["sheets_data"]) == ["first", "second"]
+    assert runs[0]["github_api"] is not None
+    result = my_daemon.run_cycle()
+    assert not result.refetched and not result.ran_plugins
+    assert len(sheets_api.requests) == 2 and len(runs) == 1
+    modified_times["second-id"] = "t2"
+    result = my_daemon.run_cycle()
+    assert result.refetched == ["second"]
+    assert runs[-1]["changed_sheets"] == ["second"]
+    assert len(sheets_api.requests) == 3
+    # A changed configuration is read and collected again
+    config_path = write_sheet_config(tmp_path / "sheets", "first", "first-id")
+    os.utime(config_path, (1, 1))
+    assert my_daemon.configs_changed()
+    assert my_daemon.run_cycle().refetched == ["first"]
+    # New GitHub configurations make the plugins run without fetching
+    (tmp_path / "github" / "issues.yml").write_text("[]", encoding="utf-8")
+    result = my_daemon.run_cycle()
+    assert result.ran_plugins and not result.refetched
+    assert len(sheets_api.requests) == 4
+    (tmp_path / "sheets" / "second.yml").unlink()
+    result = my_daemon.run_cycle()
+    assert result.removed == ["second"]
+    assert list(runs[-1]["sheets_data"]) == ["first"]
+
+
+def test_unknown_modified_times_compare_data(tmp_path, sheets_api):
+    """Check that spreadsheets are compared when their modified time is unknown."""
+    my_daemon, runs = make_daemon(tmp_path, {})
+    write_sheet_config(tmp_path / "sheets", "first", "first-id")
+    assert my_daemon.run_cycle().ran_plugins
+    result = my_daemon.run_cycle()
+    assert not result.ran_plugins and len(sheets_api.requests) == 2
+    sheets_api.values_by_range["students!A1:B2"] = [["name", "grade"], ["Ada", "95"]]
+    assert my_daemon.run_cycle().refetched == ["first"]
+    region = runs[-1]["sheets_data"]["first"].get_tab("students")["names"]
+    assert region.data["grade"].tolist() == ["95"]
+
+
+@pytest.mark.usefixtures("sheets_api")
+def test_serve_runs_scheduled_cycles(tmp_path, capsys):
+    """Check that serve runs a cycle every interval and keeps going after errors."""
+    clock = FakeClock(step=1.0)
+    my_daemon, runs = make_daemon(
+        tmp_path, {"first-id": "t1"}, interval=3, poll_interval=0, clock=clock.time
+    )
+    write_sheet_config(tmp_path / "sheets", "first", "first-id")
+    failures = [ZeroDivisionError("division by zero")]
+
+    def fail_once(*_args, **_kwargs):
+        if failures:
+            raise failures.pop()
+
+    my_daemon.plugins["broken"] = SimpleNamespace(run=fail_once)
+    my_daemon.serve(max_cycles=3)
+    output = capsys.readouterr().out
+    assert my_daemon.cycle_count == 3
+    assert "ERROR: cycle 1 failed: division by zero" in output
+    # The changes of the failed cycle are run again by the next one
+    assert "Cycle 2: changes in first, plugins ran" in output
+    assert "Cycle 3: no changes, plugins skipped" in output
+    assert len(runs) == 2
+
+
+@pytest.mark.usefixtures("sheets_api")
+def test_serve_command(tmp_path):
+    """Check that the serve command runs the plugins with warm data."""
+    (tmp_path / "plugins").mkdir()
+    (tmp_path / "plugins" / "counter.py").write_text(
+        "def run(*args, **kwargs):\n    print('sheets', sorted(kwargs['sheets_data']))\n",
+        encoding="utf-8",
+    )
+    (tmp_path / "sheets").mkdir()
+    write_sheet_config(tmp_path / "sheets", "first", "first-id")
+    result = CliRunner().invoke(
+        main.app,
+        [
+            "serve",
+            "-sd",
+            str(tmp_path / "sheets"),
+            "-gd",
+            str(tmp_path / "github"),
+            "-pd",
+            str(tmp_path / "plugins"),
+            "-pn",
+            "counter",
+            "--max-cycles",
+            "1",
+        ],
+    )
+    assert result.exit_code == 0, result.output
+    assert "sheets ['first']" in result.output
+    assert "Cycle 1: changes in first, plugins ran" in result.output
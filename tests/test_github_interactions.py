@@ -1,13 +1,16 @@
 """Test functionalities in the github_interaction module."""
+
 import json
 import os
-import yaml
-
+import queue
+import threading
+import pandas as pd
 import pytest
+import yaml
 from jsonschema.exceptions import ValidationError
 from mock_api import mock_gh_api
-from sheetshuttle import github_interaction, github_objects, util
-
+from sheetshuttle import github_interaction, github_objects, sheet_collector, util
+from tests.helpers import collected_sheet, issue_config
 
 ENV_VAR_NAME = "GH_ACCESS_TOKEN"
 
@@ -153,3 +156,196 @@ def test_post_all(test_data):
         manager.file_entries[0].gh_object.sha,
         "main",
     )
+
+
+def test_iter_entries_reads_yaml_and_json_lines(tmp_path, monkeypatch):
+    """Check that entries are yielded from YAML and JSON Lines config files."""
+    monkeypatch.setenv(ENV_VAR_NAME, "test-token")
+    with open(tmp_path / "first.yml", "w", encoding="utf-8") as writefile:
+        yaml.dump([issue_config(0)], writefile)
+    with open(tmp_path / "second.jsonl", "w", encoding="utf-8") as writefile:
+        writefile.write(json.dumps(issue_config(1)) + "\n\n")
+        writefile.write(json.dumps(issue_config(2)) + "\n")
+    manager = github_interaction.GithubManager(sources_dir=str(tmp_path))
+    entries = manager.iter_entries()
+    assert not isinstance(entries, list)
+    titles = sorted(entry.title for entry in entries)
+    assert titles == ["issue 0", "issue 1", "issue 2"]
+    assert not manager.config_data and not manager.issue_entries
+    manager.collect_config()
+    assert len(manager.config_data["second"]) == 2
+    assert len(manager.issue_entries) == 3
+
+
+def test_iter_json_lines_errors(tmp_path):
+    """Check that invalid JSON Lines entries raise errors."""
+    config_path = tmp_path / "entries.jsonl"
+    config_path.write_text('{"type": "issue"}\n{broken\n', encoding="utf-8")
+    with pytest.raises(Exception, match="line 2"):
+        list(github_interaction.GithubManager.iter_json_lines(config_path))
+    config_path.write_text('{"type": "discussion"}\n', encoding="utf-8")
+    with pytest.raises(ValidationError):
+        list(github_interaction.GithubManager.iter_json_lines(config_path))
+
+
+def test_post_stream_bounds_read_ahead(monkeypatch):
+    """Check that entries are not read far ahead of posting."""
+    monkeypatch.setenv(ENV_VAR_NAME, "test-token")
+    manager = github_interaction.GithubManager()
+    manager.api = mock_gh_api.MockGH()
+    read_count = 0
+    max_read_ahead = 0
+
+    def generated_entries():
+        nonlocal read_count
+        for number in range(200):
+            read_count += 1
+            yield github_objects.IssueEntry(issue_config(number))
+
+    original_record_posted = manager.record_posted
+
+    def record_posted(entry):
+        nonlocal max_read_ahead
+        posted_count = len(manager.api.get_repo("AC-GopherBot/test-1").issues) - 1
+        max_read_ahead = max(max_read_ahead, read_count - posted_count)
+        original_record_posted(entry)
+
+    manager.record_posted = record_posted
+    assert manager.post_stream(generated_entries(), queue_size=5) == 200
+    # Queue size, one entry blocked on put, and one being posted
+    assert max_read_ahead <= 7
+
+
+def test_post_stream_raises_producer_errors(monkeypatch):
+    """Check that errors raised while reading entries reach the caller."""
+    monkeypatch.setenv(ENV_VAR_NAME, "test-token")
+    manager = github_interaction.GithubManager()
+    manager.api = mock_gh_api.MockGH()
+
+    def broken_entries():
+        yield github_objects.IssueEntry(issue_config(0))
+        raise ValueError("broken config")
+
+    with pytest.raises(ValueError, match="broken config"):
+        manager.post_stream(broken_entries())
+
+
+def test_producer_error_stops_with_full_queue():
+    """Check that a producer error does not block when the consumer stopped."""
+    entry_queue: queue.Queue = queue.Queue(maxsize=1)
+    entry_queue.put("pending entry")
+    stop = threading.Event()
+
+    def broken_entries():
+        raise ValueError("broken config")
+        yield  # pylint: disable=W0101
+
+    # pylint: disable=W0212
+    producer = threading.Thread(
+        target=github_interaction.GithubManager._produce_entries,
+        args=(broken_entries(), entry_queue, stop),
+        daemon=True,
+    )
+    producer.start()
+    stop.set()
+    producer.join(timeout=5)
+    assert not producer.is_alive()
+
+
+def test_add_entries_from_memory(tmp_path, monkeypatch):
+    """Check that entry configurations are added directly and persisted."""
+    monkeypatch.setenv(ENV_VAR_NAME, "test-token")
+    manager = github_interaction.GithubManager()
+    configs = (issue_config(number) for number in range(3))
+    entries = manager.add_entries(configs, persist_path=str(tmp_path / "audit.yml"))
+    assert manager.add_entries(issue_config(3))[0].title == "issue 3"
+    assert [entry.title for entry in manager.issue_entries] == [
+        f"issue {number}" for number in range(4)
+    ]
+    assert entries == manager.issue_entries[:3]
+    manager.wait_for_persistence()
+    with open(tmp_path / "audit.yml", "r", encoding="utf-8") as readfile:
+        assert yaml.safe_load(readfile) == [issue_config(number) for number in range(3)]
+    manager.add_entries(
+        [issue_config(4), issue_config(5)], persist_path=str(tmp_path / "audit.jsonl")
+    )
+    manager.wait_for_persistence()
+    assert list(
+        github_interaction.GithubManager.iter_json_lines(tmp_path / "audit.jsonl")
+    ) == [issue_config(4), issue_config(5)]
+
+
+def test_add_entries_reports_every_invalid_config(monkeypatch):
+    """Check that invalid configurations are reported together and nothing is added."""
+    monkeypatch.setenv(ENV_VAR_NAME, "test-token")
+    manager = github_interaction.GithubManager()
+    missing_title = issue_config(1)
+    del missing_title["title"]
+    configs = [issue_config(0), missing_title, {"type": "discussion"}]
+    with pytest.raises(github_interaction.InvalidEntryConfig) as error:
+        manager.add_entries(configs)
+    assert "2 invalid entry configurations" in str(error.value)
+    assert "entry 1: 'title' is a required property" in str(error.value)
+    assert "entry 2:" in str(error.value)
+    assert not manager.issue_entries
+
+
+def test_wait_for_persistence_raises_write_errors(tmp_path, monkeypatch):
+    """Check that errors while writing the configuration are raised when waiting."""
+    monkeypatch.setenv(ENV_VAR_NAME, "test-token")
+    manager = github_interaction.GithubManager()
+    manager.add_entries(
+        issue_config(0), persist_path=str(tmp_path / "missing" / "audit.yml")
+    )
+    with pytest.raises(FileNotFoundError):
+        manager.wait_for_persistence()
+    manager.wait_for_persistence()
+
+
+def test_templates_render_source_regions(tmp_path, monkeypatch):
+    """Check that templates in the config directory render rows of collected regions."""
+    monkeypatch.setenv(ENV_VAR_NAME, "test-token")
+    data = pd.DataFrame({"user": ["ada-l", "grace-h"], "name": ["Ada", "Grace"]})
+    region = sheet_collector.Region("names", "students", "A1", "B3", data)
+    sheet = collected_sheet(region)
+    template = {
+        "type": "template",
+        "entry_type": "file",
+        "source": {"sheet": "grades", "tab": "students", "region": "names"},
+        "action": "create",
+        "repo": "sample_org/grades_{user}",
+        "path": "grades/{user}.md",
+        "content": "Grades of {name}",
+        "branch": "main",
+    }
+    with open(tmp_path / "templates.yml", "w", encoding="utf-8") as config_file:
+        yaml.dump([template, issue_config(0)], config_file)
+    manager = github_interaction.GithubManager(
+        sources_dir=str(tmp_path), sheets_data={"grades": sheet}
+    )
+    manager.collect_config()
+    assert [entry.path for entry in manager.file_entries] == [
+        "grades/ada-l.md",
+        "grades/grace-h.md",
+    ]
+    assert len(manager.issue_entries) == 1
+    assert [entry.repo for entry in manager.iter_entries()][:2] == [
+        "sample_org/grades_ada-l",
+        "sample_org/grades_grace-h",
+    ]
+    entries = manager.add_template(
+        {
+            "entry_type": "issue",
+            "action": "create",
+            "repo": "sample_org/grades_{user}",
+            "title": "{name}",
+            "body": "body",
+        },
+        data,
+    )
+    assert [entry.title for entry in manager.issue_entries[1:]] == ["Ada", "Grace"]
+    assert entries == manager.issue_entries[1:]
+    with pytest.raises(github_interaction.InvalidEntryConfig, match="source region"):
+        manager.add_entries(
+            {key: value for key, value in template.items() if key != "source"}
+        )
@@ -1,13 +1,18 @@
 """Test functionalities in the github_objects module."""
+
+import base64
+import io
+import tracemalloc
 from datetime import datetime
 
 import pytest
+from github.GithubException import GithubException
 from jsonschema.exceptions import ValidationError
 from mock_api import mock_gh_api
 from sheetshuttle import github_objects
+from tests.helpers import TEST_REPO_NAME
 
 ENV_VAR_NAME = "GH_ACCESS_TOKEN"
-TEST_REPO_NAME = "AC-GopherBot/test-1"
 HEAD_BRANCH = "test_branch"
 BASE_BRANCH = "main"
 
@@ -490,3 +495,304 @@ def test_file_replace_nonexistent(capfd):
         out == f"Warning: file does not exist, {nonexisting_file_path} was"
         f" NOT replaced in {TEST_REPO_NAME}:{BASE_BRANCH}.\n"
     )
+
+
+def test_blob_sha_matches_git():
+    """Check that the blob SHA is the one computed by git hash-object."""
+    assert (
+        github_objects.FileEntry.blob_sha(b"hello\n")
+        == "ce013625030ba8dba906f756967f9e9ca394464a"
+    )
+    assert (
+        github_objects.FileEntry.blob_sha(b"")
+        == "e69de29bb2d1d6434b8b29ae775ad8c2e48c5391"
+    )
+
+
+def test_file_replace_unchanged_skips_commit(capfd):
+    """Check that replacing a file with identical content does not commit."""
+    api = mock_gh_api.MockGH()
+    file_path = "test_folder/unchanged.md"
+    github_objects.FileEntry.create_file(
+        api, TEST_REPO_NAME, file_path, "# same content", BASE_BRANCH
+    )
+    repo = api.get_repo(TEST_REPO_NAME)
+    assert repo.write_count == 1
+    replace_config = {
+        "type": "file",
+        "action": "replace",
+        "repo": TEST_REPO_NAME,
+        "path": file_path,
+        "content": "# same content",
+        "branch": BASE_BRANCH,
+    }
+    replace_file_entry = github_objects.FileEntry(replace_config)
+    replace_file_entry.post(api)
+    out, _ = capfd.readouterr()
+    assert replace_file_entry.posted
+    assert replace_file_entry.gh_object is None
+    assert repo.write_count == 1
+    assert (
+        out == f"File {file_path} is unchanged in {TEST_REPO_NAME}:{BASE_BRANCH},"
+        " skipping commit.\n"
+    )
+    # Changed content is still committed
+    replace_config["content"] = "# new content"
+    github_objects.FileEntry(replace_config).post(api)
+    assert repo.write_count == 2
+
+
+def test_file_update_reads_contents_once(capfd):
+    """Check that updates read the file once and skip commits that change nothing."""
+    api = mock_gh_api.MockGH()
+    file_path = "test_folder/log.md"
+    github_objects.FileEntry.create_file(
+        api, TEST_REPO_NAME, file_path, "first", BASE_BRANCH
+    )
+    repo = api.get_repo(TEST_REPO_NAME)
+    read_count = repo.read_count
+    github_objects.FileEntry.update_file(
+        api, TEST_REPO_NAME, file_path, " second", BASE_BRANCH
+    )
+    assert repo.contents[file_path].decoded_content == b"first second"
+    assert repo.read_count == read_count + 1
+    assert repo.write_count == 2
+    assert (
+        github_objects.FileEntry.update_file(
+            api, TEST_REPO_NAME, file_path, "", BASE_BRANCH
+        )
+        is None
+    )
+    out, _ = capfd.readouterr()
+    assert "is unchanged" in out
+    assert repo.write_count == 2
+
+
+def test_get_remote_sha_directories():
+    """Check that directories only match when they are requested."""
+    api = mock_gh_api.MockGH()
+    github_objects.FileEntry.create_file(
+        api, TEST_REPO_NAME, "docs/nested/file.md", "content", BASE_BRANCH
+    )
+    assert github_objects.FileEntry.get_remote_sha(
+        api, TEST_REPO_NAME, "docs/nested/file.md", BASE_BRANCH
+    ) == github_objects.FileEntry.blob_sha(b"content")
+    assert (
+        github_objects.FileEntry.get_remote_sha(
+            api, TEST_REPO_NAME, "docs/nested", BASE_BRANCH
+        )
+        is None
+    )
+    assert github_objects.FileEntry.exists(api, TEST_REPO_NAME, "docs", BASE_BRANCH)
+
+
+def test_file_content_path_schema():
+    """Check that exactly one of content and content_path is required."""
+    config = {
+        "type": "file",
+        "action": "create",
+        "repo": TEST_REPO_NAME,
+        "path": "grades.csv",
+        "branch": BASE_BRANCH,
+    }
+    with pytest.raises(ValidationError):
+        github_objects.FileEntry(config)
+    with pytest.raises(ValidationError):
+        github_objects.FileEntry(
+            {**config, "content": "a", "content_path": "grades.csv"}
+        )
+    assert github_objects.FileEntry({**config, "content_path": "grades.csv"})
+
+
+def test_encode_base64_chunks():
+    """Check that the encoded chunks concatenate to the encoding of the whole content."""
+    content = bytes(range(256)) * 50
+    chunks = list(github_objects.FileEntry.encode_base64(io.BytesIO(content), 300))
+    assert len(chunks) == 43
+    assert "".join(chunks) == base64.b64encode(content).decode("ascii")
+    assert github_objects.FileEntry.stream_blob_sha(
+        io.BytesIO(content), 300
+    ) == github_objects.FileEntry.blob_sha(content)
+
+
+def test_decode_base64_chunks():
+    """Check that content decoded in chunks matches decoding it at once."""
+    content = bytes(range(256)) * 50
+    # Git blobs are encoded with line breaks
+    encoded = base64.encodebytes(content).decode("ascii")
+    decoded = io.BytesIO()
+    github_objects.FileEntry.decode_base64(encoded, decoded, 301)
+    assert decoded.getvalue() == content
+
+
+def test_large_file_uses_blobs_api(tmp_path, capfd):
+    """Check that large files are created, replaced, and updated with Git blobs."""
+    api = mock_gh_api.MockGH()
+    repo = api.get_repo(TEST_REPO_NAME)
+    large_file = tmp_path / "grades.csv"
+    large_content = "name,grade\n" + "student,100\n" * 200000
+    large_file.write_text(large_content, encoding="utf-8")
+    config = {
+        "type": "file",
+        "action": "create",
+        "repo": TEST_REPO_NAME,
+        "path": "exports/grades.csv",
+        "content_path": str(large_file),
+        "branch": BASE_BRANCH,
+    }
+    create_entry = github_objects.FileEntry(config)
+    create_entry.post(api)
+    assert create_entry.posted
+    assert create_entry.gh_object.sha in repo.blobs
+    exported = repo.get_contents("exports/grades.csv", BASE_BRANCH)
+    assert exported.decoded_content.decode("utf-8") == large_content
+    assert repo.write_count == 1
+    # Replacing with the same file does not commit
+    github_objects.FileEntry({**config, "action": "replace"}).post(api)
+    out, _ = capfd.readouterr()
+    assert "is unchanged" in out
+    assert repo.write_count == 1
+    # Appending to a large file goes through the blobs API as well
+    github_objects.FileEntry(
+        {
+            "type": "file",
+            "action": "update",
+            "repo": TEST_REPO_NAME,
+            "path": "exports/grades.csv",
+            "content": "late,90\n",
+            "branch": BASE_BRANCH,
+        }
+    ).post(api)
+    exported = repo.get_contents("exports/grades.csv", BASE_BRANCH)
+    assert exported.decoded_content.decode("utf-8") == large_content + "late,90\n"
+    assert repo.write_count == 2
+
+
+def test_small_content_path_uses_contents_api(tmp_path):
+    """Check that small files given by path are committed with the contents API."""
+    api = mock_gh_api.MockGH()
+    small_file = tmp_path / "report.md"
+    small_file.write_text("# Report", encoding="utf-8")
+    entry = github_objects.FileEntry(
+        {
+            "type": "file",
+            "action": "create",
+            "repo": TEST_REPO_NAME,
+            "path": "report.md",
+            "content_path": str(small_file),
+            "branch": BASE_BRANCH,
+        }
+    )
+    entry.post(api)
+    assert entry.gh_object.decoded_content == b"# Report"
+    assert not api.get_repo(TEST_REPO_NAME).blobs
+
+
+def test_content_path_reads_bytes_and_fails_when_missing(tmp_path):
+    """Check that binary files are committed and unreadable paths mark a failure."""
+    api = mock_gh_api.MockGH()
+    binary_file = tmp_path / "logo.png"
+    binary_file.write_bytes(bytes(range(256)))
+    config = {
+        "type": "file",
+        "action": "create",
+        "repo": TEST_REPO_NAME,
+        "path": "logo.png",
+        "content_path": str(binary_file),
+        "branch": BASE_BRANCH,
+    }
+    entry = github_objects.FileEntry(config)
+    entry.post(api)
+    assert entry.result.status == "posted"
+    assert entry.gh_object.decoded_content == bytes(range(256))
+    missing_entry = github_objects.FileEntry(
+        {**config, "content_path": str(tmp_path / "missing.png")}
+    )
+    missing_entry.post(api)
+    assert not missing_entry.posted
+    assert missing_entry.result.status == "failed"
+
+
+####################################
+# ###### Compact entry tests ########
+####################################
+
+
+class DiscardingRepo(mock_gh_api.MockRepo):
+    """Mock repo returning issues with a large raw payload without storing them."""
+
+    def create_issue(self, title: str, body: str, labels=None):
+        self.issues_last_index += 1
+        issue = mock_gh_api.MockIssue(title, body, self.issues_last_index + 1, labels)
+        issue.raw_data = {"body": body * 20, "title": title}
+        issue.html_url = f"https://github.com/{self.name}/issues/{issue.number}"
+        return issue
+
+
+def compact_issue_config(number):
+    """Return a valid issue creation configuration."""
+    return {
+        "type": "issue",
+        "action": "create",
+        "repo": TEST_REPO_NAME,
+        "title": f"issue {number}",
+        "body": f"compact body {number}",
+        "labels": ["SheetShuttle"],
+    }
+
+
+def test_compact_entry_keeps_fields_and_key():
+    """Check that compact entries drop the config but rebuild it and keep the key."""
+    config = compact_issue_config(1)
+    full_entry = github_objects.create_entry(config)
+    compact_entry = github_objects.create_entry(config, compact=True)
+    assert compact_entry.config is None
+    assert compact_entry.to_config() == config
+    assert full_entry.to_config() is config
+    assert compact_entry.config_key == full_entry.config_key
+    with pytest.raises(AttributeError):
+        compact_entry.unknown_attribute = True  # pylint: disable=E0237
+
+
+def test_compact_entry_keeps_only_post_result():
+    """Check that posting a compact entry keeps a result instead of the GitHub object."""
+    api = mock_gh_api.MockGH()
+    entry = github_objects.create_entry(compact_issue_config(1), compact=True)
+    entry.post(api)
+    assert entry.posted and entry.gh_object is None
+    created_issue = api.get_repo(TEST_REPO_NAME).issues[-1]
+    assert entry.result == github_objects.PostResult(
+        "posted", number=created_issue.number
+    )
+    failing_repo = DiscardingRepo(TEST_REPO_NAME)
+    failing_repo.create_issue = raise_server_error
+    api.repos[TEST_REPO_NAME] = failing_repo
+    failed_entry = github_objects.IssueEntry(compact_issue_config(2), compact=True)
+    failed_entry.post(api)
+    assert not failed_entry.posted
+    assert failed_entry.result.status == "failed"
+
+
+def raise_server_error(*args, **kwargs):
+    """Raise the error PyGithub raises for a failed request."""
+    raise GithubException(502, {"message": "Server Error"}, {})
+
+
+def test_compact_entries_memory_benchmark():
+    """Track the memory retained by posted entries in full and compact mode."""
+    retained = {}
+    for compact in (False, True):
+        api = mock_gh_api.MockGH()
+        api.repos[TEST_REPO_NAME] = DiscardingRepo(TEST_REPO_NAME)
+        tracemalloc.start()
+        entries = [
+            github_objects.create_entry(compact_issue_config(number), compact)
+            for number in range(1000)
+        ]
+        for entry in entries:
+            entry.post(api)
+        retained[compact] = tracemalloc.get_traced_memory()[0] / len(entries)
+        tracemalloc.stop()
+        assert entries[-1].result.url.endswith("/issues/1001")
+    print(f"bytes per posted entry: {retained}")
+    assert retained[True] < retained[False] / 2
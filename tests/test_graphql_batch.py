@@ -0,0 +1,183 @@
+"""Test functionalities in the graphql_batch module."""
+
+import re
+
+from sheetshuttle import github_objects, graphql_batch, rate_limit
+from tests.helpers import TEST_REPO_NAME
+
+RESOLVE_PATTERN = re.compile(
+    r'(r\d+): repository\(owner: "(.*?)", name: "(.*?)"\)'
+    r"|(f\d+): issueOrPullRequest\(number: (\d+)\)"
+    r'|(f\d+): label\(name: "(.*?)"\)'
+)
+COMMENT_PATTERN = re.compile(
+    r"(m\d+): addComment\(input: \{subjectId: \$(s\d+), body: \$(b\d+)\}\)"
+)
+LABELS_PATTERN = re.compile(
+    r"(a\d+): addLabelsToLabelable\(input: \{labelableId: \$(s\d+), labelIds: \$(l\d+)\}\)"
+)
+CREATE_LABEL_PATTERN = re.compile(
+    r"(c\d+): createLabel\(input: \{repositoryId: \$(r\d+), name: \$(n\d+)"
+)
+
+
+# pylint: disable=R0903
+class FakeGraphQL:
+    """Answer the queries and mutations sent by GraphQLBatcher from memory."""
+
+    def __init__(self, issue_numbers, labels, label_error=None) -> None:
+        self.issues = {
+            f"I_{TEST_REPO_NAME}_{number}": {"comments": [], "labels": []}
+            for number in issue_numbers
+        }
+        self.labels = {f"L_{TEST_REPO_NAME}_{label}": label for label in labels}
+        # Message of the error answered to label mutations, None to add them
+        self.label_error = label_error
+        self.requests = 0
+
+    def __call__(self, query, variables):
+        self.requests += 1
+        data = {}
+        if query.startswith("query"):
+            current = {}
+            for match in RESOLVE_PATTERN.finditer(query):
+                if match.group(1):
+                    repo = f"{match.group(2)}/{match.group(3)}"
+                    current = data[match.group(1)] = {"id": f"R_{repo}"}
+                elif match.group(4):
+                    node_id = f"I_{TEST_REPO_NAME}_{match.group(5)}"
+                    current[match.group(4)] = (
+                        {"id": node_id} if node_id in self.issues else None
+                    )
+                else:
+                    node_id = f"L_{TEST_REPO_NAME}_{match.group(7)}"
+                    current[match.group(6)] = (
+                        {"id": node_id} if node_id in self.labels else None
+                    )
+            return {"data": data}
+        for alias, _, name_var in CREATE_LABEL_PATTERN.findall(query):
+            node_id = f"L_{TEST_REPO_NAME}_{variables[name_var]}"
+            self.labels[node_id] = variables[name_var]
+            data[alias] = {"label": {"id": node_id}}
+        for alias, subject_var, body_var in COMMENT_PATTERN.findall(query):
+            self.issues[variables[subject_var]]["comments"].append(variables[body_var])
+            data[alias] = {"clientMutationId": None}
+        errors = []
+        for alias, subject_var, labels_var in LABELS_PATTERN.findall(query):
+            if self.label_error is not None:
+                errors.append({"path": [alias], "message": self.label_error})
+                data[alias] = None
+                continue
+            self.issues[variables[subject_var]]["labels"].extend(
+                self.labels[label_id] for label_id in variables[labels_var]
+            )
+            data[alias] = {"clientMutationId": None}
+        return {"data": data, "errors": errors}
+
+
+def update_entry(number, labels=None):
+    """Return an issue update entry."""
+    config = {
+        "type": "issue",
+        "action": "update",
+        "repo": TEST_REPO_NAME,
+        "number": number,
+        "body": f"comment on {number}",
+    }
+    if labels:
+        config["labels"] = labels
+    return github_objects.IssueEntry(config)
+
+
+def test_post_updates_uses_few_requests():
+    """Check that many updates are posted in a small number of requests."""
+    fake = FakeGraphQL(range(1, 501), ["SheetShuttle"])
+    batcher = graphql_batch.GraphQLBatcher(fake, batch_size=100)
+    entries = [
+        update_entry(number, ["SheetShuttle", "graded"]) for number in range(1, 501)
+    ]
+    batcher.post_updates(entries)
+    assert all(entry.posted for entry in entries)
+    issue = fake.issues[f"I_{TEST_REPO_NAME}_42"]
+    assert issue["comments"] == ["comment on 42"]
+    assert issue["labels"] == ["SheetShuttle", "graded"]
+    # 6 resolve queries, 1 label creation, 5 mutation batches
+    assert fake.requests == 12
+    assert batcher.request_count == fake.requests
+
+
+def test_post_updates_skips_missing_issues(capfd):
+    """Check that updates of issues that do not exist are skipped with a warning."""
+    fake = FakeGraphQL([1], [])
+    batcher = graphql_batch.GraphQLBatcher(fake)
+    existing_entry = update_entry(1)
+    missing_entry = update_entry(9)
+    batcher.post_updates([existing_entry, missing_entry])
+    out, _ = capfd.readouterr()
+    assert existing_entry.result.status == "posted"
+    assert missing_entry.result.status == "skipped"
+    assert (
+        f"Warning: issue #9 in {TEST_REPO_NAME} does not exist, update skipped" in out
+    )
+
+
+def test_post_updates_fails_entries_without_labels(capfd):
+    """Check that entries whose labels were not added are marked as failed."""
+    fake = FakeGraphQL([1, 2], ["graded"], label_error="Resource not accessible")
+    batcher = graphql_batch.GraphQLBatcher(fake)
+    labeled_entry = update_entry(1, ["graded"])
+    plain_entry = update_entry(2)
+    batcher.post_updates([labeled_entry, plain_entry])
+    out, _ = capfd.readouterr()
+    assert labeled_entry.result.status == "failed"
+    assert labeled_entry.result.error == "Resource not accessible"
+    assert plain_entry.result.status == "posted"
+    assert "Entry with the following configuration was NOT posted" in out
+
+
+def test_from_requester_is_paced_by_the_scheduler():
+    """Check that requests go through the requester and update the GraphQL limits."""
+    fake = FakeGraphQL([1], [])
+    sent = []
+
+    # pylint: disable=R0903
+    class FakeRequester:
+        """Answer GraphQL requests like a PyGithub Requester."""
+
+        graphql_url = "https://api.github.com/graphql"
+
+        # pylint: disable=C0103,W0622
+        def requestJsonAndCheck(self, verb, url, input=None):
+            """Send the request to the fake GraphQL endpoint."""
+            sent.append((verb, url))
+            headers = {"x-ratelimit-remaining": "4990", "x-ratelimit-reset": "1"}
+            return headers, fake(input["query"], input["variables"])
+
+    requester = FakeRequester()
+    scheduler = rate_limit.RateLimitScheduler(write_interval=0)
+    batcher = graphql_batch.GraphQLBatcher.from_requester(
+        requester, scheduler=scheduler
+    )
+    entry = update_entry(1)
+    batcher.post_updates([entry])
+    assert entry.result.status == "posted"
+    assert sent == [("POST", "https://api.github.com/graphql")] * 2
+    assert scheduler.call_count == 2
+    assert scheduler.limit(("graphql", requester)).remaining == 4990
+    # The REST limits of the credential are left alone
+    assert scheduler.limit().remaining is None
+
+
+def test_build_resolve_query_aliases():
+    """Check that each lookup gets its own alias under the repository alias."""
+    query, aliases = graphql_batch.GraphQLBatcher.build_resolve_query(
+        [(TEST_REPO_NAME, "numbers", 3), (TEST_REPO_NAME, "labels", 'quoted "name"')]
+    )
+    assert aliases == {
+        "r0": (
+            TEST_REPO_NAME,
+            {"f0": ("numbers", 3), "f1": ("labels", 'quoted "name"')},
+        )
+    }
+    assert 'repository(owner: "AC-GopherBot", name: "test-1")' in query
+    assert 'label(name: "quoted \\"name\\"")' in query
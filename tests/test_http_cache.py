@@ -0,0 +1,136 @@
+"""Test functionalities in the http_cache module."""
+
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+import requests
+from github import Github
+
+from sheetshuttle import github_interaction, http_cache
+
+
+class ETagHandler(BaseHTTPRequestHandler):
+    """Serve a JSON repo that only changes when its version changes."""
+
+    version = 1
+    requests_seen: list = []
+
+    def do_GET(self):  # pylint: disable=C0103
+        """Answer with 304 when the client already has the current version."""
+        etag = f'"version-{ETagHandler.version}"'
+        ETagHandler.requests_seen.append(self.headers.get("If-None-Match"))
+        if self.headers.get("If-None-Match") == etag:
+            self.send_response(304)
+            self.send_header("ETag", etag)
+            self.send_header("X-RateLimit-Remaining", "4999")
+            self.end_headers()
+            return
+        body = json.dumps(
+            {
+                "full_name": "sample_org/sample_repo",
+                "name": "sample_repo",
+                "description": f"version {ETagHandler.version}",
+            }
+        ).encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.send_header("ETag", etag)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):  # pylint: disable=W0221
+        """Keep the test output quiet."""
+
+
+@pytest.fixture(name="etag_server")
+def fixture_etag_server():
+    """Run the ETag server in a background thread."""
+    ETagHandler.version = 1
+    ETagHandler.requests_seen = []
+    server = ThreadingHTTPServer(("127.0.0.1", 0), ETagHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_address[1]}"
+    server.shutdown()
+    server.server_close()
+
+
+def test_adapter_revalidates_cached_responses(tmp_path, etag_server):
+    """Check that repeated GETs are answered from the cache after a 304."""
+    cache = http_cache.ResponseCache(str(tmp_path / "cache"))
+    session = requests.Session()
+    session.mount("http://", http_cache.ConditionalCacheAdapter(cache))
+    first = session.get(f"{etag_server}/repos/sample_org/sample_repo")
+    second = session.get(f"{etag_server}/repos/sample_org/sample_repo")
+    assert first.json() == second.json()
+    assert second.status_code == 200
+    assert second.headers["X-RateLimit-Remaining"] == "4999"
+    assert ETagHandler.requests_seen == [None, '"version-1"']
+    assert cache.stats.report() == {
+        "hits": 1,
+        "misses": 1,
+        "stores": 1,
+        "uncached": 0,
+        "hit_ratio": 0.5,
+    }
+    # A changed resource is downloaded and stored again
+    ETagHandler.version = 2
+    third = session.get(f"{etag_server}/repos/sample_org/sample_repo")
+    assert third.json()["description"] == "version 2"
+    assert cache.stats.stores == 2
+
+
+def test_cache_persists_across_sessions(tmp_path, etag_server):
+    """Check that responses cached by one run are revalidated by the next run."""
+    for _ in range(2):
+        session = requests.Session()
+        cache = http_cache.ResponseCache(str(tmp_path / "cache"))
+        session.mount("http://", http_cache.ConditionalCacheAdapter(cache))
+        session.get(f"{etag_server}/repos/sample_org/sample_repo")
+    assert cache.stats.hits == 1 and cache.stats.misses == 0
+
+
+def test_attach_cache_for_pygithub(tmp_path, etag_server):
+    """Check that only the PyGithub client given to attach_cache uses the cache."""
+    cache = http_cache.ResponseCache(str(tmp_path / "cache"))
+    api = http_cache.attach_cache(Github(base_url=etag_server), cache)
+    other_api = Github(base_url=etag_server)
+    first = api.get_repo("sample_org/sample_repo")
+    second = api.get_repo("sample_org/sample_repo")
+    other_api.get_repo("sample_org/sample_repo")
+    assert first.description == second.description == "version 1"
+    assert cache.stats.hits == 1 and cache.stats.misses == 1
+    assert ETagHandler.requests_seen == [None, '"version-1"', None]
+    assert (tmp_path / "cache").stat().st_mode & 0o777 == 0o700
+
+
+def test_github_manager_caches_its_client(tmp_path, etag_server, monkeypatch, capsys):
+    """Check that a GithubManager caches the client it builds and reports the stats."""
+    http_cache.report_stats()
+    monkeypatch.setattr(
+        github_interaction.GithubManager,
+        "authenticate_api",
+        staticmethod(lambda key_file: Github(base_url=etag_server)),
+    )
+    manager = github_interaction.GithubManager(cache_dir=str(tmp_path / "cache"))
+    manager.api.get_repo("sample_org/sample_repo")
+    manager.api.get_repo("sample_org/sample_repo")
+    Github(base_url=etag_server).get_repo("sample_org/sample_repo")
+    assert manager.http_cache.stats.hits == 1 and manager.http_cache.stats.misses == 1
+    assert http_cache.report_stats() == [manager.http_cache]
+    assert "1 hits, 1 misses (50% hit ratio)" in capsys.readouterr().out
+    assert not http_cache.report_stats()
+
+
+def test_github_manager_does_not_cache_given_clients(tmp_path, etag_server, capsys):
+    """Check that a client given to a GithubManager is not changed by cache_dir."""
+    api = Github(base_url=etag_server)
+    manager = github_interaction.GithubManager(
+        cache_dir=str(tmp_path / "cache"), api=api
+    )
+    api.get_repo("sample_org/sample_repo")
+    assert manager.http_cache.stats.misses == 0
+    assert "Warning: cache_dir is only used" in capsys.readouterr().out
@@ -0,0 +1,90 @@
+"""Test functionalities in the isolation module."""
+
+import json
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+from sheetshuttle import isolation, plugin_runner, sheet_collector
+from tests.helpers import collected_sheet
+
+PLUGIN = """import json
+import os
+
+
+def run(sheets_keys_file, sheets_config_directory, gh_config_directory, **kwargs):
+    data = kwargs["sheets_data"]["gradebook"].tabs["students"]["scores"].data
+    record = {
+        "pid": os.getpid(),
+        "args": kwargs["args"],
+        "names": data["name"].tolist(),
+        "total": float(data["grade"].sum()),
+    }
+    name = __name__.split(".")[-1]
+    with open(os.path.join(kwargs["args"]["output"], f"{name}.json"), "w") as file:
+        json.dump(record, file)
+"""
+
+
+def make_sheet(data):
+    """Return a sheet with a single region holding the data."""
+    return collected_sheet(
+        sheet_collector.Region("scores", "students", "A1", "E4", data, key="name")
+    )
+
+
+def test_shared_sheets_round_trip():
+    """Check that regions read from shared memory equal the collected regions."""
+    data = pd.DataFrame(
+        {
+            "name": pd.array(["Ada", "Zoë", None], dtype="string"),
+            "grade": [90.5, 80.0, np.nan],
+            "late": pd.array([1, None, 3], dtype="Int64"),
+            "notes": [1, "late", None],
+            "passed": [True, True, False],
+            "section": pd.Categorical(["A", None, "A"]),
+        },
+        index=pd.RangeIndex(1, 4, name="row"),
+    )
+    with isolation.SharedSheets({"gradebook": make_sheet(data)}) as shared:
+        sheets_data = isolation.read_sheets(shared.memory, shared.description)
+        region = sheets_data["gradebook"].get_tab("students")["scores"]
+        assert region.start_range == "A1" and region.end_range == "E4"
+        assert region.lookup("Zoë")["grade"] == 80.0
+        pd.testing.assert_frame_equal(region.data, data)
+        grades = region.data["grade"].to_numpy()
+        # Numeric columns view the shared memory block instead of copying it
+        assert not grades.flags.owndata and not grades.flags.writeable
+        with pytest.raises(ValueError, match="read-only"):
+            region.data.loc[1, "grade"] = 0.0
+        del sheets_data, region, grades
+
+
+def test_run_plugins_in_worker_processes(tmp_path, capsys):
+    """Check that plugins run in other processes with the shared sheets."""
+    plugins_directory = tmp_path / "plugins"
+    plugins_directory.mkdir()
+    for name in ("first", "second"):
+        (plugins_directory / f"{name}.py").write_text(PLUGIN, encoding="utf-8")
+    (plugins_directory / "broken.py").write_text(
+        "def run(*args, **kwargs):\n    raise ValueError('broken plugin')\n",
+        encoding="utf-8",
+    )
+    data = pd.DataFrame({"name": ["Ada", "Alan"], "grade": [90, 80]})
+    plugins = plugin_runner.load_plugins(
+        str(plugins_directory), ["first", "broken", "second"]
+    )
+    kwargs = {
+        "args": {"output": str(tmp_path)},
+        "sheets_data": {"gradebook": make_sheet(data)},
+    }
+    with pytest.raises(ValueError, match="broken plugin"):
+        isolation.run_plugins(plugins, ("", "", ""), kwargs, concurrency=2)
+    assert "ERROR: plugin broken failed: broken plugin" in capsys.readouterr().out
+    for name in ("first", "second"):
+        record = json.loads((tmp_path / f"{name}.json").read_text(encoding="utf-8"))
+        assert record["args"] == {"output": str(tmp_path)}
+        assert record["names"] == ["Ada", "Alan"]
+        assert record["total"] == 170.0
+        assert record["pid"] != os.getpid()
@@ -0,0 +1,111 @@
+"""Test functionalities in the ledger module."""
+
+from github.GithubException import GithubException
+
+from mock_api import mock_gh_api
+from sheetshuttle import github_interaction, github_objects, ledger
+from tests.helpers import TEST_REPO_NAME, issue_config
+
+
+def test_entry_key_is_stable():
+    """Check that the key does not depend on the order of the configuration keys."""
+    config = issue_config(1)
+    reordered = dict(reversed(list(config.items())))
+    assert ledger.PostingLedger.entry_key(config) == ledger.PostingLedger.entry_key(
+        reordered
+    )
+    assert ledger.PostingLedger.entry_key(config) != ledger.PostingLedger.entry_key(
+        issue_config(2)
+    )
+
+
+def test_record_persists_across_connections(tmp_path):
+    """Check that recorded entries are found after reopening the ledger."""
+    ledger_path = str(tmp_path / "ledger.db")
+    posting_ledger = ledger.PostingLedger(ledger_path)
+    entry = github_objects.IssueEntry(issue_config(1))
+    assert not posting_ledger.contains(entry)
+    entry.post(mock_gh_api.MockGH())
+    record = posting_ledger.record(entry)
+    assert record.number == entry.gh_object.number
+    posting_ledger.close()
+    reopened_ledger = ledger.PostingLedger(ledger_path)
+    assert reopened_ledger.contains(github_objects.IssueEntry(issue_config(1)))
+    assert reopened_ledger.get(entry) == record
+    assert len(reopened_ledger) == 1
+
+
+def test_manager_rerun_skips_posted_entries(tmp_path, monkeypatch):
+    """Check that a rerun after a partial run only posts the remaining entries."""
+    monkeypatch.setenv("GH_ACCESS_TOKEN", "test-token")
+    ledger_path = str(tmp_path / "ledger.db")
+    api = mock_gh_api.MockGH()
+    configs = [issue_config(number) for number in range(6)]
+    # First run only gets through half of the entries
+    first_manager = github_interaction.GithubManager(
+        ledger=ledger.PostingLedger(ledger_path)
+    )
+    first_manager.api = api
+    first_manager.parse_config_list(configs[:3])
+    first_manager.post_all()
+    # Second run receives every entry
+    second_manager = github_interaction.GithubManager(
+        ledger=ledger.PostingLedger(ledger_path)
+    )
+    second_manager.api = api
+    second_manager.parse_config_list(configs)
+    second_manager.post_all()
+    assert all(entry.posted for entry in second_manager.issue_entries)
+    assert [entry.gh_object is None for entry in second_manager.issue_entries] == [
+        True,
+        True,
+        True,
+        False,
+        False,
+        False,
+    ]
+    created_titles = [issue.title for issue in api.get_repo(TEST_REPO_NAME).issues[:-1]]
+    assert sorted(created_titles) == sorted(config["title"] for config in configs)
+    assert len(second_manager.ledger) == 6
+
+
+def test_manager_does_not_record_failed_or_skipped_entries(tmp_path, monkeypatch):
+    """Check that failed and skipped entries are posted again on the next run."""
+    monkeypatch.setenv("GH_ACCESS_TOKEN", "test-token")
+    api = mock_gh_api.MockGH()
+    repo = api.get_repo(TEST_REPO_NAME)
+
+    def reject_pull(**_):
+        raise GithubException(422, {"message": "Validation Failed"}, {})
+
+    monkeypatch.setattr(repo, "create_pull", reject_pull)
+    manager = github_interaction.GithubManager(
+        ledger=ledger.PostingLedger(str(tmp_path / "ledger.db"))
+    )
+    manager.api = api
+    manager.parse_config_list(
+        [
+            {
+                "type": "pull request",
+                "action": "create",
+                "repo": TEST_REPO_NAME,
+                "title": "rejected pull request",
+                "body": "ledger body",
+                "base": "main",
+                "head": "feedback",
+            },
+            {
+                "type": "issue",
+                "action": "update",
+                "repo": TEST_REPO_NAME,
+                "number": 50,
+                "body": "missing issue",
+            },
+            issue_config(1),
+        ]
+    )
+    manager.post_all()
+    assert manager.pull_request_entries[0].result.status == "failed"
+    assert manager.issue_entries[0].result.status == "skipped"
+    assert len(manager.ledger) == 1
+    assert manager.ledger.contains(manager.issue_entries[1])
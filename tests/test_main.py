@@ -1,25 +1,213 @@
 """Test the main module of SheetShuttle"""
-import pytest
+
+import json
+
+from typer.testing import CliRunner
 
 from sheetshuttle import main
+from tests.helpers import STUDENTS_CELLS, STUDENTS_CONFIG, mock_sheets
+
+
+def test_preview_command(monkeypatch, tmp_path):
+    """Check that the preview command prints the collected regions."""
+    mock_sheets(monkeypatch, STUDENTS_CELLS)
+    (tmp_path / "grades.yml").write_text(STUDENTS_CONFIG, encoding="utf-8")
+    result = CliRunner().invoke(
+        main.app, ["preview", "-sd", str(tmp_path), "--head", "1"]
+    )
+    assert result.exit_code == 0
+    assert "students / names (A1:B3)" in result.output
+    assert "Ada" in result.output and "Alan" not in result.output
+
+
+RECORDING_PLUGIN = """
+import json
+
+def run(sheets_keys_file, sheets_config_directory, gh_config_directory, **kwargs):
+    sheets_data = kwargs.get("sheets_data")
+    record = {
+        "args": kwargs["args"],
+        "sheets": None if sheets_data is None else sorted(sheets_data),
+        "github_api": type(kwargs.get("github_api")).__name__,
+        "credential_pool": type(kwargs.get("credential_pool")).__name__,
+    }
+    with open(kwargs["args"]["output"] + "/NAME.json", "w", encoding="utf-8") as out:
+        json.dump(record, out)
+"""
+
+
+def write_plugins(directory, names):
+    """Write plugins recording the keyword arguments they receive."""
+    directory.mkdir()
+    for name in names:
+        (directory / f"{name}.py").write_text(
+            RECORDING_PLUGIN.replace("NAME", name), encoding="utf-8"
+        )
+
+
+def test_run_several_plugins_with_shared_data(monkeypatch, tmp_path):
+    """Check that sheets are collected once and passed to every plugin."""
+    api = mock_sheets(
+        monkeypatch, {"students!A1:B2": [["name", "grade"], ["Ada", "90"]]}
+    )
+    monkeypatch.setenv("GH_ACCESS_TOKEN", "test-token")
+    sheets_directory = tmp_path / "sheets"
+    sheets_directory.mkdir()
+    (sheets_directory / "gradebook.yml").write_text(
+        "source_id: sheet-id\n"
+        "sheets:\n"
+        "  - name: students\n"
+        "    regions:\n"
+        "      - {name: names, start: A1, end: B2, contains_headers: true}\n",
+        encoding="utf-8",
+    )
+    write_plugins(tmp_path / "plugins", ["first", "second"])
+    args_file = tmp_path / "args.json"
+    args_file.write_text(json.dumps({"output": str(tmp_path)}), encoding="utf-8")
+    result = CliRunner().invoke(
+        main.app,
+        [
+            "run",
+            "-sd",
+            str(sheets_directory),
+            "-pd",
+            str(tmp_path / "plugins"),
+            "-pn",
+            "first",
+            "-pn",
+            "second",
+            "-ja",
+            str(args_file),
+            "--shared",
+            "--concurrency",
+            "2",
+        ],
+    )
+    assert result.exit_code == 0, result.output
+    assert len(api.requests) == 1
+    for name in ("first", "second"):
+        record = json.loads((tmp_path / f"{name}.json").read_text(encoding="utf-8"))
+        assert record == {
+            "args": {"output": str(tmp_path)},
+            "sheets": ["gradebook"],
+            "github_api": "Github",
+            "credential_pool": "NoneType",
+        }
+
+
+def test_run_isolated_plugins_with_credential_pool(monkeypatch, tmp_path):
+    """Check that --gh-pool gives every worker a pool of the GitHub tokens."""
+    mock_sheets(monkeypatch, STUDENTS_CELLS)
+    monkeypatch.setenv("GH_ACCESS_TOKEN", "test-token")
+    monkeypatch.setenv("GH_ACCESS_TOKENS", "first-token,second-token")
+    sheets_directory = tmp_path / "sheets"
+    sheets_directory.mkdir()
+    (sheets_directory / "gradebook.yml").write_text(STUDENTS_CONFIG, encoding="utf-8")
+    write_plugins(tmp_path / "plugins", ["first"])
+    args_file = tmp_path / "args.json"
+    args_file.write_text(json.dumps({"output": str(tmp_path)}), encoding="utf-8")
+    result = CliRunner().invoke(
+        main.app,
+        [
+            "run",
+            "-sd",
+            str(sheets_directory),
+            "-pd",
+            str(tmp_path / "plugins"),
+            "-pn",
+            "first",
+            "-ja",
+            str(args_file),
+            "--shared",
+            "--gh-pool",
+            "--isolated",
+        ],
+    )
+    assert result.exit_code == 0, result.output
+    record = json.loads((tmp_path / "first.json").read_text(encoding="utf-8"))
+    assert record["sheets"] == ["gradebook"]
+    assert record["credential_pool"] == "CredentialPool"
+
+
+def test_bench_command_compares_to_baseline(tmp_path):
+    """Check that bench saves its results and exits with 1 on regressions."""
+    results = tmp_path / "results.json"
+    arguments = ["bench", "-w", "convert", "--rows", "50", "--repeat", "2"]
+    result = CliRunner().invoke(main.app, [*arguments, "-o", str(results)])
+    assert result.exit_code == 0, result.output
+    document = json.loads(results.read_text(encoding="utf-8"))
+    assert list(document["workloads"]) == ["convert"]
+    result = CliRunner().invoke(
+        main.app, [*arguments, "-b", str(results), "--tolerance", "1000"]
+    )
+    assert result.exit_code == 0, result.output
+    assert "OK: convert" in result.output
+    document["workloads"]["convert"]["p50"] = 1e-9
+    results.write_text(json.dumps(document), encoding="utf-8")
+    result = CliRunner().invoke(main.app, [*arguments, "-b", str(results)])
+    assert result.exit_code == 1
+    assert "ERROR: regression in convert" in result.output
+    result = CliRunner().invoke(main.app, ["bench", "-w", "sort"])
+    assert result.exit_code == 1
+
+
+def test_run_with_profile(tmp_path):
+    """Check that every plugin gets a profile report."""
+    write_plugins(tmp_path / "plugins", ["first", "second"])
+    args_file = tmp_path / "args.json"
+    args_file.write_text(json.dumps({"output": str(tmp_path)}), encoding="utf-8")
+    arguments = ["run", "-pd", str(tmp_path / "plugins"), "-ja", str(args_file)]
+    arguments.extend(["-pn", "first", "-pn", "second", "--concurrency", "2"])
+    profile_directory = tmp_path / "profile"
+    result = CliRunner().invoke(
+        main.app,
+        [*arguments, "--profile", "cpu", "--profile-directory", str(profile_directory)],
+    )
+    assert result.exit_code == 0, result.output
+    assert "plugins are run one after the other" in result.output
+    summary = json.loads((profile_directory / "summary.json").read_text("utf-8"))
+    assert [phase["name"] for phase in summary["phases"]] == [
+        "plugin first",
+        "plugin second",
+    ]
+    assert (profile_directory / "001-plugin_first.cpu.txt").exists()
+    result = CliRunner().invoke(main.app, [*arguments, "--profile", "disk"])
+    assert "ERROR: --profile must be one of" in result.output
 
 
-@pytest.mark.parametrize(
-    "directory,name,errors",
-    [
-        ("plugins/", "default", False),
-        ("plugins/", "non_existent_plugin", True),
-        ("non_existent_directory/", "default", True),
-        ("non_existent_directory/", "non_existent_plugin", True),
-    ],
-)
-def test_load_plugin(directory, name, errors):
-    """Check that existing plugins can be loaded successfully.
-
-    And incorrect plugins throw errors.
-    """
-    if errors:
-        with pytest.raises(Exception):
-            main.load_plugin(directory, name)
-    else:
-        main.load_plugin(directory, name)
+def test_run_with_trace(tmp_path):
+    """Check that the spans of every plugin are written as Chrome trace events."""
+    write_plugins(tmp_path / "plugins", ["first", "second"])
+    args_file = tmp_path / "args.json"
+    args_file.write_text(json.dumps({"output": str(tmp_path)}), encoding="utf-8")
+    trace = tmp_path / "trace.json"
+    result = CliRunner().invoke(
+        main.app,
+        [
+            "run",
+            "-pd",
+            str(tmp_path / "plugins"),
+            "-ja",
+            str(args_file),
+            "-pn",
+            "first",
+            "-pn",
+            "second",
+            "--concurrency",
+            "2",
+            "--trace",
+            str(trace),
+        ],
+    )
+    assert result.exit_code == 0, result.output
+    assert f"Trace written to {trace}" in result.output
+    events = json.loads(trace.read_text("utf-8"))["traceEvents"]
+    assert events[0]["name"] == "run"
+    plugins = {
+        event["args"]["plugin"]: event for event in events if event["name"] == "plugin"
+    }
+    assert sorted(plugins) == ["first", "second"]
+    assert all(
+        event["args"]["parent_id"] == events[0]["args"]["span_id"]
+        for event in plugins.values()
+    )
@@ -0,0 +1,51 @@
+"""Test the plugin_runner module of SheetShuttle"""
+
+import pytest
+
+from sheetshuttle import plugin_runner
+
+
+@pytest.mark.parametrize(
+    "directory,name,errors",
+    [
+        ("plugins/", "default", False),
+        ("plugins/", "non_existent_plugin", True),
+        ("non_existent_directory/", "default", True),
+        ("non_existent_directory/", "non_existent_plugin", True),
+    ],
+)
+def test_load_plugin(directory, name, errors):
+    """Check that existing plugins can be loaded successfully.
+
+    And incorrect plugins throw errors.
+    """
+    if errors:
+        with pytest.raises(Exception):
+            plugin_runner.load_plugin(directory, name)
+    else:
+        plugin_runner.load_plugin(directory, name)
+
+
+def test_run_plugins_reports_failures(tmp_path, capsys):
+    """Check that missing run functions fail early and plugin errors are raised last."""
+    (tmp_path / "no_run.py").write_text("VALUE = 1\n", encoding="utf-8")
+    with pytest.raises(Exception, match="function run was not found in no_run"):
+        plugin_runner.load_plugins(str(tmp_path), ["no_run"])
+    (tmp_path / "broken.py").write_text(
+        "def run(*args, **kwargs):\n    raise ValueError('broken plugin')\n",
+        encoding="utf-8",
+    )
+    (tmp_path / "plugins").mkdir()
+    (tmp_path / "plugins" / "working.py").write_text(
+        "def run(*args, **kwargs):\n"
+        "    with open(kwargs['output'] + '/working.txt', 'w') as out:\n"
+        "        out.write('ran')\n",
+        encoding="utf-8",
+    )
+    plugins = plugin_runner.load_plugins(str(tmp_path), ["broken"])
+    plugins.update(plugin_runner.load_plugins(str(tmp_path / "plugins"), ["working"]))
+    with pytest.raises(ValueError, match="broken plugin"):
+        plugin_runner.run_plugins(plugins, ("", "", ""), {"output": str(tmp_path)})
+    assert "ERROR: plugin broken failed: broken plugin" in capsys.readouterr().out
+    # The working plugin still ran after the broken one
+    assert (tmp_path / "working.txt").exists()
@@ -0,0 +1,78 @@
+"""Test functionalities in the preview module."""
+
+import io
+
+import numpy as np
+import pandas as pd
+from rich.console import Console
+from sheetshuttle import preview, sheet_collector
+from tests.helpers import STUDENTS_CELLS, STUDENTS_CONFIG, mock_sheets
+
+
+def make_region(rows=100):
+    """Return a region with a text and a numeric column."""
+    data = pd.DataFrame(
+        {"name": [f"student [{n}]" for n in range(rows)], "grade": np.arange(rows)}
+    )
+    data["grade"] = data["grade"].astype(float)
+    data.loc[3, "grade"] = np.nan
+    return sheet_collector.Region("grades", "students", "A1", f"B{rows + 1}", data)
+
+
+def test_select_rows():
+    """Check that head, tail, and sampled rows are selected in order without overlap."""
+    assert preview.select_rows(10, head=3, tail=2) == [0, 1, 2, 8, 9]
+    assert preview.select_rows(4, head=3, tail=3) == [0, 1, 2, 3]
+    sampled = preview.select_rows(100, head=2, tail=2, sample=5, seed=1)
+    assert len(sampled) == 9 and sampled == sorted(sampled)
+    assert sampled == preview.select_rows(100, head=2, tail=2, sample=5, seed=1)
+    assert preview.select_rows(0, head=5, tail=5, sample=5) == []
+
+
+def test_preview_region_output():
+    """Check that the summary and the selected rows are printed, with gaps marked."""
+    output = io.StringIO()
+    console = Console(file=output, width=100)
+    preview.preview_region(make_region(), console, head=2, tail=1)
+    text = output.getvalue()
+    assert "students / grades (A1:B101)" in text
+    assert "100 rows x 2 columns" in text
+    assert "float64" in text and "│ 99       │ 1       │" in text
+    # Values are not read as rich markup
+    assert "student [1]" in text and "student [99]" in text
+    assert "student [2]" not in text
+    assert text.count("…") == 3
+
+
+def test_collector_previews_while_collecting(monkeypatch, tmp_path):
+    """Check that every region is printed as soon as it is collected."""
+    api = mock_sheets(
+        monkeypatch,
+        {**STUDENTS_CELLS, "labs!A1:A2": [["lab"], ["lab 1"]]},
+    )
+    (tmp_path / "grades.yml").write_text(
+        STUDENTS_CONFIG + "  - name: labs\n"
+        "    regions:\n"
+        "      - {name: labs, start: A1, end: A2, contains_headers: true}\n",
+        encoding="utf-8",
+    )
+    collector = sheet_collector.SheetCollector(sources_dir=str(tmp_path))
+    printed = []
+
+    def record_preview(region, _console, **_options):
+        printed.append((region.region_name, len(api.requests)))
+
+    monkeypatch.setattr(preview, "preview_region", record_preview)
+    assert collector.preview() == 2
+    # The first region is printed before the second one is requested
+    assert printed == [("names", 1), ("labs", 2)]
+    assert collector.sheets_data["grades"].get_tab("labs")["labs"].data.shape == (1, 1)
+
+
+def test_preview_compacted_region():
+    """Check that the size before compaction is shown for compacted regions."""
+    output = io.StringIO()
+    region = make_region()
+    region.original_size = 1024 * 1024
+    preview.preview_region(region, Console(file=output, width=100))
+    assert "compacted from 1.0 MB" in output.getvalue()
@@ -0,0 +1,128 @@
+"""Test functionalities in the profiling module."""
+
+import json
+import threading
+
+import pytest
+from mock_api import mock_sheets_api
+from sheetshuttle import profiling, sheet_collector
+
+
+@pytest.fixture(autouse=True)
+def stop_profiler():
+    """Make sure that no profiler is left running by a failing test."""
+    yield
+    profiling.stop()
+
+
+def make_garbage(count):
+    """Allocate a list of strings to be found by the profilers."""
+    return [str(number) * 10 for number in range(count)]
+
+
+def test_phases_do_nothing_without_profiler():
+    """Check that phases are not recorded when profiling is off."""
+    with profiling.phase("grading") as record:
+        make_garbage(10)
+    assert record is None
+    assert profiling.active() is None
+    assert profiling.stop() is None
+
+
+def test_cpu_profile_of_nested_phases(tmp_path):
+    """Check that nested phases get their own cpu reports and summary entries."""
+    profiler = profiling.start("cpu", str(tmp_path))
+    with profiling.phase("plugin grades"):
+        make_garbage(100)
+        with profiling.phase("grade submissions"):
+            make_garbage(1000)
+
+    @profiling.phase("decorated")
+    def decorated():
+        return make_garbage(10)
+
+    assert len(decorated()) == 10
+
+    # Phases of other threads are not profiled
+    def other_thread():
+        with profiling.phase("other"):
+            make_garbage(10)
+
+    thread = threading.Thread(target=other_thread)
+    thread.start()
+    thread.join()
+    summary = profiling.stop()
+    assert profiling.active() is None
+    phases = json.loads(summary.read_text(encoding="utf-8"))["phases"]
+    assert [phase["name"] for phase in phases] == [
+        "plugin grades",
+        "grade submissions",
+        "decorated",
+    ]
+    assert profiler.records[1].duration <= profiler.records[0].duration
+    inner_report = (tmp_path / "001-grade_submissions.cpu.txt").read_text(
+        encoding="utf-8"
+    )
+    assert "make_garbage" in inner_report
+    assert (tmp_path / "002-plugin_grades.cpu.txt").exists()
+    assert (tmp_path / "002-plugin_grades.prof").exists()
+
+
+def test_memory_profile_of_collected_regions(tmp_path):
+    """Check that the memory report lists peaks and the collected regions."""
+    api = mock_sheets_api.MockSheets(
+        {
+            "students!A1:B3": [["name", "grade"], ["Ada", "90"], ["Alan", "80"]],
+            "students!D1:D2": [["late"], ["2"]],
+        }
+    )
+    sheet = sheet_collector.Sheet(
+        {
+            "source_id": "sheet-id",
+            "sheets": [
+                {
+                    "name": "students",
+                    "regions": [
+                        {
+                            "name": "grades",
+                            "start": "A1",
+                            "end": "B3",
+                            "contains_headers": True,
+                        },
+                        {
+                            "name": "late",
+                            "start": "D1",
+                            "end": "D2",
+                            "contains_headers": True,
+                        },
+                    ],
+                }
+            ],
+        },
+        api,
+    )
+    profiling.start("memory", str(tmp_path))
+    with profiling.phase("collect") as record:
+        sheet.collect_regions()
+        garbage = make_garbage(20000)
+    summary = profiling.stop()
+    assert record.peak >= record.allocated > 0
+    phases = json.loads(summary.read_text(encoding="utf-8"))["phases"]
+    assert [phase["name"] for phase in phases] == [
+        "collect",
+        "region students/grades",
+        "region students/late",
+    ]
+    assert all(phase["data_size"] > 0 for phase in phases[1:])
+    assert all(phase["report"] is None for phase in phases[1:])
+    report = (tmp_path / "001-collect.memory.txt").read_text(encoding="utf-8")
+    assert "Peak traced memory" in report
+    assert "test_profiling.py" in report
+    assert "region students/grades: peak" in report
+    del garbage
+
+
+def test_unknown_mode(tmp_path):
+    """Check that only the cpu and memory modes are accepted."""
+    with pytest.raises(Exception, match="unknown profile mode"):
+        profiling.start("disk", str(tmp_path))
@@ -0,0 +1,249 @@
+"""Test functionalities in the rate_limit module."""
+
+from types import SimpleNamespace
+
+from github.GithubException import GithubException
+from github.PaginatedList import PaginatedListBase
+
+import pytest
+from mock_api import mock_gh_api
+from sheetshuttle import github_objects, rate_limit
+from tests.helpers import TEST_REPO_NAME, SleepingClock, issue_config
+
+
+class ThrottledRepo(mock_gh_api.MockRepo):
+    """Mock repo that throttles the first few issue creations."""
+
+    def __init__(self, name: str, failures: int, headers) -> None:
+        super().__init__(name)
+        self.failures = failures
+        self.headers = headers
+
+    def create_issue(self, title: str, body: str, labels=None):
+        if self.failures:
+            self.failures -= 1
+            raise GithubException(
+                403,
+                {"message": "You have exceeded a secondary rate limit"},
+                self.headers,
+            )
+        return super().create_issue(title, body, labels)
+
+
+# pylint: disable=R0903
+class PagedList(PaginatedListBase):
+    """Paginated list fetching the given pages, throttled on the first fetches."""
+
+    def __init__(self, pages, failures: int = 0) -> None:
+        super().__init__()
+        self.pages = list(pages)
+        self.failures = failures
+
+    def _couldGrow(self):  # pylint: disable=C0103
+        return bool(self.pages)
+
+    def _fetchNextPage(self):  # pylint: disable=C0103
+        if self.failures:
+            self.failures -= 1
+            raise GithubException(403, {}, {"Retry-After": "5"})
+        return self.pages.pop(0)
+
+
+# pylint: disable=R0903
+class LazyIssue:
+    """Issue whose title is only loaded by a request when it is first read."""
+
+    def __init__(self) -> None:
+        self.completed = False
+
+    @property
+    def title(self):
+        """Load the issue and return its title."""
+        self.completed = True
+        return "lazy title"
+
+
+def test_is_throttled_detects_rate_limits():
+    """Check that primary and secondary rate limit errors are detected."""
+    assert rate_limit.RateLimitScheduler.is_throttled(
+        GithubException(403, {}, {"Retry-After": "5"})
+    )
+    assert rate_limit.RateLimitScheduler.is_throttled(
+        GithubException(403, {}, {"X-RateLimit-Remaining": "0"})
+    )
+    assert rate_limit.RateLimitScheduler.is_throttled(
+        GithubException(429, {"message": "secondary rate limit"}, {})
+    )
+    assert not rate_limit.RateLimitScheduler.is_throttled(
+        GithubException(404, {"message": "Not Found"}, {})
+    )
+    assert not rate_limit.RateLimitScheduler.is_throttled(
+        GithubException(403, {"message": "Resource not accessible"}, {})
+    )
+
+
+def test_call_retries_after_retry_after_header():
+    """Check that a throttled call waits for Retry-After and is retried."""
+    clock = SleepingClock()
+    scheduler = rate_limit.RateLimitScheduler(sleep=clock.sleep, clock=clock.time)
+    calls = []
+
+    def flaky():
+        calls.append(clock.now)
+        if len(calls) == 1:
+            raise GithubException(403, {}, {"Retry-After": "30"})
+        return "done"
+
+    assert scheduler.call(flaky) == "done"
+    assert len(calls) == 2
+    assert calls[1] - calls[0] >= 30
+    assert scheduler.throttled_count == 1
+    assert scheduler.concurrency == scheduler.max_concurrency // 2
+
+
+def test_call_raises_permanent_errors_without_retry():
+    """Check that errors unrelated to rate limits are raised immediately."""
+    clock = SleepingClock()
+    scheduler = rate_limit.RateLimitScheduler(sleep=clock.sleep, clock=clock.time)
+    calls = []
+
+    def missing():
+        calls.append(1)
+        raise GithubException(404, {"message": "Not Found"}, {})
+
+    with pytest.raises(GithubException):
+        scheduler.call(missing)
+    assert len(calls) == 1
+    assert not clock.sleeps
+
+
+def test_call_waits_for_primary_limit_reset():
+    """Check that no call is made before the reset time when no requests remain."""
+    clock = SleepingClock()
+    scheduler = rate_limit.RateLimitScheduler(sleep=clock.sleep, clock=clock.time)
+    scheduler.update_from_headers(
+        {"X-RateLimit-Remaining": "0", "X-RateLimit-Reset": str(clock.now + 120)}
+    )
+    scheduler.call(lambda: None)
+    assert clock.now >= 1120
+
+
+def test_write_calls_are_spaced():
+    """Check that content creating calls respect the write interval."""
+    clock = SleepingClock()
+    scheduler = rate_limit.RateLimitScheduler(
+        write_interval=2.0, sleep=clock.sleep, clock=clock.time
+    )
+    start = clock.now
+    for _ in range(3):
+        scheduler.call(lambda: None, write=True)
+    assert clock.now - start >= 4.0
+
+
+def test_run_posts_every_entry_despite_throttling():
+    """Check that throttled entries are retried and none of them are dropped."""
+    clock = SleepingClock()
+    scheduler = rate_limit.RateLimitScheduler(
+        write_interval=0, sleep=clock.sleep, clock=clock.time
+    )
+    api = mock_gh_api.MockGH()
+    api.repos[TEST_REPO_NAME] = ThrottledRepo(
+        TEST_REPO_NAME, failures=3, headers={"Retry-After": "1"}
+    )
+    entries = [github_objects.IssueEntry(issue_config(number)) for number in range(10)]
+    scheduler.run(entries, api)
+    assert all(entry.posted for entry in entries)
+    assert scheduler.throttled_count == 3
+    titles = {issue.title for issue in api.get_repo(TEST_REPO_NAME).issues}
+    assert {f"issue {number}" for number in range(10)} <= titles
+
+
+def test_run_reads_lazy_entries_on_demand():
+    """Check that run does not read a lazy iterable far ahead of posting."""
+    clock = SleepingClock()
+    scheduler = rate_limit.RateLimitScheduler(
+        max_concurrency=2, write_interval=0, sleep=clock.sleep, clock=clock.time
+    )
+    api = mock_gh_api.MockGH()
+    read_count = 0
+    max_read_ahead = 0
+
+    def generated_entries():
+        nonlocal read_count
+        for number in range(50):
+            read_count += 1
+            yield github_objects.IssueEntry(issue_config(number))
+
+    def callback(_):
+        nonlocal max_read_ahead
+        posted_count = len(api.get_repo(TEST_REPO_NAME).issues) - 1
+        max_read_ahead = max(max_read_ahead, read_count - posted_count)
+
+    scheduler.run(generated_entries(), api, callback=callback)
+    assert read_count == 50
+    assert max_read_ahead <= 5
+
+
+def test_iterating_paginated_lists_is_scheduled():
+    """Check that page fetches are scheduled and retried without losing items."""
+    clock = SleepingClock()
+    scheduler = rate_limit.RateLimitScheduler(sleep=clock.sleep, clock=clock.time)
+    pages = scheduler.wrap(PagedList([[1, 2], [3]], failures=1))
+    assert list(pages) == [1, 2, 3]
+    assert scheduler.throttled_count == 1 and 5 in clock.sleeps
+    # The throttled fetch and the fetches of the two pages
+    assert scheduler.call_count == 3
+
+
+def test_only_page_fetches_count_against_limits():
+    """Check that items of fetched pages are read without scheduled calls."""
+    scheduler = rate_limit.RateLimitScheduler()
+    scheduler.update_from_headers({"X-RateLimit-Remaining": "4000"})
+    pages = [list(range(start, start + 100)) for start in range(0, 1000, 100)]
+    paged_list = scheduler.wrap(PagedList(pages))
+    assert paged_list[150] == 150 and scheduler.call_count == 2
+    assert paged_list[3] == 3 and scheduler.call_count == 2
+    assert list(paged_list) == list(range(1000))
+    assert scheduler.call_count == 10
+    assert scheduler.limit().remaining == 3990
+    with pytest.raises(IndexError):
+        paged_list[1000]  # pylint: disable=W0104
+
+
+def test_lazy_property_loads_are_scheduled():
+    """Check that reading an incomplete object is scheduled once."""
+    scheduler = rate_limit.RateLimitScheduler()
+    issue = scheduler.wrap(LazyIssue())
+    assert issue.title == "lazy title" and issue.title == "lazy title"
+    assert scheduler.call_count == 1
+
+
+def test_limits_are_read_from_every_response():
+    """Check that the headers of the response of a call update the limits."""
+    clock = SleepingClock()
+    scheduler = rate_limit.RateLimitScheduler(sleep=clock.sleep, clock=clock.time)
+    response = SimpleNamespace(
+        _headers={"x-ratelimit-remaining": 12, "x-ratelimit-reset": "2000"}
+    )
+    assert scheduler.call(lambda: response) is response
+    assert scheduler.limit().remaining == 12
+    assert scheduler.limit().reset_time == 2000.0
+
+
+def test_limits_are_kept_for_every_credential():
+    """Check that a credential without requests left does not block the others."""
+    clock = SleepingClock()
+    scheduler = rate_limit.RateLimitScheduler(sleep=clock.sleep, clock=clock.time)
+    first, second = object(), object()
+    exhausted = SimpleNamespace(
+        _headers={"X-RateLimit-Remaining": "0", "X-RateLimit-Reset": "1100"},
+        _requester=first,
+    )
+    scheduler.call(lambda: exhausted)
+    assert scheduler.limit(first).remaining == 0
+    assert scheduler.limit(second).remaining is None
+    scheduler.call(lambda: None, limit_key=second)
+    assert clock.now == 1000.0
+    repo = scheduler.wrap(SimpleNamespace(_requester=first, edit=lambda: None))
+    repo.edit()
+    assert clock.now >= 1100.0
@@ -0,0 +1,233 @@
+"""Test functionalities in the retry module."""
+
+import json
+
+import pytest
+import requests
+from github.GithubException import GithubException
+from mock_api import mock_gh_api
+from sheetshuttle import github_interaction, github_objects, rate_limit, retry
+from tests.helpers import TEST_REPO_NAME, SleepingClock, issue_config
+
+BROKEN_REPO_NAME = "AC-GopherBot/missing"
+
+
+class FailingRepo(mock_gh_api.MockRepo):
+    """Mock repo failing the first few calls of a method with the given status."""
+
+    def __init__(
+        self, name: str, failures: int, status: int, method: str = "create_issue"
+    ) -> None:
+        super().__init__(name)
+        self.failures = failures
+        self.status = status
+        self.method = method
+        self.attempts = 0
+
+    def fail(self, method: str) -> None:
+        """Raise the configured error while failures remain for the method."""
+        if method != self.method:
+            return
+        self.attempts += 1
+        if self.failures:
+            self.failures -= 1
+            raise GithubException(self.status, {"message": "failure"}, {})
+
+    def create_issue(self, title: str, body: str, labels=None):
+        self.fail("create_issue")
+        return super().create_issue(title, body, labels)
+
+    def get_issues(self, state="all"):
+        self.fail("get_issues")
+        return super().get_issues(state)
+
+
+def update_config(number, repo=TEST_REPO_NAME):
+    """Return a valid issue update configuration."""
+    return {
+        "type": "issue",
+        "action": "update",
+        "repo": repo,
+        "number": number,
+        "body": "retried comment",
+    }
+
+
+def test_classify_errors():
+    """Check that errors are classified as throttled, retryable, or permanent."""
+    classify = retry.RetryPolicy.classify
+    assert classify(GithubException(502, {"message": "Bad Gateway"}, {})) == "retryable"
+    assert classify(GithubException(404, {"message": "Not Found"}, {})) == "permanent"
+    assert classify(GithubException(422, {"message": "Invalid"}, {})) == "permanent"
+    assert (
+        classify(GithubException(403, {"message": "forbidden"}, {"Retry-After": "3"}))
+        == "throttled"
+    )
+    assert classify(requests.exceptions.ConnectionError()) == "retryable"
+    assert classify(ValueError()) == "permanent"
+
+
+def test_delay_is_jittered_and_capped():
+    """Check that delays grow exponentially up to the maximum, scaled by the jitter."""
+    policy = retry.RetryPolicy(base_delay=2.0, max_delay=10.0, jitter=lambda: 0.5)
+    assert [policy.delay(attempt) for attempt in range(4)] == [1.0, 2.0, 4.0, 5.0]
+
+
+def test_call_retries_transient_errors():
+    """Check that transient errors are retried and permanent ones are raised."""
+    clock = SleepingClock()
+    policy = retry.RetryPolicy(max_attempts=3, sleep=clock.sleep, jitter=lambda: 1.0)
+    repo = FailingRepo(TEST_REPO_NAME, failures=2, status=502)
+    assert policy.call(repo.create_issue, "title", "body").title == "title"
+    assert repo.attempts == 3 and clock.sleeps == [1.0, 2.0]
+    repo = FailingRepo(TEST_REPO_NAME, failures=3, status=502)
+    with pytest.raises(GithubException):
+        policy.call(repo.create_issue, "title", "body")
+    assert repo.attempts == 3
+    repo = FailingRepo(TEST_REPO_NAME, failures=1, status=404)
+    with pytest.raises(GithubException):
+        policy.call(repo.create_issue, "title", "body")
+    assert repo.attempts == 1
+    # Creating content is not retried after server errors, it may have succeeded
+    repo = FailingRepo(TEST_REPO_NAME, failures=1, status=502)
+    with pytest.raises(GithubException):
+        policy.call(repo.create_issue, "title", "body", write=True)
+    assert repo.attempts == 1
+    assert policy.should_retry(requests.exceptions.ConnectTimeout(), 0, write=True)
+    assert not policy.should_retry(requests.exceptions.ReadTimeout(), 0, write=True)
+
+
+def test_call_waits_for_rate_limit_headers():
+    """Check that throttled calls wait for the time given by the response headers."""
+    clock = SleepingClock()
+    policy = retry.RetryPolicy(sleep=clock.sleep, clock=clock.time)
+    errors = [
+        GithubException(429, {"message": "slow down"}, {"Retry-After": "7"}),
+        GithubException(
+            403,
+            {"message": "API rate limit exceeded"},
+            {"X-RateLimit-Remaining": "0", "X-RateLimit-Reset": "1037"},
+        ),
+    ]
+
+    def throttled_call():
+        if errors:
+            raise errors.pop(0)
+        return "done"
+
+    assert policy.call(throttled_call, write=True) == "done"
+    assert clock.sleeps == [7.0, 30.0]
+    assert policy.retry_count == 2
+
+
+def test_circuit_breaker_opens_and_half_opens():
+    """Check that a repo is skipped after repeated failures until the timeout passes."""
+    clock = SleepingClock()
+    breaker = retry.CircuitBreaker(
+        failure_threshold=2, reset_timeout=60, clock=clock.time
+    )
+    breaker.record_failure(BROKEN_REPO_NAME)
+    assert breaker.allow(BROKEN_REPO_NAME)
+    breaker.record_failure(BROKEN_REPO_NAME)
+    assert not breaker.allow(BROKEN_REPO_NAME)
+    assert breaker.allow(TEST_REPO_NAME)
+    clock.sleep(61)
+    # Only one trial entry goes through once the timeout passed
+    assert breaker.allow(BROKEN_REPO_NAME)
+    assert not breaker.allow(BROKEN_REPO_NAME)
+    breaker.record_success(BROKEN_REPO_NAME)
+    assert breaker.allow(BROKEN_REPO_NAME)
+
+
+def test_scheduler_uses_retry_policy():
+    """Check that the scheduler retries server errors according to the policy."""
+    clock = SleepingClock()
+    policy = retry.RetryPolicy(sleep=clock.sleep, jitter=lambda: 0.0)
+    scheduler = rate_limit.RateLimitScheduler(
+        write_interval=0, sleep=clock.sleep, clock=clock.time, retry_policy=policy
+    )
+    api = mock_gh_api.MockGH()
+    api.repos[TEST_REPO_NAME] = FailingRepo(
+        TEST_REPO_NAME, failures=2, status=503, method="get_issues"
+    )
+    entry = github_objects.IssueEntry(update_config(1))
+    scheduler.run([entry], api)
+    assert entry.result.status == "posted"
+    assert policy.retry_count == 2
+    # Issue creations failing with server errors are not retried
+    api.repos[TEST_REPO_NAME] = FailingRepo(TEST_REPO_NAME, failures=1, status=503)
+    entry = github_objects.IssueEntry(issue_config(1))
+    scheduler.run([entry], api)
+    assert entry.result.status == "failed"
+    assert policy.retry_count == 2
+
+
+def test_manager_skips_failing_repo_and_reports(tmp_path, monkeypatch):
+    """Check that entries of a failing repo are skipped and written to the report."""
+    monkeypatch.setenv("GH_ACCESS_TOKEN", "test-token")
+    clock = SleepingClock()
+    policy = retry.RetryPolicy(
+        breaker=retry.CircuitBreaker(failure_threshold=2, clock=clock.time),
+        sleep=clock.sleep,
+    )
+    manager = github_interaction.GithubManager(retry_policy=policy)
+    manager.api = mock_gh_api.MockGH()
+    broken_repo = FailingRepo(BROKEN_REPO_NAME, failures=100, status=404)
+    manager.api.repos[BROKEN_REPO_NAME] = broken_repo
+    manager.api.repos[TEST_REPO_NAME] = FailingRepo(
+        TEST_REPO_NAME, failures=1, status=502, method="get_issues"
+    )
+    configs = [issue_config(number, BROKEN_REPO_NAME) for number in range(5)]
+    configs.append(update_config(1))
+    manager.add_entries(configs)
+    manager.post_all()
+    assert broken_repo.attempts == 2
+    assert manager.issue_entries[-1].posted
+    report_path = tmp_path / "failures.json"
+    policy.report.write(str(report_path))
+    with open(report_path, "r", encoding="utf-8") as report_file:
+        report = json.load(report_file)
+    assert report["count"] == 5
+    assert report["per_repo"] == {BROKEN_REPO_NAME: 5}
+    assert [failure["reason"] for failure in report["failures"]] == [
+        "failed",
+        "failed",
+        "circuit_open",
+        "circuit_open",
+        "circuit_open",
+    ]
+    assert report["failures"][0]["status"] == 404
+    assert retry.FailureReport.load_configs(str(report_path)) == configs[:5]
+
+
+def test_pull_request_failures_are_reported(monkeypatch):
+    """Check that pull requests GitHub rejects reach the breaker and the report."""
+    monkeypatch.setenv("GH_ACCESS_TOKEN", "test-token")
+    policy = retry.RetryPolicy(
+        breaker=retry.CircuitBreaker(failure_threshold=1), sleep=lambda _: None
+    )
+    manager = github_interaction.GithubManager(retry_policy=policy)
+    manager.api = mock_gh_api.MockGH()
+    repo = manager.api.get_repo(TEST_REPO_NAME)
+
+    def reject_pull(**_):
+        raise GithubException(422, {"message": "Validation Failed"}, {})
+
+    monkeypatch.setattr(repo, "create_pull", reject_pull)
+    manager.add_entries(
+        [
+            {
+                "type": "pull request",
+                "action": "create",
+                "repo": TEST_REPO_NAME,
+                "title": "rejected",
+                "body": "body",
+                "base": "main",
+                "head": "feature",
+            }
+        ]
+    )
+    manager.post_all()
+    assert policy.breaker.is_open(TEST_REPO_NAME)
+    failure = policy.report.to_dict()["failures"][0]
+    assert (failure["type"], failure["status"]) == ("pull request", 422)
@@ -9,8 +9,10 @@ import yaml
 
 import pandas as pd
 
+from mock_api import mock_sheets_api
 from sheetshuttle import sheet_collector
 from sheetshuttle import util
+from tests.helpers import STUDENTS_CELLS, STUDENTS_CONFIG, mock_sheets
 
 
 def test_region_initialize():
@@ -136,12 +138,11 @@ def test_print_sheet_with_data(capfd, test_data):
     second_data = pd.DataFrame([["name", "lab1", "lab2"], ["Noor", "100", "94"]])
     second_region = sheet_collector.Region("labs", "CMPCS102", "A2", "H20", second_data)
     regions_dict = {"overall": first_region, "labs": second_region}
-    my_tab = sheet_collector.Tab("test_data", regions_dict)
-    my_sheet.tabs = {"test_data": my_tab}
+    my_sheet.tabs = {"test_data": regions_dict}
     # Start assertions
     # Verify that my regions are in the sheet
-    assert my_sheet.get_tab("test_data").get_region("overall") == first_region
-    assert my_sheet.get_tab("test_data").get_region("labs") == second_region
+    assert my_sheet.get_tab("test_data")["overall"] == first_region
+    assert my_sheet.get_tab("test_data")["labs"] == second_region
     my_sheet.print_sheet()
 
     # Actual print output
@@ -186,6 +187,22 @@ end range: H20
     assert second_item in captured.out
 
 
+def test_sheet_collector_print_contents(capfd, monkeypatch, tmp_path):
+    """Check that the contents of collected sheets are printed."""
+    mock_sheets(monkeypatch, STUDENTS_CELLS)
+    (tmp_path / "grades.yml").write_text(STUDENTS_CONFIG, encoding="utf-8")
+    collector = sheet_collector.SheetCollector(sources_dir=str(tmp_path))
+    collector.collect_files()
+    collector.print_contents()
+    captured = capfd.readouterr()
+    assert captured.out.startswith(
+        "******\t students \t ******\n\t- Tab name: students\n"
+    )
+    assert "###############  names ###############" in captured.out
+    assert "|  0 | Ada    | 90      |" in captured.out
+    assert "|  1 | Alan   | 80      |" in captured.out
+
+
 def test_sheet_to_dataframe_no_error_with_headers():
     """Check that conversion to data frame using preset headers is done correctly."""
     data = [["name", "class", "age"], ["Noor", 2022, 21], ["Thomas", "2023", 21]]
@@ -448,3 +465,65 @@ def test_extract_sheet_id_throws_error_when_missing_id_start_token():
     url = "https://docs.google.com/spreadsheets/1XKnoa1BBzEnJ1TA_LTRs5e0zcva0SCgNyt7cfMVGHWc/edit"
     with pytest.raises(util.InvalidSheetInfo):
         util.extract_sheet_id(url)
+
+
+def test_region_lookup_and_take(keyed_regions):
+    """Check that rows are found by key whatever their position."""
+    info, _ = keyed_regions
+    row = info.lookup("grace")
+    assert row.name == "grace" and row["Student Name"] == "Grace"
+    rows = info.take(["grace", "ada"])
+    assert list(rows.index) == ["grace", "ada"]
+    assert list(rows["Student Name"]) == ["Grace", "Ada"]
+    with pytest.raises(KeyError, match="linus"):
+        info.lookup("linus")
+    with pytest.raises(KeyError, match="linus"):
+        info.take(["ada", "linus"])
+    # The index is built again when the data is replaced
+    info.data = info.data.iloc[::-1]
+    assert info.lookup("ada")["Student Name"] == "Ada"
+    assert list(info.key_index()) == [0, 2, 3]
+
+
+def test_region_key_errors():
+    """Check that regions without a key or with duplicate keys cannot be indexed."""
+    region = sheet_collector.Region(
+        "info", "students", "A1", "A3", pd.DataFrame({"name": ["Ada", "Ada"]})
+    )
+    with pytest.raises(Exception, match="has no key column"):
+        region.lookup("Ada")
+    region.key = "name"
+    with pytest.raises(Exception, match=r"duplicate values: \['Ada'\]"):
+        region.lookup("Ada")
+
+
+def test_sheet_checks_key_column():
+    """Check that a key column missing from the collected data is reported."""
+    config = {
+        "source_id": "sheet-id",
+        "sheets": [
+            {
+                "name": "students",
+                "regions": [
+                    {
+                        "name": "info",
+                        "start": "A1",
+                        "end": "B2",
+                        "contains_headers": True,
+                        "key": "Student GitHub",
+                    }
+                ],
+            }
+        ],
+    }
+    api = mock_sheets_api.MockSheets(
+        {"students!A1:B2": [["name", "grade"], ["Ada", "9"]]}
+    )
+    with pytest.raises(Exception, match="key column Student GitHub not found"):
+        sheet_collector.Sheet(config, api).collect_regions()
+    api = mock_sheets_api.MockSheets(
+        {"students!A1:B2": [["Student GitHub", "grade"], ["ada", "9"]]}
+    )
+    sheet = sheet_collector.Sheet(config, api)
+    sheet.collect_regions()
+    assert sheet.get_tab("students")["info"].lookup("ada")["grade"] == "9"
@@ -0,0 +1,142 @@
+"""Test functionalities in the stages module."""
+
+import pandas as pd
+import pytest
+from sheetshuttle import github_objects, sheet_collector, stages
+from tests.helpers import collected_sheet
+
+SCORES_NAME = "gradebook/students/scores"
+
+
+def make_region(grades):
+    """Return a region with the grades of two students."""
+    data = pd.DataFrame({"name": ["Ada", "Alan"], "grade": grades})
+    return sheet_collector.Region("scores", "students", "A1", "B3", data)
+
+
+def make_pipeline(calls, cache_dir=None):
+    """Return a three stage pipeline that records the stages it computes."""
+    pipeline = stages.Pipeline(cache_dir)
+
+    @pipeline.stage(inputs=[SCORES_NAME])
+    def passed(scores):
+        calls.append("passed")
+        return scores.data[scores.data["grade"] >= 60]["name"].tolist()
+
+    @pipeline.stage(inputs=["passed", "args"])
+    def entries(names, args):
+        calls.append("entries")
+        return [
+            github_objects.IssueEntry(
+                {
+                    "type": "issue",
+                    "action": "create",
+                    "repo": f"{args['org']}/{name}",
+                    "title": "Passed",
+                    "body": "Congratulations",
+                }
+            )
+            for name in names
+        ]
+
+    @pipeline.stage(inputs=["entries"], cache=False)
+    def post(issue_entries):
+        calls.append("post")
+        return len(issue_entries)
+
+    return pipeline
+
+
+def test_only_stages_after_changes_are_computed():
+    """Check that stages are cached until one of their inputs changes."""
+    calls = []
+    pipeline = make_pipeline(calls)
+    sources = {SCORES_NAME: make_region([90, 50]), "args": {"org": "course"}}
+    assert pipeline.run(sources)["post"] == 1
+    assert calls == ["passed", "entries", "post"]
+    calls.clear()
+    pipeline.run(sources)
+    assert calls == ["post"]
+    assert pipeline.last_run == {
+        "passed": "cached",
+        "entries": "cached",
+        "post": "computed",
+    }
+    # A new grade that does not change who passed stops at the first stage
+    calls.clear()
+    pipeline.run({**sources, SCORES_NAME: make_region([95, 50])})
+    assert calls == ["passed", "post"]
+    calls.clear()
+    outputs = pipeline.run({**sources, "args": {"org": "other"}})
+    assert calls == ["entries", "post"]
+    assert outputs["entries"][0].repo == "other/Ada"
+    calls.clear()
+    pipeline.run(sources, targets=["passed"])
+    assert not calls
+
+
+def test_outputs_are_cached_on_disk(tmp_path):
+    """Check that a new process reuses the outputs stored in the cache directory."""
+    sources = {SCORES_NAME: make_region([90, 70]), "args": {"org": "course"}}
+    make_pipeline([], str(tmp_path)).run(sources)
+    calls = []
+    outputs = make_pipeline(calls, str(tmp_path)).run(sources)
+    assert calls == ["post"]
+    assert [entry.repo for entry in outputs["entries"]] == ["course/Ada", "course/Alan"]
+
+
+def test_code_hash_covers_the_module(tmp_path, monkeypatch):
+    """Check that changing a helper next to a stage function changes its hash."""
+    monkeypatch.syspath_prepend(str(tmp_path))
+    for name, bonus in [("plugin_one", 1), ("plugin_two", 2)]:
+        (tmp_path / f"{name}.py").write_text(
+            f"def bonus():\n    return {bonus}\n\n\n"
+            "def passed(scores):\n    return scores + bonus()\n",
+            encoding="utf-8",
+        )
+    first = __import__("plugin_one").passed
+    second = __import__("plugin_two").passed
+    assert stages.Stage.hash_code(first) != stages.Stage.hash_code(second)
+
+
+def test_pipeline_errors():
+    """Check that unknown inputs, unknown targets, and cycles are reported."""
+    pipeline = stages.Pipeline()
+    pipeline.add_stage(stages.Stage("first", lambda value: value, ["second"]))
+    pipeline.add_stage(stages.Stage("second", lambda value: value, ["first"]))
+    pipeline.add_stage(stages.Stage("third", lambda value: value, ["missing"]))
+    with pytest.raises(Exception, match="first -> second -> first"):
+        pipeline.run({}, targets=["first"])
+    with pytest.raises(Exception, match="input missing of stage third"):
+        pipeline.run({}, targets=["third"])
+    with pytest.raises(Exception, match="unknown stage fourth"):
+        pipeline.run({}, targets=["fourth"])
+    with pytest.raises(Exception, match="defined twice"):
+        pipeline.add_stage(stages.Stage("first", lambda: None))
+
+
+def test_content_hash():
+    """Check that equal contents have equal hashes and any change is detected."""
+    data = pd.DataFrame({"name": ["Ada"], "grade": [90]})
+    assert stages.content_hash(data) == stages.content_hash(data.copy())
+    assert stages.content_hash(data) != stages.content_hash(data.astype(str))
+    assert stages.content_hash(data) != stages.content_hash(
+        data.rename(columns={"grade": "score"})
+    )
+    assert stages.content_hash({"a": 1, "b": [1, 2]}) == stages.content_hash(
+        {"b": [1, 2], "a": 1}
+    )
+    assert stages.content_hash(1) != stages.content_hash("1")
+    assert stages.content_hash(pd.DataFrame({"tags": [["a"]]})) != stages.content_hash(
+        pd.DataFrame({"tags": [["b"]]})
+    )
+
+
+def test_run_plugin_uses_shared_sheets():
+    """Check that a pipeline runs as a plugin with the regions of shared sheets."""
+    sheet = collected_sheet(make_region([90, 80]))
+    calls = []
+    outputs = make_pipeline(calls).run_plugin(
+        ".env", "", "", sheets_data={"gradebook": sheet}, args={"org": "course"}
+    )
+    assert outputs["post"] == 2
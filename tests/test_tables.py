@@ -0,0 +1,63 @@
+"""Test functionalities in the tables module."""
+
+import io
+
+import numpy as np
+import pandas as pd
+import pytest
+from sheetshuttle import sheet_collector, tables
+
+GRADES = pd.DataFrame(
+    {
+        "name": ["Ada", "Grace | Hopper", "Alan"],
+        "grade": [91.5, 78.0, np.nan],
+        "notes": ["first\nsecond", "<b>late</b>", ""],
+    }
+)
+
+
+def test_markdown_matches_to_markdown_for_text():
+    """Check that text tables are rendered as DataFrame.to_markdown renders them."""
+    data = pd.DataFrame([["name", "class", "grade"], ["Noor", "2022", "94"]])
+    assert tables.render(data) == data.to_markdown() + "\n"
+    assert tables.render(data, index=False) == data.to_markdown(index=False) + "\n"
+
+
+def test_markdown_alignment_escaping_and_truncation():
+    """Check that numbers are right aligned, cells escaped, and extra rows left out."""
+    assert tables.render(GRADES, max_rows=2) == (
+        "|     | name            |   grade | notes           |\n"
+        "|----:|:----------------|--------:|:----------------|\n"
+        "|   0 | Ada             |    91.5 | first<br>second |\n"
+        "|   1 | Grace \\| Hopper |    78.0 | <b>late</b>     |\n"
+        "| ... | ...             |     ... | ...             |\n"
+    )
+
+
+def test_html_and_csv():
+    """Check that HTML cells are escaped and CSV tables are truncated."""
+    html = tables.render(GRADES.iloc[1:], table_format="html", index=False)
+    assert html.startswith("<table>\n<thead>\n<tr><th>name</th><th>grade</th>")
+    assert "<tr><td>Grace | Hopper</td><td>78.0</td><td>&lt;b&gt;late&lt;/b&gt;" in html
+    assert "<tr><td>Alan</td><td></td><td></td></tr>\n</tbody>\n</table>\n" in html
+    csv_table = tables.render(GRADES, table_format="csv", max_rows=1, index=False)
+    assert csv_table == 'name,grade,notes\nAda,91.5,"first\nsecond"\n'
+    with pytest.raises(Exception, match="Unknown table format"):
+        tables.render(GRADES, table_format="latex")
+
+
+def test_streaming_write(tmp_path, monkeypatch):
+    """Check that rows are written in chunks to a file and match the returned table."""
+    monkeypatch.setattr(tables, "CHUNK_SIZE", 7)
+    data = pd.DataFrame({"student": [f"student {n}" for n in range(50)]})
+    region = sheet_collector.Region("names", "students", "A1", "A51", data)
+    with open(tmp_path / "report.md", "w", encoding="utf-8") as report:
+        assert region.to_table(report) is None
+    builder = io.StringIO()
+    region.to_table(builder)
+    with open(tmp_path / "report.md", "r", encoding="utf-8") as report:
+        assert report.read() == builder.getvalue() == region.to_table()
+    assert region.to_table().count("\n") == 52
+    # Widths come from every chunk, not only the first one
+    assert region.to_table() == data.to_markdown() + "\n"
+    assert tables.render(data.iloc[:0]) == "|    | student   |\n|---:|:----------|\n"
@@ -0,0 +1,173 @@
+"""Test functionalities in the templates module."""
+
+import time
+
+import numpy as np
+import pandas as pd
+import pytest
+from jsonschema.exceptions import ValidationError
+from sheetshuttle import github_objects, sheet_collector, templates
+
+STUDENTS = pd.DataFrame(
+    {
+        "Student Name": ["Ada", "Grace", "Alan"],
+        "Student GitHub": ["ada-l", "grace-h", "alan-t"],
+        "Grade": [91.256, 78.0, np.nan],
+        "Issue": ["4", "7", "9"],
+        "Section": ["a", "", "b"],
+    }
+)
+
+ISSUE_TEMPLATE = {
+    "type": "template",
+    "entry_type": "issue",
+    "action": "create",
+    "repo": "sample_org/grades_{Student GitHub}",
+    "title": "{Student Name} Automated Grade Update",
+    "body": "Your final grade is: {Grade:.1f}",
+    "labels": ["SheetShuttle", "section-{Section}"],
+}
+
+
+def test_field_template_renders_columns():
+    """Check that placeholders are replaced with column values, missing values empty."""
+    field = templates.FieldTemplate("{Student Name} has {Grade:.2f}{Grade!r:>6}!")
+    assert field.columns == ["Student Name", "Grade", "Grade"]
+    assert field.render(STUDENTS).tolist() == [
+        "Ada has 91.2691.256!",
+        "Grace has 78.00  78.0!",
+        "Alan has !",
+    ]
+    assert (
+        templates.FieldTemplate("{{literal}}").render(STUDENTS).tolist()
+        == ["{literal}"] * 3
+    )
+    with pytest.raises(templates.InvalidTemplate):
+        templates.FieldTemplate("positional {}")
+
+
+def test_render_issue_entries():
+    """Check that one issue entry is created per row, with constant and rendered fields."""
+    template = templates.EntryTemplate(ISSUE_TEMPLATE)
+    entries = template.render(STUDENTS.iloc[:2])
+    assert [type(entry) for entry in entries] == [github_objects.IssueEntry] * 2
+    assert entries[0].to_config() == {
+        "type": "issue",
+        "action": "create",
+        "repo": "sample_org/grades_ada-l",
+        "title": "Ada Automated Grade Update",
+        "body": "Your final grade is: 91.3",
+        "labels": ["SheetShuttle", "section-a"],
+    }
+    assert entries[1].labels == ["SheetShuttle", "section-"]
+    compact_entries = template.render(STUDENTS.iloc[:2], compact=True)
+    assert compact_entries[1].config is None
+    assert compact_entries[1].config_key == entries[1].config_key
+
+
+def test_render_update_numbers_and_empty_labels():
+    """Check that numbers render as integers and labels that render empty are dropped."""
+    template = templates.EntryTemplate(
+        {
+            "type": "template",
+            "entry_type": "issue",
+            "action": "update",
+            "repo": "sample_org/grades_{Student GitHub}",
+            "number": "{Issue}",
+            "body": "Updated grade",
+            "labels": ["{Section}"],
+        }
+    )
+    configs = template.render_configs(STUDENTS)
+    assert [config["number"] for config in configs] == [4, 7, 9]
+    assert "labels" not in configs[1]
+    assert configs[2]["labels"] == ["b"]
+
+
+def test_render_errors():
+    """Check that missing columns, empty fields, and invalid entries are reported."""
+    template = templates.EntryTemplate({**ISSUE_TEMPLATE, "body": "{Missing}"})
+    with pytest.raises(templates.InvalidTemplate, match="Missing"):
+        template.render(STUDENTS)
+    template = templates.EntryTemplate({**ISSUE_TEMPLATE, "title": "{Section}"})
+    with pytest.raises(templates.InvalidTemplate, match=r"rows \[1\]"):
+        template.render(STUDENTS)
+    template = templates.EntryTemplate(
+        {**ISSUE_TEMPLATE, "repo": "not a repo {Student GitHub}"}
+    )
+    with pytest.raises(ValidationError):
+        template.render(STUDENTS)
+    with pytest.raises(ValidationError):
+        templates.EntryTemplate({**ISSUE_TEMPLATE, "entry_type": "discussion"})
+    assert template.render(STUDENTS.iloc[:0]) == []
+
+
+def test_render_errors_in_later_rows():
+    """Check that every row is checked, not only the first one."""
+    students = STUDENTS.assign(**{"Student GitHub": ["ada-l", "grace ", "alan-t"]})
+    template = templates.EntryTemplate(
+        {**ISSUE_TEMPLATE, "repo": "{Student GitHub}/grades", "body": "Grade"}
+    )
+    with pytest.raises(templates.InvalidTemplate, match=r"repo .* rows \[1\]"):
+        template.render(students)
+    template = templates.EntryTemplate(
+        {
+            "type": "template",
+            "entry_type": "issue",
+            "action": "update",
+            "repo": "sample_org/grades",
+            "number": "{Issue}",
+            "body": "Updated grade",
+        }
+    )
+    students = STUDENTS.assign(Issue=["4", "3.7", "5.0"])
+    with pytest.raises(templates.InvalidTemplate, match=r"rows \[1\] .*3\.7"):
+        template.render(students)
+    students = STUDENTS.assign(Issue=["4", "7", "seven"])
+    with pytest.raises(templates.InvalidTemplate, match=r"rows \[2\]"):
+        template.render(students)
+    assert [entry.number for entry in template.render(STUDENTS)] == [4, 7, 9]
+    # Rows with another action are validated against the schema of that action
+    template = templates.EntryTemplate({**ISSUE_TEMPLATE, "action": "{Action}"})
+    students = STUDENTS.assign(Action=["create", "create", "update"])
+    with pytest.raises(ValidationError, match="number"):
+        template.render(students)
+
+
+def test_find_region():
+    """Check that the source region of a template is found in collected sheets."""
+    region = sheet_collector.Region("names", "students", "A1", "C4", STUDENTS)
+
+    # pylint: disable=R0903
+    class CollectedSheet:
+        """Sheet with already collected tabs."""
+
+        def get_tab(self, tab_name):
+            """Return the regions of a tab."""
+            return {"students": {"names": region}}[tab_name]
+
+    sheets_data = {"grades": CollectedSheet()}
+    source = {"sheet": "grades", "tab": "students", "region": "names"}
+    assert templates.find_region(sheets_data, source) is region
+    with pytest.raises(templates.InvalidTemplate, match="was not collected"):
+        templates.find_region(sheets_data, {**source, "region": "other"})
+
+
+def test_render_many_rows_quickly():
+    """Check that 50k entries are generated well under a second."""
+    rows = 50_000
+    data = pd.DataFrame(
+        {
+            "Student Name": [f"student {number}" for number in range(rows)],
+            "Student GitHub": [f"user-{number}" for number in range(rows)],
+            "Grade": np.linspace(0, 100, rows),
+            "Section": ["a", "b"] * (rows // 2),
+        }
+    )
+    template = templates.EntryTemplate(ISSUE_TEMPLATE)
+    start = time.perf_counter()
+    entries = template.render(data)
+    elapsed = time.perf_counter() - start
+    assert len(entries) == rows
+    assert entries[-1].repo == f"sample_org/grades_user-{rows - 1}"
+    assert elapsed < 2.0
@@ -0,0 +1,216 @@
+"""Test functionalities in the tracing module."""
+
+import http.server
+import json
+import threading
+
+import pytest
+from mock_api import mock_gh_api
+from sheetshuttle import (
+    github_interaction,
+    github_objects,
+    plugin_runner,
+    rate_limit,
+    sheet_collector,
+    tracing,
+)
+from tests.helpers import STUDENTS_CELLS, mock_sheets
+
+
+@pytest.fixture(autouse=True)
+def stop_tracer():
+    """Make sure that no tracer is left running by a failing test."""
+    yield
+    tracing.stop()
+
+
+# pylint: disable=R0903
+class MemoryExporter:
+    """Keep the exported spans."""
+
+    def __init__(self):
+        """Create a MemoryExporter object without spans."""
+        self.spans = []
+
+    def export(self, _trace_id, spans):
+        """Keep the spans of a trace."""
+        self.spans = spans
+
+
+def parent_names(spans):
+    """Return the name of the parent of every span, by span name."""
+    names = {span.span_id: span.name for span in spans}
+    return {span.name: names.get(span.parent_id) for span in spans}
+
+
+def test_spans_do_nothing_without_tracer():
+    """Check that spans are not recorded and objects not wrapped when tracing is off."""
+    with tracing.span("run") as span:
+        assert span is None
+    api = mock_gh_api.MockGH()
+    assert tracing.wrap(api) is api
+    assert tracing.stop() is None
+
+
+def test_collection_and_posting_spans(monkeypatch, tmp_path):
+    """Check the spans of collecting a sheet and posting an issue."""
+    mock_sheets(monkeypatch, STUDENTS_CELLS)
+    (tmp_path / "gradebook.yml").write_text(
+        "source_id: sheet-id\n"
+        "sheets:\n"
+        "  - name: students\n"
+        "    regions:\n"
+        "      - {name: grades, start: A1, end: B3, contains_headers: true}\n",
+        encoding="utf-8",
+    )
+    exporter = MemoryExporter()
+    tracing.start([exporter, tracing.ChromeTraceExporter(str(tmp_path / "t.json"))])
+    with tracing.span("run"):
+        collector = sheet_collector.SheetCollector(sources_dir=str(tmp_path))
+        collector.collect_files()
+        manager = github_interaction.GithubManager(api=mock_gh_api.MockGH())
+        manager.add_entries(
+            [
+                {
+                    "type": "issue",
+                    "action": "create",
+                    "repo": "org/repo",
+                    "title": "Grades",
+                    "body": "Your grade is 90",
+                }
+            ]
+        )
+        manager.post_all()
+    tracing.stop()
+    spans = {span.name: span for span in exporter.spans}
+    assert parent_names(exporter.spans) == {
+        "run": None,
+        "collect": "run",
+        "config file": "collect",
+        "collect regions": "config file",
+        "region": "collect regions",
+        "fetch": "region",
+        "convert": "region",
+        "post all": "run",
+        "post entries": "post all",
+        "entry": "post entries",
+        "github get_repo": "entry",
+        "github create_issue": "entry",
+    }
+    assert spans["region"].attributes == {
+        "spreadsheet_id": "sheet-id",
+        "region": "grades",
+        "range": "students!A1:B3",
+        "rows": 2,
+        "columns": 2,
+    }
+    assert spans["fetch"].attributes == {"rows": 3, "bytes": 20}
+    assert spans["entry"].attributes["repo"] == "org/repo"
+    assert spans["entry"].attributes["result"] == "posted"
+    assert spans["github get_repo"].attributes["repo"] == "org/repo"
+    events = json.loads((tmp_path / "t.json").read_text(encoding="utf-8"))
+    event = events["traceEvents"][0]
+    assert event["name"] == "run" and event["ph"] == "X" and event["ts"] == 0
+    assert all(
+        item["ts"] + item["dur"] <= event["dur"] for item in events["traceEvents"]
+    )
+
+
+def test_spans_of_other_threads_and_errors():
+    """Check that plugins and scheduled entries in threads keep their parents."""
+    exporter = MemoryExporter()
+    tracing.start([exporter])
+
+    # pylint: disable=R0903
+    class Plugin:
+        """Plugin posting an entry with a scheduler."""
+
+        @staticmethod
+        def run(*_args, **_kwargs):
+            """Post an entry from the threads of a scheduler."""
+            entry = github_objects.IssueEntry(
+                {
+                    "type": "issue",
+                    "action": "create",
+                    "repo": "org/repo",
+                    "title": "Grades",
+                    "body": "Your grade is 90",
+                }
+            )
+            scheduler = rate_limit.RateLimitScheduler(max_concurrency=2)
+            with tracing.span("post entries"):
+                scheduler.run([entry], tracing.wrap(mock_gh_api.MockGH()))
+
+    # pylint: disable=R0903
+    class BrokenPlugin:
+        """Plugin raising an error."""
+
+        @staticmethod
+        def run(*_args, **_kwargs):
+            """Raise an error."""
+            raise ValueError("broken plugin")
+
+    with pytest.raises(ValueError):
+        with tracing.span("run"):
+            plugin_runner.run_plugins(
+                {"first": Plugin, "broken": BrokenPlugin}, (), {}, concurrency=2
+            )
+    tracing.stop()
+    parents = parent_names(exporter.spans)
+    assert parents["plugin"] == "run"
+    assert parents["entry"] == "post entries"
+    assert parents["github create_issue"] == "entry"
+    broken = [
+        span for span in exporter.spans if span.attributes.get("plugin") == "broken"
+    ]
+    assert broken[0].status == "error"
+    assert broken[0].error == "ValueError: broken plugin"
+
+
+def test_otlp_exporter_sends_spans():
+    """Check that spans are sent to a collector stand-in as OTLP JSON."""
+    requests = []
+
+    class CollectorHandler(http.server.BaseHTTPRequestHandler):
+        """Record the bodies of the requests."""
+
+        # pylint: disable=C0103
+        def do_POST(self):
+            """Record the body of a request and accept it."""
+            body = self.rfile.read(int(self.headers["Content-Length"]))
+            requests.append((self.path, json.loads(body)))
+            self.send_response(200)
+            self.end_headers()
+
+        def log_message(self, *args):
+            pass
+
+    server = http.server.HTTPServer(("127.0.0.1", 0), CollectorHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    endpoint = f"http://127.0.0.1:{server.server_port}/v1/traces"
+    try:
+        tracer = tracing.start([tracing.OTLPExporter(endpoint)])
+        with tracing.span("run", plugins=["grades"]):
+            with tracing.span("region", rows=2, shared=True):
+                pass
+        tracing.stop()
+    finally:
+        server.shutdown()
+    path, payload = requests[0]
+    assert path == "/v1/traces"
+    resource_spans = payload["resourceSpans"][0]
+    assert resource_spans["resource"]["attributes"] == [
+        {"key": "service.name", "value": {"stringValue": "sheetshuttle"}}
+    ]
+    run_span, region_span = resource_spans["scopeSpans"][0]["spans"]
+    assert run_span["traceId"] == region_span["traceId"] == tracer.trace_id
+    assert region_span["parentSpanId"] == run_span["spanId"]
+    assert "parentSpanId" not in run_span
+    assert {"key": "rows", "value": {"intValue": "2"}} in region_span["attributes"]
+    assert {"key": "shared", "value": {"boolValue": True}} in region_span["attributes"]
+    assert int(run_span["endTimeUnixNano"]) >= int(region_span["endTimeUnixNano"])
+    tracing.start([tracing.OTLPExporter(endpoint, timeout=1)])
+    with tracing.span("run"):
+        pass
+    tracing.stop()
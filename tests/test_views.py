@@ -0,0 +1,191 @@
+"""Test cases for views Module."""
+
+import pandas as pd
+import pytest
+
+from sheetshuttle import sheet_collector, views
+from tests.helpers import mock_sheets
+
+
+def test_align_regions(keyed_regions):
+    """Check that regions are joined on their key columns."""
+    info, grades = keyed_regions
+    aligned = views.align([info, grades])
+    assert list(aligned.index) == ["ada", "grace"]
+    assert list(aligned.columns) == [("info", "Student Name"), ("grades", "EE1")]
+    assert list(aligned["grades"]["EE1"]) == [80.0, 90.0]
+    outer = views.align({"a": info, "b": grades}, how="outer")
+    assert list(outer.index) == ["ada", "alan", "grace", "linus"]
+    assert outer.index.name == "Student GitHub"
+    assert outer["b"]["EE1"].isna().tolist() == [False, True, False, False]
+    left = views.align([info, grades], how="left")
+    assert list(left.index) == ["ada", "alan", "grace"]
+    with pytest.raises(Exception, match="aligned twice"):
+        views.align([info, info])
+    with pytest.raises(Exception, match="unknown alignment"):
+        views.align([info, grades], how="right")
+
+
+def test_collector_views(monkeypatch, tmp_path):
+    """Check that views join regions of two spreadsheets when first requested."""
+    mock_sheets(
+        monkeypatch,
+        {
+            "roster!A1:C5": [
+                ["Student GitHub", "Student Name", "Section"],
+                ["ada", "Ada", "01"],
+                ["alan", "Alan", "02"],
+                ["grace", "Grace", "01"],
+                ["linus", "Linus", "01"],
+            ],
+            "labs!A1:C4": [
+                ["username", "Lab 1", "Section"],
+                ["grace", "95", "01"],
+                ["ada", "85", "01"],
+                ["alan", "55", "02"],
+            ],
+        },
+    )
+    (tmp_path / "info.yml").write_text(
+        "source_id: info-sheet\n"
+        "sheets:\n"
+        "  - name: roster\n"
+        "    regions:\n"
+        "      - name: students\n"
+        "        start: A1\n"
+        "        end: C5\n"
+        "        contains_headers: true\n"
+        "        key: Student GitHub\n",
+        encoding="utf-8",
+    )
+    (tmp_path / "grades.yml").write_text(
+        "source_id: grades-sheet\n"
+        "sheets:\n"
+        "  - name: labs\n"
+        "    regions:\n"
+        "      - name: labs\n"
+        "        start: A1\n"
+        "        end: C4\n"
+        "        contains_headers: true\n"
+        "        key: username\n"
+        "        types: {username: string, Lab 1: int, Section: string}\n"
+        "views:\n"
+        "  - name: lab_grades\n"
+        "    join: [info/roster/students, labs/labs]\n"
+        "    how: left\n"
+        "    columns: [Student Name, Lab 1, students.Section]\n"
+        "  - name: passed\n"
+        "    join: [lab_grades]\n"
+        "    filter:\n"
+        "      - {column: Lab 1, op: '>=', value: 60}\n"
+        "      - {column: students.Section, op: in, value: ['01']}\n",
+        encoding="utf-8",
+    )
+    collector = sheet_collector.SheetCollector(sources_dir=str(tmp_path))
+    collector.collect_files()
+    assert collector.views.names() == ["lab_grades", "passed"]
+    assert not collector.views.cache
+    passed = collector.view("passed")
+    assert passed.key == "Student GitHub"
+    assert passed.data["Student GitHub"].tolist() == ["ada", "grace"]
+    assert passed.data["Lab 1"].tolist() == [85, 95]
+    lab_grades = collector.view("lab_grades")
+    assert list(lab_grades.data.columns) == [
+        "Student GitHub",
+        "Student Name",
+        "Lab 1",
+        "students.Section",
+    ]
+    assert lab_grades.data["Lab 1"].isna().tolist() == [False, False, False, True]
+    assert lab_grades.lookup("alan")["Student Name"] == "Alan"
+    # Views are cached until the sheets are collected again
+    assert collector.view("passed") is passed
+    collector.collect_files()
+    assert collector.view("passed") is not passed
+    # Views work on sheets shared with plugins as well
+    shared_views = views.Views(collector.sheets_data)
+    assert shared_views.get("passed").data.equals(passed.data)
+
+
+def views_of(regions, view_configs):
+    """Return the views of a sheet whose students tab holds the given regions."""
+    region_config = {
+        "name": "info",
+        "start": "A1",
+        "end": "B5",
+        "contains_headers": True,
+    }
+    sheet = sheet_collector.Sheet(
+        {
+            "source_id": "sheet-id",
+            "sheets": [{"name": "students", "regions": [region_config]}],
+            "views": view_configs,
+        },
+        None,
+    )
+    sheet.tabs["students"] = {region.region_name: region for region in regions}
+    return views.Views({"gradebook": sheet})
+
+
+def test_views_errors(keyed_regions):
+    """Check that views with unknown regions, columns, or cycles are reported."""
+    sheet_views = views_of(
+        keyed_regions,
+        [
+            {"name": "first", "join": ["second"]},
+            {"name": "second", "join": ["first"]},
+            {"name": "missing", "join": ["students/roster"]},
+            {
+                "name": "filtered",
+                "join": ["students/info", "students/grades"],
+                "filter": [{"column": "EE2", "op": "notna"}],
+            },
+            {"name": "projected", "join": ["students/info"], "columns": ["EE1"]},
+        ],
+    )
+    with pytest.raises(Exception, match="views join each other: first -> second"):
+        sheet_views.get("first")
+    with pytest.raises(Exception, match="region students/roster .* not collected"):
+        sheet_views.get("missing")
+    with pytest.raises(Exception, match="filter column EE2 not found"):
+        sheet_views.get("filtered")
+    with pytest.raises(Exception, match=r"columns \['EE1'\] of view projected"):
+        sheet_views.get("projected")
+    with pytest.raises(Exception, match="unknown view other"):
+        sheet_views.get("other")
+    assert not sheet_views.cache
+
+
+def test_views_filter_key_and_numbers(keyed_regions):
+    """Check that filters and columns name the key and compare text as numbers."""
+    info, _ = keyed_regions
+    scores = sheet_collector.Region(
+        "scores",
+        "students",
+        "G1",
+        "H4",
+        pd.DataFrame({"username": ["ada", "alan", "grace"], "EE1": ["85", "100", "x"]}),
+        key="username",
+    )
+    sheet_views = views_of(
+        [info, scores],
+        [
+            {
+                "name": "high",
+                "join": ["students/info", "students/scores"],
+                "filter": [{"column": "EE1", "op": ">", "value": 85}],
+                "columns": ["EE1"],
+            },
+            {
+                "name": "named",
+                "join": ["students/info"],
+                "filter": [{"column": "Student GitHub", "op": "in", "value": ["ada"]}],
+                "columns": ["Student Name", "Student GitHub"],
+            },
+        ],
+    )
+    high = sheet_views.get("high")
+    assert high.data.to_dict("list") == {"Student GitHub": ["alan"], "EE1": ["100"]}
+    named = sheet_views.get("named")
+    assert list(named.data.columns) == ["Student GitHub", "Student Name"]
+    assert named.data["Student Name"].tolist() == ["Ada"]